@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import EmailTemplate, EmailMessage, IncomingEmail
+from .models import EmailTemplate, EmailMessage, EmailAttachment, EmailCampaign, IncomingEmail, MailboxSyncState, MailboxSyncJob
 
 
 @admin.register(EmailTemplate)
@@ -32,7 +32,7 @@ class EmailMessageAdmin(admin.ModelAdmin):
     list_display = ('subject', 'sender', 'status', 'company', 'contact', 'created_at', 'sent_at')
     list_filter = ('status', 'created_at', 'sent_at')
     search_fields = ('subject', 'content', 'sender', 'company__name', 'contact__first_name', 'contact__last_name')
-    readonly_fields = ('created_at', 'sent_at', 'status', 'error_message')
+    readonly_fields = ('created_at', 'sent_at', 'status', 'error_message', 'attempts', 'next_attempt_at', 'sending_started_at')
     fieldsets = (
         (None, {
             'fields': ('subject', 'content', 'sender')
@@ -41,10 +41,10 @@ class EmailMessageAdmin(admin.ModelAdmin):
             'fields': ('recipients', 'cc', 'bcc')
         }),
         ('İlişkiler', {
-            'fields': ('company', 'contact')
+            'fields': ('company', 'contact', 'campaign')
         }),
         ('Durum', {
-            'fields': ('status', 'error_message', 'created_at', 'sent_at')
+            'fields': ('status', 'error_message', 'created_at', 'sent_at', 'attempts', 'next_attempt_at', 'sending_started_at')
         }),
         ('Dosyalar ve Meta Veriler', {
             'fields': ('attachments', 'metadata'),
@@ -53,6 +53,28 @@ class EmailMessageAdmin(admin.ModelAdmin):
     )
 
 
+@admin.register(EmailAttachment)
+class EmailAttachmentAdmin(admin.ModelAdmin):
+    """
+    E-posta ekleri için admin panel yapılandırması
+    """
+    list_display = ('original_name', 'content_type', 'file_size', 'uploaded_by', 'uploaded_at')
+    search_fields = ('original_name', 'content_hash')
+    readonly_fields = ('file', 'file_size', 'content_type', 'content_hash', 'uploaded_by', 'uploaded_at')
+
+
+@admin.register(EmailCampaign)
+class EmailCampaignAdmin(admin.ModelAdmin):
+    """
+    Toplu e-posta kampanyaları için admin panel yapılandırması
+    """
+    list_display = ('name', 'created_by', 'recipient_type', 'status', 'total_count', 'sent_count', 'failed_count', 'created_at')
+    list_filter = ('status', 'recipient_type', 'created_at')
+    search_fields = ('name', 'subject', 'created_by__username')
+    readonly_fields = ('status', 'total_count', 'queued_count', 'sent_count', 'failed_count', 'last_recipient_id',
+                       'error_message', 'created_at', 'started_at', 'finished_at')
+
+
 # EmailConfigAdmin kaldırıldı - SMTP ayarları artık kullanıcı profilinde
 
 
@@ -64,7 +86,7 @@ class IncomingEmailAdmin(admin.ModelAdmin):
     list_display = ('subject', 'sender_email', 'sender_name', 'status', 'company', 'contact', 'received_at', 'has_attachments')
     list_filter = ('status', 'received_at', 'has_attachments', 'company')
     search_fields = ('subject', 'content', 'sender_email', 'sender_name', 'company__name', 'contact__first_name', 'contact__last_name')
-    readonly_fields = ('message_id', 'received_at', 'created_at', 'updated_at', 'raw_headers')
+    readonly_fields = ('message_id', 'received_at', 'created_at', 'updated_at', 'raw_headers', 'mailbox', 'imap_uid')
     date_hierarchy = 'received_at'
 
     fieldsets = (
@@ -88,10 +110,32 @@ class IncomingEmailAdmin(admin.ModelAdmin):
             'classes': ('collapse',),
         }),
         ('Teknik Bilgiler', {
-            'fields': ('raw_headers',),
+            'fields': ('raw_headers', 'mailbox', 'imap_uid', 'body_loaded'),
             'classes': ('collapse',),
         }),
     )
 
     def get_queryset(self, request):
         return super().get_queryset(request).select_related('company', 'contact')
+
+
+@admin.register(MailboxSyncState)
+class MailboxSyncStateAdmin(admin.ModelAdmin):
+    """
+    IMAP senkronizasyon durumları için admin panel yapılandırması
+    """
+    list_display = ('user', 'account', 'folder', 'uid_validity', 'last_uid', 'last_synced_at')
+    search_fields = ('user__username', 'account', 'folder')
+    readonly_fields = ('uid_validity', 'last_uid', 'last_synced_at', 'lock_token', 'locked_until')
+
+
+@admin.register(MailboxSyncJob)
+class MailboxSyncJobAdmin(admin.ModelAdmin):
+    """
+    Arka plan IMAP senkronizasyon işleri için admin panel yapılandırması
+    """
+    list_display = ('mailbox', 'user', 'status', 'fetched_count', 'saved_count', 'created_at', 'finished_at')
+    list_filter = ('status', 'created_at')
+    search_fields = ('user__username', 'mailbox__account', 'task_id')
+    readonly_fields = ('task_id', 'fetched_count', 'saved_count', 'batches_done', 'batch_count',
+                       'message', 'created_at', 'started_at', 'finished_at')
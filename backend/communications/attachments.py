@@ -0,0 +1,104 @@
+"""
+E-posta eklerinin saklanması ve MIME mesajına eklenmesi.
+
+Yüklenen dosyanın SHA-256 özeti parça parça hesaplanır; aynı içerik depoda
+tek kopya olarak tutulur. Gönderimde dosya depodan parça parça okunup
+base64 satırlarına çevrilir, dosyanın tamamı ham haliyle belleğe alınmaz.
+"""
+import base64
+import hashlib
+import mimetypes
+from email.mime.base import MIMEBase
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
+
+from .models import EmailAttachment, email_attachment_upload_path
+
+# 57 baytlık parçalar 76 karakterlik tam base64 satırlarına denk gelir
+BASE64_CHUNK_SIZE = 57 * 1024
+
+
+def get_content_hash(file_obj):
+    """
+    Dosyanın SHA-256 özeti; dosya parça parça okunur
+    """
+    hasher = hashlib.sha256()
+    for chunk in file_obj.chunks():
+        hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def store_attachment(file_obj, file_name, content_type=None, user=None):
+    """
+    Dosyayı ek olarak kaydeder. Kullanıcının aynı içerik ve adla daha önce
+    yüklediği bir ek varsa o döner; başka kullanıcıların kayıtları dönmez
+    (yalnızca depodaki dosya paylaşılır).
+
+    Returns:
+        tuple: (EmailAttachment, yeni oluşturuldu mu)
+    """
+    content_hash = get_content_hash(file_obj)
+    own_attachments = EmailAttachment.objects.filter(uploaded_by=user, content_hash=content_hash, original_name=file_name)
+    existing = own_attachments.first()
+    if existing:
+        return existing, False
+
+    attachment = EmailAttachment(
+        original_name=file_name,
+        file_size=file_obj.size,
+        content_type=content_type or mimetypes.guess_type(file_name)[0] or 'application/octet-stream',
+        content_hash=content_hash,
+        uploaded_by=user,
+    )
+    path = email_attachment_upload_path(attachment, file_name)
+    if default_storage.exists(path):
+        attachment.file.name = path
+    else:
+        file_obj.seek(0)
+        attachment.file.save(file_name, file_obj, save=False)
+
+    try:
+        with transaction.atomic():
+            attachment.save()
+    except IntegrityError:
+        # Aynı dosya eşzamanlı olarak yüklendi
+        return own_attachments.get(), False
+    return attachment, True
+
+
+def store_inline_attachment(attachment_data, user=None):
+    """
+    İstek gövdesinde base64 olarak gelen eski biçimli eki kaydeder; böylece
+    giden kutusundaki mesajlar dosya içeriği taşımaz.
+    """
+    content = base64.b64decode(attachment_data['file_content'])
+    file_name = attachment_data.get('file_name') or 'attachment'
+    attachment, _ = store_attachment(
+        ContentFile(content, name=file_name), file_name, attachment_data.get('content_type'), user
+    )
+    return attachment
+
+
+def build_attachment_part(file_obj, file_name, content_type=None):
+    """
+    Açık bir dosyadan base64 kodlanmış MIME eki üretir; dosya
+    BASE64_CHUNK_SIZE'lık parçalar halinde okunur.
+    """
+    mime_type = content_type or mimetypes.guess_type(file_name)[0] or 'application/octet-stream'
+    main_type, sub_type = mime_type.split('/', 1)
+
+    lines = []
+    while True:
+        chunk = file_obj.read(BASE64_CHUNK_SIZE)
+        if not chunk:
+            break
+        lines.append(base64.encodebytes(chunk).decode('ascii'))
+
+    part = MIMEBase(main_type, sub_type)
+    part.set_payload(''.join(lines))
+    part['Content-Transfer-Encoding'] = 'base64'
+    # Türkçe karakterli dosya adları RFC 2231 ile kodlanır
+    part.add_header('Content-Disposition', 'attachment', filename=file_name)
+    return part
@@ -0,0 +1,87 @@
+"""
+Toplu e-posta kampanyaları: alıcı seçimi ve kişiye özel mesaj üretimi.
+"""
+from customers.models import Company, Contact
+from customers.search import apply_search
+from .models import EmailMessage
+from .templating import compile_template, get_company_context, get_contact_context
+
+# Alıcı tipi başına desteklenen filtreler: {filtre adı: (lookup, liste mi)}
+CAMPAIGN_FILTERS = {
+    'contacts': {
+        'contact_ids': ('id__in', True),
+        'company_ids': ('company_id__in', True),
+        'lead_status': ('lead_status__in', True),
+        'lead_source': ('lead_source__in', True),
+        'industry': ('company__industry__in', True),
+        'is_primary': ('is_primary', False),
+        'q': (None, False),
+    },
+    'companies': {
+        'company_ids': ('id__in', True),
+        'industry': ('industry__in', True),
+        'company_size': ('company_size__in', True),
+        'q': (None, False),
+    },
+}
+
+
+def get_campaign_recipients(recipient_type, filters):
+    """
+    Filtreye uyan ve e-posta adresi olan alıcılar, birincil anahtar sırasıyla.
+
+    Sıralama partiler halinde (pk > son_pk) okumaya uygundur; 50 bin alıcılı
+    bir kampanyada da bellekte sadece tek parti tutulur.
+    """
+    if recipient_type == 'companies':
+        queryset = Company.objects.all()
+    else:
+        queryset = Contact.objects.select_related('company')
+
+    lookups = CAMPAIGN_FILTERS[recipient_type]
+    for name, value in filters.items():
+        lookup, _ = lookups[name]
+        if name == 'q':
+            queryset = apply_search(queryset, value)
+        else:
+            queryset = queryset.filter(**{lookup: value})
+
+    return queryset.exclude(email__isnull=True).exclude(email='').order_by('pk')
+
+
+def build_campaign_messages(campaign, recipients):
+    """
+    Bir parti alıcı için kişiye özel, kuyruğa alınmış EmailMessage nesneleri
+    (kaydedilmemiş; bulk_create ile yazılır).
+    """
+    subject_template = compile_template(campaign.subject)
+    content_template = compile_template(campaign.content)
+    is_company = campaign.recipient_type == 'companies'
+
+    messages = []
+    for recipient in recipients:
+        if is_company:
+            context = get_company_context(recipient)
+            company, contact, name = recipient, None, recipient.name
+        else:
+            context = get_contact_context(recipient)
+            company, contact, name = recipient.company, recipient, context['ad_soyad']
+        # Kampanyaya özel değişkenler kayıt değişkenlerini ezmez
+        context = {**campaign.variables, **context}
+
+        messages.append(EmailMessage(
+            subject=subject_template.render(context)[:255],
+            content=content_template.render(context),
+            sender=campaign.sender,
+            recipients=[{'email': recipient.email, 'name': name}],
+            status='queued',
+            company=company,
+            contact=contact,
+            campaign=campaign,
+            metadata={
+                'campaign_id': campaign.pk,
+                'sent_by_user_id': campaign.created_by_id,
+                'sender_name': campaign.sender_name,
+            },
+        ))
+    return messages
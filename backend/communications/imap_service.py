@@ -9,120 +9,357 @@ from django.conf import settings
 import re
 import json
 
-from .models import IncomingEmail
+from .models import IncomingEmail, MailboxSyncState
 from customers.models import Company, Contact
+from customers.matching import domain_from_email
 
 logger = logging.getLogger(__name__)
 
+# Tek UID FETCH komutunda istenecek en fazla mesaj
+FETCH_BATCH_SIZE = 200
+# İlk senkronizasyonda alınacak en yeni mesaj sayısı
+INITIAL_SYNC_LIMIT = 50
+
+
+def get_imap_config(user_profile):
+    """
+    Kullanıcı profilindeki IMAP ayarlarından bağlantı konfigürasyonu üretir.
+    """
+    return {
+        'imap_server': user_profile.imap_server,
+        'imap_port': user_profile.imap_port,
+        'imap_username': user_profile.imap_username,
+        'imap_password': user_profile.imap_password,
+        'use_ssl': user_profile.use_imap_ssl,
+    }
+
+
+def get_mailbox_account(imap_config):
+    """
+    Senkronizasyon durumunun tutulduğu hesap anahtarı.
+    """
+    return f"{imap_config['imap_username']}@{imap_config['imap_server']}"
+
 
 class IMAPService:
     """
     IMAP ile e-posta alma servisi
+
+    Durum tutmaz; her işlem kendi bağlantısını açıp kapatır, bu yüzden tek
+    global instance farklı thread ve Celery worker'larında güvenle kullanılır.
     """
-    
-    def __init__(self):
-        self.connection = None
-    
+
     def connect(self, imap_config):
         """
         IMAP sunucusuna bağlan
+
+        Returns:
+            tuple: (bağlantı veya None, mesaj)
         """
         try:
             # IMAP bağlantısı kur
             if imap_config.get('use_ssl', True):
-                self.connection = imaplib.IMAP4_SSL(
+                connection = imaplib.IMAP4_SSL(
                     imap_config['imap_server'], 
                     imap_config.get('imap_port', 993)
                 )
             else:
-                self.connection = imaplib.IMAP4(
+                connection = imaplib.IMAP4(
                     imap_config['imap_server'], 
                     imap_config.get('imap_port', 143)
                 )
             
             # Giriş yap
-            self.connection.login(
+            connection.login(
                 imap_config['imap_username'], 
                 imap_config['imap_password']
             )
             
             logger.info(f"IMAP bağlantısı başarılı: {imap_config['imap_server']}")
-            return True, "Bağlantı başarılı"
+            return connection, "Bağlantı başarılı"
             
         except Exception as e:
             logger.error(f"IMAP bağlantı hatası: {str(e)}")
-            return False, f"Bağlantı hatası: {str(e)}"
+            return None, f"Bağlantı hatası: {str(e)}"
     
-    def disconnect(self):
+    def disconnect(self, connection):
         """
         IMAP bağlantısını kapat
         """
-        if self.connection:
+        if connection:
             try:
-                self.connection.close()
-                self.connection.logout()
+                connection.close()
+                connection.logout()
                 logger.info("IMAP bağlantısı kapatıldı")
             except:
                 pass
-            finally:
-                self.connection = None
-    
-    def fetch_emails(self, imap_config, folder='INBOX', limit=50):
+
+    def sync_mailbox(self, user, imap_config, folder='INBOX', headers_only=False,
+                     initial_limit=INITIAL_SYNC_LIMIT, batch_size=FETCH_BATCH_SIZE,
+                     progress_callback=None):
         """
-        E-postaları al
+        Klasördeki yeni e-postaları UID tabanlı ve artımlı olarak alıp kaydeder.
+
+        Kullanıcının bu klasör için bilinen en büyük UID'sinden sonrası, UID
+        aralıkları halinde toplu FETCH ile istenir. Yeni e-posta yoksa SELECT
+        yanıtındaki UIDNEXT yeterlidir, FETCH yapılmaz. UIDVALIDITY değişmişse
+        klasörün tüm UID'leri Message-ID üzerinden kayıtlı e-postalarla yeniden
+        eşleştirilir (bkz. _resync_uids) ve yalnızca yeni mesajlar alınır.
+
+        Args:
+            headers_only: True ise sadece başlıklar ve BODYSTRUCTURE alınır,
+                içerik ilk görüntülemede fetch_message_body ile çekilir
+            initial_limit: İlk senkronizasyonda alınacak en yeni mesaj sayısı
+                (None ise tamamı)
+            batch_size: Tek FETCH komutundaki en fazla UID sayısı
+            progress_callback: Her partiden sonra {'fetched_count', 'saved_count',
+                'last_uid', 'batches_done', 'batch_count'} ile çağrılır
+
+        Returns:
+            tuple: (başarılı mı, mesaj, {'fetched_count', 'saved_count', 'last_uid'})
         """
+        account = get_mailbox_account(imap_config)
+        state, _ = MailboxSyncState.objects.get_or_create(user=user, account=account, folder=folder)
+
+        connection, message = self.connect(imap_config)
+        if not connection:
+            return False, message, {}
+
+        fetched_count = 0
+        saved_count = 0
         try:
-            # Bağlan
-            success, message = self.connect(imap_config)
-            if not success:
-                return False, message, []
-            
-            # Klasörü seç
-            self.connection.select(folder)
-            
-            # Son e-postaları ara
-            status, messages = self.connection.search(None, 'ALL')
-            
-            if status != 'OK':
-                return False, "E-posta arama hatası", []
-            
-            # Mesaj ID'lerini al
-            message_ids = messages[0].split()
-            
-            # Son N mesajı al
-            recent_ids = message_ids[-limit:] if len(message_ids) > limit else message_ids
-            
-            emails = []
-            
-            for msg_id in reversed(recent_ids):  # En yeniden başla
-                try:
-                    # E-postayı al
-                    status, msg_data = self.connection.fetch(msg_id, '(RFC822)')
-                    
-                    if status != 'OK':
-                        continue
-                    
-                    # E-postayı parse et
-                    email_obj = email.message_from_bytes(msg_data[0][1])
-                    parsed_email = self._parse_email(email_obj)
-                    
-                    if parsed_email:
-                        emails.append(parsed_email)
-                        
-                except Exception as e:
-                    logger.error(f"E-posta parse hatası: {str(e)}")
-                    continue
-            
-            self.disconnect()
-            
-            logger.info(f"{len(emails)} e-posta alındı")
-            return True, f"{len(emails)} e-posta alındı", emails
-            
+            uid_validity, uid_next = self._select(connection, folder)
+
+            resync_last_uid = 0
+            if state.uid_validity != uid_validity:
+                # İlk senkronizasyon veya sunucu UID'leri sıfırladı
+                is_resync = state.uid_validity is not None
+                state.uid_validity = uid_validity
+                state.last_uid = 0
+                if is_resync:
+                    pending_uids, resync_last_uid = self._resync_uids(connection, state, initial_limit, batch_size)
+
+            if resync_last_uid:
+                uid_sets = self._uid_sets(pending_uids, batch_size)
+            elif state.last_uid and uid_next and uid_next <= state.last_uid + 1:
+                uid_sets = []
+            else:
+                uid_sets = self._pending_uid_sets(connection, state.last_uid, uid_next, initial_limit, batch_size)
+
+            for batches_done, uid_set in enumerate(uid_sets, start=1):
+                emails = [
+                    email_data for email_data in self._fetch_batch(connection, uid_set, headers_only)
+                    # 'n:*' aralığı yeni mesaj yoksa en son mesajı da döndürür
+                    if email_data['uid'] > state.last_uid
+                ]
+                if emails:
+                    for email_data in emails:
+                        if not email_data['message_id']:
+                            email_data['message_id'] = f"{uid_validity}.{email_data['uid']}@{account}"
+
+                    fetched_count += len(emails)
+                    saved_count += self.save_emails_to_db(emails, mailbox=state)
+
+                    # Her partiden sonra kaydedilir; yarıda kalan senkronizasyon kaldığı yerden devam eder
+                    state.last_uid = max(email_data['uid'] for email_data in emails)
+                    state.save(update_fields=['uid_validity', 'last_uid'])
+
+                if progress_callback:
+                    progress_callback({
+                        'fetched_count': fetched_count,
+                        'saved_count': saved_count,
+                        'last_uid': state.last_uid,
+                        'batches_done': batches_done,
+                        'batch_count': len(uid_sets),
+                    })
+
+            state.last_uid = max(state.last_uid, resync_last_uid)
+            state.last_synced_at = django_timezone.now()
+            state.save(update_fields=['uid_validity', 'last_uid', 'last_synced_at'])
+
+            logger.info(f"{account}/{folder}: {fetched_count} e-posta alındı, {saved_count} yeni")
+            return True, f"{fetched_count} e-posta alındı", {
+                'fetched_count': fetched_count,
+                'saved_count': saved_count,
+                'last_uid': state.last_uid,
+            }
+
         except Exception as e:
             logger.error(f"E-posta alma hatası: {str(e)}")
-            self.disconnect()
-            return False, f"E-posta alma hatası: {str(e)}", []
-    
+            return False, f"E-posta alma hatası: {str(e)}", {
+                'fetched_count': fetched_count,
+                'saved_count': saved_count,
+                'last_uid': state.last_uid,
+            }
+        finally:
+            self.disconnect(connection)
+
+    def fetch_message_body(self, imap_config, folder, uid):
+        """
+        Sadece başlıkları alınmış bir e-postanın içeriğini sunucudan çeker.
+
+        Returns:
+            dict: _parse_email çıktısı, mesaj bulunamazsa None
+        """
+        connection, message = self.connect(imap_config)
+        if not connection:
+            raise imaplib.IMAP4.error(message)
+
+        try:
+            self._select(connection, folder)
+            for email_data in self._fetch_batch(connection, str(uid), headers_only=False):
+                if email_data['uid'] == uid:
+                    return email_data
+            return None
+        finally:
+            self.disconnect(connection)
+
+    def _select(self, connection, folder):
+        """
+        Klasörü salt okunur seçer ve (UIDVALIDITY, UIDNEXT) döner.
+        """
+        status, data = connection.select(folder, readonly=True)
+        if status != 'OK':
+            raise imaplib.IMAP4.error(f"Klasör seçilemedi: {folder}")
+        return self._untagged_int(connection, 'UIDVALIDITY'), self._untagged_int(connection, 'UIDNEXT')
+
+    def _untagged_int(self, connection, name):
+        _, data = connection.response(name)
+        try:
+            return int(data[-1])
+        except (TypeError, ValueError, IndexError):
+            return None
+
+    def _pending_uid_sets(self, connection, last_uid, uid_next, initial_limit, batch_size):
+        """
+        Alınacak UID'leri FETCH komutlarına verilecek UID kümelerine böler.
+        """
+        if last_uid and uid_next:
+            # Aralıklar sunucuda çözülür, UID listesi indirilmez; son aralık
+            # SELECT'ten sonra gelen mesajları da kapsar
+            starts = range(last_uid + 1, uid_next, batch_size)
+            return [
+                f"{start}:{start + batch_size - 1}" if start + batch_size < uid_next else f"{start}:*"
+                for start in starts
+            ] or [f"{last_uid + 1}:*"]
+
+        criteria = f"UID {last_uid + 1}:*" if last_uid else 'ALL'
+        status, data = connection.uid('SEARCH', None, criteria)
+        if status != 'OK':
+            raise imaplib.IMAP4.error("E-posta arama hatası")
+
+        uids = sorted(int(uid) for uid in data[0].split() if int(uid) > last_uid)
+        if not last_uid and initial_limit:
+            uids = uids[-initial_limit:]
+        return self._uid_sets(uids, batch_size)
+
+    def _uid_sets(self, uids, batch_size):
+        return [
+            ','.join(str(uid) for uid in uids[index:index + batch_size])
+            for index in range(0, len(uids), batch_size)
+        ]
+
+    def _resync_uids(self, connection, state, initial_limit, batch_size):
+        """
+        UIDVALIDITY değiştiğinde klasördeki tüm UID'leri yeniden eşleştirir.
+
+        Tüm mesajların yalnızca Message-ID başlığı alınır; bu posta kutusunda
+        kayıtlı e-postaların `imap_uid` alanı yeni UID ile güncellenir (klasörde
+        artık olmayanlarınki boşaltılır). Alınması gereken mesajlar, eşleşen en
+        büyük UID'den sonraki eşleşmeyen mesajlardır; hiç eşleşme yoksa klasör
+        ilk senkronizasyondaki gibi `initial_limit` ile alınır.
+
+        Returns:
+            tuple: (alınacak UID'ler, klasördeki en büyük UID)
+        """
+        status, data = connection.uid('SEARCH', None, 'ALL')
+        if status != 'OK':
+            raise imaplib.IMAP4.error("E-posta arama hatası")
+        uids = sorted(int(uid) for uid in data[0].split())
+
+        uid_by_message_id = {}
+        for uid_set in self._uid_sets(uids, batch_size):
+            status, data = connection.uid('FETCH', uid_set, '(UID BODY.PEEK[HEADER.FIELDS (MESSAGE-ID)])')
+            if status != 'OK':
+                raise imaplib.IMAP4.error(f"E-posta alma hatası: {uid_set}")
+            for meta, literal in self._iter_fetch_response(data):
+                uid_match = re.search(rb'UID (\d+)', meta)
+                if not uid_match or literal is None:
+                    continue
+                message_id = str(email.message_from_bytes(literal).get('Message-ID', '')).strip().strip('<>')[:255]
+                if message_id:
+                    uid_by_message_id[message_id] = int(uid_match.group(1))
+
+        stored = IncomingEmail.objects.filter(mailbox=state).only('pk', 'message_id', 'imap_uid')
+        changed = []
+        for incoming in stored.iterator(chunk_size=2000):
+            imap_uid = uid_by_message_id.get(incoming.message_id)
+            if incoming.imap_uid != imap_uid:
+                incoming.imap_uid = imap_uid
+                changed.append(incoming)
+        IncomingEmail.objects.bulk_update(changed, ['imap_uid'], batch_size=500)
+
+        known_ids = set()
+        message_ids = list(uid_by_message_id)
+        for index in range(0, len(message_ids), 1000):
+            known_ids.update(IncomingEmail.objects.filter(
+                message_id__in=message_ids[index:index + 1000]
+            ).values_list('message_id', flat=True))
+        known_uids = {uid_by_message_id[message_id] for message_id in known_ids}
+
+        if known_uids:
+            pending = [uid for uid in uids if uid > max(known_uids) and uid not in known_uids]
+        else:
+            pending = uids[-initial_limit:] if initial_limit else uids
+        logger.info(
+            f"{state.account}/{state.folder}: UIDVALIDITY changed, remapped {len(changed)} stored emails, "
+            f"{len(pending)} to fetch"
+        )
+        return pending, max(uids, default=0)
+
+    def _fetch_batch(self, connection, uid_set, headers_only):
+        """
+        Bir UID kümesini tek UID FETCH komutuyla alıp parse eder.
+        """
+        query = '(UID BODYSTRUCTURE BODY.PEEK[HEADER])' if headers_only else '(UID BODY.PEEK[])'
+        status, data = connection.uid('FETCH', uid_set, query)
+        if status != 'OK':
+            raise imaplib.IMAP4.error(f"E-posta alma hatası: {uid_set}")
+
+        emails = []
+        for meta, literal in self._iter_fetch_response(data):
+            uid_match = re.search(rb'UID (\d+)', meta)
+            if not uid_match or literal is None:
+                continue
+
+            parsed_email = self._parse_email(email.message_from_bytes(literal))
+            if not parsed_email:
+                continue
+
+            parsed_email['uid'] = int(uid_match.group(1))
+            parsed_email['body_loaded'] = not headers_only
+            if headers_only:
+                parsed_email['has_attachments'] = b'"ATTACHMENT"' in meta.upper()
+            emails.append(parsed_email)
+
+        return emails
+
+    def _iter_fetch_response(self, data):
+        """
+        imaplib FETCH yanıtını (meta, literal) çiftlerine ayırır. Literal'den
+        sonra gelen parçalar (ör. BODYSTRUCTURE) meta bilgisine eklenir.
+        """
+        meta, literal = None, None
+        for item in data:
+            if isinstance(item, tuple):
+                if meta is not None:
+                    yield meta, literal
+                meta, literal = item[0], item[1]
+            elif isinstance(item, bytes) and meta is not None:
+                meta += b' ' + item
+        if meta is not None:
+            yield meta, literal
+
     def _parse_email(self, email_obj):
         """
         E-posta nesnesini parse et
@@ -130,16 +367,17 @@ class IMAPService:
         try:
             # Başlık bilgilerini al
             subject = self._decode_header(email_obj.get('Subject', ''))
-            sender = self._parse_email_address(email_obj.get('From', ''))
-            recipients = self._parse_recipients(email_obj.get('To', ''))
-            cc = self._parse_recipients(email_obj.get('Cc', '')) if email_obj.get('Cc') else []
+            # 8-bit başlıklar str yerine Header nesnesi olarak dönebilir
+            sender = self._parse_email_address(str(email_obj.get('From', '')))
+            recipients = self._parse_recipients(str(email_obj.get('To', '')))
+            cc = self._parse_recipients(str(email_obj.get('Cc', ''))) if email_obj.get('Cc') else []
             
             # Tarih
             date_str = email_obj.get('Date')
             received_at = parsedate_to_datetime(date_str) if date_str else django_timezone.now()
             
             # Message-ID
-            message_id = email_obj.get('Message-ID', '').strip('<>')
+            message_id = str(email_obj.get('Message-ID', '')).strip().strip('<>')
             
             # İçerik
             content, content_html = self._extract_content(email_obj)
@@ -159,7 +397,7 @@ class IMAPService:
                 'received_at': received_at,
                 'has_attachments': has_attachments,
                 'attachments': attachments,
-                'raw_headers': dict(email_obj.items())
+                'raw_headers': {name: str(value) for name, value in email_obj.items()}
             }
             
         except Exception as e:
@@ -284,72 +522,101 @@ class IMAPService:
         
         return attachments, has_attachments
     
-    def save_emails_to_db(self, emails):
+    def save_emails_to_db(self, emails, mailbox=None):
         """
-        E-postaları veritabanına kaydet
+        E-postaları toplu olarak veritabanına kaydet
+
+        Returns:
+            int: Yeni kaydedilen e-posta sayısı
         """
-        saved_count = 0
-        
         for email_data in emails:
-            try:
-                # Zaten var mı kontrol et
-                if IncomingEmail.objects.filter(message_id=email_data['message_id']).exists():
-                    continue
-                
-                # Şirket ve kişi ilişkilerini bul
-                company, contact = self._find_relations(email_data['sender_email'])
-
-                # E-postayı kaydet
-                incoming_email = IncomingEmail.objects.create(
-                    message_id=email_data['message_id'],
-                    subject=email_data['subject'],
-                    content=email_data['content'],
-                    content_html=email_data['content_html'],
-                    sender_email=email_data['sender_email'],
-                    sender_name=email_data['sender_name'],
-                    recipients=email_data['recipients'],
-                    cc=email_data['cc'],
-                    received_at=email_data['received_at'],
-                    has_attachments=email_data['has_attachments'],
-                    attachments=email_data['attachments'],
-                    raw_headers=email_data['raw_headers'],
-                    company=company,
-                    contact=contact
-                )
-                
-                saved_count += 1
-                logger.info(f"E-posta kaydedildi: {email_data['subject']}")
-                
-            except Exception as e:
-                logger.error(f"E-posta kaydetme hatası: {str(e)}")
+            email_data['message_id'] = email_data['message_id'][:255]
+        message_ids = {email_data['message_id'] for email_data in emails}
+        existing_ids = set(
+            IncomingEmail.objects.filter(message_id__in=message_ids).values_list('message_id', flat=True)
+        )
+
+        new_emails = []
+        for email_data in emails:
+            if email_data['message_id'] in existing_ids:
                 continue
-        
-        return saved_count
-    
-    def _find_relations(self, sender_email):
+            existing_ids.add(email_data['message_id'])
+            new_emails.append(email_data)
+
+        if not new_emails:
+            return 0
+
+        relations = self._find_relations([email_data['sender_email'] for email_data in new_emails])
+        incoming_emails = []
+        for email_data in new_emails:
+            company, contact = relations.get(email_data['sender_email'], (None, None))
+            incoming_emails.append(IncomingEmail(
+                message_id=email_data['message_id'],
+                subject=email_data['subject'][:255],
+                content=self.clean_text(email_data['content']),
+                content_html=self.clean_text(email_data['content_html']),
+                sender_email=email_data['sender_email'],
+                sender_name=(email_data['sender_name'] or '')[:255],
+                recipients=email_data['recipients'],
+                cc=email_data['cc'],
+                received_at=email_data['received_at'],
+                has_attachments=email_data['has_attachments'],
+                attachments=email_data['attachments'],
+                raw_headers=email_data['raw_headers'],
+                company=company,
+                contact=contact,
+                mailbox=mailbox,
+                imap_uid=email_data.get('uid'),
+                body_loaded=email_data.get('body_loaded', True),
+            ))
+
+        # Eşzamanlı bir senkronizasyonun kaydettiği mesajlar unique message_id ile atlanır.
+        # ignore_conflicts atlanan satırları bildirmez; eklenenler, önceden olmayan
+        # message_id'lerden eklemeden sonra bu posta kutusunda bulunanlardır.
+        IncomingEmail.objects.bulk_create(incoming_emails, batch_size=500, ignore_conflicts=True)
+        return IncomingEmail.objects.filter(
+            message_id__in=[incoming.message_id for incoming in incoming_emails], mailbox=mailbox
+        ).count()
+
+    def clean_text(self, value):
+        # PostgreSQL metin alanları NUL karakter kabul etmez
+        return value.replace('\x00', '') if value else value
+
+    def _find_relations(self, sender_emails):
         """
-        Gönderen e-postaya göre şirket ve kişi ilişkilerini bul
+        Gönderen e-postalara göre şirket ve kişi ilişkilerini toplu olarak bul
+
+        Returns:
+            dict: {gönderen_e-posta: (şirket, kişi)}
         """
-        company = None
-        contact = None
+        sender_emails = {sender_email for sender_email in sender_emails if sender_email}
+        relations = {}
 
         try:
             # Önce kişi ara
-            contact = Contact.objects.filter(email=sender_email).first()
-            if contact and contact.company:
-                company = contact.company
+            for contact in Contact.objects.filter(email__in=sender_emails).select_related('company'):
+                relations.setdefault(contact.email, (contact.company, contact))
+
+            # Kişi bulunamadıysa e-posta domain'ine göre şirket ara (indeksli tam eşleşme;
+            # ücretsiz e-posta servisleri bir şirkete bağlanmaz)
+            domains = {
+                sender_email: domain_from_email(sender_email)
+                for sender_email in sender_emails
+                if sender_email not in relations
+            }
+            domains = {sender_email: domain for sender_email, domain in domains.items() if domain}
 
-            # Kişi bulunamadıysa şirket ara
-            if not company:
-                # E-posta domain'ine göre şirket ara
-                domain = sender_email.split('@')[1] if '@' in sender_email else ''
-                if domain:
-                    company = Company.objects.filter(website_url__icontains=domain).first()
+            if domains:
+                by_domain = {}
+                for company in Company.objects.filter(domain__in=set(domains.values())).order_by('pk'):
+                    by_domain.setdefault(company.domain, company)
+                for sender_email, domain in domains.items():
+                    relations[sender_email] = (by_domain.get(domain), None)
 
         except Exception as e:
             logger.error(f"İlişki bulma hatası: {str(e)}")
 
-        return company, contact
+        return relations
 
 
 # Global servis instance
@@ -0,0 +1,86 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from communications.smtp_pool import SMTPConnectionPool
+from communications.smtp_service import SMTPEmailService
+
+
+class Command(BaseCommand):
+    help = (
+        'Yerel bir aiosmtpd sunucusuna e-posta göndererek bağlantı havuzu '
+        'olmadan ve havuzla saniyedeki mesaj sayısını ölç'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--messages',
+            type=int,
+            default=200,
+            help='Her senaryoda gönderilecek mesaj sayısı (varsayılan: 200)',
+        )
+        parser.add_argument(
+            '--port',
+            type=int,
+            default=8025,
+            help='Yerel SMTP sunucusunun portu (varsayılan: 8025)',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            from aiosmtpd.controller import Controller
+            from aiosmtpd.handlers import Sink
+            from aiosmtpd.smtp import AuthResult
+        except ImportError:
+            raise CommandError("Bu komut için aiosmtpd gerekli: pip install aiosmtpd")
+
+        messages = options['messages']
+        port = options['port']
+
+        # Gerçek sunuculardaki gibi her bağlantıda AUTH LOGIN yapılır
+        controller = Controller(
+            Sink(),
+            hostname='127.0.0.1',
+            port=port,
+            authenticator=lambda *args: AuthResult(success=True),
+            auth_require_tls=False,
+        )
+        controller.start()
+
+        smtp_config = {
+            'smtp_server': '127.0.0.1',
+            'smtp_port': port,
+            'smtp_username': 'benchmark@example.com',
+            'smtp_password': 'benchmark',
+            'use_tls': False,
+        }
+
+        try:
+            # Mesaj başına yeni bağlantı: havuzdan önceki davranış
+            before = self.run_scenario(SMTPConnectionPool(max_messages_per_connection=1), smtp_config, messages)
+            after = self.run_scenario(SMTPConnectionPool(), smtp_config, messages)
+        finally:
+            controller.stop()
+
+        self.stdout.write(f'Bağlantı havuzu olmadan: {before:.1f} mesaj/sn')
+        self.stdout.write(f'Bağlantı havuzu ile:     {after:.1f} mesaj/sn')
+        self.stdout.write(self.style.SUCCESS(f'Hızlanma: {after / before:.1f}x'))
+
+    def run_scenario(self, pool, smtp_config, messages):
+        service = SMTPEmailService(smtp_config=smtp_config, pool=pool)
+        start = time.perf_counter()
+
+        for index in range(messages):
+            success, message, _ = service.send_email(
+                from_email='benchmark@example.com',
+                from_name='Benchmark',
+                to_emails=['alici@example.com'],
+                subject=f'Benchmark {index}',
+                content='<p>Merhaba</p>',
+            )
+            if not success:
+                raise CommandError(message)
+
+        elapsed = time.perf_counter() - start
+        pool.close_all()
+        return messages / elapsed
@@ -1,8 +1,10 @@
-from django.db import models
+from django.db import models, transaction
 from django.utils import timezone
 from django.conf import settings
 from customers.models import Company, Contact
+from datetime import timedelta
 import os
+import uuid
 
 
 class EmailTemplate(models.Model):
@@ -30,9 +32,11 @@ class EmailMessage(models.Model):
     """
     STATUS_CHOICES = (
         ('draft', 'Taslak'),
+        ('queued', 'Sırada'),
         ('sending', 'Gönderiliyor'),
         ('sent', 'Gönderildi'),
         ('failed', 'Gönderme Hatası'),
+        ('dead', 'Teslim Edilemedi'),
     )
     
     subject = models.CharField(max_length=255, verbose_name="E-posta Konusu")
@@ -41,20 +45,34 @@ class EmailMessage(models.Model):
     recipients = models.JSONField(verbose_name="Alıcılar")  # [{"email": "mail@example.com", "name": "Display Name"}]
     cc = models.JSONField(blank=True, null=True, verbose_name="CC")
     bcc = models.JSONField(blank=True, null=True, verbose_name="BCC")
-    attachments = models.JSONField(blank=True, null=True, verbose_name="Ekler", help_text="Dosya referansları: [{'file_name': 'dosya.pdf', 'file_path': 'uploads/dosya.pdf', 'file_size': 1024}]")
+    attachments = models.JSONField(blank=True, null=True, verbose_name="Ekler", help_text="Ek referansları: [{'attachment_id': 1, 'file_name': 'dosya.pdf', 'file_size': 1024, 'content_type': 'application/pdf'}]")
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='draft', verbose_name="Durum")
     error_message = models.TextField(blank=True, null=True, verbose_name="Hata Mesajı")
     metadata = models.JSONField(default=dict, blank=True, verbose_name="Meta Veriler")
     company = models.ForeignKey(Company, on_delete=models.SET_NULL, null=True, blank=True, related_name='emails', verbose_name="İlişkili Firma")
     contact = models.ForeignKey(Contact, on_delete=models.SET_NULL, null=True, blank=True, related_name='emails', verbose_name="İlişkili Kişi")
     opportunity = models.ForeignKey('opportunities.Opportunity', on_delete=models.SET_NULL, null=True, blank=True, related_name='emails', verbose_name="İlişkili Fırsat")
+    campaign = models.ForeignKey('EmailCampaign', on_delete=models.SET_NULL, null=True, blank=True, related_name='messages', verbose_name="Kampanya")
+    attachment_files = models.ManyToManyField('EmailAttachment', blank=True, related_name='messages', verbose_name="Ek Dosyalar")
     created_at = models.DateTimeField(default=timezone.now, verbose_name="Oluşturulma Tarihi")
     sent_at = models.DateTimeField(null=True, blank=True, verbose_name="Gönderilme Tarihi")
+
+    # Giden kutusu (outbox): kuyruğa alınan mesajlar arka planda, hata durumunda artan aralıklarla tekrar denenir
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name="Deneme Sayısı")
+    next_attempt_at = models.DateTimeField(null=True, blank=True, verbose_name="Sonraki Deneme")
+    sending_started_at = models.DateTimeField(null=True, blank=True, verbose_name="Gönderim Başlangıcı")
+    # Aynı isteğin tekrarında ikinci mesaj oluşturulmaz ("<kullanıcı_id>:<Idempotency-Key>")
+    idempotency_key = models.CharField(max_length=255, unique=True, null=True, blank=True, editable=False, verbose_name="Tekrar Anahtarı")
     
     class Meta:
         verbose_name = "E-posta Mesajı"
         verbose_name_plural = "E-posta Mesajları"
         ordering = ['-created_at']
+        indexes = [
+            # Sadece sırada bekleyen mesajlar; giden kutusu işlenirken taranan küçük indeks
+            models.Index(fields=['next_attempt_at'], condition=models.Q(status='queued'), name='email_outbox_due_idx'),
+            models.Index(fields=['sending_started_at'], condition=models.Q(status='sending'), name='email_outbox_sending_idx'),
+        ]
         
     def __str__(self):
         return self.subject
@@ -67,6 +85,111 @@ class EmailMessage(models.Model):
 
 
 
+class EmailCampaign(models.Model):
+    """
+    Bir şablonun filtreyle seçilen kişi veya firmalara toplu gönderimi.
+
+    Alıcılar birincil anahtar sırasıyla partiler halinde işlenir; her parti
+    için kişiye özel EmailMessage kayıtları oluşturulur ve gönderim görevleri
+    SMTP hesabının hız sınırına göre zamanlanır. `last_recipient_id` işlenen
+    son alıcıyı tutar, yarıda kalan hazırlık kaldığı yerden devam eder.
+    """
+    STATUS_CHOICES = [
+        ('queued', 'Sırada'),
+        ('preparing', 'Hazırlanıyor'),
+        ('sending', 'Gönderiliyor'),
+        ('completed', 'Tamamlandı'),
+        ('failed', 'Başarısız'),
+    ]
+    RECIPIENT_TYPE_CHOICES = [
+        ('contacts', 'Kişiler'),
+        ('companies', 'Firmalar'),
+    ]
+
+    name = models.CharField(max_length=255, verbose_name="Kampanya Adı")
+    template = models.ForeignKey(EmailTemplate, on_delete=models.SET_NULL, null=True, blank=True, related_name='campaigns', verbose_name="Şablon")
+    # Şablon sonradan değişse de kampanya oluşturulduğu andaki metinle gönderilir
+    subject = models.CharField(max_length=255, verbose_name="E-posta Konusu")
+    content = models.TextField(verbose_name="İçerik")
+    variables = models.JSONField(default=dict, blank=True, verbose_name="Ek Değişkenler")
+    recipient_type = models.CharField(max_length=10, choices=RECIPIENT_TYPE_CHOICES, default='contacts', verbose_name="Alıcı Tipi")
+    filters = models.JSONField(default=dict, blank=True, verbose_name="Alıcı Filtreleri")
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='email_campaigns', verbose_name="Oluşturan")
+    sender = models.EmailField(verbose_name="Gönderen")
+    sender_name = models.CharField(max_length=255, blank=True, default='', verbose_name="Gönderen Adı")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued', verbose_name="Durum")
+    total_count = models.PositiveIntegerField(default=0, verbose_name="Toplam Alıcı")
+    queued_count = models.PositiveIntegerField(default=0, verbose_name="Kuyruğa Alınan")
+    sent_count = models.PositiveIntegerField(default=0, verbose_name="Gönderilen")
+    failed_count = models.PositiveIntegerField(default=0, verbose_name="Başarısız")
+    last_recipient_id = models.PositiveBigIntegerField(default=0, verbose_name="Son İşlenen Alıcı")
+    error_message = models.TextField(blank=True, default='', verbose_name="Hata Mesajı")
+    created_at = models.DateTimeField(default=timezone.now, verbose_name="Oluşturulma Tarihi")
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name="Başlama Tarihi")
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name="Bitiş Tarihi")
+
+    class Meta:
+        verbose_name = "E-posta Kampanyası"
+        verbose_name_plural = "E-posta Kampanyaları"
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.name} - {self.get_status_display()}"
+
+    @property
+    def progress(self):
+        """Gönderim ilerleme yüzdesi"""
+        if self.status == 'completed':
+            return 100
+        if not self.total_count:
+            return 0
+        return min(100, int((self.sent_count + self.failed_count) * 100 / self.total_count))
+
+    def complete_if_done(self):
+        """
+        Hazırlık bitmiş ve kuyruğa alınan tüm mesajlar sonuçlanmışsa kampanyayı
+        tek koşullu UPDATE ile tamamlar; paralel parti görevlerinden yalnızca biri başarır.
+        """
+        return EmailCampaign.objects.filter(
+            pk=self.pk,
+            status='sending',
+            queued_count__lte=models.F('sent_count') + models.F('failed_count'),
+        ).update(status='completed', finished_at=timezone.now())
+
+
+class SMTPSendThrottle(models.Model):
+    """
+    SMTP hesabı başına gönderim hız sınırı.
+
+    `next_slot_at` hesabın bir sonraki boş gönderim zamanıdır; parti
+    görevleri satırı kilitleyerek sıradaki zaman dilimini ayırır, böylece
+    aynı hesaptan çalışan tüm kampanyalar ve worker'lar sınırı birlikte paylaşır.
+    """
+    account = models.CharField(max_length=255, unique=True, verbose_name="Hesap", help_text="kullanıcı_adı@smtp_sunucusu")
+    next_slot_at = models.DateTimeField(default=timezone.now, verbose_name="Sonraki Gönderim Zamanı")
+
+    class Meta:
+        verbose_name = "SMTP Gönderim Sınırı"
+        verbose_name_plural = "SMTP Gönderim Sınırları"
+
+    def __str__(self):
+        return self.account
+
+    @classmethod
+    def reserve(cls, account, message_count, rate_per_minute):
+        """
+        Hesap için `message_count` mesajlık zaman dilimi ayırır.
+
+        Returns:
+            datetime: Ayrılan dilimin başlangıcı (gönderimin yapılacağı zaman)
+        """
+        with transaction.atomic():
+            throttle, _ = cls.objects.select_for_update().get_or_create(account=account)
+            start = max(timezone.now(), throttle.next_slot_at)
+            throttle.next_slot_at = start + timedelta(seconds=message_count * 60 / rate_per_minute)
+            throttle.save(update_fields=['next_slot_at'])
+        return start
+
 
 class IncomingEmail(models.Model):
     """
@@ -104,6 +227,22 @@ class IncomingEmail(models.Model):
     attachments = models.JSONField(blank=True, null=True, verbose_name="Ek Dosyalar")
     raw_headers = models.JSONField(blank=True, null=True, verbose_name="Ham Başlıklar")
 
+    # IMAP senkronizasyonu
+    mailbox = models.ForeignKey(
+        'MailboxSyncState',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='emails',
+        verbose_name="Posta Kutusu"
+    )
+    imap_uid = models.PositiveBigIntegerField(null=True, blank=True, verbose_name="IMAP UID")
+    body_loaded = models.BooleanField(
+        default=True,
+        verbose_name="İçerik Yüklendi",
+        help_text="Sadece başlıklar alındıysa içerik ilk görüntülemede sunucudan çekilir"
+    )
+
     class Meta:
         verbose_name = "Gelen E-posta"
         verbose_name_plural = "Gelen E-postalar"
@@ -113,6 +252,118 @@ class IncomingEmail(models.Model):
         return f"{self.sender_email} - {self.subject}"
 
 
+class MailboxSyncState(models.Model):
+    """
+    Kullanıcı başına her IMAP klasörünün senkronizasyon durumu.
+
+    UIDVALIDITY değişmediği sürece sadece `last_uid`'den büyük UID'ler
+    sunucudan istenir; değişirse klasör baştan senkronize edilir.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='mailbox_states', verbose_name="Kullanıcı")
+    account = models.CharField(max_length=255, verbose_name="Hesap", help_text="kullanıcı_adı@imap_sunucusu")
+    folder = models.CharField(max_length=255, default='INBOX', verbose_name="Klasör")
+    uid_validity = models.PositiveBigIntegerField(null=True, blank=True, verbose_name="UIDVALIDITY")
+    last_uid = models.PositiveBigIntegerField(default=0, verbose_name="Son UID")
+    last_synced_at = models.DateTimeField(null=True, blank=True, verbose_name="Son Senkronizasyon")
+    # Aynı posta kutusunun eşzamanlı senkronizasyonunu engelleyen kilit (süreli)
+    lock_token = models.CharField(max_length=64, blank=True, default='', verbose_name="Kilit Anahtarı")
+    locked_until = models.DateTimeField(null=True, blank=True, verbose_name="Kilit Bitişi")
+
+    class Meta:
+        verbose_name = "Posta Kutusu Senkronizasyonu"
+        verbose_name_plural = "Posta Kutusu Senkronizasyonları"
+        unique_together = ('user', 'account', 'folder')
+
+    def __str__(self):
+        return f"{self.account}/{self.folder} (UID {self.last_uid})"
+
+    def acquire_lock(self, timeout):
+        """
+        Kilidi tek bir koşullu UPDATE ile alır; süresi dolmuş kilitler
+        (ör. çöken worker) devralınır.
+
+        Returns:
+            str: Kilit alındıysa kilit anahtarı, başka bir senkronizasyon sürüyorsa None
+        """
+        now = timezone.now()
+        token = uuid.uuid4().hex
+        acquired = MailboxSyncState.objects.filter(
+            models.Q(locked_until__isnull=True) | models.Q(locked_until__lt=now),
+            pk=self.pk,
+        ).update(lock_token=token, locked_until=now + timedelta(seconds=timeout))
+        return token if acquired else None
+
+    def extend_lock(self, token, timeout):
+        """
+        Uzun süren senkronizasyonlarda kilidin süresini uzatır.
+        """
+        MailboxSyncState.objects.filter(pk=self.pk, lock_token=token).update(
+            locked_until=timezone.now() + timedelta(seconds=timeout)
+        )
+
+    def release_lock(self, token):
+        MailboxSyncState.objects.filter(pk=self.pk, lock_token=token).update(lock_token='', locked_until=None)
+
+
+class MailboxSyncJob(models.Model):
+    """
+    Arka planda çalışan bir posta kutusu senkronizasyonu ve ilerlemesi.
+    """
+    STATUS_CHOICES = [
+        ('queued', 'Sırada'),
+        ('running', 'Çalışıyor'),
+        ('success', 'Tamamlandı'),
+        ('failed', 'Başarısız'),
+        ('skipped', 'Atlandı'),
+    ]
+    ACTIVE_STATUSES = ('queued', 'running')
+
+    mailbox = models.ForeignKey(MailboxSyncState, on_delete=models.CASCADE, related_name='sync_jobs', verbose_name="Posta Kutusu")
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='mailbox_sync_jobs', verbose_name="Kullanıcı")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued', verbose_name="Durum")
+    headers_only = models.BooleanField(default=False, verbose_name="Sadece Başlıklar")
+    task_id = models.CharField(max_length=255, blank=True, default='', verbose_name="Görev ID")
+    fetched_count = models.PositiveIntegerField(default=0, verbose_name="Alınan E-posta")
+    saved_count = models.PositiveIntegerField(default=0, verbose_name="Kaydedilen E-posta")
+    batches_done = models.PositiveIntegerField(default=0, verbose_name="Tamamlanan Parti")
+    batch_count = models.PositiveIntegerField(default=0, verbose_name="Toplam Parti")
+    message = models.TextField(blank=True, default='', verbose_name="Mesaj")
+    created_at = models.DateTimeField(default=timezone.now, verbose_name="Oluşturulma Tarihi")
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name="Başlama Tarihi")
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name="Bitiş Tarihi")
+
+    class Meta:
+        verbose_name = "Posta Kutusu Senkronizasyon İşi"
+        verbose_name_plural = "Posta Kutusu Senkronizasyon İşleri"
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.mailbox} - {self.get_status_display()}"
+
+    @property
+    def progress(self):
+        """İlerleme yüzdesi"""
+        if self.status in ('success', 'skipped'):
+            return 100
+        if not self.batch_count:
+            return 0
+        return int(self.batches_done * 100 / self.batch_count)
+
+    def update_progress(self, progress):
+        """
+        sync_mailbox ilerleme callback'i; her partiden sonra tek UPDATE çalıştırır.
+        """
+        for field in ('fetched_count', 'saved_count', 'batches_done', 'batch_count'):
+            setattr(self, field, progress[field])
+        self.save(update_fields=['fetched_count', 'saved_count', 'batches_done', 'batch_count'])
+
+    def finish(self, status, message=''):
+        self.status = status
+        self.message = message
+        self.finished_at = timezone.now()
+        self.save(update_fields=['status', 'message', 'finished_at'])
+
+
 class EmailConfig(models.Model):
     """
     E-posta gönderimi için konfigürasyon ayarları
@@ -145,29 +396,47 @@ class EmailConfig(models.Model):
 
 
 def email_attachment_upload_path(instance, filename):
-    """E-posta ekleri için upload path"""
-    return f'email_attachments/{instance.email_message.id}/{filename}'
+    """
+    E-posta ekleri içerik özetine göre saklanır; aynı dosya bir kez yazılır
+    """
+    return f'email_attachments/{instance.content_hash[:2]}/{instance.content_hash}'
 
 
 class EmailAttachment(models.Model):
     """
-    E-posta ekleri
+    E-posta ekleri.
+
+    Dosya bir kez yüklenir, gönderim isteklerinde id ile referans verilir.
+    Aynı içerik (SHA-256) depoda tek kopya olarak tutulur; farklı adlarla veya
+    farklı kullanıcılarca yüklenen aynı dosya aynı depolama nesnesini paylaşır.
+    Kayıtlar kullanıcıya özeldir: bir kullanıcı başkasının ekini kullanamaz.
     """
-    email_message = models.ForeignKey(EmailMessage, on_delete=models.CASCADE, related_name='attachment_files')
-    file = models.FileField(upload_to=email_attachment_upload_path, verbose_name="Dosya")
+    file = models.FileField(upload_to=email_attachment_upload_path, max_length=255, verbose_name="Dosya")
     original_name = models.CharField(max_length=255, verbose_name="Orijinal Dosya Adı")
     file_size = models.PositiveIntegerField(verbose_name="Dosya Boyutu (bytes)")
     content_type = models.CharField(max_length=100, verbose_name="İçerik Tipi")
+    content_hash = models.CharField(max_length=64, db_index=True, verbose_name="İçerik Özeti (SHA-256)")
+    uploaded_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='email_attachments', verbose_name="Yükleyen")
     uploaded_at = models.DateTimeField(default=timezone.now, verbose_name="Yüklenme Tarihi")
 
     class Meta:
         verbose_name = "E-posta Eki"
         verbose_name_plural = "E-posta Ekleri"
+        unique_together = ('content_hash', 'original_name', 'uploaded_by')
 
     def __str__(self):
-        return f"{self.original_name} - {self.email_message.subject}"
+        return self.original_name
 
     @property
     def file_size_mb(self):
         """Dosya boyutunu MB cinsinden döndür"""
         return round(self.file_size / (1024 * 1024), 2)
+
+    def to_reference(self):
+        """EmailMessage.attachments alanında tutulan hafif referans (içerik içermez)"""
+        return {
+            'attachment_id': self.pk,
+            'file_name': self.original_name,
+            'file_size': self.file_size,
+            'content_type': self.content_type,
+        }
@@ -0,0 +1,221 @@
+"""
+Giden e-posta kutusu (outbox).
+
+Gönderim isteği mesajı `queued` olarak kaydeder ve hemen döner; Celery
+worker'ları sırası gelen mesajları sahiplenip (SELECT ... FOR UPDATE SKIP
+LOCKED) gönderir. Durum makinesi:
+
+    queued -> sending -> sent
+                      -> queued (geçici hata, artan bekleme süresiyle tekrar)
+                      -> dead   (kalıcı hata veya deneme hakkı bitti)
+
+Gönderim sırasında çöken worker'ların `sending` durumunda bıraktığı mesajlar
+`requeue_stale_messages` ile tekrar kuyruğa alınır.
+"""
+import logging
+import random
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, Min, Q
+from django.utils import timezone
+
+from authentication.models import UserProfile
+from .models import EmailMessage
+from .smtp_service import get_smtp_config, smtp_service
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_MAX_ATTEMPTS = 5
+# Tekrar denemeler arasındaki bekleme: 1, 2, 4, 8 ... dakika (en fazla 1 saat)
+OUTBOX_RETRY_BASE_DELAY = 60
+OUTBOX_RETRY_MAX_DELAY = 60 * 60
+# Tek seferde sahiplenilen mesaj sayısı
+OUTBOX_BATCH_SIZE = 50
+# Bu süreden uzun `sending` durumunda kalan mesajın worker'ı çökmüş sayılır
+OUTBOX_SENDING_TIMEOUT = 10 * 60
+
+
+def get_retry_delay(attempts):
+    """
+    `attempts` denemeden sonraki bekleme süresi (saniye); aynı anda düşen
+    mesajlar aynı anda tekrar denenmesin diye %20 sapma eklenir.
+    """
+    delay = min(OUTBOX_RETRY_BASE_DELAY * 2 ** max(attempts - 1, 0), OUTBOX_RETRY_MAX_DELAY)
+    return delay * random.uniform(0.8, 1.2)
+
+
+def claim_due_messages(limit=OUTBOX_BATCH_SIZE):
+    """
+    Gönderim zamanı gelmiş mesajları sahiplenir ve `sending` durumuna alır.
+
+    Kilitli satırlar atlandığından paralel çalışan worker'lar aynı mesajı
+    almaz. Kampanya mesajları kendi hız sınırlı görevleriyle gönderilir.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        messages = list(
+            EmailMessage.objects.select_for_update(skip_locked=True)
+            .filter(status='queued', next_attempt_at__lte=now, campaign__isnull=True)
+            .prefetch_related('attachment_files')
+            .order_by('next_attempt_at')[:limit]
+        )
+        for message in messages:
+            message.status = 'sending'
+            message.sending_started_at = now
+            message.attempts += 1
+        EmailMessage.objects.bulk_update(messages, ['status', 'sending_started_at', 'attempts'])
+    return messages
+
+
+def get_sender_configs(messages):
+    """
+    Mesajları gönderen kullanıcıların SMTP ayarları: {kullanıcı_id: smtp_config}
+    """
+    user_ids = {message.metadata.get('sent_by_user_id') for message in messages}
+    profiles = UserProfile.objects.filter(user_id__in=[user_id for user_id in user_ids if user_id])
+    return {profile.user_id: get_smtp_config(profile) for profile in profiles}
+
+
+def get_message_attachments(message):
+    """
+    Mesajın kayıtlı ekleri; eski biçimli (dosya yolu veya base64 içerikli) ekler de korunur
+    """
+    attachments = list(message.attachment_files.all())
+    attachments += [
+        item for item in message.attachments or []
+        if isinstance(item, dict) and not item.get('attachment_id')
+    ]
+    return attachments
+
+
+def deliver_message(message, smtp_config):
+    """
+    Sahiplenilmiş bir mesajı gönderir ve sonucuna göre durumunu günceller.
+
+    Returns:
+        str: Yeni durum ('sent', 'queued' veya 'dead')
+    """
+    if smtp_config:
+        success, result, response_data = smtp_service.send_email(
+            from_email=message.sender,
+            from_name=message.metadata.get('sender_name'),
+            to_emails=smtp_service.format_recipients(message.recipients),
+            subject=message.subject,
+            content=message.content,
+            cc_emails=smtp_service.format_recipients(message.cc) or None,
+            bcc_emails=smtp_service.format_recipients(message.bcc) or None,
+            attachments=get_message_attachments(message),
+            smtp_config=smtp_config,
+        )
+    else:
+        success, result, response_data = False, "Gönderen kullanıcının SMTP ayarları bulunamadı", None
+
+    update_fields = ['status', 'error_message', 'next_attempt_at', 'sending_started_at']
+    message.sending_started_at = None
+    if success:
+        message.status = 'sent'
+        message.error_message = None
+        message.next_attempt_at = None
+        message.sent_at = timezone.now()
+        message.metadata['smtp_response'] = response_data
+        update_fields += ['sent_at', 'metadata']
+    elif (response_data or {}).get('permanent') or message.attempts >= OUTBOX_MAX_ATTEMPTS:
+        message.status = 'dead'
+        message.error_message = result
+        message.next_attempt_at = None
+    else:
+        message.status = 'queued'
+        message.error_message = result
+        message.next_attempt_at = timezone.now() + timedelta(seconds=get_retry_delay(message.attempts))
+
+    message.save(update_fields=update_fields)
+    return message.status
+
+
+def drain_outbox(batch_size=OUTBOX_BATCH_SIZE, max_messages=None):
+    """
+    Gönderim zamanı gelmiş mesajları partiler halinde gönderir.
+
+    Returns:
+        dict: {'sent': ..., 'queued': ..., 'dead': ...} - bu çalıştırmadaki sonuçlar
+    """
+    results = {'sent': 0, 'queued': 0, 'dead': 0}
+    processed = 0
+    while max_messages is None or processed < max_messages:
+        limit = batch_size if max_messages is None else min(batch_size, max_messages - processed)
+        messages = claim_due_messages(limit)
+        if not messages:
+            break
+
+        configs = get_sender_configs(messages)
+        for message in messages:
+            new_status = deliver_message(message, configs.get(message.metadata.get('sent_by_user_id')))
+            results[new_status] += 1
+        processed += len(messages)
+    return results
+
+
+def requeue_message(message):
+    """
+    Teslim edilemeyen veya başarısız bir mesajı deneme sayacını sıfırlayarak tekrar kuyruğa alır.
+    """
+    message.status = 'queued'
+    message.attempts = 0
+    message.next_attempt_at = timezone.now()
+    message.error_message = None
+    message.save(update_fields=['status', 'attempts', 'next_attempt_at', 'error_message'])
+
+
+def get_stale_sending_messages():
+    """
+    Gönderimi zaman aşımına uğramış (worker'ı çökmüş) `sending` mesajları
+    """
+    cutoff = timezone.now() - timedelta(seconds=OUTBOX_SENDING_TIMEOUT)
+    return EmailMessage.objects.filter(status='sending').filter(
+        Q(sending_started_at__lt=cutoff) |
+        # Giden kutusundan önce senkron gönderimde takılı kalmış eski kayıtlar
+        Q(sending_started_at__isnull=True, created_at__lt=cutoff)
+    )
+
+
+def requeue_stale_messages():
+    """
+    Takılı kalan kampanya dışı mesajları tekrar kuyruğa alır; deneme hakkı
+    bitmiş olanlar teslim edilemedi olarak işaretlenir.
+
+    Not: SMTP sunucusu mesajı kabul ettikten sonra çöken bir worker'ın
+    mesajı tekrar gönderilebilir (en az bir kez teslim).
+
+    Returns:
+        tuple: (tekrar kuyruğa alınan, teslim edilemedi sayılan)
+    """
+    now = timezone.now()
+    stale = get_stale_sending_messages().filter(campaign__isnull=True)
+    dead = stale.filter(attempts__gte=OUTBOX_MAX_ATTEMPTS).update(
+        status='dead', sending_started_at=None, next_attempt_at=None,
+        error_message='Gönderim zaman aşımına uğradı'
+    )
+    requeued = stale.update(status='queued', sending_started_at=None, next_attempt_at=now)
+    return requeued, dead
+
+
+def get_outbox_stats():
+    """
+    Giden kutusu metrikleri: durum bazında mesaj sayıları, gönderim hızı ve
+    kuyruk gecikmesi (sırası gelmiş en eski mesajın bekleme süresi).
+    """
+    now = timezone.now()
+    stats = EmailMessage.objects.aggregate(
+        queued=Count('pk', filter=Q(status='queued')),
+        due=Count('pk', filter=Q(status='queued', next_attempt_at__lte=now)),
+        sending=Count('pk', filter=Q(status='sending')),
+        dead=Count('pk', filter=Q(status='dead')),
+        sent_last_minute=Count('pk', filter=Q(status='sent', sent_at__gte=now - timedelta(minutes=1))),
+        sent_last_hour=Count('pk', filter=Q(status='sent', sent_at__gte=now - timedelta(hours=1))),
+        retrying=Count('pk', filter=Q(status='queued', attempts__gt=0)),
+        oldest_due_at=Min('next_attempt_at', filter=Q(status='queued', next_attempt_at__lte=now)),
+    )
+    oldest_due_at = stats.pop('oldest_due_at')
+    stats['queue_lag_seconds'] = round((now - oldest_due_at).total_seconds(), 1) if oldest_due_at else 0
+    return stats
@@ -1,5 +1,6 @@
 from rest_framework import serializers
-from .models import EmailTemplate, EmailMessage, EmailAttachment, IncomingEmail
+from .campaigns import CAMPAIGN_FILTERS
+from .models import EmailTemplate, EmailMessage, EmailAttachment, IncomingEmail, MailboxSyncJob, EmailCampaign
 
 
 class EmailTemplateSerializer(serializers.ModelSerializer):
@@ -29,7 +30,7 @@ class EmailMessageListSerializer(serializers.ModelSerializer):
             'id', 'subject', 'content', 'sender', 'recipients', 'cc', 'bcc',
             'status', 'error_message', 'company', 'company_name', 'contact',
             'contact_name', 'opportunity', 'opportunity_title', 'created_at',
-            'sent_at', 'recipients_count'
+            'sent_at', 'recipients_count', 'attempts', 'next_attempt_at'
         )
 
     def get_company_name(self, obj):
@@ -67,7 +68,8 @@ class EmailMessageDetailSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = EmailMessage
-        fields = '__all__'
+        # Ekler `attachments` alanındaki referanslarla döner
+        exclude = ('attachment_files',)
 
     def get_company_name(self, obj):
         if obj.company:
@@ -93,7 +95,7 @@ class EmailAttachmentSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = EmailAttachment
-        fields = ['id', 'original_name', 'file_size', 'file_size_mb', 'content_type', 'uploaded_at']
+        fields = ['id', 'original_name', 'file_size', 'file_size_mb', 'content_type', 'content_hash', 'uploaded_at']
 
 
 class SendEmailSerializer(serializers.Serializer):
@@ -106,7 +108,11 @@ class SendEmailSerializer(serializers.Serializer):
     cc = serializers.JSONField(required=False)
     bcc = serializers.JSONField(required=False)
     attachments = serializers.JSONField(required=False)
+    # upload-attachment endpoint'inden dönen ek id'leri
+    attachment_ids = serializers.ListField(child=serializers.IntegerField(), required=False, default=list)
     template_id = serializers.CharField(required=False, allow_blank=True)
+    # Idempotency-Key başlığı yerine gövdede de gönderilebilir
+    idempotency_key = serializers.CharField(max_length=200, required=False, allow_blank=True)
 
     def validate_template_id(self, value):
         """Template ID validation - boş string'i None'a çevir"""
@@ -210,15 +216,6 @@ class SendEmailSerializer(serializers.Serializer):
         return normalized_bcc
 
 
-class EmailAttachmentSerializer(serializers.ModelSerializer):
-    """
-    E-posta ekleri için serializer
-    """
-    class Meta:
-        model = EmailAttachment
-        fields = '__all__'
-
-
 class IncomingEmailSerializer(serializers.ModelSerializer):
     """
     Gelen e-postalar için serializer
@@ -255,3 +252,79 @@ class IncomingEmailSerializer(serializers.ModelSerializer):
 
     def get_recipients_count(self, obj):
         return len(obj.recipients) if obj.recipients else 0
+
+
+class MailboxSyncJobSerializer(serializers.ModelSerializer):
+    """
+    Posta kutusu senkronizasyon işleri için serializer
+    """
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+    progress = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = MailboxSyncJob
+        fields = (
+            'id', 'status', 'status_display', 'progress', 'headers_only',
+            'fetched_count', 'saved_count', 'batches_done', 'batch_count',
+            'message', 'created_at', 'started_at', 'finished_at'
+        )
+
+
+class EmailCampaignSerializer(serializers.ModelSerializer):
+    """
+    Toplu e-posta kampanyaları ve ilerlemeleri için serializer
+    """
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+    progress = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = EmailCampaign
+        fields = (
+            'id', 'name', 'template', 'subject', 'recipient_type', 'filters',
+            'variables', 'sender', 'status', 'status_display', 'progress',
+            'total_count', 'queued_count', 'sent_count', 'failed_count',
+            'error_message', 'created_at', 'started_at', 'finished_at'
+        )
+
+
+class EmailCampaignCreateSerializer(serializers.Serializer):
+    """
+    Kampanya oluşturma isteği: şablon, alıcı tipi ve alıcı filtreleri
+    """
+    template_id = serializers.PrimaryKeyRelatedField(queryset=EmailTemplate.objects.all(), source='template')
+    name = serializers.CharField(max_length=255, required=False, allow_blank=True)
+    recipient_type = serializers.ChoiceField(choices=EmailCampaign.RECIPIENT_TYPE_CHOICES, default='contacts')
+    filters = serializers.DictField(required=False, default=dict)
+    variables = serializers.DictField(child=serializers.CharField(allow_blank=True), required=False, default=dict)
+
+    def validate(self, attrs):
+        allowed = CAMPAIGN_FILTERS[attrs['recipient_type']]
+        unknown = sorted(set(attrs['filters']) - set(allowed))
+        if unknown:
+            raise serializers.ValidationError({
+                'filters': f"Desteklenmeyen filtreler: {', '.join(unknown)}. "
+                           f"Kullanılabilir filtreler: {', '.join(allowed)}"
+            })
+
+        filters = {}
+        for name, value in attrs['filters'].items():
+            _, is_list = allowed[name]
+            if is_list:
+                # Tek değer veya virgülle ayrılmış liste de kabul edilir
+                if isinstance(value, str):
+                    value = [item.strip() for item in value.split(',') if item.strip()]
+                elif not isinstance(value, list):
+                    value = [value]
+                if name.endswith('_ids'):
+                    try:
+                        value = [int(item) for item in value]
+                    except (TypeError, ValueError):
+                        raise serializers.ValidationError({'filters': f"{name} sayılardan oluşmalıdır."})
+            elif name == 'is_primary':
+                value = str(value).lower() in ('1', 'true')
+            filters[name] = value
+        attrs['filters'] = filters
+
+        if not attrs.get('name'):
+            attrs['name'] = attrs['template'].name
+        return attrs
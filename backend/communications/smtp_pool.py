@@ -0,0 +1,197 @@
+import logging
+import os
+import smtplib
+import threading
+import time
+from collections import defaultdict, deque
+
+logger = logging.getLogger(__name__)
+
+# Boşta bekleyen bir bağlantının kapatılmadan önce tutulacağı süre (saniye)
+SMTP_MAX_IDLE_SECONDS = 60
+# Bu süreden uzun beklemiş bağlantı kullanılmadan önce NOOP ile kontrol edilir (saniye)
+SMTP_KEEPALIVE_INTERVAL = 15
+# Tek bağlantı üzerinden gönderilecek en fazla mesaj; sonrasında bağlantı yenilenir
+SMTP_MAX_MESSAGES_PER_CONNECTION = 100
+# Hesap başına boşta tutulacak en fazla bağlantı
+SMTP_MAX_IDLE_PER_ACCOUNT = 4
+SMTP_TIMEOUT = 30
+
+# Bağlantıyı kullanılamaz hale getiren hatalar; gönderim yeni bağlantıyla bir kez tekrarlanır
+RECONNECT_ERRORS = (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError)
+# Sunucunun mesajı reddettiği ama oturumun sağlam kaldığı hatalar (smtplib RSET gönderir)
+SESSION_SAFE_ERRORS = (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError)
+
+
+class PooledSMTPConnection:
+    """
+    Havuzdaki kimliği doğrulanmış tek bir SMTP oturumu
+    """
+
+    def __init__(self, key, smtp):
+        self.key = key
+        self.smtp = smtp
+        self.message_count = 0
+        self.last_used = time.monotonic()
+
+    def close(self):
+        try:
+            self.smtp.quit()
+        except Exception:
+            try:
+                self.smtp.close()
+            except Exception:
+                pass
+
+
+class SMTPConnectionPool:
+    """
+    (sunucu, port, kullanıcı adı) başına kimliği doğrulanmış SMTP
+    bağlantılarını yeniden kullanan havuz.
+
+    - Boşta bekleyen bağlantılar `max_idle_seconds` sonra kapatılır
+    - `keepalive_interval`'dan uzun beklemiş bağlantılar NOOP ile yoklanır
+    - Bir bağlantı `max_messages_per_connection` mesajdan sonra yenilenir
+    - SMTPServerDisconnected gibi hatalarda gönderim yeni bağlantıyla tekrarlanır
+
+    Bir bağlantı aynı anda yalnızca bir thread tarafından kullanılır; havuz
+    listeleri kilit ile korunur. Celery prefork worker'ları gibi fork edilen
+    süreçler üst sürecin soketlerini devralmaz, havuz süreç başına yeniden kurulur.
+    """
+
+    def __init__(self, max_idle_seconds=SMTP_MAX_IDLE_SECONDS, keepalive_interval=SMTP_KEEPALIVE_INTERVAL,
+                 max_messages_per_connection=SMTP_MAX_MESSAGES_PER_CONNECTION,
+                 max_idle_per_account=SMTP_MAX_IDLE_PER_ACCOUNT, timeout=SMTP_TIMEOUT):
+        self.max_idle_seconds = max_idle_seconds
+        self.keepalive_interval = keepalive_interval
+        self.max_messages_per_connection = max_messages_per_connection
+        self.max_idle_per_account = max_idle_per_account
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._idle = defaultdict(deque)
+        self._pid = os.getpid()
+
+    @staticmethod
+    def get_key(smtp_config):
+        return (smtp_config['smtp_server'], int(smtp_config['smtp_port']), smtp_config['smtp_username'])
+
+    def send(self, smtp_config, from_addr, to_addrs, message):
+        """
+        Mesajı havuzdaki bir bağlantı üzerinden gönderir.
+
+        Returns:
+            dict: smtplib.sendmail'in reddedilen alıcılar sözlüğü
+        """
+        for attempt in range(2):
+            connection = self._acquire(smtp_config)
+            try:
+                refused = connection.smtp.sendmail(from_addr, to_addrs, message)
+            except RECONNECT_ERRORS as e:
+                self._discard(connection)
+                if attempt:
+                    raise
+                logger.info(f"SMTP bağlantısı koptu, yeniden bağlanılıyor: {e}")
+                continue
+            except SESSION_SAFE_ERRORS:
+                self._release(connection)
+                raise
+            except Exception:
+                self._discard(connection)
+                raise
+
+            connection.message_count += 1
+            self._release(connection)
+            return refused
+
+    def close_all(self):
+        """
+        Boştaki tüm bağlantıları kapatır
+        """
+        with self._lock:
+            connections = [connection for idle in self._idle.values() for connection in idle]
+            self._idle.clear()
+        for connection in connections:
+            connection.close()
+
+    def evict_idle(self):
+        """
+        Süresi dolmuş boştaki bağlantıları kapatır
+        """
+        now = time.monotonic()
+        expired = []
+        with self._lock:
+            self._check_process()
+            for idle in self._idle.values():
+                while idle and now - idle[0].last_used > self.max_idle_seconds:
+                    expired.append(idle.popleft())
+        for connection in expired:
+            connection.close()
+
+    def idle_count(self, smtp_config=None):
+        with self._lock:
+            if smtp_config:
+                return len(self._idle.get(self.get_key(smtp_config), ()))
+            return sum(len(idle) for idle in self._idle.values())
+
+    def _check_process(self):
+        # Fork sonrası üst sürecin soketleri kullanılmaz, kapatılmaz da (üst süreç kullanıyor olabilir)
+        if os.getpid() != self._pid:
+            self._idle = defaultdict(deque)
+            self._pid = os.getpid()
+
+    def _acquire(self, smtp_config):
+        self.evict_idle()
+        key = self.get_key(smtp_config)
+
+        while True:
+            with self._lock:
+                idle = self._idle.get(key)
+                # En son kullanılan bağlantı alınır; eskiler sırayla zaman aşımına uğrar
+                connection = idle.pop() if idle else None
+            if connection is None:
+                return self._connect(key, smtp_config)
+            if time.monotonic() - connection.last_used <= self.keepalive_interval or self._is_alive(connection):
+                return connection
+            connection.close()
+
+    def _is_alive(self, connection):
+        try:
+            return connection.smtp.noop()[0] == 250
+        except Exception:
+            return False
+
+    def _connect(self, key, smtp_config):
+        smtp = smtplib.SMTP(smtp_config['smtp_server'], smtp_config['smtp_port'], timeout=self.timeout)
+        try:
+            if smtp_config.get('use_tls', True):
+                smtp.starttls()
+            smtp.login(smtp_config['smtp_username'], smtp_config['smtp_password'])
+        except Exception:
+            smtp.close()
+            raise
+        logger.debug(f"Yeni SMTP bağlantısı açıldı: {key[0]}:{key[1]} ({key[2]})")
+        return PooledSMTPConnection(key, smtp)
+
+    def _release(self, connection):
+        if connection.message_count >= self.max_messages_per_connection:
+            connection.close()
+            return
+
+        connection.last_used = time.monotonic()
+        with self._lock:
+            self._check_process()
+            idle = self._idle[connection.key]
+            if len(idle) < self.max_idle_per_account:
+                idle.append(connection)
+                return
+        connection.close()
+
+    def _discard(self, connection):
+        try:
+            connection.smtp.close()
+        except Exception:
+            pass
+
+
+# Global havuz; süreç içindeki tüm thread'ler tarafından paylaşılır
+smtp_pool = SMTPConnectionPool()
@@ -2,21 +2,57 @@ import smtplib
 import logging
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from email.mime.base import MIMEBase
-from email import encoders
+from io import BytesIO
 from django.core.files.storage import default_storage
-import mimetypes
 import base64
 
+from .attachments import build_attachment_part
+from .models import EmailAttachment
+from .smtp_pool import smtp_pool
+
 logger = logging.getLogger(__name__)
 
+REQUIRED_SMTP_FIELDS = ['smtp_server', 'smtp_port', 'smtp_username', 'smtp_password']
+
+
+def get_smtp_config(user_profile):
+    """
+    Kullanıcı profilindeki SMTP ayarlarından gönderim konfigürasyonu üretir.
+    """
+    return {
+        'smtp_server': user_profile.smtp_server,
+        'smtp_port': user_profile.smtp_port,
+        'smtp_username': user_profile.smtp_username,
+        'smtp_password': user_profile.smtp_password,
+        'use_tls': user_profile.use_tls,
+    }
+
+
+def is_permanent_smtp_error(error):
+    """
+    Sunucunun kalıcı (5xx) olarak reddettiği gönderimler; tekrar denemek sonucu değiştirmez.
+    Bağlantı kopması, zaman aşımı ve 4xx yanıtlar geçicidir.
+    """
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(code >= 500 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPResponseException):
+        return error.smtp_code >= 500
+    return False
+
+
+def get_smtp_account(smtp_config):
+    """
+    Gönderim hız sınırının tutulduğu hesap anahtarı.
+    """
+    return f"{smtp_config['smtp_username']}@{smtp_config['smtp_server']}"
+
 
 class SMTPEmailService:
     """
     Klasik SMTP e-posta gönderme servisi
     """
     
-    def __init__(self, smtp_config=None):
+    def __init__(self, smtp_config=None, pool=None):
         """
         SMTP servisi başlat
         
@@ -27,8 +63,10 @@ class SMTPEmailService:
                 - smtp_username: Kullanıcı adı
                 - smtp_password: Şifre
                 - use_tls: TLS kullanımı
+            pool (SMTPConnectionPool, optional): Bağlantı havuzu (varsayılan: global havuz)
         """
         self.smtp_config = smtp_config or {}
+        self.pool = pool or smtp_pool
     
     def send_email(self, from_email, from_name, to_emails, subject, content, 
                    cc_emails=None, bcc_emails=None, attachments=None, smtp_config=None):
@@ -103,20 +141,11 @@ class SMTPEmailService:
                     if attachment:
                         msg.attach(attachment)
             
-            # SMTP bağlantısı kur ve e-postayı gönder
-            server = smtplib.SMTP(config['smtp_server'], config['smtp_port'])
-            
-            if config.get('use_tls', True):
-                server.starttls()
-            
-            server.login(config['smtp_username'], config['smtp_password'])
-            
             # Tüm alıcıları birleştir
             all_recipients = to_list + cc_list + bcc_list
             
-            # E-postayı gönder
-            server.sendmail(from_email, all_recipients, msg.as_string())
-            server.quit()
+            # E-postayı havuzdaki kimliği doğrulanmış bir bağlantı üzerinden gönder
+            self.pool.send(config, from_email, all_recipients, msg.as_string())
             
             return True, "E-posta başarıyla gönderildi", {
                 "to": to_list,
@@ -127,7 +156,7 @@ class SMTPEmailService:
         
         except Exception as e:
             logger.error(f"E-posta gönderirken hata: {str(e)}", exc_info=True)
-            return False, f"E-posta gönderirken hata: {str(e)}", None
+            return False, f"E-posta gönderirken hata: {str(e)}", {"permanent": is_permanent_smtp_error(e)}
     
     def _html_to_plaintext(self, html_content):
         """
@@ -183,7 +212,7 @@ class SMTPEmailService:
         Ek dosya için MIMEBase nesnesi oluştur
         
         Args:
-            attachment_data (dict): Ek dosya bilgileri
+            attachment_data (EmailAttachment | dict): Kayıtlı ek ya da eski biçimli ek bilgileri
                 - file_path: Dosya yolu
                 - file_name: Dosya adı
                 - file_content: Dosya içeriği (base64 encoded)
@@ -192,44 +221,24 @@ class SMTPEmailService:
             MIMEBase: Ek dosya nesnesi
         """
         try:
+            if isinstance(attachment_data, EmailAttachment):
+                # Dosya depodan parça parça okunarak kodlanır
+                with attachment_data.file.open('rb') as f:
+                    return build_attachment_part(f, attachment_data.original_name, attachment_data.content_type)
+
             file_name = attachment_data.get('file_name', 'attachment')
             file_content = attachment_data.get('file_content')
             file_path = attachment_data.get('file_path')
             
-            # Dosya içeriğini al
             if file_content:
                 # Base64 encoded content
-                content = base64.b64decode(file_content)
-            elif file_path and default_storage.exists(file_path):
-                # Dosya yolundan oku
+                return build_attachment_part(BytesIO(base64.b64decode(file_content)), file_name)
+            if file_path and default_storage.exists(file_path):
                 with default_storage.open(file_path, 'rb') as f:
-                    content = f.read()
-            else:
-                logger.warning(f"Attachment content not found: {file_name}")
-                return None
-            
-            # MIME type'ı belirle
-            mime_type, _ = mimetypes.guess_type(file_name)
-            if not mime_type:
-                mime_type = 'application/octet-stream'
-            
-            # Ana ve alt MIME tiplerini ayır
-            main_type, sub_type = mime_type.split('/', 1)
-            
-            # MIMEBase nesnesi oluştur
-            attachment = MIMEBase(main_type, sub_type)
-            attachment.set_payload(content)
-            
-            # Base64 encoding
-            encoders.encode_base64(attachment)
-            
-            # Header ekle
-            attachment.add_header(
-                'Content-Disposition',
-                f'attachment; filename="{file_name}"'
-            )
-            
-            return attachment
+                    return build_attachment_part(f, file_name)
+
+            logger.warning(f"Attachment content not found: {file_name}")
+            return None
             
         except Exception as e:
             logger.error(f"Error creating attachment: {str(e)}")
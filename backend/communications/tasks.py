@@ -0,0 +1,427 @@
+import logging
+from datetime import datetime, timedelta
+
+from celery import shared_task
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from authentication.models import UserProfile
+from .campaigns import build_campaign_messages, get_campaign_recipients
+from .imap_service import imap_service, get_imap_config, get_mailbox_account
+from .models import EmailCampaign, EmailMessage, MailboxSyncJob, MailboxSyncState, SMTPSendThrottle
+from .outbox import drain_outbox, get_outbox_stats, get_stale_sending_messages, requeue_stale_messages
+from .smtp_service import REQUIRED_SMTP_FIELDS, get_smtp_account, get_smtp_config, smtp_service
+
+logger = logging.getLogger(__name__)
+
+# Posta kutusu kilidinin süresi; çöken bir worker'ın kilidi bu süre sonunda devralınır
+MAILBOX_LOCK_TIMEOUT = 15 * 60
+
+REQUIRED_IMAP_FIELDS = ['imap_server', 'imap_port', 'imap_username', 'imap_password']
+
+# Kampanya alıcıları bu büyüklükte partiler halinde okunup mesajlara dönüştürülür
+CAMPAIGN_RENDER_BATCH_SIZE = 500
+# Tek gönderim görevinin gönderdiği mesaj sayısı
+CAMPAIGN_SEND_CHUNK_SIZE = 20
+# Broker'a verilen en uzak ETA (saniye). Redis broker, ETA'sı visibility_timeout'u
+# (varsayılan 1 saat) aşan görevleri tekrar teslim eder; daha ileri zamanlı partiler
+# bu süre sonunda çalışıp zamanları gelene kadar kendilerini yeniden kuyruğa alır.
+CAMPAIGN_MAX_ETA = 10 * 60
+# Gönderim zamanı bu kadar geçtiği halde hâlâ sırada olan kampanya mesajları
+# (görevi kaybolmuş) tekrar zamanlanır
+CAMPAIGN_ORPHAN_GRACE = 10 * 60
+
+
+def get_missing_imap_fields(user_profile):
+    """
+    Profilde eksik olan IMAP ayarlarının listesi
+    """
+    return [field for field in REQUIRED_IMAP_FIELDS if not getattr(user_profile, field)]
+
+
+def enqueue_mailbox_sync(user_profile, headers_only=False, folder='INBOX'):
+    """
+    Kullanıcının posta kutusu için arka plan senkronizasyonu başlatır.
+
+    Aynı posta kutusu için sırada veya çalışmakta olan bir iş varsa yeni iş
+    oluşturulmaz, mevcut iş döner.
+
+    Returns:
+        tuple: (MailboxSyncJob, yeni oluşturuldu mu)
+    """
+    imap_config = get_imap_config(user_profile)
+    mailbox, _ = MailboxSyncState.objects.get_or_create(
+        user=user_profile.user,
+        account=get_mailbox_account(imap_config),
+        folder=folder,
+    )
+
+    now = timezone.now()
+    # Kilidi bırakılmış ama hiç bitmemiş işler (ör. broker kapalıyken kuyruğa alınan) engel olmasın
+    if not mailbox.locked_until or mailbox.locked_until < now:
+        mailbox.sync_jobs.filter(
+            status__in=MailboxSyncJob.ACTIVE_STATUSES,
+            created_at__lt=now - timedelta(seconds=MAILBOX_LOCK_TIMEOUT),
+        ).update(status='failed', message='Zaman aşımı', finished_at=now)
+
+    active_job = mailbox.sync_jobs.filter(status__in=MailboxSyncJob.ACTIVE_STATUSES).first()
+    if active_job:
+        return active_job, False
+
+    job = MailboxSyncJob.objects.create(mailbox=mailbox, user=user_profile.user, headers_only=headers_only)
+    job.task_id = f"mailbox-sync-{job.pk}"
+    job.save(update_fields=['task_id'])
+
+    # İş kaydı commit edilmeden worker çalışmaya başlamasın
+    transaction.on_commit(lambda: sync_mailbox_task.apply_async(args=[job.pk], task_id=job.task_id))
+    return job, True
+
+
+@shared_task(bind=True)
+def sync_mailbox_task(self, job_id):
+    """
+    Bir posta kutusunu IMAP sunucusuyla senkronize et
+    """
+    try:
+        job = MailboxSyncJob.objects.select_related('mailbox', 'user').get(pk=job_id)
+    except MailboxSyncJob.DoesNotExist:
+        logger.error(f"Mailbox sync job {job_id} not found")
+        return f"Mailbox sync job {job_id} not found"
+
+    mailbox = job.mailbox
+    token = mailbox.acquire_lock(MAILBOX_LOCK_TIMEOUT)
+    if not token:
+        job.finish('skipped', 'Bu posta kutusu için başka bir senkronizasyon sürüyor')
+        return f"Mailbox {mailbox.pk} is already being synced"
+
+    try:
+        user_profile = UserProfile.objects.get(user=job.user)
+
+        job.status = 'running'
+        job.started_at = timezone.now()
+        job.save(update_fields=['status', 'started_at'])
+
+        def on_progress(progress):
+            job.update_progress(progress)
+            mailbox.extend_lock(token, MAILBOX_LOCK_TIMEOUT)
+
+        success, message, result = imap_service.sync_mailbox(
+            job.user,
+            get_imap_config(user_profile),
+            folder=mailbox.folder,
+            headers_only=job.headers_only,
+            progress_callback=on_progress,
+        )
+
+        if result:
+            job.fetched_count = result['fetched_count']
+            job.saved_count = result['saved_count']
+            job.save(update_fields=['fetched_count', 'saved_count'])
+        job.finish('success' if success else 'failed', message)
+
+        logger.info(f"Mailbox sync job {job_id} finished: {message}")
+        return message
+
+    except Exception as exc:
+        logger.error(f"Error syncing mailbox for job {job_id}: {exc}")
+        job.finish('failed', str(exc))
+        return f"Mailbox sync failed: {exc}"
+    finally:
+        mailbox.release_lock(token)
+
+
+@shared_task
+def sync_all_mailboxes():
+    """
+    IMAP ayarları tamamlanmış tüm kullanıcıların posta kutularını kuyruğa al
+    """
+    profiles = UserProfile.objects.select_related('user').filter(
+        user__is_active=True
+    ).exclude(
+        Q(imap_server__isnull=True) | Q(imap_server='') |
+        Q(imap_username__isnull=True) | Q(imap_username='')
+    )
+
+    queued_count = 0
+    for user_profile in profiles:
+        if get_missing_imap_fields(user_profile):
+            continue
+        try:
+            _, created = enqueue_mailbox_sync(user_profile)
+            queued_count += int(created)
+        except Exception as e:
+            logger.error(f"Error queueing mailbox sync for user {user_profile.user_id}: {e}")
+
+    logger.info(f"Queued {queued_count} mailbox syncs")
+    return f"Queued {queued_count} mailbox syncs"
+
+
+def get_campaign_rate_limit():
+    """
+    SMTP hesabı başına dakikada gönderilebilecek kampanya mesajı sayısı
+    """
+    return getattr(settings, 'EMAIL_CAMPAIGN_RATE_LIMIT', 60)
+
+
+def enqueue_campaign(campaign):
+    """
+    Kampanyanın hazırlanmasını, kayıt commit edildikten sonra kuyruğa alır.
+    """
+    transaction.on_commit(lambda: prepare_campaign_task.apply_async(
+        args=[campaign.pk], task_id=f"email-campaign-{campaign.pk}"
+    ))
+
+
+def schedule_campaign_chunk(campaign, account, message_ids):
+    """
+    Bir parti mesaj için hesabın hız sınırında zaman dilimi ayırır ve gönderim
+    görevini commit sonrasında kuyruğa alır.
+
+    Ayrılan zaman mesajların `next_attempt_at` alanına yazılır; görevi hiç
+    kuyruğa girmemiş veya kaybolmuş mesajlar `requeue_stale_emails` tarafından
+    bu alana göre bulunup yeniden zamanlanır.
+    """
+    send_at = SMTPSendThrottle.reserve(account, len(message_ids), get_campaign_rate_limit())
+    EmailMessage.objects.filter(pk__in=message_ids).update(next_attempt_at=send_at)
+    transaction.on_commit(lambda: dispatch_campaign_chunk(campaign.pk, message_ids, send_at))
+
+
+def dispatch_campaign_chunk(campaign_id, message_ids, send_at):
+    """
+    Gönderim görevini `send_at` zamanında çalışacak şekilde kuyruğa alır; ETA
+    `CAMPAIGN_MAX_ETA` ile sınırlanır, görev erken çalışırsa kendini yeniden kuyruğa alır.
+    """
+    latest = timezone.now() + timedelta(seconds=CAMPAIGN_MAX_ETA)
+    if send_at <= latest:
+        send_campaign_chunk_task.apply_async(args=[campaign_id, message_ids], eta=send_at)
+    else:
+        send_campaign_chunk_task.apply_async(
+            args=[campaign_id, message_ids], kwargs={'send_at': send_at.isoformat()}, eta=latest
+        )
+
+
+def fail_campaign(campaign, message):
+    campaign.status = 'failed'
+    campaign.error_message = message
+    campaign.finished_at = timezone.now()
+    campaign.save(update_fields=['status', 'error_message', 'finished_at'])
+
+
+@shared_task(bind=True)
+def prepare_campaign_task(self, campaign_id):
+    """
+    Kampanya alıcılarını partiler halinde okuyup kişiye özel mesajları oluştur
+    ve gönderim görevlerini zamanla
+    """
+    try:
+        campaign = EmailCampaign.objects.select_related('created_by').get(pk=campaign_id)
+    except EmailCampaign.DoesNotExist:
+        logger.error(f"Email campaign {campaign_id} not found")
+        return f"Email campaign {campaign_id} not found"
+
+    if campaign.status not in ('queued', 'preparing'):
+        return f"Email campaign {campaign_id} is already {campaign.status}"
+
+    try:
+        user_profile = UserProfile.objects.get(user=campaign.created_by)
+        smtp_config = get_smtp_config(user_profile)
+        missing_fields = [field for field in REQUIRED_SMTP_FIELDS if not smtp_config.get(field)]
+        if missing_fields:
+            fail_campaign(campaign, f"SMTP ayarları eksik: {', '.join(missing_fields)}")
+            return f"Email campaign {campaign_id} has incomplete SMTP settings"
+        account = get_smtp_account(smtp_config)
+
+        campaign.status = 'preparing'
+        campaign.started_at = campaign.started_at or timezone.now()
+        campaign.save(update_fields=['status', 'started_at'])
+
+        recipients = get_campaign_recipients(campaign.recipient_type, campaign.filters)
+        while True:
+            # Kaldığı yerden devam: yeniden çalışan görev aynı alıcıya ikinci mesaj üretmez
+            batch = list(recipients.filter(pk__gt=campaign.last_recipient_id)[:CAMPAIGN_RENDER_BATCH_SIZE])
+            if not batch:
+                break
+
+            # Mesajlar ve gönderim zamanları birlikte commit edilir; görevler commit sonrası kuyruğa girer
+            with transaction.atomic():
+                messages = EmailMessage.objects.bulk_create(build_campaign_messages(campaign, batch))
+                campaign.last_recipient_id = batch[-1].pk
+                campaign.queued_count += len(messages)
+                campaign.save(update_fields=['last_recipient_id', 'queued_count'])
+
+                message_ids = [message.pk for message in messages]
+                for start in range(0, len(message_ids), CAMPAIGN_SEND_CHUNK_SIZE):
+                    schedule_campaign_chunk(campaign, account, message_ids[start:start + CAMPAIGN_SEND_CHUNK_SIZE])
+
+        # Oluşturma ile hazırlık arasında değişen alıcı sayısı ilerlemeyi bozmasın
+        campaign.status = 'sending'
+        campaign.total_count = campaign.queued_count
+        campaign.save(update_fields=['status', 'total_count'])
+        campaign.complete_if_done()
+
+        logger.info(f"Email campaign {campaign_id} queued {campaign.queued_count} messages")
+        return f"Queued {campaign.queued_count} messages"
+
+    except Exception as exc:
+        logger.error(f"Error preparing email campaign {campaign_id}: {exc}")
+        fail_campaign(campaign, str(exc))
+        return f"Email campaign preparation failed: {exc}"
+
+
+@shared_task(bind=True)
+def send_campaign_chunk_task(self, campaign_id, message_ids, send_at=None):
+    """
+    Bir parti kampanya mesajını havuzdaki SMTP bağlantısı üzerinden gönder
+    """
+    if send_at:
+        # ETA sınırı nedeniyle erken çalıştı; gönderim zamanına kadar yeniden kuyruğa alınır
+        send_at = datetime.fromisoformat(send_at)
+        if send_at > timezone.now():
+            dispatch_campaign_chunk(campaign_id, message_ids, send_at)
+            return f"Deferred until {send_at.isoformat()}"
+
+    try:
+        campaign = EmailCampaign.objects.select_related('created_by').get(pk=campaign_id)
+    except EmailCampaign.DoesNotExist:
+        logger.error(f"Email campaign {campaign_id} not found")
+        return f"Email campaign {campaign_id} not found"
+
+    # Mesajlar sahiplenilir; aynı görev tekrar teslim edilirse gönderilmiş mesajlar atlanır
+    with transaction.atomic():
+        messages = list(
+            EmailMessage.objects.select_for_update(skip_locked=True)
+            .filter(pk__in=message_ids, campaign=campaign, status='queued')
+        )
+        EmailMessage.objects.filter(pk__in=[message.pk for message in messages]).update(
+            status='sending', sending_started_at=timezone.now()
+        )
+
+    if not messages:
+        return "No queued messages"
+
+    try:
+        smtp_config = get_smtp_config(UserProfile.objects.get(user=campaign.created_by))
+    except UserProfile.DoesNotExist:
+        smtp_config = None
+
+    sent_ids = []
+    failed = []
+    for message in messages:
+        if smtp_config:
+            success, result, _ = smtp_service.send_email(
+                from_email=campaign.sender,
+                from_name=campaign.sender_name,
+                to_emails=smtp_service.format_recipients(message.recipients),
+                subject=message.subject,
+                content=message.content,
+                smtp_config=smtp_config,
+            )
+        else:
+            success, result = False, "Kullanıcı profili bulunamadı"
+
+        if success:
+            sent_ids.append(message.pk)
+        else:
+            message.status = 'failed'
+            message.error_message = result
+            message.sending_started_at = None
+            failed.append(message)
+
+    EmailMessage.objects.filter(pk__in=sent_ids).update(status='sent', sent_at=timezone.now(), sending_started_at=None)
+    EmailMessage.objects.bulk_update(failed, ['status', 'error_message', 'sending_started_at'])
+
+    EmailCampaign.objects.filter(pk=campaign.pk).update(
+        sent_count=F('sent_count') + len(sent_ids),
+        failed_count=F('failed_count') + len(failed),
+    )
+    campaign.complete_if_done()
+
+    logger.info(f"Email campaign {campaign_id}: sent {len(sent_ids)}, failed {len(failed)}")
+    return f"Sent {len(sent_ids)}, failed {len(failed)}"
+
+
+def enqueue_email(message):
+    """
+    Giden kutusuna `status='queued'` ve `next_attempt_at` ile kaydedilmiş mesaj
+    için commit sonrası bir worker'ı hemen uyandırır (beat ile periyodik boşaltma
+    da yapılır). Mesaj alanları burada değiştirilmez.
+    """
+    transaction.on_commit(lambda: drain_outbox_task.apply_async())
+
+
+@shared_task(bind=True)
+def drain_outbox_task(self, max_messages=500):
+    """
+    Giden kutusunda gönderim zamanı gelmiş e-postaları gönder
+    """
+    started = timezone.now()
+    results = drain_outbox(max_messages=max_messages)
+    elapsed = (timezone.now() - started).total_seconds()
+
+    processed = sum(results.values())
+    if processed:
+        rate = processed / elapsed if elapsed else processed
+        logger.info(
+            f"Outbox drained: sent {results['sent']}, retry {results['queued']}, "
+            f"dead {results['dead']} in {elapsed:.1f}s ({rate:.1f} msg/s)"
+        )
+    return f"Sent {results['sent']}, retry {results['queued']}, dead {results['dead']}"
+
+
+@shared_task
+def requeue_stale_emails():
+    """
+    `sending` durumunda takılı kalan e-postaları ve gönderim görevi kaybolmuş
+    kampanya mesajlarını tekrar kuyruğa al, giden kutusu metriklerini logla
+    """
+    requeued, dead = requeue_stale_messages()
+
+    # Kampanya mesajları hesabın hız sınırına göre yeniden zamanlanır
+    orphan_cutoff = timezone.now() - timedelta(seconds=CAMPAIGN_ORPHAN_GRACE)
+    orphaned = EmailMessage.objects.filter(
+        status='queued', campaign__status__in=('preparing', 'sending')
+    ).filter(
+        Q(next_attempt_at__lt=orphan_cutoff) |
+        # Gönderim zamanı kaydedilmeden önce oluşturulmuş eski kayıtlar
+        Q(next_attempt_at__isnull=True, created_at__lt=orphan_cutoff)
+    )
+    campaign_messages = {}
+    for campaign_id, message_id in (
+        get_stale_sending_messages().filter(campaign__isnull=False) | orphaned
+    ).order_by('pk').values_list('campaign_id', 'pk'):
+        campaign_messages.setdefault(campaign_id, []).append(message_id)
+
+    for campaign in EmailCampaign.objects.select_related('created_by').filter(pk__in=campaign_messages):
+        message_ids = campaign_messages[campaign.pk]
+        try:
+            smtp_config = get_smtp_config(UserProfile.objects.get(user=campaign.created_by))
+        except UserProfile.DoesNotExist:
+            smtp_config = None
+        if not smtp_config or not all(smtp_config.get(field) for field in REQUIRED_SMTP_FIELDS):
+            failed = EmailMessage.objects.filter(pk__in=message_ids, status__in=('sending', 'queued')).update(
+                status='failed', sending_started_at=None, error_message="SMTP ayarları bulunamadı"
+            )
+            EmailCampaign.objects.filter(pk=campaign.pk).update(failed_count=F('failed_count') + failed)
+            campaign.complete_if_done()
+            dead += failed
+            continue
+
+        account = get_smtp_account(smtp_config)
+        with transaction.atomic():
+            EmailMessage.objects.filter(pk__in=message_ids, status='sending').update(
+                status='queued', sending_started_at=None
+            )
+            for start in range(0, len(message_ids), CAMPAIGN_SEND_CHUNK_SIZE):
+                schedule_campaign_chunk(campaign, account, message_ids[start:start + CAMPAIGN_SEND_CHUNK_SIZE])
+        requeued += len(message_ids)
+
+    stats = get_outbox_stats()
+    logger.info(
+        f"Outbox: {stats['queued']} queued ({stats['due']} due, lag {stats['queue_lag_seconds']}s), "
+        f"{stats['sending']} sending, {stats['dead']} dead, {stats['sent_last_hour']} sent in the last hour"
+    )
+    if requeued or dead:
+        logger.warning(f"Requeued {requeued} stale emails, marked {dead} as dead")
+    return f"Requeued {requeued} stale emails, marked {dead} as dead"
@@ -0,0 +1,75 @@
+"""
+E-posta şablonlarındaki {değişken} yer tutucularının kişiye özel doldurulması.
+
+Şablonlar bir kez derlenir (sabit metin ve değişken parçalarına ayrılır) ve
+her alıcı için sadece parçalar birleştirilir. Bilinmeyen değişkenler ve
+HTML/CSS içindeki diğer süslü parantezler olduğu gibi bırakılır.
+"""
+import re
+from functools import lru_cache
+
+VARIABLE_RE = re.compile(r'\{(\w+)\}')
+
+
+class CompiledTemplate:
+    """
+    Parçalarına ayrılmış şablon metni
+    """
+
+    def __init__(self, text):
+        self.parts = VARIABLE_RE.split(text or '')
+        # split sonucu: [metin, değişken, metin, değişken, ..., metin]
+        self.variables = set(self.parts[1::2])
+
+    def render(self, context):
+        rendered = list(self.parts)
+        for index in range(1, len(rendered), 2):
+            name = rendered[index]
+            value = context.get(name)
+            rendered[index] = '{%s}' % name if value is None else str(value)
+        return ''.join(rendered)
+
+
+@lru_cache(maxsize=256)
+def compile_template(text):
+    return CompiledTemplate(text)
+
+
+def render_template(text, context):
+    """
+    Şablon metnindeki {değişken} yer tutucularını context değerleriyle doldurur.
+    """
+    return compile_template(text).render(context)
+
+
+def get_contact_context(contact):
+    """
+    Bir iletişim kişisi için şablon değişkenleri
+    """
+    company = contact.company
+    return {
+        'ad': contact.first_name,
+        'soyad': contact.last_name,
+        'ad_soyad': f"{contact.first_name} {contact.last_name}".strip(),
+        'pozisyon': contact.position or '',
+        'email': contact.email or '',
+        'telefon': contact.phone or '',
+        'firma_adi': company.name if company else '',
+        'sektor': (company.industry or '') if company else '',
+    }
+
+
+def get_company_context(company):
+    """
+    Bir firma için şablon değişkenleri; kişi değişkenleri firma adıyla doldurulur
+    """
+    return {
+        'ad': company.name,
+        'soyad': '',
+        'ad_soyad': company.name,
+        'pozisyon': '',
+        'email': company.email or '',
+        'telefon': company.phone or '',
+        'firma_adi': company.name,
+        'sektor': company.industry or '',
+    }
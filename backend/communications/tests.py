@@ -1,3 +1,1012 @@
-from django.test import TestCase
+import base64
+import email
+import os
+import shutil
+import smtplib
+import tempfile
+import time
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from authentication.models import UserProfile
+from crm_project.middleware import QueryRecorder
+from crm_project.testing import QueryBudgetMixin
+from customers.models import Company, Contact
+from .attachments import BASE64_CHUNK_SIZE, build_attachment_part
+from .imap_service import imap_service
+from .models import EmailAttachment, EmailCampaign, EmailMessage, EmailTemplate, IncomingEmail, MailboxSyncJob, MailboxSyncState
+from .smtp_pool import SMTPConnectionPool, smtp_pool
+from .smtp_service import SMTPEmailService
+from .outbox import OUTBOX_MAX_ATTEMPTS, OUTBOX_SENDING_TIMEOUT, get_outbox_stats
+from .tasks import (
+    CAMPAIGN_MAX_ETA, CAMPAIGN_ORPHAN_GRACE, MAILBOX_LOCK_TIMEOUT, dispatch_campaign_chunk, drain_outbox_task,
+    prepare_campaign_task, requeue_stale_emails, send_campaign_chunk_task, sync_mailbox_task,
+)
+from .templating import render_template
+from .urls import router
+
+
+class CommunicationsQueryBudgetTests(QueryBudgetMixin, APITestCase):
+    """
+    İletişim endpoint'lerinin sorgu bütçeleri (N+1 regresyonlarını yakalar)
+    """
+    router = router
+    budgets = {
+        'emailtemplate-list': 1,
+        'emailtemplate-detail': 1,
+        'emailmessage-list': 1,
+        'emailmessage-detail': 1,
+        'emailmessage-export': 1,
+        'emailmessage-email-status': 1,
+        'emailmessage-outbox-stats': 1,
+        'emailcampaign-list': 1,
+        'emailcampaign-detail': 1,
+        'emailcampaign-failures': 2,
+        'incomingemail-list': 1,
+        'incomingemail-detail': 1,
+        'incomingemail-imap-status': 1,
+        'incomingemail-sync-job': 1,
+        'incomingemail-company-emails': 1,
+        'incomingemail-contact-emails': 1,
+    }
+    route_params = {
+        'incomingemail-company-emails': lambda: {'company_id': Contact.objects.order_by('pk').first().company_id},
+        'incomingemail-contact-emails': lambda: {'contact_id': Contact.objects.order_by('pk').first().pk},
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        campaign = EmailCampaign.objects.create(
+            name='Bülten', subject='Merhaba {ad_soyad}', content='<p>Merhaba</p>',
+            created_by=cls.user, sender='satis@example.com', status='sending',
+        )
+        for message in EmailMessage.objects.all()[:5]:
+            message.campaign = campaign
+            message.status = 'failed'
+            message.save()
+
+
+class FakeIMAPConnection:
+    """
+    imaplib.IMAP4 yerine kullanılan, UID komutlarını bellekteki mesajlarla
+    yanıtlayan sahte bağlantı. Sunucuya gönderilen komutlar `commands`
+    listesinde tutulur.
+    """
+
+    def __init__(self, uid_validity=1):
+        self.uid_validity = uid_validity
+        self.messages = {}
+        self.commands = []
+        self._untagged = {}
+
+    def add_message(self, uid, sender='musteri@example.com', body='Merhaba'):
+        self.messages[uid] = (
+            f"Message-ID: <msg-{uid}@example.com>\r\n"
+            f"From: Müşteri <{sender}>\r\n"
+            f"To: satis@example.com\r\n"
+            f"Subject: Mesaj {uid}\r\n"
+            f"Date: Mon, 06 Jan 2025 10:00:00 +0300\r\n"
+            f"Content-Type: text/plain; charset=utf-8\r\n\r\n"
+            f"{body} {uid}\r\n"
+        ).encode('utf-8')
+
+    def login(self, username, password):
+        return 'OK', [b'Logged in']
+
+    def select(self, folder, readonly=False):
+        self.commands.append('SELECT')
+        self._untagged = {
+            'UIDVALIDITY': [str(self.uid_validity).encode()],
+            'UIDNEXT': [str(max(self.messages, default=0) + 1).encode()],
+        }
+        return 'OK', [str(len(self.messages)).encode()]
+
+    def response(self, name):
+        return name, self._untagged.pop(name, [None])
+
+    def uid(self, command, *args):
+        self.commands.append(command)
+        if command == 'SEARCH':
+            uids = self._resolve(args[1].replace('UID ', '')) if args[1] != 'ALL' else sorted(self.messages)
+            return 'OK', [' '.join(str(uid) for uid in uids).encode()]
+
+        uid_set, query = args
+        data = []
+        for uid in self._resolve(uid_set):
+            raw = self.messages[uid]
+            if 'HEADER' in query:
+                raw = raw.split(b'\r\n\r\n')[0] + b'\r\n\r\n'
+            data.append((f"{uid} (UID {uid} BODY[] {{{len(raw)}}}".encode(), raw))
+            data.append(b')')
+        return 'OK', data
+
+    def _resolve(self, uid_set):
+        uids = set()
+        for part in uid_set.split(','):
+            start, _, end = part.partition(':')
+            if not end:
+                uids.add(int(start))
+            elif end == '*':
+                matched = [uid for uid in self.messages if uid >= int(start)]
+                # Gerçek sunucular gibi 'n:*' en az en son mesajı döndürür
+                uids.update(matched or [max(self.messages)])
+            else:
+                uids.update(uid for uid in self.messages if int(start) <= uid <= int(end))
+        return sorted(uid for uid in uids if uid in self.messages)
+
+    def close(self):
+        pass
+
+    def logout(self):
+        pass
+
+
+class IMAPSyncTests(APITestCase):
+    """
+    UID tabanlı artımlı IMAP senkronizasyonu
+    """
+    imap_config = {
+        'imap_server': 'imap.example.com',
+        'imap_port': 993,
+        'imap_username': 'satis@example.com',
+        'imap_password': 'secret',
+        'use_ssl': True,
+    }
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='imap_user', password='test-password')
+        self.server = FakeIMAPConnection()
+        for uid in range(1, 61):
+            self.server.add_message(uid)
+        patcher = mock.patch('imaplib.IMAP4_SSL', return_value=self.server)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def sync(self, **kwargs):
+        self.server.commands = []
+        success, message, result = imap_service.sync_mailbox(self.user, self.imap_config, **kwargs)
+        self.assertTrue(success, message)
+        return result
+
+    def test_initial_sync_takes_latest_messages(self):
+        result = self.sync()
+
+        self.assertEqual(result, {'fetched_count': 50, 'saved_count': 50, 'last_uid': 60})
+        self.assertEqual(self.server.commands, ['SELECT', 'SEARCH', 'FETCH'])
+        self.assertFalse(IncomingEmail.objects.filter(imap_uid__lte=10).exists())
+        state = MailboxSyncState.objects.get(user=self.user)
+        self.assertEqual((state.uid_validity, state.last_uid), (1, 60))
+
+    def test_unchanged_mailbox_costs_only_select(self):
+        self.sync()
+        with QueryRecorder() as recorder:
+            result = self.sync()
+
+        self.assertEqual(self.server.commands, ['SELECT'])
+        self.assertEqual(result['saved_count'], 0)
+        self.assertLessEqual(recorder.count, 2)
+
+    def test_new_messages_fetched_in_uid_batches(self):
+        self.sync()
+        for uid in range(61, 66):
+            self.server.add_message(uid)
+
+        result = self.sync(batch_size=2)
+
+        self.assertEqual(result, {'fetched_count': 5, 'saved_count': 5, 'last_uid': 65})
+        self.assertEqual(self.server.commands, ['SELECT', 'FETCH', 'FETCH', 'FETCH'])
+        self.assertEqual(IncomingEmail.objects.count(), 55)
+
+    def test_uidvalidity_change_resyncs_without_duplicates(self):
+        self.sync()
+        # Sunucu UID'leri yeniden numaralandırdı; bu arada iki yeni mesaj geldi
+        self.server.uid_validity = 2
+        self.server.messages = {uid + 100: raw for uid, raw in self.server.messages.items()}
+        self.server.add_message(161)
+        self.server.add_message(162)
+
+        result = self.sync()
+
+        self.assertEqual(result, {'fetched_count': 2, 'saved_count': 2, 'last_uid': 162})
+        self.assertEqual(IncomingEmail.objects.count(), 52)
+        # Kayıtlı e-postalar yeni UID'leriyle eşleştirilir
+        incoming = IncomingEmail.objects.get(message_id='msg-60@example.com')
+        self.assertEqual(incoming.imap_uid, 160)
+        state = MailboxSyncState.objects.get(user=self.user)
+        self.assertEqual((state.uid_validity, state.last_uid), (2, 162))
+
+        self.assertEqual(self.sync()['fetched_count'], 0)
+
+    def test_saved_count_excludes_concurrently_saved_emails(self):
+        state = MailboxSyncState.objects.create(user=self.user, account='satis@example.com@imap.example.com')
+        emails = [
+            {**imap_service._parse_email(email.message_from_bytes(self.server.messages[uid])), 'uid': uid}
+            for uid in (1, 2)
+        ]
+        find_relations = imap_service._find_relations
+
+        def save_concurrently(sender_emails):
+            # Başka bir senkronizasyon ilk mesajı varlık kontrolünden sonra kaydetti
+            IncomingEmail.objects.create(
+                message_id='msg-1@example.com', subject='x', content='x', sender_email='musteri@example.com',
+                recipients=[], received_at=timezone.now(),
+            )
+            return find_relations(sender_emails)
+
+        with mock.patch.object(imap_service, '_find_relations', side_effect=save_concurrently):
+            saved = imap_service.save_emails_to_db(emails, mailbox=state)
+
+        self.assertEqual(saved, 1)
+        self.assertEqual(IncomingEmail.objects.count(), 2)
+
+    def test_relations_are_resolved_in_bulk(self):
+        contact = Contact.objects.create(
+            company=Company.objects.create(name='Örnek A.Ş.'),
+            first_name='Ali', last_name='Veli', email='ali@ornek.com.tr',
+        )
+        self.server.add_message(61, sender='ali@ornek.com.tr')
+        self.sync(initial_limit=5)
+
+        incoming = IncomingEmail.objects.get(imap_uid=61)
+        self.assertEqual((incoming.contact, incoming.company), (contact, contact.company))
+
+    def test_sender_domain_matches_company_domain_exactly(self):
+        Company.objects.create(name='XABC', website_url='https://xabc.com.tr')
+        company = Company.objects.create(name='ABC', website_url='https://www.abc.com')
+        self.server.add_message(61, sender='Satis@ABC.com')
+        self.server.add_message(62, sender='info@bc.com')
+        self.server.add_message(63, sender='biri@gmail.com')
+        self.sync(initial_limit=5)
+
+        relations = dict(IncomingEmail.objects.filter(imap_uid__gt=60).values_list('imap_uid', 'company'))
+        self.assertEqual(relations, {61: company.pk, 62: None, 63: None})
+
+    def test_headers_only_loads_body_on_first_view(self):
+        UserProfile.objects.filter(user=self.user).update(
+            imap_server='imap.example.com', imap_port=993,
+            imap_username='satis@example.com', imap_password='secret', use_imap_ssl=True,
+        )
+        self.sync(headers_only=True, initial_limit=1)
+        incoming = IncomingEmail.objects.get()
+        self.assertFalse(incoming.body_loaded)
+        self.assertEqual(incoming.content, '')
+
+        self.client.force_authenticate(self.user)
+        response = self.client.get(reverse('incomingemail-detail', kwargs={'pk': incoming.pk}))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['content'].strip(), 'Merhaba 60')
+        incoming.refresh_from_db()
+        self.assertTrue(incoming.body_loaded)
+
+
+class MailboxSyncTaskTests(APITestCase):
+    """
+    Arka plan IMAP senkronizasyon işleri
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='sync_user', password='test-password')
+        UserProfile.objects.filter(user=self.user).update(
+            imap_server='imap.example.com', imap_port=993,
+            imap_username='satis@example.com', imap_password='secret', use_imap_ssl=True,
+        )
+        self.server = FakeIMAPConnection()
+        for uid in range(1, 6):
+            self.server.add_message(uid)
+        patcher = mock.patch('imaplib.IMAP4_SSL', return_value=self.server)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client.force_authenticate(self.user)
+
+    def trigger(self):
+        with mock.patch.object(sync_mailbox_task, 'apply_async') as apply_async:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(reverse('incomingemail-fetch-emails'))
+        return response, apply_async
+
+    def test_trigger_returns_job_and_deduplicates(self):
+        response, apply_async = self.trigger()
+
+        self.assertEqual(response.status_code, 202)
+        job = MailboxSyncJob.objects.get(pk=response.data['job_id'])
+        self.assertEqual(job.status, 'queued')
+        apply_async.assert_called_once_with(args=[job.pk], task_id=job.task_id)
+        # İstek sırasında IMAP sunucusuna bağlanılmaz
+        self.assertEqual(self.server.commands, [])
+
+        response, apply_async = self.trigger()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['job_id'], job.pk)
+        apply_async.assert_not_called()
+
+    def test_task_syncs_and_reports_progress(self):
+        response, _ = self.trigger()
+        job_id = response.data['job_id']
+
+        sync_mailbox_task(job_id)
+
+        response = self.client.get(reverse('incomingemail-sync-job', kwargs={'job_id': job_id}))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['status'], 'success')
+        self.assertEqual(response.data['progress'], 100)
+        self.assertEqual((response.data['fetched_count'], response.data['saved_count']), (5, 5))
+        self.assertEqual(IncomingEmail.objects.count(), 5)
+
+        mailbox = MailboxSyncState.objects.get(user=self.user)
+        self.assertIsNone(mailbox.locked_until)
+
+        # Önceki iş bittiği için yeni senkronizasyon kuyruğa alınabilir
+        response, _ = self.trigger()
+        self.assertEqual(response.status_code, 202)
+
+    def test_locked_mailbox_is_skipped(self):
+        response, _ = self.trigger()
+        job = MailboxSyncJob.objects.get(pk=response.data['job_id'])
+        token = job.mailbox.acquire_lock(MAILBOX_LOCK_TIMEOUT)
+        self.assertIsNotNone(token)
+
+        sync_mailbox_task(job.pk)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'skipped')
+        self.assertEqual(self.server.commands, [])
+        self.assertIsNone(job.mailbox.acquire_lock(MAILBOX_LOCK_TIMEOUT))
+
+    def test_other_users_jobs_are_hidden(self):
+        response, _ = self.trigger()
+        other = User.objects.create_user(username='other_user', password='test-password')
+        self.client.force_authenticate(other)
+
+        response = self.client.get(reverse('incomingemail-sync-job', kwargs={'job_id': response.data['job_id']}))
+        self.assertEqual(response.status_code, 404)
+
+
+class FakeSMTP:
+    """
+    smtplib.SMTP yerine kullanılan sahte bağlantı; açılan tüm bağlantılar
+    `instances` listesinde tutulur.
+    """
+    instances = []
+
+    def __init__(self, host, port, timeout=None):
+        self.logins = 0
+        self.sent = []
+        self.messages = []
+        self.noop_code = 250
+        self.fail_next_send = None
+        self.closed = False
+        FakeSMTP.instances.append(self)
+
+    def starttls(self):
+        pass
+
+    def login(self, username, password):
+        self.logins += 1
+
+    def noop(self):
+        if self.noop_code != 250:
+            raise smtplib.SMTPServerDisconnected('Connection unexpectedly closed')
+        return 250, b'OK'
+
+    def sendmail(self, from_addr, to_addrs, message):
+        if self.fail_next_send:
+            error, self.fail_next_send = self.fail_next_send, None
+            raise error
+        self.sent.append(to_addrs)
+        self.messages.append(message)
+        return {}
+
+    def quit(self):
+        self.closed = True
+
+    def close(self):
+        self.closed = True
+
+
+class SMTPConnectionPoolTests(TestCase):
+    """
+    SMTP bağlantı havuzu
+    """
+    smtp_config = {
+        'smtp_server': 'smtp.example.com',
+        'smtp_port': 587,
+        'smtp_username': 'satis@example.com',
+        'smtp_password': 'secret',
+        'use_tls': True,
+    }
+
+    def setUp(self):
+        FakeSMTP.instances = []
+        patcher = mock.patch('smtplib.SMTP', FakeSMTP)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def send(self, pool, count=1):
+        for _ in range(count):
+            pool.send(self.smtp_config, 'satis@example.com', ['alici@example.com'], 'mesaj')
+
+    def test_authenticated_session_is_reused(self):
+        pool = SMTPConnectionPool()
+        self.send(pool, 5)
+
+        self.assertEqual(len(FakeSMTP.instances), 1)
+        self.assertEqual(FakeSMTP.instances[0].logins, 1)
+        self.assertEqual(len(FakeSMTP.instances[0].sent), 5)
+        self.assertEqual(pool.idle_count(self.smtp_config), 1)
+
+    def test_pools_are_separated_per_account(self):
+        pool = SMTPConnectionPool()
+        self.send(pool)
+        pool.send({**self.smtp_config, 'smtp_username': 'destek@example.com'},
+                  'destek@example.com', ['alici@example.com'], 'mesaj')
+
+        self.assertEqual(len(FakeSMTP.instances), 2)
+
+    def test_connection_recycled_after_max_messages(self):
+        pool = SMTPConnectionPool(max_messages_per_connection=2)
+        self.send(pool, 5)
+
+        self.assertEqual([len(smtp.sent) for smtp in FakeSMTP.instances], [2, 2, 1])
+        self.assertTrue(FakeSMTP.instances[0].closed)
+
+    def test_reconnects_when_server_disconnects(self):
+        pool = SMTPConnectionPool()
+        self.send(pool)
+        FakeSMTP.instances[0].fail_next_send = smtplib.SMTPServerDisconnected('timed out')
+
+        self.send(pool)
+
+        self.assertEqual(len(FakeSMTP.instances), 2)
+        self.assertEqual(len(FakeSMTP.instances[1].sent), 1)
+        self.assertEqual(pool.idle_count(), 1)
+
+    def test_refused_recipient_keeps_session(self):
+        pool = SMTPConnectionPool()
+        self.send(pool)
+        FakeSMTP.instances[0].fail_next_send = smtplib.SMTPRecipientsRefused({'alici@example.com': (550, b'')})
+
+        with self.assertRaises(smtplib.SMTPRecipientsRefused):
+            self.send(pool)
+        self.send(pool)
+
+        self.assertEqual(len(FakeSMTP.instances), 1)
+
+    def test_idle_connections_are_evicted_and_probed(self):
+        pool = SMTPConnectionPool(max_idle_seconds=60, keepalive_interval=10)
+        self.send(pool)
+        first = FakeSMTP.instances[0]
+
+        # Keepalive süresini aşan bağlantı NOOP ile yoklanır, cevap vermezse yenisi açılır
+        with mock.patch('time.monotonic', return_value=time.monotonic() + 30):
+            first.noop_code = 421
+            self.send(pool)
+        self.assertEqual(len(FakeSMTP.instances), 2)
+
+        with mock.patch('time.monotonic', return_value=time.monotonic() + 120):
+            pool.evict_idle()
+        self.assertEqual(pool.idle_count(), 0)
+        self.assertTrue(FakeSMTP.instances[1].closed)
+
+    def test_send_email_uses_pool(self):
+        pool = SMTPConnectionPool()
+        service = SMTPEmailService(smtp_config=self.smtp_config, pool=pool)
+        for index in range(3):
+            success, message, _ = service.send_email(
+                from_email='satis@example.com', from_name='Satış', to_emails=['alici@example.com'],
+                subject=f'Teklif {index}', content='<p>Merhaba</p>',
+            )
+            self.assertTrue(success, message)
+
+        self.assertEqual(len(FakeSMTP.instances), 1)
+
+
+class RejectingSMTP(FakeSMTP):
+    """
+    'red' ile başlayan adresleri reddeden sahte SMTP bağlantısı
+    """
+
+    def sendmail(self, from_addr, to_addrs, message):
+        refused = {address: (550, b'Mailbox unavailable') for address in to_addrs if address.startswith('red')}
+        if refused:
+            raise smtplib.SMTPRecipientsRefused(refused)
+        return super().sendmail(from_addr, to_addrs, message)
+
+
+class EmailCampaignTests(APITestCase):
+    """
+    Toplu e-posta kampanyaları
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='kampanya', password='test-password',
+                                             first_name='Ayşe', last_name='Satış')
+        UserProfile.objects.filter(user=self.user).update(
+            smtp_server='smtp.example.com', smtp_port=587,
+            smtp_username='satis@example.com', smtp_password='secret', use_tls=True,
+        )
+        self.template = EmailTemplate.objects.create(
+            name='Tanıtım',
+            subject='{firma_adi} için teklif',
+            content='<style>p {color: red}</style><p>Sayın {ad_soyad}, {kampanya_kodu} {bilinmeyen}</p>',
+        )
+        self.company = Company.objects.create(name='Arçelik A.Ş.', industry='Üretim', email='info@arcelik.example.com')
+        other = Company.objects.create(name='Koç Holding', industry='Finans', email='info@koc.example.com')
+        self.contacts = [
+            Contact.objects.create(company=self.company, first_name='Mehmet', last_name='Yılmaz',
+                                   email='mehmet@arcelik.example.com'),
+            Contact.objects.create(company=self.company, first_name='Zeynep', last_name='Kaya',
+                                   email='red@arcelik.example.com'),
+            Contact.objects.create(company=self.company, first_name='Ali', last_name='Demir',
+                                   email='ali@arcelik.example.com'),
+            Contact.objects.create(company=self.company, first_name='E-postasız', last_name='Kişi'),
+            Contact.objects.create(company=other, first_name='Can', last_name='Koç', email='can@koc.example.com'),
+        ]
+
+        FakeSMTP.instances = []
+        patcher = mock.patch('smtplib.SMTP', RejectingSMTP)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(smtp_pool.close_all)
+        self.client.force_authenticate(self.user)
+
+    def create_campaign(self, **data):
+        payload = {
+            'template_id': self.template.pk,
+            'filters': {'company_ids': [self.company.pk]},
+            'variables': {'kampanya_kodu': 'YAZ25'},
+            **data,
+        }
+        with mock.patch.object(prepare_campaign_task, 'apply_async') as apply_async:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(reverse('emailcampaign-list'), payload, format='json')
+        return response, apply_async
+
+    def prepare(self, campaign):
+        """Hazırlık görevini çalıştırır, zamanlanan gönderim partilerini döner"""
+        with mock.patch('communications.tasks.CAMPAIGN_RENDER_BATCH_SIZE', 2), \
+                mock.patch('communications.tasks.CAMPAIGN_SEND_CHUNK_SIZE', 2), \
+                mock.patch.object(send_campaign_chunk_task, 'apply_async') as apply_async, \
+                self.captureOnCommitCallbacks(execute=True):
+            prepare_campaign_task(campaign.pk)
+        return apply_async.call_args_list
+
+    def test_create_returns_202_and_enqueues(self):
+        response, apply_async = self.create_campaign()
+
+        self.assertEqual(response.status_code, 202)
+        campaign = EmailCampaign.objects.get(pk=response.data['id'])
+        self.assertEqual(campaign.total_count, 3)
+        self.assertEqual(campaign.status, 'queued')
+        self.assertEqual(campaign.name, 'Tanıtım')
+        apply_async.assert_called_once_with(args=[campaign.pk], task_id=f"email-campaign-{campaign.pk}")
+        # İstek sırasında mesaj oluşturulmaz ve gönderilmez
+        self.assertFalse(EmailMessage.objects.exists())
+
+    def test_invalid_requests_are_rejected(self):
+        response, _ = self.create_campaign(filters={'renk': 'mavi'})
+        self.assertEqual(response.status_code, 400)
+
+        response, _ = self.create_campaign(filters={'company_ids': [0]})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('error', response.data)
+
+    def test_messages_are_personalized_and_rate_limited(self):
+        response, _ = self.create_campaign()
+        campaign = EmailCampaign.objects.get(pk=response.data['id'])
+
+        chunks = self.prepare(campaign)
+
+        messages = {message.contact_id: message for message in campaign.messages.all()}
+        self.assertEqual(len(messages), 3)
+        message = messages[self.contacts[0].pk]
+        self.assertEqual(message.subject, 'Arçelik A.Ş. için teklif')
+        self.assertEqual(
+            message.content,
+            '<style>p {color: red}</style><p>Sayın Mehmet Yılmaz, YAZ25 {bilinmeyen}</p>'
+        )
+        self.assertEqual(message.status, 'queued')
+        self.assertEqual(message.recipients, [{'email': 'mehmet@arcelik.example.com', 'name': 'Mehmet Yılmaz'}])
+
+        # Partiler hesabın dakikalık sınırına göre (60/dk -> 2 mesaj = 2 sn) aralıklı zamanlanır
+        self.assertEqual(len(chunks), 2)
+        first_eta, second_eta = (call.kwargs['eta'] for call in chunks)
+        self.assertEqual((second_eta - first_eta).total_seconds(), 2)
+
+        campaign.refresh_from_db()
+        self.assertEqual(campaign.status, 'sending')
+        self.assertEqual(campaign.queued_count, 3)
+
+    def test_chunks_send_and_report_failures(self):
+        response, _ = self.create_campaign()
+        campaign = EmailCampaign.objects.get(pk=response.data['id'])
+        chunks = self.prepare(campaign)
+
+        for call in chunks:
+            send_campaign_chunk_task(*call.kwargs['args'])
+        # Tekrar teslim edilen görev mesajları ikinci kez göndermez
+        send_campaign_chunk_task(*chunks[0].kwargs['args'])
+
+        campaign.refresh_from_db()
+        self.assertEqual(campaign.status, 'completed')
+        self.assertEqual((campaign.sent_count, campaign.failed_count), (2, 1))
+        self.assertEqual(sum(len(connection.sent) for connection in FakeSMTP.instances), 2)
+        # Tüm mesajlar tek kimliği doğrulanmış oturum üzerinden gider
+        self.assertEqual(len(FakeSMTP.instances), 1)
+
+        response = self.client.get(reverse('emailcampaign-detail', args=[campaign.pk]))
+        self.assertEqual(response.data['progress'], 100)
+
+        response = self.client.get(reverse('emailcampaign-failures', args=[campaign.pk]))
+        self.assertEqual(len(response.data['results']), 1)
+        failure = response.data['results'][0]
+        self.assertEqual(failure['contact'], self.contacts[1].pk)
+        self.assertIn('550', failure['error_message'])
+
+    def test_chunks_are_scheduled_only_after_commit(self):
+        response, _ = self.create_campaign()
+        campaign = EmailCampaign.objects.get(pk=response.data['id'])
+
+        with mock.patch.object(send_campaign_chunk_task, 'apply_async') as apply_async, \
+                self.captureOnCommitCallbacks() as callbacks:
+            prepare_campaign_task(campaign.pk)
+
+        # Görevler mesajlar commit edilmeden kuyruğa girmez; gönderim zamanı mesajla birlikte yazılır
+        apply_async.assert_not_called()
+        self.assertEqual(len(callbacks), 1)
+        self.assertFalse(campaign.messages.filter(next_attempt_at__isnull=True).exists())
+
+    def test_orphaned_campaign_messages_are_rescheduled(self):
+        response, _ = self.create_campaign()
+        campaign = EmailCampaign.objects.get(pk=response.data['id'])
+        # Hazırlık commit edildi ama gönderim görevleri kuyruğa girmeden worker çöktü
+        with mock.patch.object(send_campaign_chunk_task, 'apply_async'):
+            prepare_campaign_task(campaign.pk)
+        campaign.messages.update(next_attempt_at=timezone.now() - timedelta(seconds=CAMPAIGN_ORPHAN_GRACE + 60))
+
+        with mock.patch.object(send_campaign_chunk_task, 'apply_async') as apply_async, \
+                self.captureOnCommitCallbacks(execute=True):
+            requeue_stale_emails()
+
+        apply_async.assert_called_once()
+        rescheduled = apply_async.call_args.kwargs['args'][1]
+        self.assertEqual(sorted(rescheduled), sorted(campaign.messages.values_list('pk', flat=True)))
+        self.assertFalse(campaign.messages.filter(next_attempt_at__lt=timezone.now() - timedelta(minutes=1)).exists())
+
+        # Zamanı henüz geçmemiş mesajlar tekrar zamanlanmaz
+        with mock.patch.object(send_campaign_chunk_task, 'apply_async') as apply_async, \
+                self.captureOnCommitCallbacks(execute=True):
+            requeue_stale_emails()
+        apply_async.assert_not_called()
+
+    def test_far_chunks_are_capped_and_deferred(self):
+        response, _ = self.create_campaign()
+        campaign = EmailCampaign.objects.get(pk=response.data['id'])
+        send_at = timezone.now() + timedelta(hours=3)
+
+        with mock.patch.object(send_campaign_chunk_task, 'apply_async') as apply_async:
+            dispatch_campaign_chunk(campaign.pk, [1, 2], send_at)
+        eta = apply_async.call_args.kwargs['eta']
+        self.assertLessEqual(eta, timezone.now() + timedelta(seconds=CAMPAIGN_MAX_ETA))
+        self.assertEqual(apply_async.call_args.kwargs['kwargs'], {'send_at': send_at.isoformat()})
+
+        # Erken çalışan görev göndermeden yeniden kuyruğa girer
+        with mock.patch.object(send_campaign_chunk_task, 'apply_async') as apply_async:
+            result = send_campaign_chunk_task(campaign.pk, [1, 2], send_at=send_at.isoformat())
+        self.assertTrue(result.startswith('Deferred'))
+        apply_async.assert_called_once()
+        self.assertEqual(FakeSMTP.instances, [])
+
+    def test_preparation_resumes_without_duplicates(self):
+        response, _ = self.create_campaign(recipient_type='companies', filters={'industry': 'Üretim,Finans'})
+        campaign = EmailCampaign.objects.get(pk=response.data['id'])
+        self.assertEqual(campaign.total_count, 2)
+
+        # İlk firma işlenmişken yarıda kalan hazırlık
+        campaign.last_recipient_id = self.company.pk
+        campaign.status = 'preparing'
+        campaign.save()
+        self.prepare(campaign)
+
+        self.assertEqual(list(campaign.messages.values_list('subject', flat=True)), ['Koç Holding için teklif'])
+
+    def test_render_template_keeps_unknown_placeholders(self):
+        self.assertEqual(
+            render_template('{ad} {soyad} {yok} {{ad}}', {'ad': 'Ali', 'soyad': None}),
+            'Ali {soyad} {yok} {Ali}'
+        )
+
+
+class DisconnectingSMTP(FakeSMTP):
+    """
+    Her gönderimde bağlantısı kopan sahte SMTP sunucusu (geçici hata)
+    """
+
+    def sendmail(self, from_addr, to_addrs, message):
+        raise smtplib.SMTPServerDisconnected('Connection unexpectedly closed')
+
+
+class EmailOutboxTests(APITestCase):
+    """
+    Giden kutusu: kuyruğa alma, tekrar denemeler ve takılı kalan gönderimler
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='outbox', password='test-password')
+        UserProfile.objects.filter(user=self.user).update(
+            smtp_server='smtp.example.com', smtp_port=587,
+            smtp_username='satis@example.com', smtp_password='secret', use_tls=True,
+        )
+        FakeSMTP.instances = []
+        self.patch_smtp(RejectingSMTP)
+        self.addCleanup(smtp_pool.close_all)
+        self.client.force_authenticate(self.user)
+
+    def patch_smtp(self, smtp_class):
+        patcher = mock.patch('smtplib.SMTP', smtp_class)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def send(self, email='alici@example.com', **headers):
+        payload = {'subject': 'Teklif', 'content': '<p>Merhaba</p>', 'recipients': [{'email': email}]}
+        with mock.patch.object(drain_outbox_task, 'apply_async') as apply_async:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(reverse('emailmessage-send-email'), payload, format='json', **headers)
+        return response, apply_async
+
+    def sent_count(self):
+        return sum(len(connection.sent) for connection in FakeSMTP.instances)
+
+    def test_send_is_queued_and_drained(self):
+        response, apply_async = self.send()
+
+        self.assertEqual(response.status_code, 202)
+        email = EmailMessage.objects.get(pk=response.data['email_id'])
+        self.assertEqual(email.status, 'queued')
+        apply_async.assert_called_once_with()
+        # İstek sırasında SMTP sunucusuna bağlanılmaz
+        self.assertEqual(FakeSMTP.instances, [])
+
+        drain_outbox_task()
+
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), ('sent', 1))
+        self.assertIsNotNone(email.sent_at)
+        self.assertEqual(self.sent_count(), 1)
+        self.assertEqual(get_outbox_stats()['sent_last_minute'], 1)
+
+    def test_queued_message_is_due_without_wake_up(self):
+        # Commit sonrası uyandırma çalışmasa da (ör. süreç çöktü) beat boşaltması mesajı gönderir
+        payload = {'subject': 'Teklif', 'content': '<p>Merhaba</p>', 'recipients': [{'email': 'alici@example.com'}]}
+        with mock.patch.object(drain_outbox_task, 'apply_async') as apply_async:
+            response = self.client.post(reverse('emailmessage-send-email'), payload, format='json')
+        apply_async.assert_not_called()
+
+        email = EmailMessage.objects.get(pk=response.data['email_id'])
+        self.assertEqual(email.status, 'queued')
+        self.assertIsNotNone(email.next_attempt_at)
+
+        drain_outbox_task()
+
+        email.refresh_from_db()
+        self.assertEqual(email.status, 'sent')
+
+    def test_idempotency_key_returns_existing_message(self):
+        first, _ = self.send(HTTP_IDEMPOTENCY_KEY='siparis-42')
+        second, apply_async = self.send(HTTP_IDEMPOTENCY_KEY='siparis-42')
+
+        self.assertEqual(first.status_code, 202)
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(first.data['email_id'], second.data['email_id'])
+        self.assertEqual(EmailMessage.objects.count(), 1)
+        apply_async.assert_not_called()
+
+        # Anahtar kullanıcı bazındadır
+        other = User.objects.create_user(username='diger', password='test-password')
+        UserProfile.objects.filter(user=other).update(
+            smtp_server='smtp.example.com', smtp_port=587, smtp_username='diger@example.com', smtp_password='secret',
+        )
+        self.client.force_authenticate(other)
+        third, _ = self.send(HTTP_IDEMPOTENCY_KEY='siparis-42')
+        self.assertNotEqual(third.data['email_id'], first.data['email_id'])
+
+    def test_transient_failures_back_off_until_dead(self):
+        self.patch_smtp(DisconnectingSMTP)
+        response, _ = self.send()
+        email = EmailMessage.objects.get(pk=response.data['email_id'])
+
+        before = timezone.now()
+        drain_outbox_task()
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), ('queued', 1))
+        delay = (email.next_attempt_at - before).total_seconds()
+        self.assertTrue(45 <= delay <= 75, delay)
+
+        # Zamanı gelmeyen mesaj tekrar denenmez
+        drain_outbox_task()
+        email.refresh_from_db()
+        self.assertEqual(email.attempts, 1)
+
+        for _ in range(OUTBOX_MAX_ATTEMPTS - 1):
+            EmailMessage.objects.filter(pk=email.pk).update(next_attempt_at=timezone.now())
+            drain_outbox_task()
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), ('dead', OUTBOX_MAX_ATTEMPTS))
+        self.assertIsNone(email.next_attempt_at)
+
+    def test_permanent_failure_is_dead_lettered_and_can_be_retried(self):
+        response, _ = self.send(email='red@example.com')
+        drain_outbox_task()
+
+        email = EmailMessage.objects.get(pk=response.data['email_id'])
+        self.assertEqual((email.status, email.attempts), ('dead', 1))
+        self.assertIn('550', email.error_message)
+
+        with mock.patch.object(drain_outbox_task, 'apply_async'):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(reverse('emailmessage-retry', args=[email.pk]))
+        self.assertEqual(response.status_code, 202)
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), ('queued', 0))
+
+    def test_stale_sending_messages_are_requeued(self):
+        stale_at = timezone.now() - timedelta(seconds=OUTBOX_SENDING_TIMEOUT + 60)
+        stale = EmailMessage.objects.create(
+            subject='Takılı', content='x', sender='satis@example.com', recipients=[{'email': 'a@example.com'}],
+            status='sending', sending_started_at=stale_at, attempts=1,
+            metadata={'sent_by_user_id': self.user.pk},
+        )
+        exhausted = EmailMessage.objects.create(
+            subject='Son deneme', content='x', sender='satis@example.com', recipients=[{'email': 'b@example.com'}],
+            status='sending', sending_started_at=stale_at, attempts=OUTBOX_MAX_ATTEMPTS,
+        )
+        in_progress = EmailMessage.objects.create(
+            subject='Gönderiliyor', content='x', sender='satis@example.com', recipients=[{'email': 'c@example.com'}],
+            status='sending', sending_started_at=timezone.now(), attempts=1,
+        )
+        campaign = EmailCampaign.objects.create(
+            name='Bülten', subject='Merhaba', content='x', created_by=self.user,
+            sender='satis@example.com', status='sending', queued_count=1, total_count=1,
+        )
+        campaign_message = EmailMessage.objects.create(
+            subject='Merhaba', content='x', sender='satis@example.com', recipients=[{'email': 'd@example.com'}],
+            status='sending', sending_started_at=stale_at, campaign=campaign,
+        )
+
+        with mock.patch.object(send_campaign_chunk_task, 'apply_async') as apply_async, \
+                self.captureOnCommitCallbacks(execute=True):
+            requeue_stale_emails()
+
+        statuses = dict(EmailMessage.objects.values_list('pk', 'status'))
+        self.assertEqual(statuses[stale.pk], 'queued')
+        self.assertEqual(statuses[exhausted.pk], 'dead')
+        self.assertEqual(statuses[in_progress.pk], 'sending')
+        self.assertEqual(statuses[campaign_message.pk], 'queued')
+        apply_async.assert_called_once()
+        self.assertEqual(apply_async.call_args.kwargs['args'], [campaign.pk, [campaign_message.pk]])
+
+        drain_outbox_task()
+        stale.refresh_from_db()
+        self.assertEqual((stale.status, stale.attempts), ('sent', 2))
+        # Kampanya mesajı giden kutusundan değil, hız sınırlı kampanya görevinden gönderilir
+        campaign_message.refresh_from_db()
+        self.assertEqual(campaign_message.status, 'queued')
+
+
+class EmailAttachmentTests(APITestCase):
+    """
+    Id ile referans verilen, içerik özetiyle tekilleştirilen e-posta ekleri
+    """
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.media_root = media_root
+
+        self.user = User.objects.create_user(username='ekler', password='test-password')
+        UserProfile.objects.filter(user=self.user).update(
+            smtp_server='smtp.example.com', smtp_port=587,
+            smtp_username='satis@example.com', smtp_password='secret', use_tls=True,
+        )
+        FakeSMTP.instances = []
+        patcher = mock.patch('smtplib.SMTP', FakeSMTP)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(smtp_pool.close_all)
+        self.client.force_authenticate(self.user)
+
+    def upload(self, name='teklif.pdf', content=b'%PDF-1.4 teklif'):
+        upload = ContentFile(content, name=name)
+        upload.content_type = 'application/pdf'
+        return self.client.post(reverse('emailmessage-upload-attachment'), {'file': upload}, format='multipart')
+
+    def send(self, **data):
+        payload = {'subject': 'Teklif', 'content': '<p>Ekte</p>', 'recipients': [{'email': 'alici@example.com'}], **data}
+        with mock.patch.object(drain_outbox_task, 'apply_async'):
+            with self.captureOnCommitCallbacks(execute=True):
+                return self.client.post(reverse('emailmessage-send-email'), payload, format='json')
+
+    def stored_files(self):
+        return [name for _, _, names in os.walk(self.media_root) for name in names]
+
+    def test_upload_returns_reference_and_deduplicates(self):
+        response = self.upload()
+        self.assertEqual(response.status_code, 201)
+        self.assertNotIn('file_content', response.data)
+        first_id = response.data['id']
+
+        response = self.upload()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['id'], first_id)
+
+        # Aynı içerik farklı adla: yeni kayıt, depoda tek dosya
+        response = self.upload(name='teklif-kopya.pdf')
+        self.assertEqual(response.status_code, 201)
+        renamed = EmailAttachment.objects.get(pk=response.data['id'])
+        self.assertEqual(renamed.file.name, EmailAttachment.objects.get(pk=first_id).file.name)
+        self.assertEqual(len(self.stored_files()), 1)
+
+    def test_referenced_attachment_is_sent(self):
+        attachment_id = self.upload(name='fiyat listesi ş.pdf').data['id']
+        response = self.send(attachment_ids=[attachment_id])
+        self.assertEqual(response.status_code, 202)
+
+        message = EmailMessage.objects.get(pk=response.data['email_id'])
+        self.assertEqual(message.attachments[0]['attachment_id'], attachment_id)
+        self.assertNotIn('file_content', message.attachments[0])
+
+        drain_outbox_task()
+
+        sent = email.message_from_string(FakeSMTP.instances[0].messages[0])
+        parts = [part for part in sent.walk() if part.get_filename()]
+        self.assertEqual(len(parts), 1)
+        self.assertEqual(parts[0].get_filename(), 'fiyat listesi ş.pdf')
+        self.assertEqual(parts[0].get_payload(decode=True), b'%PDF-1.4 teklif')
+
+    def test_unknown_attachment_id_is_rejected(self):
+        response = self.send(attachment_ids=[999])
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(EmailMessage.objects.exists())
+
+    def test_other_users_attachments_are_not_shared(self):
+        attachment_id = self.upload().data['id']
+        other = User.objects.create_user(username='baska', password='test-password')
+        self.client.force_authenticate(other)
+
+        # Aynı dosyayı yükleyen başka kullanıcı kendi kaydını alır (yalnızca depo paylaşılır)
+        response = self.upload()
+        self.assertEqual(response.status_code, 201)
+        self.assertNotEqual(response.data['id'], attachment_id)
+        self.assertEqual(len(self.stored_files()), 1)
+
+        response = self.send(attachment_ids=[attachment_id])
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(EmailMessage.objects.exists())
+
+    def test_inline_base64_attachment_is_stored_once(self):
+        legacy = {'file_name': 'not.txt', 'file_content': base64.b64encode(b'merhaba').decode()}
+        response = self.send(attachments=[legacy])
+
+        message = EmailMessage.objects.get(pk=response.data['email_id'])
+        attachment = message.attachment_files.get()
+        self.assertEqual(attachment.original_name, 'not.txt')
+        self.assertEqual(message.attachments, [attachment.to_reference()])
+
+    def test_attachment_part_is_encoded_in_chunks(self):
+        content = os.urandom(BASE64_CHUNK_SIZE * 2 + 100)
+        part = build_attachment_part(ContentFile(content), 'veri.bin')
+
+        self.assertEqual(part.get_content_type(), 'application/octet-stream')
+        self.assertEqual(part.get_payload(decode=True), content)
+        self.assertTrue(all(len(line) <= 76 for line in part.get_payload().splitlines()))
@@ -6,28 +6,40 @@ from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.parsers import MultiPartParser, FormParser
 from django.utils import timezone
+from django.db import IntegrityError, transaction
 
 from django.core.files.storage import default_storage
 from django.core.files.base import ContentFile
 import os
+import logging
 import mimetypes
 
 
-from .smtp_service import smtp_service
-from .imap_service import imap_service
-from .models import EmailTemplate, EmailMessage, EmailAttachment, IncomingEmail
+from .smtp_service import smtp_service, get_smtp_config, REQUIRED_SMTP_FIELDS
+from .imap_service import imap_service, get_imap_config
+from .campaigns import get_campaign_recipients
+from .attachments import store_attachment, store_inline_attachment
+from .outbox import get_outbox_stats, requeue_message
+from .tasks import enqueue_mailbox_sync, get_missing_imap_fields, enqueue_campaign, enqueue_email, drain_outbox_task
+from .models import EmailTemplate, EmailMessage, EmailAttachment, IncomingEmail, MailboxSyncJob, EmailCampaign
 from .serializers import (
     EmailTemplateSerializer,
     EmailMessageListSerializer,
     EmailMessageDetailSerializer,
     SendEmailSerializer,
     EmailAttachmentSerializer,
-    IncomingEmailSerializer
+    IncomingEmailSerializer,
+    MailboxSyncJobSerializer,
+    EmailCampaignSerializer,
+    EmailCampaignCreateSerializer
 )
 from customers.models import Company, Contact
+from exports.mixins import ExportMixin
 from authentication.models import UserProfile
 from opportunities.models import Opportunity
 
+logger = logging.getLogger(__name__)
+
 
 class EmailTemplateViewSet(viewsets.ModelViewSet):
     """
@@ -42,14 +54,17 @@ class EmailTemplateViewSet(viewsets.ModelViewSet):
 # EmailConfigViewSet artık kullanılmıyor - SMTP ayarları kullanıcı profilinde
 
 
-class EmailMessageViewSet(viewsets.ModelViewSet):
+class EmailMessageViewSet(ExportMixin, viewsets.ModelViewSet):
     """
     E-posta mesajları için API endpoint'i
     """
-    queryset = EmailMessage.objects.all().order_by('-created_at')
+    queryset = EmailMessage.objects.select_related('company', 'contact__company', 'opportunity').order_by('-created_at')
     filter_backends = [DjangoFilterBackend, filters.SearchFilter]
     filterset_fields = ['status', 'company', 'contact', 'opportunity']
     search_fields = ['subject', 'content', 'sender', 'company__name', 'contact__first_name', 'contact__last_name', 'opportunity__title']
+    export_resource = 'emails'
+    export_fields = ('id', 'subject', 'sender', 'recipients', 'status', ('company__name', 'Firma'),
+                     ('opportunity__title', 'Fırsat'), 'created_at', 'sent_at')
     
     def get_serializer_class(self):
         if self.action == 'list':
@@ -60,19 +75,19 @@ class EmailMessageViewSet(viewsets.ModelViewSet):
     def send_email(self, request):
         """
         SMTP ile e-posta gönderme endpoint'i
+
+        E-posta giden kutusuna alınır ve 202 döner; gönderim, tekrar denemeler
+        dahil arka planda yapılır. Durum e-posta detayından takip edilir.
         """
-        print(f"=== EMAIL SEND REQUEST ===")
-        print(f"User: {request.user}")
-        print(f"Request data: {request.data}")
+        logger.debug(f"E-posta gönderim isteği: {request.user}")
 
         serializer = SendEmailSerializer(data=request.data)
 
         if not serializer.is_valid():
-            print(f"Serializer errors: {serializer.errors}")
+            logger.debug(f"E-posta gönderim isteği geçersiz: {serializer.errors}")
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
         data = serializer.validated_data
-        print(f"Validated data: {data}")
 
         # İlgili firma, kişi ve fırsat nesnelerini bulalım
         company = None
@@ -144,7 +159,19 @@ class EmailMessageViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # E-posta nesnesi oluşturalım
+        # Aynı Idempotency-Key ile tekrarlanan istek yeni mesaj oluşturmaz
+        idempotency_key = request.headers.get('Idempotency-Key') or data.get('idempotency_key')
+        if idempotency_key:
+            idempotency_key = f"{request.user.id}:{idempotency_key}"[:255]
+            existing = EmailMessage.objects.filter(idempotency_key=idempotency_key).first()
+            if existing:
+                return self._queued_response(existing, status.HTTP_200_OK)
+
+        attachments, error_response = self._resolve_attachments(data)
+        if error_response:
+            return error_response
+
+        # E-posta giden kutusuna alınır, SMTP gönderimi arka planda yapılır
         email = EmailMessage(
             subject=data['subject'],
             content=data['content'],
@@ -152,98 +179,159 @@ class EmailMessageViewSet(viewsets.ModelViewSet):
             recipients=data['recipients'],
             cc=data.get('cc'),
             bcc=data.get('bcc'),
-            attachments=data.get('attachments'),
-            status='sending',
+            attachments=[attachment.to_reference() for attachment in attachments],
+            status='queued',
+            next_attempt_at=timezone.now(),
             company=company,
             contact=contact,
             opportunity=opportunity,
+            idempotency_key=idempotency_key,
             metadata={
                 'sent_by_user_id': request.user.id,
                 'sent_by_username': request.user.username,
                 'sender_name': sender_name,
             }
         )
-        email.save()
-
         try:
-                # Alıcıları formatla
-                to_emails = smtp_service.format_recipients(data['recipients'])
-                cc_emails = smtp_service.format_recipients(data.get('cc', [])) if data.get('cc') else None
-                bcc_emails = smtp_service.format_recipients(data.get('bcc', [])) if data.get('bcc') else None
-
-                # Ekleri hazırla
-                attachments = []
-                if data.get('attachments'):
-                    for attachment_data in data['attachments']:
-                        if isinstance(attachment_data, dict):
-                            attachments.append(attachment_data)
-
-                # SMTP ile e-posta gönder
-                success, message, response_data = smtp_service.send_email(
-                    from_email=sender_email,
-                    from_name=sender_name,
-                    to_emails=to_emails,
-                    subject=data['subject'],
-                    content=data['content'],
-                    cc_emails=cc_emails,
-                    bcc_emails=bcc_emails,
-                    attachments=attachments,
-                    smtp_config=smtp_config
-                )
+            with transaction.atomic():
+                email.save()
+                email.attachment_files.set(attachments)
+        except IntegrityError:
+            # Aynı anahtarla eşzamanlı gelen istek mesajı önce oluşturdu
+            existing = EmailMessage.objects.get(idempotency_key=idempotency_key)
+            return self._queued_response(existing, status.HTTP_200_OK)
+
+        enqueue_email(email)
+        return self._queued_response(email, status.HTTP_202_ACCEPTED)
+
+    def _resolve_attachments(self, data):
+        """
+        İstekteki ek referanslarını EmailAttachment kayıtlarına çevirir.
 
-                if success:
-                    # Başarılı gönderim
-                    email.status = 'sent'
-                    email.sent_at = timezone.now()
-                    email.metadata.update({
-                        'smtp_response': response_data
-                    })
-                    email.save()
-
-                    total_recipients = len(to_emails)
-                    if cc_emails:
-                        total_recipients += len(cc_emails)
-                    if bcc_emails:
-                        total_recipients += len(bcc_emails)
+        Returns:
+            tuple: (ekler, hata yanıtı veya None)
+        """
+        attachment_ids = data.get('attachment_ids') or []
+        # Kullanıcı yalnızca kendi yüklediği ekleri kullanabilir
+        attachments = list(EmailAttachment.objects.filter(pk__in=attachment_ids, uploaded_by=self.request.user))
+        missing = set(attachment_ids) - {attachment.pk for attachment in attachments}
+        if missing:
+            return None, Response(
+                {"error": f"Belirtilen ek dosyalar bulunamadı: {', '.join(map(str, sorted(missing)))}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
-                    return Response(
-                        {
-                            "message": message,
-                            "email_id": email.id,
-                            "recipients_count": total_recipients
-                        },
-                        status=status.HTTP_200_OK
+        # Eski istemcilerin base64 olarak gönderdiği ekler bir kez kaydedilir
+        for attachment_data in data.get('attachments') or []:
+            if isinstance(attachment_data, dict) and attachment_data.get('file_content'):
+                try:
+                    attachments.append(store_inline_attachment(attachment_data, self.request.user))
+                except (ValueError, TypeError):
+                    return None, Response(
+                        {"error": f"Ek dosya içeriği okunamadı: {attachment_data.get('file_name')}"},
+                        status=status.HTTP_400_BAD_REQUEST
                     )
-                else:
-                    # Gönderim hatası
-                    email.status = 'failed'
-                    email.error_message = message
-                    email.save()
+        return attachments, None
+
+    def _queued_response(self, email, response_status):
+        recipients_count = sum(len(email_list or []) for email_list in (email.recipients, email.cc, email.bcc))
+        return Response(
+            {
+                "message": "E-posta gönderim kuyruğuna alındı.",
+                "email_id": email.id,
+                "status": email.status,
+                "recipients_count": recipients_count
+            },
+            status=response_status
+        )
 
-                    return Response(
-                        {
-                            "error": "E-posta gönderilirken bir hata oluştu.",
-                            "details": message,
-                            "email_id": email.id
-                        },
-                        status=status.HTTP_500_INTERNAL_SERVER_ERROR
-                    )
+    @action(detail=True, methods=['post'])
+    def retry(self, request, pk=None):
+        """
+        Başarısız veya teslim edilemeyen e-postayı tekrar kuyruğa al
+        """
+        email = self.get_object()
+        if email.status not in ('failed', 'dead'):
+            return Response(
+                {"error": "Sadece başarısız veya teslim edilemeyen e-postalar tekrar gönderilebilir."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if email.campaign_id:
+            return Response(
+                {"error": "Kampanya e-postaları tek tek tekrar gönderilemez."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
-        except Exception as e:
-            # Beklenmeyen hata
-            email.status = 'failed'
-            email.error_message = str(e)
-            email.save()
+        requeue_message(email)
+        transaction.on_commit(lambda: drain_outbox_task.apply_async())
+        return self._queued_response(email, status.HTTP_202_ACCEPTED)
 
+    @action(detail=False, methods=['post'], url_path='upload-attachment', parser_classes=[MultiPartParser, FormParser])
+    def upload_attachment(self, request):
+        """
+        E-posta eki yükleme endpoint'i
+
+        Dosya bir kez saklanır ve id'si döner; gönderim ve taslak isteklerinde
+        `attachment_ids` ile referans verilir. Aynı dosya tekrar yüklenirse
+        mevcut kayıt döner.
+        """
+        if 'file' not in request.FILES:
             return Response(
-                {
-                    "error": "E-posta gönderilirken beklenmeyen bir hata oluştu.",
-                    "details": str(e),
-                    "email_id": email.id
-                },
+                {"error": "Dosya yüklenmedi."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        uploaded_file = request.FILES['file']
+
+        # Dosya boyutu kontrolü (10MB limit)
+        max_size = 10 * 1024 * 1024  # 10MB
+        if uploaded_file.size > max_size:
+            return Response(
+                {"error": "Dosya boyutu 10MB'dan büyük olamaz."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # Dosya tipini kontrol et
+        allowed_types = [
+            'application/pdf',
+            'application/msword',
+            'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+            'application/vnd.ms-excel',
+            'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+            'text/plain',
+            'image/jpeg',
+            'image/png',
+            'image/gif',
+        ]
+
+        content_type = uploaded_file.content_type
+        if content_type not in allowed_types:
+            return Response(
+                {"error": f"Desteklenmeyen dosya tipi: {content_type}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            attachment, created = store_attachment(uploaded_file, uploaded_file.name, content_type, request.user)
+        except Exception as e:
+            logger.error(f"Error storing attachment: {e}")
+            return Response(
+                {"error": f"Dosya yüklenirken hata oluştu: {str(e)}"},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+        return Response(
+            EmailAttachmentSerializer(attachment).data,
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK
+        )
+
+    @action(detail=False, methods=['get'], url_path='outbox-stats')
+    def outbox_stats(self, request):
+        """
+        Giden kutusu metrikleri: kuyruk uzunluğu, gecikme ve gönderim hızı
+        """
+        return Response(get_outbox_stats())
+
     @action(detail=False, methods=['post'], url_path='drafts')
     def save_draft(self, request):
         """
@@ -291,6 +379,10 @@ class EmailMessageViewSet(viewsets.ModelViewSet):
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
+            attachments, error_response = self._resolve_attachments(data)
+            if error_response:
+                return error_response
+
             # Taslak e-posta nesnesi oluşturalım
             email = EmailMessage(
                 subject=data.get('subject', ''),
@@ -299,7 +391,7 @@ class EmailMessageViewSet(viewsets.ModelViewSet):
                 recipients=data.get('recipients', []),
                 cc=data.get('cc'),
                 bcc=data.get('bcc'),
-                attachments=data.get('attachments'),
+                attachments=[attachment.to_reference() for attachment in attachments],
                 status='draft',
                 company=company,
                 contact=contact,
@@ -310,6 +402,7 @@ class EmailMessageViewSet(viewsets.ModelViewSet):
                 }
             )
             email.save()
+            email.attachment_files.set(attachments)
 
             return Response(
                 {
@@ -361,11 +454,92 @@ class EmailMessageViewSet(viewsets.ModelViewSet):
         return Response(status_info)
 
 
+class EmailCampaignViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Toplu e-posta kampanyaları için API endpoint'i.
+
+    POST ile kampanya oluşturulur ve arka planda gönderilir (202); detay
+    endpoint'i ilerlemeyi, failures endpoint'i başarısız alıcıları döner.
+    """
+    queryset = EmailCampaign.objects.all()
+    serializer_class = EmailCampaignSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return EmailCampaign.objects.filter(created_by=self.request.user)
+
+    def create(self, request):
+        serializer = EmailCampaignCreateSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        data = serializer.validated_data
+
+        try:
+            user_profile = UserProfile.objects.get(user=request.user)
+        except UserProfile.DoesNotExist:
+            return Response(
+                {"error": "Kullanıcı profili bulunamadı. Lütfen profil ayarlarınızı tamamlayın."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        smtp_config = get_smtp_config(user_profile)
+        missing_fields = [field for field in REQUIRED_SMTP_FIELDS if not smtp_config.get(field)]
+        if missing_fields:
+            return Response(
+                {"error": f"SMTP ayarları eksik. Lütfen profil ayarlarınızda şu alanları doldurun: {', '.join(missing_fields)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        total_count = get_campaign_recipients(data['recipient_type'], data['filters']).count()
+        if not total_count:
+            return Response(
+                {"error": "Filtrelere uyan, e-posta adresi olan alıcı bulunamadı."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        template = data['template']
+        sender_email = user_profile.smtp_username
+        campaign = EmailCampaign.objects.create(
+            name=data['name'],
+            template=template,
+            subject=template.subject,
+            content=template.content,
+            variables=data['variables'],
+            recipient_type=data['recipient_type'],
+            filters=data['filters'],
+            created_by=request.user,
+            sender=sender_email,
+            sender_name=f"{request.user.first_name} {request.user.last_name}".strip() or sender_email.split('@')[0],
+            total_count=total_count,
+        )
+        enqueue_campaign(campaign)
+
+        return Response(EmailCampaignSerializer(campaign).data, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=True, methods=['get'])
+    def failures(self, request, pk=None):
+        """
+        Kampanyada gönderilemeyen mesajlar ve hata nedenleri
+        """
+        campaign = self.get_object()
+        queryset = campaign.messages.filter(status='failed').select_related(
+            'company', 'contact__company', 'opportunity'
+        ).order_by('-created_at')
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = EmailMessageListSerializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+
+        serializer = EmailMessageListSerializer(queryset, many=True)
+        return Response(serializer.data)
+
+
 class IncomingEmailViewSet(viewsets.ReadOnlyModelViewSet):
     """
     Gelen e-postalar için ViewSet
     """
-    queryset = IncomingEmail.objects.all()
+    queryset = IncomingEmail.objects.select_related('company', 'contact__company')
     serializer_class = IncomingEmailSerializer
     permission_classes = [IsAuthenticated]
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
@@ -373,55 +547,67 @@ class IncomingEmailViewSet(viewsets.ReadOnlyModelViewSet):
     ordering_fields = ['received_at', 'created_at']
     ordering = ['-received_at']
 
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        if not instance.body_loaded:
+            self._load_body(instance)
+        serializer = self.get_serializer(instance)
+        return Response(serializer.data)
+
+    def _load_body(self, instance):
+        """
+        Sadece başlıkları alınmış e-postanın içeriğini IMAP sunucusundan çeker
+        """
+        mailbox = instance.mailbox
+        if not mailbox or not instance.imap_uid:
+            return
+
+        try:
+            user_profile = UserProfile.objects.get(user=mailbox.user)
+            email_data = imap_service.fetch_message_body(
+                get_imap_config(user_profile), mailbox.folder, instance.imap_uid
+            )
+        except Exception as e:
+            # İçerik alınamazsa başlıklarla yanıt verilir, sonraki görüntülemede tekrar denenir
+            logger.error(f"E-posta içeriği alınamadı: {str(e)}")
+            return
+
+        if email_data:
+            instance.content = imap_service.clean_text(email_data['content'])
+            instance.content_html = imap_service.clean_text(email_data['content_html'])
+            instance.attachments = email_data['attachments']
+            instance.has_attachments = email_data['has_attachments']
+        instance.body_loaded = True
+        instance.save(update_fields=['content', 'content_html', 'attachments', 'has_attachments', 'body_loaded', 'updated_at'])
+
     @action(detail=False, methods=['post'], url_path='fetch')
     def fetch_emails(self, request):
         """
-        IMAP ile e-postaları al
+        IMAP senkronizasyonunu arka planda başlat
+
+        Yanıt hemen döner; ilerleme sync-jobs/<id>/ endpoint'inden takip edilir.
+        Aynı posta kutusu için süren bir senkronizasyon varsa o iş döner.
         """
         try:
             user_profile = UserProfile.objects.get(user=request.user)
 
             # IMAP ayarlarını kontrol et
-            required_imap_fields = ['imap_server', 'imap_port', 'imap_username', 'imap_password']
-            missing_fields = []
-
-            for field in required_imap_fields:
-                if not getattr(user_profile, field):
-                    missing_fields.append(field)
-
+            missing_fields = get_missing_imap_fields(user_profile)
             if missing_fields:
                 return Response(
                     {"error": f"IMAP ayarları eksik. Lütfen profil ayarlarınızda şu alanları doldurun: {', '.join(missing_fields)}"},
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
-            # IMAP konfigürasyonu
-            imap_config = {
-                'imap_server': user_profile.imap_server,
-                'imap_port': user_profile.imap_port,
-                'imap_username': user_profile.imap_username,
-                'imap_password': user_profile.imap_password,
-                'use_ssl': user_profile.use_imap_ssl,
-            }
-
-            # E-postaları al
-            success, message, emails = imap_service.fetch_emails(imap_config)
-
-            if not success:
-                return Response(
-                    {"error": message},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-
-            # Veritabanına kaydet
-            saved_count = imap_service.save_emails_to_db(emails)
+            headers_only = str(request.data.get('headers_only', '')).lower() in ['1', 'true']
+            job, created = enqueue_mailbox_sync(user_profile, headers_only=headers_only)
 
             return Response({
+                **MailboxSyncJobSerializer(job).data,
                 "success": True,
-                "message": f"{len(emails)} e-posta alındı, {saved_count} yeni e-posta kaydedildi",
-                "fetched_count": len(emails),
-                "saved_count": saved_count
-            })
+                "message": "E-posta senkronizasyonu başlatıldı" if created else "E-posta senkronizasyonu zaten sürüyor",
+                "job_id": job.id,
+            }, status=status.HTTP_202_ACCEPTED if created else status.HTTP_200_OK)
 
         except UserProfile.DoesNotExist:
             return Response(
@@ -429,12 +615,22 @@ class IncomingEmailViewSet(viewsets.ReadOnlyModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         except Exception as e:
-            logger.error(f"E-posta alma hatası: {str(e)}")
+            logger.error(f"E-posta senkronizasyonu başlatma hatası: {str(e)}")
             return Response(
                 {"error": f"E-posta alma hatası: {str(e)}"},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+    @action(detail=False, methods=['get'], url_path=r'sync-jobs/(?P<job_id>\d+)')
+    def sync_job(self, request, job_id=None):
+        """
+        Arka plan senkronizasyon işinin durumunu ve ilerlemesini göster
+        """
+        job = MailboxSyncJob.objects.filter(pk=job_id, user=request.user).first()
+        if not job:
+            return Response({"error": "Senkronizasyon işi bulunamadı"}, status=status.HTTP_404_NOT_FOUND)
+        return Response(MailboxSyncJobSerializer(job).data)
+
     @action(detail=True, methods=['patch'], url_path='mark-read')
     def mark_read(self, request, pk=None):
         """
@@ -515,78 +711,6 @@ class IncomingEmailViewSet(viewsets.ReadOnlyModelViewSet):
 
         return Response(status_info)
 
-    @action(detail=False, methods=['post'], url_path='upload-attachment', parser_classes=[MultiPartParser, FormParser])
-    def upload_attachment(self, request):
-        """
-        E-posta eki yükleme endpoint'i
-        """
-        if 'file' not in request.FILES:
-            return Response(
-                {"error": "Dosya yüklenmedi."},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-
-        uploaded_file = request.FILES['file']
-
-        # Dosya boyutu kontrolü (10MB limit)
-        max_size = 10 * 1024 * 1024  # 10MB
-        if uploaded_file.size > max_size:
-            return Response(
-                {"error": "Dosya boyutu 10MB'dan büyük olamaz."},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-
-        # Dosya tipini kontrol et
-        allowed_types = [
-            'application/pdf',
-            'application/msword',
-            'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
-            'application/vnd.ms-excel',
-            'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-            'text/plain',
-            'image/jpeg',
-            'image/png',
-            'image/gif',
-        ]
-
-        content_type = uploaded_file.content_type
-        if content_type not in allowed_types:
-            return Response(
-                {"error": f"Desteklenmeyen dosya tipi: {content_type}"},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-
-        try:
-            # Dosyayı geçici olarak kaydet
-            import uuid
-            file_name = f"{uuid.uuid4()}_{uploaded_file.name}"
-            file_path = f"temp_attachments/{file_name}"
-
-            # Dosyayı kaydet
-            saved_path = default_storage.save(file_path, uploaded_file)
-
-            # Base64 encode et
-            import base64
-            with default_storage.open(saved_path, 'rb') as f:
-                file_content = f.read()
-                encoded_content = base64.b64encode(file_content).decode()
-
-            # Geçici dosyayı sil
-            default_storage.delete(saved_path)
-
-            return Response({
-                "file_name": uploaded_file.name,
-                "file_content": encoded_content,
-                "file_size": uploaded_file.size,
-                "content_type": content_type
-            }, status=status.HTTP_200_OK)
-
-        except Exception as e:
-            return Response(
-                {"error": f"Dosya yüklenirken hata oluştu: {str(e)}"},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
-    
     @action(detail=False, methods=['get'])
     def company_emails(self, request):
         """
@@ -13,4 +13,10 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'crm_project.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Anlık bildirim akışı (SSE) uzun süreli bağlantı olduğu için Django'nun
+# istek/yanıt döngüsü dışında bu katmanda sunulur; ayarlar yüklendikten sonra içe aktarılmalıdır
+from notifications.stream import NotificationStreamMiddleware  # noqa: E402
+
+application = NotificationStreamMiddleware(django_application)
@@ -1,5 +1,6 @@
 import os
 from celery import Celery
+from celery.schedules import crontab
 from django.conf import settings
 
 # Django ayarlarını yükle
@@ -15,16 +16,46 @@ app.config_from_object('django.conf:settings', namespace='CELERY')
 app.conf.beat_schedule = {
     'send-meeting-reminders': {
         'task': 'notifications.tasks.send_pending_meeting_reminders',
-        'schedule': 60.0,  # Her dakika çalıştır
+        # Hatırlatmalar ETA ile tam zamanında gönderilir; tarama yaklaşanları
+        # kuyruğa alır ve kaçanları yakalar (REMINDER_SCHEDULE_HORIZON'dan kısa olmalı)
+        'schedule': 600.0,  # Her 10 dakikada çalıştır
     },
     'send-email-reminders': {
         'task': 'notifications.tasks.send_pending_email_reminders',
         'schedule': 300.0,  # Her 5 dakikada çalıştır
     },
+    'drain-email-outbox': {
+        'task': 'communications.tasks.drain_outbox_task',
+        'schedule': 30.0,  # Her 30 saniyede çalıştır (tekrar denemeler için)
+    },
+    'requeue-stale-emails': {
+        'task': 'communications.tasks.requeue_stale_emails',
+        'schedule': 300.0,  # Her 5 dakikada çalıştır
+    },
+    'sync-mailboxes': {
+        'task': 'communications.tasks.sync_all_mailboxes',
+        'schedule': 300.0,  # Her 5 dakikada çalıştır
+    },
+    'nightly-pipeline-snapshot': {
+        'task': 'opportunities.tasks.take_nightly_pipeline_snapshot',
+        'schedule': crontab(hour=23, minute=55),  # Her gün kapanmadan önce
+    },
+    'cleanup-old-exports': {
+        'task': 'exports.tasks.cleanup_old_exports',
+        'schedule': 86400.0,  # Günde bir çalıştır
+    },
+    'find-duplicate-customers': {
+        'task': 'customers.tasks.find_duplicate_customers',
+        'schedule': 600.0,  # Her 10 dakikada çalıştır (yalnızca değişen kayıtlar taranır)
+    },
     'cleanup-old-notifications': {
         'task': 'notifications.tasks.cleanup_old_notifications',
         'schedule': 86400.0,  # Günde bir çalıştır
     },
+    'reconcile-notification-counters': {
+        'task': 'notifications.tasks.reconcile_notification_counters',
+        'schedule': 3600.0,  # Saatte bir çalıştır
+    },
 }
 
 app.conf.timezone = 'Europe/Istanbul'
@@ -0,0 +1,26 @@
+"""
+Yanıt içeriğinden üretilen ETag ile koşullu GET (304 Not Modified) desteği.
+"""
+import hashlib
+import json
+
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+from rest_framework.response import Response
+
+
+def etag_response(request, data):
+    """
+    Veriden ETag üretir; istemcinin If-None-Match başlığı eşleşirse gövdesiz
+    304, aksi halde ETag başlıklı normal yanıt döner.
+    """
+    payload = json.dumps(data, sort_keys=True, default=str, separators=(',', ':'))
+    etag = quote_etag(hashlib.md5(payload.encode('utf-8')).hexdigest())
+
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = Response(data)
+    response['ETag'] = etag
+    # Tarayıcı kopyayı saklayabilir ama her kullanımda sunucuya doğrulatmalıdır
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
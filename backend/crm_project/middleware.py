@@ -0,0 +1,129 @@
+"""
+Proje genelinde kullanılan middleware'ler.
+"""
+import hashlib
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+
+class QueryRecorder:
+    """
+    Bir kod bloğu içinde çalışan SQL sorgularını kaydeder.
+
+    DEBUG kapalıyken de çalışır; connection.queries yerine execute_wrapper
+    kullanır. Parmak izi (fingerprint) parametrelerden bağımsız SQL metninden
+    üretildiği için N+1 sorgular aynı parmak izi altında toplanır.
+
+    Kullanım:
+        with QueryRecorder() as recorder:
+            ...
+        recorder.count, recorder.total_time, recorder.duplicates()
+    """
+
+    def __init__(self):
+        self.queries = []
+        self._stack = None
+
+    def __enter__(self):
+        self._stack = ExitStack()
+        for connection in connections.all():
+            self._stack.enter_context(connection.execute_wrapper(self))
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stack.close()
+        self._stack = None
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append({
+                'sql': sql,
+                'time': time.perf_counter() - start,
+                'fingerprint': self.fingerprint(sql),
+            })
+
+    @staticmethod
+    def fingerprint(sql):
+        """
+        SQL metnini normalize edip kısa bir parmak izi döner.
+        """
+        normalized = re.sub(r'\s+', ' ', sql).strip()
+        normalized = re.sub(r'IN \((?:%s, )*%s\)', 'IN (...)', normalized)
+        normalized = re.sub(r'\b\d+\b', '?', normalized)
+        return hashlib.md5(normalized.encode('utf-8')).hexdigest()[:8]
+
+    @property
+    def count(self):
+        return len(self.queries)
+
+    @property
+    def total_time(self):
+        return sum(query['time'] for query in self.queries)
+
+    def duplicates(self):
+        """
+        Birden fazla çalışan sorguların {parmak_izi: adet} sözlüğü.
+        """
+        counter = Counter(query['fingerprint'] for query in self.queries)
+        return {fingerprint: count for fingerprint, count in counter.most_common() if count > 1}
+
+    def summary(self):
+        """
+        Test hata mesajları ve loglar için okunabilir özet.
+        """
+        lines = [f"{self.count} sorgu, {self.total_time * 1000:.1f} ms"]
+        duplicates = self.duplicates()
+        if duplicates:
+            samples = {query['fingerprint']: query['sql'] for query in self.queries}
+            lines.append("Tekrarlanan sorgular:")
+            for fingerprint, count in duplicates.items():
+                lines.append(f"  [{fingerprint}] x{count}: {samples[fingerprint][:200]}")
+        return '\n'.join(lines)
+
+
+class QueryCountMiddleware:
+    """
+    Her istek için sorgu sayısı, toplam veritabanı süresi ve tekrarlanan
+    sorguları kaydeder; sonuçları yanıt başlıklarına ekler.
+
+    Sadece QUERY_INSTRUMENTATION ayarı açıkken (varsayılan: DEBUG) devreye girer.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'QUERY_INSTRUMENTATION', settings.DEBUG):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with QueryRecorder() as recorder:
+            response = self.get_response(request)
+
+        duplicates = recorder.duplicates()
+        response['X-DB-Query-Count'] = str(recorder.count)
+        response['X-DB-Query-Time-Ms'] = f"{recorder.total_time * 1000:.1f}"
+        response['X-DB-Duplicate-Queries'] = str(sum(count - 1 for count in duplicates.values()))
+        if duplicates:
+            response['X-DB-Duplicate-Fingerprints'] = ', '.join(
+                f"{fingerprint}x{count}" for fingerprint, count in list(duplicates.items())[:5]
+            )
+
+        resolver_match = getattr(request, 'resolver_match', None)
+        endpoint = resolver_match.route if resolver_match else request.path
+        logger.info(
+            "%s %s: %d sorgu, %.1f ms, %d tekrar",
+            request.method, endpoint, recorder.count,
+            recorder.total_time * 1000, len(duplicates)
+        )
+        return response
@@ -0,0 +1,236 @@
+"""
+REST API liste endpoint'leri için ortak sayfalama sınıfları.
+"""
+import json
+from base64 import b64decode, b64encode
+from collections import OrderedDict
+from datetime import date, datetime
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Keyset (cursor) tabanlı sayfalama.
+
+    Sıralama anahtarı, queryset'in mevcut sıralamasının ilk alanıdır
+    (OrderingFilter, action içindeki order_by, viewset'in `ordering`
+    niteliği veya modelin Meta.ordering'i). Eşit değerli kayıtlar birincil
+    anahtar ile ayrıştırıldığından imleçler tablo büyüse de kararlıdır ve
+    OFFSET kullanılmaz.
+
+    Query parametreleri:
+    - cursor: Bir önceki yanıttaki `next`/`previous` bağlantısından gelen opak imleç
+    - page_size: Sayfa başına kayıt sayısı (en fazla `max_page_size`)
+    - include_count: '1' veya 'true' ise toplam kayıt sayısı da döner
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    ordering = '-created_at'
+    count_query_param = 'include_count'
+    invalid_cursor_message = 'Geçersiz sayfalama imleci'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.key, self.descending = self.get_keyset(queryset, view)
+        self.key_field = self.get_key_field(queryset)
+        self.cursor = self.decode_cursor(request)
+
+        # Toplam sayı sadece istenirse hesaplanır, büyük tablolarda COUNT(*) pahalıdır
+        self.count = None
+        if request.query_params.get(self.count_query_param, '').lower() in ['1', 'true']:
+            self.count = queryset.order_by().count()
+
+        reverse = bool(self.cursor and self.cursor['reverse'])
+        queryset = queryset.order_by(*self._order_by(reverse))
+        if self.cursor is not None:
+            queryset = queryset.filter(self._position_filter(self.cursor, reverse))
+
+        # Sonraki sayfanın varlığını anlamak için bir fazla kayıt alınır
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        if reverse:
+            self.page.reverse()
+
+        if reverse:
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = self.cursor is not None
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+    def get_keyset(self, queryset, view):
+        """
+        Sayfalamada kullanılacak sıralama anahtarını ve yönünü döner.
+        """
+        candidates = [
+            queryset.query.order_by,
+            getattr(view, 'ordering', None),
+            queryset.model._meta.ordering,
+            self.ordering,
+        ]
+        for ordering in candidates:
+            if isinstance(ordering, str):
+                ordering = [ordering]
+            if ordering and isinstance(ordering[0], str) and ordering[0] != '?':
+                field = ordering[0]
+                return field.lstrip('-'), field.startswith('-')
+        return 'pk', True
+
+    def get_key_field(self, queryset):
+        """
+        Sıralama anahtarının model alanı (ilişki üzerinden de olabilir) veya
+        annotation'ın çıktı alanı; imleçteki değer bu alanla doğrulanır.
+        """
+        if self.key == 'pk':
+            return queryset.model._meta.pk
+        annotation = queryset.query.annotations.get(self.key)
+        if annotation is not None:
+            return getattr(annotation, 'output_field', None)
+
+        model, field = queryset.model, None
+        for name in self.key.split('__'):
+            if model is None:
+                return None
+            try:
+                field = model._meta.get_field(name)
+            except FieldDoesNotExist:
+                return None
+            model = field.related_model
+        return field.target_field if field.is_relation else field
+
+    def _order_by(self, reverse):
+        descending = self.descending != reverse
+        # NULL değerler ileri yönde her zaman en sonda yer alır
+        nulls = {'nulls_first': True} if reverse else {'nulls_last': True}
+        if descending:
+            return [F(self.key).desc(**nulls), '-pk']
+        return [F(self.key).asc(**nulls), 'pk']
+
+    def _position_filter(self, cursor, reverse):
+        """
+        İmlecin gösterdiği konumdan sonra (veya geri yönde önce) gelen kayıtlar için filtre.
+        """
+        value, pk = cursor['value'], cursor['pk']
+        forward = not reverse
+        key_after = f"{self.key}__{'lt' if self.descending == forward else 'gt'}"
+        pk_after = f"pk__{'lt' if self.descending == forward else 'gt'}"
+        is_null = f"{self.key}__isnull"
+
+        if forward:
+            if value is None:
+                return Q(**{is_null: True, pk_after: pk})
+            return (
+                Q(**{key_after: value})
+                | Q(**{self.key: value, pk_after: pk})
+                | Q(**{is_null: True})
+            )
+
+        if value is None:
+            return Q(**{is_null: False}) | Q(**{is_null: True, pk_after: pk})
+        return Q(**{key_after: value}) | Q(**{self.key: value, pk_after: pk})
+
+    def _get_position(self, instance):
+        if isinstance(instance, dict):
+            value = instance.get(self.key)
+            pk = instance.get('pk', instance.get('id'))
+        else:
+            value = instance
+            for attr in self.key.split('__'):
+                value = getattr(value, attr, None) if value is not None else None
+            pk = instance.pk
+
+        if isinstance(value, (datetime, date)):
+            value = value.isoformat()
+        elif value is not None and not isinstance(value, (bool, int)):
+            value = str(value)
+        return value, pk
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+
+        try:
+            payload = json.loads(b64decode(encoded.encode('ascii')).decode('utf-8'))
+            position = payload['p']
+            value = position[0]
+            # Değer sorguya girmeden önce anahtar alanın tipine çevrilir (ör. tarih)
+            key_field = getattr(self, 'key_field', None)
+            if value is not None and key_field is not None:
+                value = key_field.to_python(value)
+            return {
+                'value': value,
+                'pk': int(position[1]),
+                'reverse': bool(payload.get('r', False)),
+            }
+        except (TypeError, ValueError, KeyError, IndexError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, instance, reverse):
+        payload = {'p': list(self._get_position(instance))}
+        if reverse:
+            payload['r'] = True
+        encoded = b64encode(json.dumps(payload, separators=(',', ':')).encode('utf-8')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def build_next_link(self, base_url, instance, ordering):
+        """
+        `instance` kaydından sonraki sayfanın bağlantısı.
+
+        İlk sayfaları paginate_queryset dışında (ör. tek sorguda birden fazla
+        liste) üreten endpoint'ler, devam sayfalarını bu sınıfla sunmak için kullanır.
+        """
+        self.base_url = base_url
+        self.key, self.descending = ordering.lstrip('-'), ordering.startswith('-')
+        return self.encode_cursor(instance, reverse=False)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        if not self.page:
+            # Geri yönde boş bir sayfaya düşüldüyse ilk sayfaya dön
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        response_data = OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+        ])
+        if self.count is not None:
+            response_data['count'] = self.count
+        response_data['results'] = data
+        return Response(response_data)
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema['properties']['count'] = {
+            'type': 'integer',
+            'example': 123,
+        }
+        return response_schema
@@ -56,9 +56,11 @@ INSTALLED_APPS = [
     'events',
     'notifications',
     'ai_assistant',
+    'exports',
 ]
 
 MIDDLEWARE = [
+    'crm_project.middleware.QueryCountMiddleware',  # Sorgu sayısı/süresi (sadece QUERY_INSTRUMENTATION açıkken)
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -69,6 +71,9 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# İstek başına SQL sorgu sayısı, süresi ve tekrarlanan sorgular yanıt başlıklarına eklenir
+QUERY_INSTRUMENTATION = DEBUG
+
 ROOT_URLCONF = 'crm_project.urls'
 
 TEMPLATES = [
@@ -155,6 +160,28 @@ CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
 CELERY_ENABLE_UTC = True
 
+# Cache Configuration
+# Birden fazla worker çalışırken önbellek (ve geçersiz kılma) paylaşılmalıdır;
+# CACHE_REDIS_URL verilmezse süreç içi bellek önbelleği kullanılır.
+CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL')
+if CACHE_REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Anlık bildirimler için Redis pub/sub; verilmezse önbellek Redis'i kullanılır,
+# o da yoksa istemciler bildirimleri REST API'den yoklar.
+NOTIFICATION_PUSH_REDIS_URL = os.environ.get('NOTIFICATION_PUSH_REDIS_URL', CACHE_REDIS_URL)
+
 # Celery Beat Configuration
 CELERY_BEAT_SCHEDULER = 'django_celery_beat.schedulers:DatabaseScheduler'
 
@@ -165,6 +192,9 @@ EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 # Email encoding
 DEFAULT_CHARSET = 'utf-8'
 
+# Toplu e-posta kampanyalarında SMTP hesabı başına dakikada gönderilecek en fazla mesaj
+EMAIL_CAMPAIGN_RATE_LIMIT = 60
+
 
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/5.2/howto/static-files/
@@ -184,6 +214,12 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # CORS ayarları
 CORS_ALLOW_ALL_ORIGINS = True  # Geliştirme için, üretimde spesifik origin'ler belirtilmeli
 CORS_ALLOW_CREDENTIALS = True
+CORS_EXPOSE_HEADERS = [
+    'X-DB-Query-Count',
+    'X-DB-Query-Time-Ms',
+    'X-DB-Duplicate-Queries',
+    'X-DB-Duplicate-Fingerprints',
+]
 
 # DRF ayarları
 REST_FRAMEWORK = {
@@ -195,4 +231,7 @@ REST_FRAMEWORK = {
         'rest_framework.authentication.SessionAuthentication',
         'rest_framework.authentication.BasicAuthentication',
     ],
+    # Liste endpoint'leri keyset (cursor) sayfalama ile sınırlandırılır
+    'DEFAULT_PAGINATION_CLASS': 'crm_project.pagination.KeysetPagination',
+    'PAGE_SIZE': 50,
 }
@@ -0,0 +1,181 @@
+"""
+Testler için ortak yardımcılar: gerçekçi test verisi ve router bazlı
+sorgu bütçesi (query budget) kontrolü.
+"""
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+
+from crm_project.middleware import QueryRecorder
+
+
+def seed_test_dataset():
+    """
+    create_test_data komutunun verisini yükler ve üzerine not, etkinlik,
+    e-posta ve bildirim kayıtları ekler. Liste endpoint'lerinde satır başına
+    sorgu (N+1) varsa bütçeyi aşacak kadar kayıt üretir.
+
+    Returns:
+        User: İstekleri yapacak kullanıcı
+    """
+    from customers.models import Company, Contact, Note
+    from communications.models import EmailMessage, IncomingEmail
+    from events.models import Event, EventParticipant
+    from notifications.models import Notification
+    from opportunities.models import Opportunity, OpportunityActivity
+
+    call_command('create_test_data', stdout=StringIO())
+
+    user = User.objects.create_user(
+        username='budget_user',
+        email='budget_user@example.com',
+        password='test-password',
+        first_name='Test',
+        last_name='Kullanıcı',
+    )
+    now = timezone.now()
+
+    for index, company in enumerate(Company.objects.all()):
+        contacts = list(Contact.objects.filter(company=company))
+        contact = contacts[0] if contacts else None
+
+        Note.objects.create(title=f"{company.name} notu", content="Görüşme notu", company=company)
+        if contact:
+            Note.objects.create(title=f"{contact.first_name} notu", content="Kişi notu",
+                                company=company, contact=contact)
+
+        # 'meeting' dışındaki tipler sinyal üzerinden e-posta görevi tetiklemez
+        event = Event.objects.create(
+            title=f"{company.name} araması",
+            event_type='call',
+            company=company,
+            assigned_to=user,
+            start_datetime=now + timedelta(hours=index + 1),
+        )
+        event.contacts.set(contacts)
+        for participant in contacts:
+            EventParticipant.objects.create(event=event, contact=participant)
+
+        EmailMessage.objects.create(
+            subject=f"{company.name} teklif",
+            content="<p>Merhaba</p>",
+            sender=user.email,
+            recipients=[{'email': contact.email if contact else company.email}],
+            status='sent',
+            company=company,
+            contact=contact,
+            opportunity=Opportunity.objects.filter(company=company).first(),
+        )
+        IncomingEmail.objects.create(
+            message_id=f"seed-{company.pk}@example.com",
+            subject=f"Re: {company.name} teklif",
+            content="Teşekkürler",
+            sender_email=contact.email if contact else 'info@example.com',
+            recipients=[{'email': user.email, 'name': ''}],
+            company=company,
+            contact=contact,
+            received_at=now - timedelta(hours=index),
+        )
+
+    for opportunity in Opportunity.objects.all():
+        opportunity.assigned_to = user
+        opportunity.save()
+        OpportunityActivity.objects.create(
+            opportunity=opportunity,
+            type='call',
+            title="Takip araması",
+            description="Müşteri arandı",
+            performed_by=user,
+        )
+
+    Notification.objects.bulk_create([
+        Notification(
+            recipient=user,
+            title=f"Bildirim {index}",
+            message="Test bildirimi",
+            notification_type='info',
+            is_sent=True,
+        )
+        for index in range(10)
+    ])
+
+    return user
+
+
+class QueryBudgetMixin:
+    """
+    Bir DRF router'ına kayıtlı tüm GET route'larını çağırıp her birinin
+    sorgu sayısının bütçe içinde kaldığını doğrular.
+
+    Alt sınıflar şunları tanımlar:
+    - router: Test edilecek DefaultRouter
+    - budgets: {url_adı: en fazla sorgu sayısı}; router'daki her GET route'u için zorunlu
+    - route_params: {url_adı: query parametreleri (dict veya dict döndüren callable)}
+    - route_models: {basename: model}; viewset'te `queryset` yoksa detay route'ları için
+      (kayıt seçimi get_route_object() ile özelleştirilebilir)
+    """
+    router = None
+    budgets = {}
+    route_params = {}
+    route_models = {}
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.user = seed_test_dataset()
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.user)
+
+    def get_routes(self):
+        """
+        Router'daki GET destekleyen (url_adı, kwarg_adları, basename) üçlüleri.
+        """
+        basenames = {viewset: basename for _, viewset, basename in self.router.registry}
+        seen = set()
+        for pattern in self.router.urls:
+            name = pattern.name
+            actions = getattr(pattern.callback, 'actions', None)
+            if not name or name in seen or not actions or 'get' not in actions:
+                continue
+            seen.add(name)
+            kwarg_names = [kwarg for kwarg in pattern.pattern.regex.groupindex if kwarg != 'format']
+            yield name, kwarg_names, basenames[pattern.callback.cls]
+
+    def get_route_object(self, basename):
+        """
+        Detay route'larında kullanılacak kayıt; varsayılan olarak modelin ilk kaydı.
+        """
+        viewset = next(viewset for _, viewset, name in self.router.registry if name == basename)
+        model = viewset.queryset.model if viewset.queryset is not None else self.route_models[basename]
+        return model.objects.order_by('pk').first()
+
+    def get_route_kwargs(self, basename, kwarg_names):
+        if not kwarg_names:
+            return {}
+        instance = self.get_route_object(basename)
+        return {kwarg: instance.pk for kwarg in kwarg_names}
+
+    def test_router_query_budgets(self):
+        for name, kwarg_names, basename in self.get_routes():
+            with self.subTest(route=name):
+                self.assertIn(name, self.budgets, f"'{name}' route'u için sorgu bütçesi tanımlanmamış")
+
+                url = reverse(name, kwargs=self.get_route_kwargs(basename, kwarg_names))
+                params = self.route_params.get(name, {})
+                if callable(params):
+                    params = params()
+
+                with QueryRecorder() as recorder:
+                    response = self.client.get(url, params)
+
+                self.assertLess(response.status_code, 500, f"{url}: {response.status_code}")
+                self.assertLessEqual(
+                    recorder.count, self.budgets[name],
+                    f"{url} sorgu bütçesini aştı ({self.budgets[name]})\n{recorder.summary()}"
+                )
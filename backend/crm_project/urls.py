@@ -30,6 +30,7 @@ urlpatterns = [
     path('api/v1/notifications/', include('notifications.urls')),  # Notifications API endpointleri
     path('api/v1/auth/', include('authentication.urls')),  # Authentication API endpointleri
     path('api/v1/ai/', include('ai_assistant.urls')),  # AI Assistant API endpointleri
+    path('api/v1/exports/', include('exports.urls')),  # Dışa aktarım işleri API endpointleri
     path('api-auth/', include('rest_framework.urls')),  # DRF login/logout için
     # Temporarily disabled for development
     # path('docs/', include_docs_urls(title='CRM API')),  # API dokümantasyonu
@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import Company, Contact, Note
+from django.db.models import Count
+from .models import Company, Contact, DuplicateCandidate, Note
 
 
 class ContactInline(admin.TabularInline):
@@ -46,9 +47,14 @@ class CompanyAdmin(admin.ModelAdmin):
         }),
     )
 
+    def get_queryset(self, request):
+        # Kişi sayısı changelist sorgusunda annotate edilir, satır başına COUNT çalışmaz
+        return super().get_queryset(request).annotate(contacts_count=Count('contacts'))
+
     def get_contacts_count(self, obj):
-        return obj.contacts.count()
+        return obj.contacts_count
     get_contacts_count.short_description = 'İrtibat Kişisi Sayısı'
+    get_contacts_count.admin_order_field = 'contacts_count'
 
 
 @admin.register(Contact)
@@ -107,3 +113,13 @@ class NoteAdmin(admin.ModelAdmin):
             'fields': ('created_at', 'updated_at')
         }),
     )
+
+
+@admin.register(DuplicateCandidate)
+class DuplicateCandidateAdmin(admin.ModelAdmin):
+    """
+    Mükerrer aday çiftleri admin paneli yapılandırması
+    """
+    list_display = ('entity_type', 'first_id', 'second_id', 'score', 'status', 'updated_at')
+    list_filter = ('entity_type', 'status')
+    readonly_fields = ('entity_type', 'first_id', 'second_id', 'score', 'reasons', 'created_at', 'updated_at')
@@ -0,0 +1,303 @@
+"""
+Firma ve kişiler için mükerrer kayıt tespiti (blocking + benzerlik puanı).
+
+Her kayıt için eşleştirme anahtarları (blok) üretilir ve
+`DuplicateBlockingKey` tablosunda tutulur: vergi numarası, alan adı, telefon
+rakamları, sadeleştirilmiş ad ("Türk Telekom A.Ş." ve "Turk Telekom AS" için
+'name:turk telekom'), kişilerde e-posta. Yalnızca aynı bloğu paylaşan kayıtlar
+karşılaştırılır; tüm tablo ikili olarak taranmaz.
+
+Tarama artımlıdır: son taramadan sonra değişen (updated_at) kayıtların
+anahtarları yenilenir ve bu kayıtlar blok komşularıyla puanlanır. Eşik üstü
+çiftler `DuplicateCandidate` olarak yazılır.
+"""
+import re
+from datetime import timedelta
+from difflib import SequenceMatcher
+from itertools import islice
+
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .matching import normalize_email, normalize_tax_number
+from .models import Company, Contact, DuplicateBlockingKey, DuplicateCandidate, DuplicateScanState
+from .search import normalize_search_text
+
+# Bu puan ve üstündeki çiftler aday olarak kaydedilir
+DUPLICATE_SCORE_THRESHOLD = 0.6
+# Bu kadar kayıttan büyük bloklar (ör. çok yaygın bir ad kelimesi) karşılaştırmada kullanılmaz
+MAX_BLOCK_SIZE = 50
+SCAN_CHUNK_SIZE = 1000
+# Tarama sırasında kaydedilen değişiklikleri kaçırmamak için geriye taşma payı
+SCAN_OVERLAP = timedelta(minutes=5)
+
+# Firma adlarında karşılaştırma dışı bırakılan şirket türü ekleri
+LEGAL_SUFFIXES = frozenset({
+    'as', 'anonim', 'sirketi', 'sirket', 'ltd', 'sti', 'limited', 'tic', 'ticaret', 'san', 'sanayi',
+    've', 'inc', 'llc', 'gmbh', 'co', 'corp', 'holding',
+})
+
+COMPANY_FIELDS = ('id', 'name', 'tax_number', 'domain', 'phone', 'updated_at')
+CONTACT_FIELDS = ('id', 'first_name', 'last_name', 'email', 'phone', 'company_id', 'updated_at')
+
+
+def company_core_name(name):
+    """
+    Karşılaştırma için firma adı: Türkçe harfler katlanır, noktalama ve
+    şirket türü ekleri atılır.
+    """
+    tokens = normalize_search_text(name).replace('.', '').split()
+    return ' '.join(token for token in tokens if token not in LEGAL_SUFFIXES)
+
+
+def phone_digits(phone):
+    """
+    Telefonun son 10 rakamı (ülke kodu ve baştaki 0 farkını yok sayar).
+    """
+    digits = re.sub(r'\D', '', phone or '')
+    return digits[-10:] if len(digits) >= 7 else ''
+
+
+def contact_full_name(row):
+    return normalize_search_text(f"{row['first_name']} {row['last_name']}")
+
+
+def similarity(first, second):
+    if not first or not second:
+        return 0.0
+    if first == second:
+        return 1.0
+    return SequenceMatcher(None, first, second).ratio()
+
+
+def company_keys(row):
+    keys = set()
+    tax_number = normalize_tax_number(row['tax_number'])
+    if tax_number:
+        keys.add(f'tax:{tax_number}')
+    if row['domain']:
+        keys.add(f"domain:{row['domain']}")
+    phone = phone_digits(row['phone'])
+    if phone:
+        keys.add(f'phone:{phone}')
+    core_name = company_core_name(row['name'])
+    if core_name:
+        keys.add(f'name:{core_name}')
+        # Yazım farklarını yakalamak için adın ilk kelimesi
+        first_token = core_name.split()[0]
+        if len(first_token) >= 3:
+            keys.add(f'token:{first_token}')
+    return {key[:255] for key in keys}
+
+
+def contact_keys(row):
+    keys = set()
+    email = normalize_email(row['email'])
+    if email:
+        keys.add(f'email:{email}')
+    phone = phone_digits(row['phone'])
+    if phone:
+        keys.add(f'phone:{phone}')
+    first_name = normalize_search_text(row['first_name'])
+    last_name = normalize_search_text(row['last_name'])
+    if last_name:
+        keys.add(f'name:{last_name}:{first_name[:1]}')
+    return {key[:255] for key in keys}
+
+
+def score_companies(first, second):
+    """
+    İki firmanın benzerlik puanı (0-1) ve eşleşen alanlar.
+    """
+    first_tax = normalize_tax_number(first['tax_number'])
+    second_tax = normalize_tax_number(second['tax_number'])
+    if first_tax and first_tax == second_tax:
+        return 1.0, ['tax_number']
+
+    reasons = []
+    name_score = similarity(company_core_name(first['name']), company_core_name(second['name']))
+    score = 0.6 * name_score
+    if name_score >= 0.85:
+        reasons.append('name')
+    if first['domain'] and first['domain'] == second['domain']:
+        score += 0.3
+        reasons.append('domain')
+    first_phone = phone_digits(first['phone'])
+    if first_phone and first_phone == phone_digits(second['phone']):
+        score += 0.2
+        reasons.append('phone')
+    if first_tax and second_tax:
+        # Farklı vergi numaraları farklı tüzel kişiler demektir
+        score *= 0.5
+    return round(min(score, 1.0), 3), reasons
+
+
+def score_contacts(first, second):
+    """
+    İki kişinin benzerlik puanı (0-1) ve eşleşen alanlar.
+    """
+    first_email = normalize_email(first['email'])
+    if first_email and first_email == normalize_email(second['email']):
+        return 1.0, ['email']
+
+    reasons = []
+    name_score = similarity(contact_full_name(first), contact_full_name(second))
+    score = 0.5 * name_score
+    if name_score >= 0.85:
+        reasons.append('name')
+    first_phone = phone_digits(first['phone'])
+    if first_phone and first_phone == phone_digits(second['phone']):
+        score += 0.3
+        reasons.append('phone')
+    if first['company_id'] == second['company_id']:
+        score += 0.2
+        reasons.append('company')
+    return round(min(score, 1.0), 3), reasons
+
+
+ENTITIES = {
+    'company': (Company, COMPANY_FIELDS, company_keys, score_companies),
+    'contact': (Contact, CONTACT_FIELDS, contact_keys, score_contacts),
+}
+
+
+def find_duplicates(entity_type, full=False, chunk_size=SCAN_CHUNK_SIZE):
+    """
+    Son taramadan sonra değişen kayıtların bloklarını yeniler ve aday çiftleri
+    günceller; `full` ise tüm kayıtlar taranır.
+
+    Returns:
+        dict: {'scanned': taranan kayıt, 'candidates': yazılan/güncellenen aday}
+    """
+    model, fields, _, _ = ENTITIES[entity_type]
+    state, _ = DuplicateScanState.objects.get_or_create(entity_type=entity_type)
+
+    rows = model.objects.order_by('updated_at', 'pk').values(*fields)
+    if state.last_scanned_at and not full:
+        rows = rows.filter(updated_at__gte=state.last_scanned_at - SCAN_OVERLAP)
+
+    scanned = candidates = 0
+    last_seen = state.last_scanned_at
+    iterator = rows.iterator(chunk_size=chunk_size)
+    while chunk := list(islice(iterator, chunk_size)):
+        candidates += scan_chunk(entity_type, chunk)
+        scanned += len(chunk)
+        last_seen = chunk[-1]['updated_at']
+
+    if last_seen != state.last_scanned_at:
+        state.last_scanned_at = last_seen
+        state.save(update_fields=['last_scanned_at'])
+    return {'scanned': scanned, 'candidates': candidates}
+
+
+def scan_chunk(entity_type, rows):
+    """
+    Kayıtların anahtarlarını yazar, blok komşularıyla puanlar ve adayları
+    tek seferde ekler/günceller.
+
+    Returns:
+        int: Yazılan veya güncellenen aday sayısı
+    """
+    model, fields, build_keys, score = ENTITIES[entity_type]
+    rows_by_id = {row['id']: row for row in rows}
+    keys_by_id = {row['id']: build_keys(row) for row in rows}
+    all_keys = set().union(*keys_by_id.values())
+
+    with transaction.atomic():
+        keys = DuplicateBlockingKey.objects.filter(entity_type=entity_type)
+        keys.filter(object_id__in=rows_by_id).delete()
+        DuplicateBlockingKey.objects.bulk_create([
+            DuplicateBlockingKey(entity_type=entity_type, object_id=object_id, key=key)
+            for object_id, object_keys in keys_by_id.items() for key in object_keys
+        ])
+
+        usable_keys = keys.filter(key__in=all_keys).values('key').annotate(size=Count('id')).filter(
+            size__gt=1, size__lte=MAX_BLOCK_SIZE
+        ).values('key')
+        blocks = {}
+        for key, object_id in keys.filter(key__in=usable_keys).values_list('key', 'object_id'):
+            blocks.setdefault(key, set()).add(object_id)
+
+        pairs = set()
+        for object_id, object_keys in keys_by_id.items():
+            for key in object_keys & blocks.keys():
+                pairs.update((min(object_id, other), max(object_id, other)) for other in blocks[key] if other != object_id)
+
+        missing = {object_id for pair in pairs for object_id in pair} - rows_by_id.keys()
+        if missing:
+            rows_by_id.update((row['id'], row) for row in model.objects.filter(pk__in=missing).values(*fields))
+
+        matches = {}
+        for first_id, second_id in pairs:
+            if first_id in rows_by_id and second_id in rows_by_id:
+                pair_score, reasons = score(rows_by_id[first_id], rows_by_id[second_id])
+                if pair_score >= DUPLICATE_SCORE_THRESHOLD:
+                    matches[(first_id, second_id)] = (pair_score, reasons)
+
+        return _write_candidates(entity_type, list(keys_by_id), matches)
+
+
+def _write_candidates(entity_type, object_ids, matches):
+    existing = {
+        (candidate.first_id, candidate.second_id): candidate
+        for candidate in DuplicateCandidate.objects.filter(entity_type=entity_type).filter(
+            Q(first_id__in=object_ids) | Q(second_id__in=object_ids)
+        )
+    }
+
+    now = timezone.now()
+    to_create, to_update = [], []
+    for (first_id, second_id), (pair_score, reasons) in matches.items():
+        candidate = existing.pop((first_id, second_id), None)
+        if candidate is None:
+            to_create.append(DuplicateCandidate(
+                entity_type=entity_type, first_id=first_id, second_id=second_id, score=pair_score, reasons=reasons,
+            ))
+        elif (candidate.score, candidate.reasons) != (pair_score, reasons):
+            candidate.score, candidate.reasons, candidate.updated_at = pair_score, reasons, now
+            to_update.append(candidate)
+
+    # Artık eşleşmeyen açık adaylar kaldırılır; "mükerrer değil" kararları korunur
+    stale = [candidate.pk for candidate in existing.values() if candidate.status == 'open']
+    if stale:
+        DuplicateCandidate.objects.filter(pk__in=stale).delete()
+    DuplicateCandidate.objects.bulk_create(to_create)
+    DuplicateCandidate.objects.bulk_update(to_update, ['score', 'reasons', 'updated_at'])
+    return len(to_create) + len(to_update)
+
+
+def forget_records(entity_type, object_ids):
+    """
+    Silinen (veya birleştirilen) kayıtların anahtarlarını ve adaylarını kaldırır.
+    """
+    object_ids = list(object_ids)
+    DuplicateBlockingKey.objects.filter(entity_type=entity_type, object_id__in=object_ids).delete()
+    DuplicateCandidate.objects.filter(entity_type=entity_type).filter(
+        Q(first_id__in=object_ids) | Q(second_id__in=object_ids)
+    ).delete()
+
+
+def load_candidate_records(candidates):
+    """
+    Aday çiftlerdeki kayıtların özetlerini tür başına tek sorguyla yükler.
+
+    Returns:
+        dict: {(tür, id): özet}
+    """
+    ids = {}
+    for candidate in candidates:
+        ids.setdefault(candidate.entity_type, set()).update((candidate.first_id, candidate.second_id))
+
+    records = {}
+    if ids.get('company'):
+        for row in Company.objects.filter(pk__in=ids['company']).values(
+            'id', 'name', 'tax_number', 'domain', 'phone', 'email'
+        ):
+            records[('company', row['id'])] = row
+    if ids.get('contact'):
+        for row in Contact.objects.filter(pk__in=ids['contact']).values(
+            'id', 'first_name', 'last_name', 'email', 'phone', 'company_id', 'company__name'
+        ):
+            records[('contact', row['id'])] = row
+    return records
@@ -0,0 +1,447 @@
+"""
+Firma ve kişilerin toplu içe aktarımı.
+
+Satırlar partiler halinde işlenir: her partide satırlar doğrulanır, mevcut
+kayıtlar tek sorguyla eşleştirilir (firmalar vergi numarası veya alan adıyla,
+kişiler e-posta ile), yeni kayıtlar `bulk_create`, değişenler `bulk_update`
+ile yazılır. Model save() çağrılmadığı için türetilmiş alanlar (arama dokümanı,
+alan adı) ve ana irtibat kişisi kuralı burada toplu olarak uygulanır.
+
+Hatalı satırlar atlanır ve satır numarasıyla raporlanır; her parti kendi
+işleminde (transaction) yazılır.
+"""
+from contextlib import nullcontext
+from itertools import islice
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.functions import Lower
+from django.utils import timezone
+from rest_framework import serializers
+
+from exports.writers import FORMULA_PREFIXES
+
+from .matching import company_domain, domain_from_url, normalize_email, normalize_tax_number
+from .models import Company, Contact
+from .search import normalize_search_text, update_search_vectors
+from .serializers import CompanyImportSerializer, ContactImportSerializer
+
+# Tek seferde doğrulanıp yazılan satır sayısı
+IMPORT_BATCH_SIZE = 1000
+# Raporda ayrıntısı verilen en fazla hatalı satır sayısı
+MAX_REPORTED_ERRORS = 1000
+
+# Mantıksal sütunlarda kabul edilen Türkçe değerler
+BOOLEAN_VALUES = {'evet': True, 'hayir': False, 'var': True, 'yok': False}
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def _header_key(value):
+    return normalize_search_text(value).replace(' ', '_')
+
+
+class ImportResult:
+    """
+    İçe aktarım özeti; sayaçlar satır bazındadır.
+    """
+
+    def __init__(self):
+        self.total_rows = 0
+        self.created = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.skipped = 0
+        self.companies_created = 0
+        self.error_count = 0
+        self.errors = []
+        self.ignored_columns = set()
+
+    def add_error(self, row_number, errors):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'row': row_number, 'errors': errors})
+
+    def as_dict(self):
+        return {
+            'total_rows': self.total_rows,
+            'created': self.created,
+            'updated': self.updated,
+            'unchanged': self.unchanged,
+            'skipped': self.skipped,
+            'companies_created': self.companies_created,
+            'error_count': self.error_count,
+            'errors': self.errors,
+            'ignored_columns': sorted(self.ignored_columns),
+        }
+
+
+class BaseImporter:
+    """
+    Satır eşleme, doğrulama ve parti yönetimi. Alt sınıflar `import_batch`
+    ile doğrulanmış satırları eşleştirip yazar.
+    """
+    serializer_class = None
+    model = None
+    # Alan adı dışında kabul edilen sütun başlıkları: {başlık: alan}
+    header_aliases = {}
+
+    def __init__(self, update_existing=True, batch_size=IMPORT_BATCH_SIZE):
+        self.update_existing = update_existing
+        self.batch_size = batch_size
+        self.result = ImportResult()
+        # Alanlar bir kez bağlanır, her satır aynı serializer ile doğrulanır
+        self.serializer = self.serializer_class()
+        self.fields = self.serializer.fields
+        self.header_map = self._build_header_map()
+        self.value_maps = self._build_value_maps()
+        self._columns = {}
+
+    def _build_header_map(self):
+        header_map = {}
+        for name, field in self.fields.items():
+            header_map[_header_key(name)] = name
+            model_field = self._model_field(name)
+            if model_field is not None:
+                header_map.setdefault(_header_key(model_field.verbose_name), name)
+        for header, name in self.header_aliases.items():
+            header_map[_header_key(header)] = name
+        return header_map
+
+    def _build_value_maps(self):
+        # Dışa aktarım dosyalarındaki görünen değerler ("Evet", "Küçük (1-50 çalışan)") de kabul edilir
+        value_maps = {}
+        for name, field in self.fields.items():
+            if isinstance(field, serializers.ChoiceField):
+                value_maps[name] = {_header_key(label): key for key, label in field.choices.items()}
+            elif isinstance(field, serializers.BooleanField):
+                value_maps[name] = BOOLEAN_VALUES
+        return value_maps
+
+    def _model_field(self, name):
+        try:
+            return self.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return None
+
+    def map_row(self, raw):
+        """
+        Dosya satırını serializer alanlarına çevirir; boş değerler atlanır
+        (güncellemelerde mevcut değeri silmez).
+        """
+        data = {}
+        for header, value in raw.items():
+            if header not in self._columns:
+                self._columns[header] = self.header_map.get(_header_key(header or ''))
+                if self._columns[header] is None and header:
+                    self.result.ignored_columns.add(header)
+            name = self._columns[header]
+            if name is None or value is None:
+                continue
+            if isinstance(value, str):
+                value = value.strip()
+                if value == '':
+                    continue
+                # Dışa aktarımda formül kaçışı için eklenen tırnak kaldırılır
+                if value.startswith("'") and value[1:].startswith(FORMULA_PREFIXES):
+                    value = value[1:]
+                if name in self.value_maps:
+                    value = self.value_maps[name].get(_header_key(value), value)
+            data[name] = value
+        return data
+
+    def validate_batch(self, batch):
+        valid = []
+        for row_number, raw in batch:
+            self.result.total_rows += 1
+            try:
+                valid.append((row_number, self.serializer.run_validation(self.map_row(raw))))
+            except serializers.ValidationError as e:
+                self.result.add_error(row_number, e.detail)
+        return valid
+
+    def run(self, rows, dry_run=False):
+        """
+        Tüm satırları içe aktarır. `dry_run` ise eşleştirme ve yazma yapılır
+        ama işlem sonunda geri alınır.
+        """
+        with transaction.atomic() if dry_run else nullcontext():
+            for batch in batched(rows, self.batch_size):
+                valid = self.validate_batch(batch)
+                if valid:
+                    with transaction.atomic():
+                        self.import_batch(valid)
+            if dry_run:
+                transaction.set_rollback(True)
+        return self.result
+
+    def import_batch(self, valid):
+        raise NotImplementedError
+
+    def apply_changes(self, instance, data, changed_fields):
+        changed = False
+        for name, value in data.items():
+            if getattr(instance, name) != value:
+                setattr(instance, name, value)
+                changed_fields.add(name)
+                changed = True
+        return changed
+
+    def write(self, to_create, to_update, changed_fields):
+        """
+        Yeni ve değişen kayıtları türetilmiş alanlarıyla birlikte toplu yazar.
+        """
+        now = timezone.now()
+        for instance in to_create:
+            instance.update_derived_fields()
+        for instance in to_update:
+            instance.update_derived_fields()
+            instance.updated_at = now
+
+        self.model.objects.bulk_create(to_create)
+        if to_update:
+            self.model.objects.bulk_update(
+                to_update, [*changed_fields, *self.model.DERIVED_FIELDS, 'updated_at']
+            )
+        update_search_vectors(
+            self.model.objects.filter(pk__in=[instance.pk for instance in [*to_create, *to_update]])
+        )
+
+
+class CompanyImporter(BaseImporter):
+    """
+    Firmalar; mevcut kayıt önce vergi numarası, yoksa alan adıyla (web sitesi
+    veya kurumsal e-posta) bulunur.
+    """
+    serializer_class = CompanyImportSerializer
+    model = Company
+    header_aliases = {'firma': 'name', 'company_name': 'name', 'website': 'website_url'}
+
+    def import_batch(self, valid):
+        rows = []
+        for row_number, data in valid:
+            tax_number = normalize_tax_number(data.get('tax_number'))
+            domain = company_domain(data.get('website_url'), data.get('email'))
+            rows.append((data, tax_number, domain))
+
+        tax_numbers = {tax_number for _, tax_number, _ in rows if tax_number}
+        raw_tax_numbers = {data['tax_number'] for data, tax_number, _ in rows if tax_number}
+        domains = {domain for _, _, domain in rows if domain}
+        by_tax, by_domain = {}, {}
+        for company in Company.objects.filter(
+            Q(tax_number__in=tax_numbers | raw_tax_numbers) | Q(domain__in=domains)
+        ).order_by('pk'):
+            by_tax.setdefault(normalize_tax_number(company.tax_number), company)
+            by_domain.setdefault(company.domain, company)
+        by_tax.pop('', None)
+        by_domain.pop('', None)
+
+        to_create, to_update, changed_fields, renamed = [], {}, set(), set()
+        for data, tax_number, domain in rows:
+            company = by_tax.get(tax_number) if tax_number else None
+            if company is None and domain:
+                company = by_domain.get(domain)
+                # Farklı vergi numaralı firmalar aynı alan adını kullanabilir
+                if company is not None and tax_number and normalize_tax_number(company.tax_number) not in ('', tax_number):
+                    company = None
+
+            if company is None:
+                company = Company(**data)
+                to_create.append(company)
+                self.result.created += 1
+            elif company.pk is None:
+                # Dosyada aynı firmanın tekrarı; ilk satırla birleştirilir
+                self.apply_changes(company, data, set())
+                self.result.updated += 1
+            elif not self.update_existing:
+                self.result.skipped += 1
+                continue
+            else:
+                old_name = company.name
+                if self.apply_changes(company, data, changed_fields):
+                    to_update[company.pk] = company
+                    self.result.updated += 1
+                    if company.name != old_name:
+                        renamed.add(company.pk)
+                else:
+                    self.result.unchanged += 1
+
+            if tax_number:
+                by_tax[tax_number] = company
+            if domain:
+                by_domain[domain] = company
+
+        self.write(to_create, list(to_update.values()), changed_fields)
+        if renamed:
+            # Kişilerin arama dokümanı firma adını da içerir
+            Contact.objects.filter(company_id__in=renamed).refresh_search_documents()
+
+
+class ContactImporter(BaseImporter):
+    """
+    Kişiler; mevcut kayıt e-posta adresiyle bulunur. Firma id, vergi numarası,
+    web sitesi veya adıyla eşleştirilir; bulunamazsa ve ad verilmişse oluşturulur.
+    """
+    serializer_class = ContactImportSerializer
+    model = Contact
+    header_aliases = {
+        'firma': 'company_name',
+        'company': 'company_name',
+        'firma_adi': 'company_name',
+        'vergi_numarasi': 'company_tax_number',
+        'company_domain': 'company_website',
+    }
+
+    def resolve_companies(self, valid):
+        """
+        Satırların firmalarını tek sorguda bulur, bulunamayanları toplu oluşturur.
+
+        Returns:
+            list: [(satır no, veri, firma)]; firması belirlenemeyen satırlar hata olarak raporlanır
+        """
+        ids, tax_numbers, domains, names = set(), set(), set(), set()
+        for _, data in valid:
+            data['company_tax_number'] = normalize_tax_number(data.get('company_tax_number'))
+            data['company_domain'] = domain_from_url(data.get('company_website'))
+            ids.add(data.get('company_id'))
+            tax_numbers.add(data['company_tax_number'])
+            domains.add(data['company_domain'])
+            names.add(data.get('company_name'))
+
+        by_id, by_tax, by_domain, by_name = {}, {}, {}, {}
+        lookup = Q(pk__in=ids - {None}) | Q(tax_number__in=tax_numbers - {''}) | Q(domain__in=domains - {''})
+        lookup |= Q(name__in=names - {None})
+        for company in Company.objects.filter(lookup).only('id', 'name', 'tax_number', 'domain').order_by('pk'):
+            by_id[company.pk] = company
+            by_tax.setdefault(normalize_tax_number(company.tax_number), company)
+            by_domain.setdefault(company.domain, company)
+            by_name.setdefault(company.name, company)
+        by_tax.pop('', None)
+        by_domain.pop('', None)
+
+        resolved, new_companies = [], []
+        for row_number, data in valid:
+            company_id = data.pop('company_id', None)
+            tax_number = data.pop('company_tax_number')
+            domain = data.pop('company_domain')
+            website = data.pop('company_website', None)
+            name = data.pop('company_name', None)
+
+            if company_id is not None:
+                company = by_id.get(company_id)
+                if company is None:
+                    self.result.add_error(row_number, {'company_id': ["Firma bulunamadı."]})
+                    continue
+            else:
+                company = (by_tax.get(tax_number) if tax_number else None) \
+                    or (by_domain.get(domain) if domain else None) \
+                    or (by_name.get(name) if name else None)
+
+            if company is None:
+                if not name:
+                    self.result.add_error(row_number, {'company': ["Firma bulunamadı."]})
+                    continue
+                company = Company(
+                    name=name,
+                    tax_number=tax_number or None,
+                    website_url=(website if '//' in website else f'https://{website}') if website else None,
+                )
+                new_companies.append(company)
+                for key, index in ((tax_number, by_tax), (domain, by_domain), (name, by_name)):
+                    if key:
+                        index[key] = company
+
+            resolved.append((row_number, data, company))
+
+        if new_companies:
+            for company in new_companies:
+                company.update_derived_fields()
+            Company.objects.bulk_create(new_companies)
+            update_search_vectors(Company.objects.filter(pk__in=[company.pk for company in new_companies]))
+            self.result.companies_created += len(new_companies)
+        return resolved
+
+    def import_batch(self, valid):
+        rows = self.resolve_companies(valid)
+
+        emails = {normalize_email(data.get('email')) for _, data, _ in rows} - {''}
+        by_email = {}
+        for contact in Contact.objects.annotate(email_key=Lower('email')).filter(email_key__in=emails).order_by('pk'):
+            by_email.setdefault(contact.email_key, contact)
+
+        to_create, to_update, changed_fields = [], {}, set()
+        touched = []
+        for _, data, company in rows:
+            email = normalize_email(data.get('email'))
+            contact = by_email.get(email) if email else None
+
+            if contact is None:
+                contact = Contact(company=company, **data)
+                to_create.append(contact)
+                self.result.created += 1
+            elif contact.pk is None:
+                # Dosyada aynı kişinin tekrarı; ilk satırla birleştirilir
+                contact.company = company
+                self.apply_changes(contact, data, set())
+                self.result.updated += 1
+            elif not self.update_existing:
+                self.result.skipped += 1
+                continue
+            else:
+                moved = contact.company_id != company.pk
+                if moved:
+                    changed_fields.add('company')
+                # Firma nesnesi atanır; arama dokümanı için ayrı sorgu yapılmaz
+                contact.company = company
+                if self.apply_changes(contact, data, changed_fields) or moved:
+                    to_update[contact.pk] = contact
+                    self.result.updated += 1
+                else:
+                    self.result.unchanged += 1
+
+            if email:
+                by_email[email] = contact
+            touched.append(contact)
+
+        if self.apply_primary_contacts(touched, to_update):
+            changed_fields.add('is_primary')
+        self.write(to_create, list(to_update.values()), changed_fields)
+
+    def apply_primary_contacts(self, contacts, to_update):
+        """
+        Firma başına tek ana irtibat kişisi: partide ana kişi olarak işaretlenen
+        son satır geçerlidir. Firmaların diğer ana kişileri, yeni ana kişiler
+        yazılmadan önce tek UPDATE ile kaldırılır.
+
+        Returns:
+            bool: Ana kişi değişikliği yapıldıysa True
+        """
+        primaries = {}
+        for contact in contacts:
+            if contact.is_primary:
+                primaries[contact.company_id] = contact
+        if not primaries:
+            return False
+
+        chosen = {id(contact) for contact in primaries.values()}
+        for contact in contacts:
+            if contact.is_primary and id(contact) not in chosen:
+                contact.is_primary = False
+                if contact.pk is not None:
+                    to_update[contact.pk] = contact
+
+        Contact.objects.clear_primary(
+            list(primaries), keep_ids=[contact.pk for contact in primaries.values() if contact.pk]
+        )
+        return True
+
+
+IMPORTERS = {
+    'companies': CompanyImporter,
+    'contacts': ContactImporter,
+}
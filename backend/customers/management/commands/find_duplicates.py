@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from customers.dedupe import ENTITIES, SCAN_CHUNK_SIZE, find_duplicates
+
+
+class Command(BaseCommand):
+    help = 'Firma ve kişilerde mükerrer kayıt adaylarını bul'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'entity_types',
+            nargs='*',
+            choices=sorted(ENTITIES),
+            help='Taranacak kayıt türleri (varsayılan: hepsi)',
+        )
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Yalnızca değişen kayıtları değil tüm tabloyu yeniden tara',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=SCAN_CHUNK_SIZE,
+            help=f'Tek seferde işlenecek kayıt sayısı (varsayılan: {SCAN_CHUNK_SIZE})',
+        )
+
+    def handle(self, *args, **options):
+        for entity_type in options['entity_types'] or ENTITIES:
+            result = find_duplicates(entity_type, full=options['full'], chunk_size=options['chunk_size'])
+            self.stdout.write(
+                f"{entity_type}: {result['scanned']} kayıt tarandı, {result['candidates']} aday yazıldı"
+            )
+        self.stdout.write(self.style.SUCCESS('Mükerrer taraması tamamlandı!'))
@@ -0,0 +1,73 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from customers.importer import IMPORT_BATCH_SIZE, IMPORTERS
+from customers.readers import ImportFileError, detect_import_format, iter_import_rows
+
+
+class Command(BaseCommand):
+    help = 'Firma veya kişileri CSV, XLSX ya da JSON dosyasından toplu içe aktar'
+
+    def add_arguments(self, parser):
+        parser.add_argument('resource', choices=sorted(IMPORTERS), help='İçe aktarılacak kayıt türü')
+        parser.add_argument('path', help='İçe aktarılacak dosyanın yolu')
+        parser.add_argument('--format', dest='file_format', help='Dosya biçimi (varsayılan: dosya uzantısı)')
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Değişiklikleri kaydetmeden yalnızca raporu göster',
+        )
+        parser.add_argument(
+            '--no-update',
+            action='store_true',
+            help='Eşleşen mevcut kayıtları güncelleme, atla',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=IMPORT_BATCH_SIZE,
+            help=f'Tek seferde işlenecek satır sayısı (varsayılan: {IMPORT_BATCH_SIZE})',
+        )
+        parser.add_argument(
+            '--show-errors',
+            type=int,
+            default=20,
+            help='Gösterilecek en fazla hatalı satır sayısı (varsayılan: 20)',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            file_format = detect_import_format(options['path'], options['file_format'])
+        except ImportFileError as e:
+            raise CommandError(str(e))
+
+        importer = IMPORTERS[options['resource']](
+            update_existing=not options['no_update'],
+            batch_size=options['batch_size'],
+        )
+        try:
+            with open(options['path'], 'rb') as file:
+                result = importer.run(iter_import_rows(file, file_format), dry_run=options['dry_run'])
+        except OSError as e:
+            raise CommandError(f'Dosya açılamadı: {e}')
+        except ImportFileError as e:
+            raise CommandError(f'{e} ({importer.result.total_rows} satır işlendi)')
+
+        self.stdout.write(
+            f'{result.total_rows} satır okundu: {result.created} yeni, {result.updated} güncellendi, '
+            f'{result.unchanged} değişmedi, {result.skipped} atlandı, {result.error_count} hatalı'
+        )
+        if result.companies_created:
+            self.stdout.write(f'{result.companies_created} yeni firma oluşturuldu')
+        if result.ignored_columns:
+            self.stdout.write(f'Tanınmayan sütunlar: {", ".join(sorted(result.ignored_columns))}')
+        for error in result.errors[:options['show_errors']]:
+            self.stdout.write(self.style.WARNING(
+                f"Satır {error['row']}: {json.dumps(error['errors'], ensure_ascii=False)}"
+            ))
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING('Deneme modu: değişiklikler kaydedilmedi'))
+        else:
+            self.stdout.write(self.style.SUCCESS('İçe aktarım tamamlandı!'))
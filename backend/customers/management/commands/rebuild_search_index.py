@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from customers.models import Company, Contact
+
+
+class Command(BaseCommand):
+    help = 'Firma ve kişilerin arama dokümanlarını (ve PostgreSQL tsvector kolonlarını) yeniden oluştur'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Toplu güncellemede kullanılacak kayıt sayısı (varsayılan: 500)',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        companies = Company.objects.all().refresh_search_documents(batch_size=batch_size)
+        self.stdout.write(f'{companies} firma güncellendi')
+
+        contacts = Contact.objects.all().refresh_search_documents(batch_size=batch_size)
+        self.stdout.write(f'{contacts} kişi güncellendi')
+
+        self.stdout.write(self.style.SUCCESS('Arama indeksi yeniden oluşturuldu!'))
@@ -0,0 +1,63 @@
+"""
+Firma ve kişi kayıtlarını eşleştirmek için kullanılan anahtarlar.
+
+İçe aktarımda mevcut kayıtlar bu anahtarlarla toplu (`__in`) sorgularla
+bulunur: firmalar vergi numarası veya alan adıyla, kişiler e-posta ile.
+"""
+import re
+from urllib.parse import urlsplit
+
+# Alan adı firmayı temsil etmeyen ücretsiz e-posta servisleri
+FREE_EMAIL_DOMAINS = frozenset({
+    'gmail.com', 'googlemail.com', 'hotmail.com', 'hotmail.com.tr', 'outlook.com', 'outlook.com.tr',
+    'live.com', 'msn.com', 'yahoo.com', 'yahoo.com.tr', 'icloud.com', 'me.com', 'yandex.com',
+    'yandex.com.tr', 'mail.ru', 'aol.com', 'proton.me', 'protonmail.com', 'gmx.com', 'mynet.com',
+})
+
+
+def normalize_email(value):
+    """
+    E-posta adresinin karşılaştırma anahtarı (boşluksuz, küçük harf).
+    """
+    value = (value or '').strip().lower()
+    return value if '@' in value else ''
+
+
+def normalize_tax_number(value):
+    """
+    Vergi numarasının karşılaştırma anahtarı (boşluk ve ayraçlar olmadan).
+    """
+    return re.sub(r'[\s.-]', '', str(value or ''))
+
+
+def domain_from_url(url):
+    """
+    Web adresinin alan adı: 'https://www.Ornek.com.tr/iletisim' → 'ornek.com.tr'
+    Ayrıştırılamayan adreslerde (ör. 'http://[abc') boş döner.
+    """
+    url = (url or '').strip().lower()
+    if not url:
+        return ''
+    if '//' not in url:
+        url = f'//{url}'
+    try:
+        host = (urlsplit(url).hostname or '').rstrip('.')
+    except ValueError:
+        return ''
+    return host[4:] if host.startswith('www.') else host
+
+
+def domain_from_email(email):
+    """
+    Kurumsal e-posta adresinin alan adı; ücretsiz servislerde boş döner.
+    """
+    email = normalize_email(email)
+    domain = email.rsplit('@', 1)[-1] if email else ''
+    return '' if domain in FREE_EMAIL_DOMAINS else domain
+
+
+def company_domain(website_url=None, email=None):
+    """
+    Firmanın alan adı: önce web sitesinden, yoksa kurumsal e-posta adresinden.
+    """
+    return domain_from_url(website_url) or domain_from_email(email)
@@ -0,0 +1,161 @@
+"""
+Mükerrer firma ve kişilerin tek kayıtta birleştirilmesi.
+
+Birleştirme tek işlemde yapılır: kaynak kayıtlara bağlı tüm ilişkiler
+(kişiler, notlar, fırsatlar, etkinlikler, e-postalar) ilişki başına tek
+UPDATE ile hedef kayda taşınır, hedefteki boş alanlar kaynaklardan
+doldurulur ve kaynaklar silinir. Kayıtlar tek tek kaydedilmez.
+"""
+from django.db import transaction
+from django.db.models import Min
+
+from .models import Company, Contact
+
+COMPANY_MERGE_FIELDS = ('tax_number', 'industry', 'company_size', 'address', 'phone', 'email', 'linkedin_url', 'website_url')
+CONTACT_MERGE_FIELDS = ('position', 'phone', 'email', 'lead_source', 'linkedin_url', 'personal_website')
+
+
+class MergeError(Exception):
+    """
+    Birleştirme yapılamadığında (ör. kaynak kayıt bulunamadığında) yükseltilir.
+    """
+
+
+def _load_sources(model, target, source_ids):
+    source_ids = set(source_ids) - {target.pk}
+    if not source_ids:
+        raise MergeError("Birleştirilecek kayıt belirtilmedi")
+    # Önce oluşturulan kaydın boş alanları önce doldurulur
+    sources = list(model.objects.filter(pk__in=source_ids).order_by('created_at', 'pk'))
+    missing = source_ids - {source.pk for source in sources}
+    if missing:
+        raise MergeError(f"Kayıt bulunamadı: {', '.join(map(str, sorted(missing)))}")
+    return sources
+
+
+def _fill_blank_fields(target, sources, fields):
+    changed = []
+    for field in fields:
+        if getattr(target, field) not in (None, ''):
+            continue
+        value = next((getattr(source, field) for source in sources if getattr(source, field) not in (None, '')), None)
+        if value is not None:
+            setattr(target, field, value)
+            changed.append(field)
+    target.other_links = {
+        **{key: value for source in reversed(sources) for key, value in (source.other_links or {}).items()},
+        **(target.other_links or {}),
+    }
+    return changed
+
+
+def _repoint_foreign_keys(model, target, source_ids, skip=()):
+    """
+    Modele işaret eden tüm ForeignKey ilişkilerini ilişki başına tek UPDATE ile hedefe taşır.
+    """
+    moved = {}
+    for relation in model._meta.related_objects:
+        if not relation.one_to_many or relation.related_model in skip:
+            continue
+        related_model, field_name = relation.related_model, relation.field.name
+        moved[related_model._meta.label] = related_model._base_manager.filter(
+            **{f'{field_name}__in': source_ids}
+        ).update(**{field_name: target.pk})
+    return moved
+
+
+def _repoint_unique(queryset, parent_field, field_name, target_id, source_ids):
+    """
+    (parent, kişi) çifti tekil olan bağlantıları taşır: hedefin zaten bağlı
+    olduğu kayıtlardaki kaynak satırları silinir, aynı kayda bağlı birden çok
+    kaynaktan yalnızca biri taşınır.
+    """
+    target_parents = queryset.filter(**{field_name: target_id}).values(parent_field)
+    rows = queryset.filter(**{f'{field_name}__in': source_ids})
+    rows.filter(**{f'{parent_field}__in': target_parents}).delete()
+    keep_ids = rows.order_by().values(parent_field).annotate(keep_id=Min('pk')).values('keep_id')
+    rows.exclude(pk__in=keep_ids).delete()
+    return rows.update(**{field_name: target_id})
+
+
+def _merge_contact_links(target, source_ids):
+    from events.models import Event, EventParticipant
+    from opportunities.models import Opportunity
+
+    moved = {
+        'opportunities.Opportunity.contacts': _repoint_unique(
+            Opportunity.contacts.through.objects.all(), 'opportunity_id', 'contact_id', target.pk, source_ids
+        ),
+        'events.Event.contacts': _repoint_unique(
+            Event.contacts.through.objects.all(), 'event_id', 'contact_id', target.pk, source_ids
+        ),
+        'events.EventParticipant': _repoint_unique(
+            EventParticipant.objects.all(), 'event_id', 'contact_id', target.pk, source_ids
+        ),
+    }
+    moved.update(_repoint_foreign_keys(Contact, target, source_ids, skip=(EventParticipant,)))
+    return moved
+
+
+def _invalidate_dashboard():
+    from opportunities.dashboard import invalidate_dashboard_cache
+
+    transaction.on_commit(invalidate_dashboard_cache)
+
+
+def merge_companies(target, source_ids):
+    """
+    Kaynak firmaları hedef firmada birleştirir ve siler.
+
+    Returns:
+        dict: İlişki bazında taşınan kayıt sayıları
+    """
+    with transaction.atomic():
+        target = Company.objects.select_for_update().get(pk=target.pk)
+        sources = _load_sources(Company, target, source_ids)
+        source_ids = [source.pk for source in sources]
+
+        # Hedefin ana kişisi yoksa kaynaklardan en eskisinin ana kişisi korunur
+        keep_ids = []
+        if not Contact.objects.filter(company=target, is_primary=True).exists():
+            keep_ids = list(
+                Contact.objects.filter(company_id__in=source_ids, is_primary=True).order_by('created_at', 'pk')
+                .values_list('pk', flat=True)[:1]
+            )
+        Contact.objects.clear_primary(source_ids, keep_ids=keep_ids)
+
+        moved = _repoint_foreign_keys(Company, target, source_ids)
+
+        _fill_blank_fields(target, sources, COMPANY_MERGE_FIELDS)
+        target.save()
+        # Kişilerin arama dokümanı firma adını içerir
+        Contact.objects.filter(company=target).refresh_search_documents()
+
+        Company.objects.filter(pk__in=source_ids).delete()
+        _invalidate_dashboard()
+    return moved
+
+
+def merge_contacts(target, source_ids):
+    """
+    Kaynak kişileri hedef kişide birleştirir ve siler. Kaynaklar farklı bir
+    firmaya bağlı olabilir; kişi hedefin firmasında kalır.
+
+    Returns:
+        dict: İlişki bazında taşınan kayıt sayıları
+    """
+    with transaction.atomic():
+        target = Contact.objects.select_for_update().select_related('company').get(pk=target.pk)
+        sources = _load_sources(Contact, target, source_ids)
+        source_ids = [source.pk for source in sources]
+
+        moved = _merge_contact_links(target, source_ids)
+
+        # Kaynaklardan biri hedefin firmasının ana kişisiyse işaret hedefe geçer
+        if any(source.is_primary and source.company_id == target.company_id for source in sources):
+            target.is_primary = True
+        _fill_blank_fields(target, sources, CONTACT_MERGE_FIELDS)
+
+        Contact.objects.filter(pk__in=source_ids).delete()
+        target.save()
+    return moved
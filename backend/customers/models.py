@@ -1,6 +1,100 @@
-from django.db import models
+from decimal import Decimal
+
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.db import models, transaction
+from django.db.models import Count, DecimalField, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Lower
 from django.utils import timezone
 
+from .matching import company_domain
+from .search import build_search_document, update_search_vectors
+
+
+class SearchDocumentQuerySet(models.QuerySet):
+    """
+    Arama dokümanı tutan modeller için ortak queryset metotları.
+    """
+
+    def refresh_search_documents(self, batch_size=500):
+        """
+        Kayıtların search_document (ve modelin diğer türetilmiş) alanlarını
+        toplu olarak yeniden üretir; PostgreSQL'de tsvector kolonu da parti
+        başına tek UPDATE ile güncellenir.
+
+        Kayıtlar birincil anahtar sırasıyla `batch_size`'lık partiler halinde
+        okunur; tüm tablo yeniden üretilirken de bellekte tek parti tutulur.
+
+        Returns:
+            int: Güncellenen kayıt sayısı
+        """
+        queryset = self.search_document_queryset().order_by('pk')
+        fields = list(self.model.DERIVED_FIELDS)
+        updated = 0
+        last_pk = None
+        while True:
+            batch = queryset.filter(pk__gt=last_pk) if last_pk is not None else queryset
+            instances = list(batch[:batch_size])
+            if not instances:
+                break
+            for instance in instances:
+                instance.update_derived_fields()
+            self.model.objects.bulk_update(instances, fields)
+            update_search_vectors(self.model.objects.filter(pk__in=[instance.pk for instance in instances]))
+            updated += len(instances)
+            last_pk = instances[-1].pk
+        return updated
+
+    def search_document_queryset(self):
+        return self
+
+
+class CompanyQuerySet(SearchDocumentQuerySet):
+    """
+    Firma sorguları için yardımcı metotlar.
+    """
+
+    def with_list_stats(self):
+        """
+        Kişi sayısı, açık fırsat sayısı ve açık fırsatların toplam değerini
+        alt sorgularla ekler; liste satır başına ek sorgu çalıştırmaz.
+        """
+        from opportunities.models import Opportunity
+
+        contacts = (
+            Contact.objects.filter(company=OuterRef('pk'))
+            .order_by()
+            .values('company')
+            .annotate(total=Count('pk'))
+            .values('total')
+        )
+        open_opportunities = (
+            Opportunity.objects.filter(
+                company=OuterRef('pk'),
+                status__is_won=False,
+                status__is_lost=False,
+            )
+            .order_by()
+            .values('company')
+        )
+        value_field = DecimalField(max_digits=14, decimal_places=2)
+
+        return self.annotate(
+            contact_count=Coalesce(Subquery(contacts), 0),
+            open_opportunity_count=Coalesce(
+                Subquery(open_opportunities.annotate(total=Count('pk')).values('total')),
+                0,
+            ),
+            pipeline_value=Coalesce(
+                Subquery(
+                    open_opportunities.annotate(total=Sum('value')).values('total'),
+                    output_field=value_field,
+                ),
+                Value(Decimal('0')),
+                output_field=value_field,
+            ),
+        )
+
 
 class Company(models.Model):
     """
@@ -36,15 +130,96 @@ class Company(models.Model):
     )
     created_at = models.DateTimeField(default=timezone.now, verbose_name="Oluşturulma Tarihi")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="Güncellenme Tarihi")
+    # Arama ve eşleştirme alanları save() sırasında güncellenir, elle düzenlenmez
+    search_document = models.TextField(blank=True, default='', editable=False, verbose_name="Arama Dokümanı")
+    search_vector = SearchVectorField(null=True, editable=False)
+    domain = models.CharField(max_length=255, blank=True, default='', editable=False, verbose_name="Alan Adı")
+
+    objects = CompanyQuerySet.as_manager()
+
+    # Diğer alanlardan üretilen, toplu işlemlerde birlikte yazılması gereken alanlar
+    DERIVED_FIELDS = ('search_document', 'domain')
 
     class Meta:
         verbose_name = "Firma"
         verbose_name_plural = "Firmalar"
         ordering = ["-created_at"]
+        indexes = [
+            GinIndex(fields=['search_vector'], name='company_search_vector_gin'),
+            models.Index(fields=['tax_number'], name='company_tax_number_idx'),
+            models.Index(fields=['domain'], name='company_domain_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_name = instance.__dict__.get('name')
+        return instance
+
+    def build_search_document(self):
+        return build_search_document(
+            self.name, self.industry, self.tax_number, self.email, self.phone,
+            digits=[self.tax_number, self.phone],
+        )
+
+    def update_derived_fields(self):
+        self.search_document = self.build_search_document()
+        self.domain = company_domain(self.website_url, self.email)
+
+    def save(self, *args, **kwargs):
+        self.update_derived_fields()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, *self.DERIVED_FIELDS}
+        super().save(*args, **kwargs)
+        update_search_vectors(Company.objects.filter(pk=self.pk))
+
+        # Kişilerin arama dokümanı firma adını da içerir
+        name_changed = getattr(self, '_loaded_name', self.name) != self.name
+        self._loaded_name = self.name
+        if name_changed:
+            self.contacts.all().refresh_search_documents()
+
+
+class ContactQuerySet(SearchDocumentQuerySet):
+    """
+    İletişim kişisi sorguları için yardımcı metotlar.
+    """
+
+    def search_document_queryset(self):
+        return self.select_related('company')
+
+    def clear_primary(self, company_ids, keep_ids=()):
+        """
+        Firmaların ana irtibat kişisi işaretini (`keep_ids` dışında) tek UPDATE ile kaldırır.
+        Yeni ana kişiler yazılmadan önce çağrılmalıdır (firma başına tek ana kişi kısıtı).
+        """
+        return self.filter(company_id__in=company_ids, is_primary=True).exclude(pk__in=keep_ids).update(
+            is_primary=False, updated_at=timezone.now()
+        )
+
+    def set_primary(self, contact_ids):
+        """
+        Verilen kişileri firmalarının ana irtibat kişisi yapar. Firma sayısından
+        bağımsız olarak iki UPDATE çalışır: önce eski ana kişiler kaldırılır,
+        sonra yenileri işaretlenir (kısıt satır bazında denetlendiği için tek
+        ifadede yer değiştirme yapılmaz).
+
+        Returns:
+            int: Ana kişisi değişen firma sayısı
+        """
+        contact_ids = list(contact_ids)
+        with transaction.atomic():
+            self.clear_primary(
+                self.filter(pk__in=contact_ids).values('company_id'), keep_ids=contact_ids
+            )
+            return self.filter(pk__in=contact_ids, is_primary=False).update(
+                is_primary=True, updated_at=timezone.now()
+            )
+
 
 class Contact(models.Model):
     """
@@ -102,21 +277,64 @@ class Contact(models.Model):
     )
     created_at = models.DateTimeField(default=timezone.now, verbose_name="Oluşturulma Tarihi")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="Güncellenme Tarihi")
+    # Arama alanları save() sırasında güncellenir, elle düzenlenmez
+    search_document = models.TextField(blank=True, default='', editable=False, verbose_name="Arama Dokümanı")
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = ContactQuerySet.as_manager()
+
+    DERIVED_FIELDS = ('search_document',)
 
     class Meta:
         verbose_name = "İrtibat Kişisi"
         verbose_name_plural = "İrtibat Kişileri"
         ordering = ["-is_primary", "first_name", "last_name"]
+        indexes = [
+            GinIndex(fields=['search_vector'], name='contact_search_vector_gin'),
+            # E-posta ile büyük/küçük harf duyarsız eşleştirme (içe aktarım)
+            models.Index(Lower('email'), name='contact_email_lower_idx'),
+        ]
+        constraints = [
+            # Firma başına en fazla bir ana irtibat kişisi
+            models.UniqueConstraint(
+                fields=['company'],
+                condition=Q(is_primary=True),
+                name='contact_one_primary_per_company',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.first_name} {self.last_name} ({self.company.name})"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_primary = (instance.__dict__.get('company_id'), instance.__dict__.get('is_primary'))
+        return instance
+
+    def build_search_document(self):
+        return build_search_document(
+            self.first_name, self.last_name, self.position, self.email, self.company.name,
+            digits=[self.phone],
+        )
+
+    def update_derived_fields(self):
+        self.search_document = self.build_search_document()
+
     def save(self, *args, **kwargs):
-        # Eğer bu kişi, ana irtibat kişisi olarak işaretlendiyse
-        # şirketin diğer tüm kişilerini ana irtibat kişisi olmaktan çıkar
-        if self.is_primary:
-            Contact.objects.filter(company=self.company, is_primary=True).exclude(pk=self.pk).update(is_primary=False)
-        super().save(*args, **kwargs)
+        # Kişi ana irtibat kişisi yapıldıysa (veya ana kişi olarak firma
+        # değiştirdiyse) firmanın önceki ana kişisi kaydetmeden önce kaldırılır
+        became_primary = self.is_primary and getattr(self, '_loaded_primary', None) != (self.company_id, True)
+        self.update_derived_fields()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, *self.DERIVED_FIELDS}
+        with transaction.atomic():
+            if became_primary:
+                Contact.objects.clear_primary([self.company_id], keep_ids=[self.pk] if self.pk else [])
+            super().save(*args, **kwargs)
+        self._loaded_primary = (self.company_id, self.is_primary)
+        update_search_vectors(Contact.objects.filter(pk=self.pk))
 
 
 class Note(models.Model):
@@ -177,3 +395,78 @@ class Note(models.Model):
         
         if not self.company and not self.contact:
             raise ValidationError("Not en az bir firma veya kişiye bağlı olmalıdır.")
+
+
+class DuplicateBlockingKey(models.Model):
+    """
+    Mükerrer kayıt aramasında kullanılan eşleştirme blokları: aynı anahtarı
+    paylaşan kayıtlar birbiriyle karşılaştırılır (ör. 'tax:1234567890').
+    """
+    ENTITY_CHOICES = [
+        ('company', 'Firma'),
+        ('contact', 'Kişi'),
+    ]
+
+    entity_type = models.CharField(max_length=10, choices=ENTITY_CHOICES, verbose_name="Kayıt Türü")
+    object_id = models.PositiveBigIntegerField(verbose_name="Kayıt ID")
+    key = models.CharField(max_length=255, verbose_name="Anahtar")
+
+    class Meta:
+        verbose_name = "Mükerrer Arama Anahtarı"
+        verbose_name_plural = "Mükerrer Arama Anahtarları"
+        indexes = [
+            models.Index(fields=['entity_type', 'key'], name='dup_key_lookup_idx'),
+            models.Index(fields=['entity_type', 'object_id'], name='dup_key_object_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.entity_type}:{self.object_id} {self.key}"
+
+
+class DuplicateCandidate(models.Model):
+    """
+    Mükerrer olma ihtimali olan kayıt çifti; first_id her zaman second_id'den küçüktür.
+    """
+    STATUS_CHOICES = [
+        ('open', 'İncelenmedi'),
+        ('dismissed', 'Mükerrer Değil'),
+    ]
+
+    entity_type = models.CharField(max_length=10, choices=DuplicateBlockingKey.ENTITY_CHOICES, verbose_name="Kayıt Türü")
+    first_id = models.PositiveBigIntegerField(verbose_name="Birinci Kayıt ID")
+    second_id = models.PositiveBigIntegerField(verbose_name="İkinci Kayıt ID")
+    score = models.FloatField(verbose_name="Benzerlik Puanı")
+    reasons = models.JSONField(default=list, blank=True, verbose_name="Eşleşen Alanlar")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='open', verbose_name="Durum")
+    created_at = models.DateTimeField(default=timezone.now, verbose_name="Oluşturulma Tarihi")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Güncellenme Tarihi")
+
+    class Meta:
+        verbose_name = "Mükerrer Kayıt Adayı"
+        verbose_name_plural = "Mükerrer Kayıt Adayları"
+        ordering = ['-score']
+        constraints = [
+            models.UniqueConstraint(fields=['entity_type', 'first_id', 'second_id'], name='dup_candidate_pair_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['entity_type', 'status', '-score'], name='dup_candidate_list_idx'),
+            models.Index(fields=['entity_type', 'second_id'], name='dup_candidate_second_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.entity_type} {self.first_id} ~ {self.second_id} ({self.score:.2f})"
+
+
+class DuplicateScanState(models.Model):
+    """
+    Artımlı mükerrer taramasının kaldığı yer: bu tarihten sonra değişen kayıtlar taranır.
+    """
+    entity_type = models.CharField(max_length=10, unique=True, choices=DuplicateBlockingKey.ENTITY_CHOICES, verbose_name="Kayıt Türü")
+    last_scanned_at = models.DateTimeField(null=True, blank=True, verbose_name="Son Taranan Değişiklik")
+
+    class Meta:
+        verbose_name = "Mükerrer Tarama Durumu"
+        verbose_name_plural = "Mükerrer Tarama Durumları"
+
+    def __str__(self):
+        return f"{self.entity_type}: {self.last_scanned_at}"
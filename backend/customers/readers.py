@@ -0,0 +1,244 @@
+"""
+İçe aktarım dosyalarını (CSV, XLSX, JSON) satır satır okuyan akış okuyucuları.
+
+Okuyucular (satır numarası, {sütun başlığı: değer}) ikilileri üretir; dosya
+belleğe tamamen alınmaz. XLSX dosyaları ek kütüphane kullanmadan ZIP arşivi
+içindeki çalışma sayfası XML'i akış halinde ayrıştırılarak okunur.
+"""
+import codecs
+import csv
+import io
+import json
+import posixpath
+import re
+import zipfile
+from decimal import Decimal, InvalidOperation
+from itertools import chain
+from xml.etree.ElementTree import ParseError, iterparse
+
+IMPORT_FORMATS = ('csv', 'xlsx', 'json')
+
+# JSON dosyası bu büyüklükte parçalarla okunur
+READ_CHUNK_SIZE = 64 * 1024
+
+CSV_DELIMITERS = (',', ';', '\t')
+JSON_SEPARATOR_RE = re.compile(r'[\s,]*')
+CELL_COLUMN_RE = re.compile(r'[A-Z]+')
+
+
+class ImportFileError(Exception):
+    """
+    Dosya biçimi okunamadığında yükseltilir (satır hatalarından farklı olarak
+    tüm içe aktarımı durdurur).
+    """
+
+
+def detect_import_format(file_name, file_format=None):
+    """
+    Açıkça verilmemişse biçimi dosya uzantısından belirler.
+    """
+    file_format = (file_format or posixpath.splitext(file_name or '')[1].lstrip('.')).lower()
+    if file_format == 'jsonl':
+        file_format = 'json'
+    if file_format not in IMPORT_FORMATS:
+        raise ImportFileError(f"Desteklenmeyen dosya biçimi. Seçenekler: {', '.join(IMPORT_FORMATS)}")
+    return file_format
+
+
+def _is_blank(values):
+    return all(value in (None, '') for value in values)
+
+
+def iter_csv_rows(file):
+    """
+    UTF-8 (BOM'lu veya BOM'suz) CSV; ayraç (virgül, noktalı virgül veya sekme)
+    başlık satırından belirlenir.
+    """
+    text = io.TextIOWrapper(file, encoding='utf-8-sig', newline='')
+    try:
+        header_line = text.readline()
+        delimiter = max(CSV_DELIMITERS, key=header_line.count)
+        reader = csv.reader(chain([header_line], text), delimiter=delimiter)
+        header = [column.strip() for column in next(reader, [])]
+        for row_number, values in enumerate(reader, 2):
+            if not _is_blank(values):
+                yield row_number, dict(zip(header, values))
+    except UnicodeDecodeError:
+        raise ImportFileError("CSV dosyası UTF-8 olarak okunamadı")
+    except csv.Error as e:
+        raise ImportFileError(f"CSV dosyası okunamadı: {e}")
+    finally:
+        # Yüklenen dosya nesnesi okuyucuyla birlikte kapatılmaz
+        text.detach()
+
+
+def iter_json_rows(file):
+    """
+    Nesnelerden oluşan bir JSON dizisi veya satır başına bir nesne (JSON Lines).
+    Nesneler dosya okunurken tek tek çözülür.
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder('utf-8-sig')()
+    buffer, position, row_number = '', 0, 0
+    started = finished = False
+
+    while True:
+        chunk = file.read(READ_CHUNK_SIZE)
+        try:
+            buffer = buffer[position:] + text_decoder.decode(chunk, final=not chunk)
+        except UnicodeDecodeError:
+            raise ImportFileError("JSON dosyası UTF-8 olarak okunamadı")
+        position = 0
+
+        while True:
+            position = JSON_SEPARATOR_RE.match(buffer, position).end()
+            if not started and buffer[position:position + 1] == '[':
+                position += 1
+                started = True
+                continue
+            if buffer[position:position + 1] == ']':
+                position += 1
+                finished = True
+                break
+            started = True
+            if position >= len(buffer):
+                break
+
+            try:
+                item, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError as e:
+                if chunk:
+                    # Nesnenin devamı sonraki parçada
+                    break
+                raise ImportFileError(f"JSON dosyası okunamadı: {e}")
+
+            row_number += 1
+            if not isinstance(item, dict):
+                raise ImportFileError(f"{row_number}. kayıt bir JSON nesnesi değil")
+            yield row_number, item
+
+        if finished or not chunk:
+            break
+
+    if buffer[position:].strip():
+        raise ImportFileError("JSON dizisinden sonra beklenmeyen içerik")
+
+
+def _local_name(tag):
+    return tag.rsplit('}', 1)[-1]
+
+
+def _element_text(element):
+    # Zengin metinli hücrelerde metin birden fazla <t> parçasına bölünür
+    return ''.join(node.text or '' for node in element.iter() if _local_name(node.tag) == 't')
+
+
+def _column_index(reference):
+    index = 0
+    for letter in CELL_COLUMN_RE.match(reference).group():
+        index = index * 26 + ord(letter) - 64
+    return index - 1
+
+
+def _number_text(value):
+    # Tam sayı olarak saklanan değerler (vergi no, posta kodu) ".0" olmadan okunur
+    try:
+        number = Decimal(value)
+    except InvalidOperation:
+        return value
+    if number == number.to_integral_value():
+        return str(number.quantize(Decimal(1)))
+    return str(number.normalize())
+
+
+def _first_sheet_path(archive):
+    try:
+        workbook = archive.read('xl/workbook.xml')
+        relations = archive.read('xl/_rels/workbook.xml.rels')
+    except KeyError:
+        return 'xl/worksheets/sheet1.xml'
+
+    sheet_id = None
+    for _, element in iterparse(io.BytesIO(workbook)):
+        if _local_name(element.tag) == 'sheet':
+            sheet_id = next(value for key, value in element.attrib.items() if _local_name(key) == 'id')
+            break
+    for _, element in iterparse(io.BytesIO(relations)):
+        if _local_name(element.tag) == 'Relationship' and element.get('Id') == sheet_id:
+            target = element.get('Target')
+            return target.lstrip('/') if target.startswith('/') else posixpath.normpath(f'xl/{target}')
+    return 'xl/worksheets/sheet1.xml'
+
+
+def _read_shared_strings(archive):
+    if 'xl/sharedStrings.xml' not in archive.namelist():
+        return []
+    strings = []
+    with archive.open('xl/sharedStrings.xml') as source:
+        for _, element in iterparse(source):
+            if _local_name(element.tag) == 'si':
+                strings.append(_element_text(element))
+                element.clear()
+    return strings
+
+
+def _cell_value(cell, shared_strings):
+    cell_type = cell.get('t', 'n')
+    if cell_type == 'inlineStr':
+        return _element_text(cell)
+
+    value = next((child.text for child in cell if _local_name(child.tag) == 'v'), None)
+    if value is None:
+        return ''
+    if cell_type == 's':
+        return shared_strings[int(value)]
+    if cell_type == 'b':
+        return 'true' if value == '1' else 'false'
+    if cell_type == 'n':
+        return _number_text(value)
+    return value
+
+
+def iter_xlsx_rows(file):
+    """
+    Çalışma kitabının ilk sayfası; ilk dolu satır başlık olarak kullanılır.
+    """
+    try:
+        archive = zipfile.ZipFile(file)
+        shared_strings = _read_shared_strings(archive)
+        sheet = archive.open(_first_sheet_path(archive))
+    except (zipfile.BadZipFile, KeyError, ParseError):
+        raise ImportFileError("XLSX dosyası okunamadı")
+
+    header = None
+    try:
+        with sheet:
+            for _, element in iterparse(sheet):
+                if _local_name(element.tag) != 'row':
+                    continue
+                values = {}
+                for cell in element:
+                    if _local_name(cell.tag) == 'c':
+                        values[_column_index(cell.get('r'))] = _cell_value(cell, shared_strings)
+                row_number = int(element.get('r'))
+                element.clear()
+
+                if _is_blank(values.values()):
+                    continue
+                if header is None:
+                    header = {index: str(value).strip() for index, value in values.items() if value != ''}
+                    continue
+                yield row_number, {name: values.get(index, '') for index, name in header.items()}
+    except (ParseError, IndexError, ValueError, AttributeError) as e:
+        raise ImportFileError(f"XLSX dosyası okunamadı: {e}")
+
+
+def iter_import_rows(file, file_format):
+    """
+    Biçime göre dosya satırlarını (satır numarası, {başlık: değer}) olarak üretir.
+    """
+    if file_format == 'xlsx':
+        return iter_xlsx_rows(file)
+    if file_format == 'json':
+        return iter_json_rows(file)
+    return iter_csv_rows(file)
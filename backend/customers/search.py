@@ -0,0 +1,126 @@
+"""
+Firma ve iletişim kişileri için tam metin arama.
+
+Her kayıt için Türkçe karakterleri sadeleştirilmiş (ı/İ → i, ş → s, ğ → g ...)
+bir `search_document` metni tutulur. PostgreSQL'de bu metinden `search_vector`
+(tsvector) kolonu üretilir ve GIN indeksi üzerinden önek (prefix) eşleşmeli,
+sıralı (ranked) arama yapılır. Diğer veritabanlarında (ör. testlerdeki SQLite)
+aynı doküman üzerinde kelime başı eşleşmesi kullanılır.
+"""
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connection
+from django.db.models import F, Q
+
+SEARCH_CONFIG = 'simple'
+
+# Türkçe'ye özgü harflerin aranabilir karşılıkları; 'I' ve 'ı' da 'i' olarak
+# katlanır ki "ışık", "IŞIK" ve "isik" aynı kaydı bulsun
+TURKISH_FOLDING = str.maketrans({
+    'İ': 'i', 'I': 'i', 'ı': 'i',
+    'Ş': 's', 'ş': 's',
+    'Ğ': 'g', 'ğ': 'g',
+    'Ü': 'u', 'ü': 'u',
+    'Ö': 'o', 'ö': 'o',
+    'Ç': 'c', 'ç': 'c',
+    'Â': 'a', 'â': 'a',
+    'Î': 'i', 'î': 'i',
+    'Û': 'u', 'û': 'u',
+})
+
+TOKEN_RE = re.compile(r"[\w@.+-]+")
+
+
+def normalize_search_text(value):
+    """
+    Metni aramaya uygun hale getirir: Türkçe harfleri katlar, küçük harfe
+    çevirir ve kelime dışı karakterleri boşluğa dönüştürür.
+    """
+    if not value:
+        return ''
+    folded = str(value).translate(TURKISH_FOLDING).lower()
+    tokens = [token.strip('.-+') for token in TOKEN_RE.findall(folded)]
+    return ' '.join(token for token in tokens if token)
+
+
+def build_search_document(*values, digits=()):
+    """
+    Verilen alanlardan arama dokümanı üretir.
+
+    `digits` içindeki değerler (telefon, vergi numarası) ayrıca sadece
+    rakamlardan oluşan halleriyle eklenir; "0212 555 12 34" kaydı
+    "02125551234" aramasıyla da bulunur.
+    """
+    parts = [normalize_search_text(value) for value in values]
+    for value in digits:
+        only_digits = re.sub(r'\D', '', value or '')
+        if only_digits:
+            parts.append(only_digits)
+    return ' '.join(part for part in parts if part)
+
+
+def search_tokens(query):
+    """
+    Arama sorgusunu normalize edilmiş kelimelere ayırır.
+    """
+    return normalize_search_text(query).split()
+
+
+def uses_search_vector():
+    return connection.vendor == 'postgresql'
+
+
+def update_search_vectors(queryset):
+    """
+    PostgreSQL'de verilen kayıtların tsvector kolonunu tek UPDATE ile
+    search_document üzerinden yeniden hesaplar.
+    """
+    if uses_search_vector():
+        queryset.update(search_vector=SearchVector('search_document', config=SEARCH_CONFIG))
+
+
+def apply_search(queryset, query):
+    """
+    Queryset'i arama sorgusuna göre filtreler ve ilgiye göre sıralar.
+
+    Tüm kelimeler eşleşmelidir; son kelime yazılmaya devam ettiği için
+    her kelime önek olarak aranır.
+    """
+    tokens = search_tokens(query)
+    if not tokens:
+        return queryset.none()
+
+    if uses_search_vector():
+        raw_query = ' & '.join(
+            "'{}':*".format(token.replace("'", "''").replace('\\', '')) for token in tokens
+        )
+        search_query = SearchQuery(raw_query, search_type='raw', config=SEARCH_CONFIG)
+        return (
+            queryset
+            .filter(search_vector=search_query)
+            .annotate(rank=SearchRank(F('search_vector'), search_query))
+            .order_by('-rank', 'pk')
+        )
+
+    # Kelime başı eşleşmesi: doküman bu kelimeyle başlar ya da ' kelime' içerir
+    condition = Q()
+    for token in tokens:
+        condition &= Q(search_document__startswith=token) | Q(search_document__contains=f' {token}')
+    return queryset.filter(condition).order_by('pk')
+
+
+def search_customers(query, limit=20):
+    """
+    Firma ve iletişim kişilerinde aynı anda arama yapar.
+
+    Returns:
+        tuple: (firmalar, kişiler) - her biri en fazla `limit` kayıt
+    """
+    from .models import Company, Contact
+
+    companies = apply_search(Company.objects.with_list_stats(), query)[:limit]
+    contacts = apply_search(
+        Contact.objects.select_related('company').prefetch_related('notes'), query
+    )[:limit]
+    return list(companies), list(contacts)
@@ -1,5 +1,10 @@
+from django.db.models import Sum
 from rest_framework import serializers
-from .models import Company, Contact, Note
+from .models import Company, Contact, DuplicateCandidate, Note
+
+# Arama ve eşleştirme için tutulan türetilmiş alanlar API'de gösterilmez
+SEARCH_FIELDS = ('search_document', 'search_vector')
+COMPANY_DERIVED_FIELDS = (*SEARCH_FIELDS, 'domain')
 
 
 class NoteNestedSerializer(serializers.ModelSerializer):
@@ -22,7 +27,9 @@ class ContactSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Contact
-        fields = '__all__'
+        exclude = SEARCH_FIELDS
+        # Ana kişi kısıtı doğrulanmaz; yeni ana kişi kaydedilirken eskisi Contact.save() ile kaldırılır
+        validators = []
 
 
 class ContactNestedSerializer(serializers.ModelSerializer):
@@ -31,7 +38,7 @@ class ContactNestedSerializer(serializers.ModelSerializer):
     """
     class Meta:
         model = Contact
-        exclude = ('company',)  # Firma içinde gösterildiği için firma alanını hariç tutuyoruz
+        exclude = ('company', *SEARCH_FIELDS)  # Firma içinde gösterildiği için firma alanını hariç tutuyoruz
 
 
 class CompanyListSerializer(serializers.ModelSerializer):
@@ -39,16 +46,39 @@ class CompanyListSerializer(serializers.ModelSerializer):
     Firma listesi için kısa serializer
     """
     contact_count = serializers.SerializerMethodField()
+    open_opportunity_count = serializers.SerializerMethodField()
+    pipeline_value = serializers.SerializerMethodField()
     company_size_display = serializers.CharField(source='get_company_size_display', read_only=True)
 
     class Meta:
         model = Company
         fields = ('id', 'name', 'industry', 'company_size', 'company_size_display',
-                 'phone', 'email', 'linkedin_url', 'website_url', 'contact_count')
+                 'phone', 'email', 'linkedin_url', 'website_url', 'contact_count',
+                 'open_opportunity_count', 'pipeline_value')
+
+    # Değerler CompanyQuerySet.with_list_stats() ile annotate edilmişse doğrudan kullanılır,
+    # edilmemişse tek kayıt için ayrı sorgu çalıştırılır
 
     def get_contact_count(self, obj):
+        if hasattr(obj, 'contact_count'):
+            return obj.contact_count
         return obj.contacts.count()
 
+    def get_open_opportunity_count(self, obj):
+        if hasattr(obj, 'open_opportunity_count'):
+            return obj.open_opportunity_count
+        return self._open_opportunities(obj).count()
+
+    def get_pipeline_value(self, obj):
+        if hasattr(obj, 'pipeline_value'):
+            value = obj.pipeline_value
+        else:
+            value = self._open_opportunities(obj).aggregate(total=Sum('value'))['total'] or 0
+        return serializers.DecimalField(max_digits=14, decimal_places=2).to_representation(value)
+
+    def _open_opportunities(self, obj):
+        return obj.opportunities.filter(status__is_won=False, status__is_lost=False)
+
 
 class CompanyDetailSerializer(serializers.ModelSerializer):
     """
@@ -59,7 +89,7 @@ class CompanyDetailSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Company
-        fields = '__all__'
+        exclude = COMPANY_DERIVED_FIELDS
 
 
 class CompanyCreateUpdateSerializer(serializers.ModelSerializer):
@@ -68,7 +98,7 @@ class CompanyCreateUpdateSerializer(serializers.ModelSerializer):
     """
     class Meta:
         model = Company
-        fields = '__all__'
+        exclude = COMPANY_DERIVED_FIELDS
 
 
 class NoteSerializer(serializers.ModelSerializer):
@@ -102,4 +132,99 @@ class NoteSerializer(serializers.ModelSerializer):
                 "Not en az bir firma veya kişiye bağlı olmalıdır."
             )
 
-        return data
\ No newline at end of file
+        return data
+
+class CompanyImportSerializer(serializers.ModelSerializer):
+    """
+    İçe aktarılan firma satırlarının doğrulanması
+    """
+    class Meta:
+        model = Company
+        fields = ('name', 'tax_number', 'industry', 'company_size', 'address', 'phone', 'email',
+                  'linkedin_url', 'website_url')
+
+
+class SetPrimaryContactsSerializer(serializers.Serializer):
+    """
+    Birden fazla firmanın ana irtibat kişisini tek istekte değiştirmek için serializer
+    """
+    contact_ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=1000
+    )
+
+    def validate_contact_ids(self, value):
+        contact_ids = list(dict.fromkeys(value))
+        companies = dict(Contact.objects.filter(pk__in=contact_ids).values_list('pk', 'company_id'))
+
+        missing = [pk for pk in contact_ids if pk not in companies]
+        if missing:
+            raise serializers.ValidationError(f"Kişi bulunamadı: {', '.join(map(str, missing))}")
+        if len(set(companies.values())) != len(contact_ids):
+            raise serializers.ValidationError("Her firma için yalnızca bir kişi seçilebilir.")
+        return contact_ids
+
+
+class ContactImportSerializer(serializers.ModelSerializer):
+    """
+    İçe aktarılan kişi satırlarının doğrulanması; firma id, vergi numarası,
+    web sitesi veya adıyla belirtilir
+    """
+    company_id = serializers.IntegerField(required=False, min_value=1)
+    company_name = serializers.CharField(required=False, max_length=255)
+    company_tax_number = serializers.CharField(required=False, max_length=20)
+    company_website = serializers.CharField(required=False, max_length=200)
+
+    COMPANY_REFERENCE_FIELDS = ('company_id', 'company_name', 'company_tax_number', 'company_website')
+
+    class Meta:
+        model = Contact
+        fields = ('first_name', 'last_name', 'position', 'phone', 'email', 'is_primary', 'lead_source',
+                  'lead_status', 'linkedin_url', 'personal_website', 'company_id', 'company_name',
+                  'company_tax_number', 'company_website')
+
+    def validate(self, data):
+        if not any(data.get(field) for field in self.COMPANY_REFERENCE_FIELDS):
+            raise serializers.ValidationError({
+                'company': "Firma bilgisi gerekli (company_id, company_name, company_tax_number veya company_website)."
+            })
+        return data
+
+
+class MergeSerializer(serializers.Serializer):
+    """
+    Kayıt birleştirme isteği; kaynak kayıtlar hedefe taşınıp silinir
+    """
+    source_ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=100
+    )
+
+
+class DuplicateCandidateSerializer(serializers.ModelSerializer):
+    """
+    Mükerrer aday çifti; kayıt özetleri view tarafından toplu yüklenip
+    `records` context'i ile verilir
+    """
+    first = serializers.SerializerMethodField()
+    second = serializers.SerializerMethodField()
+
+    class Meta:
+        model = DuplicateCandidate
+        fields = ('id', 'entity_type', 'first_id', 'second_id', 'score', 'reasons', 'status',
+                  'first', 'second', 'created_at', 'updated_at')
+        read_only_fields = fields
+
+    def get_record(self, obj, object_id):
+        return self.context.get('records', {}).get((obj.entity_type, object_id))
+
+    def get_first(self, obj):
+        return self.get_record(obj, obj.first_id)
+
+    def get_second(self, obj):
+        return self.get_record(obj, obj.second_id)
+
+
+class DuplicateMergeSerializer(serializers.Serializer):
+    """
+    Aday çiftin birleştirilmesi; `keep` korunacak kaydı belirtir
+    """
+    keep = serializers.ChoiceField(choices=['first', 'second'], default='first')
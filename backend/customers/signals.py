@@ -0,0 +1,18 @@
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from .dedupe import forget_records
+from .models import Company, Contact
+
+
+@receiver(post_delete, sender=Company)
+def forget_deleted_company(sender, instance, **kwargs):
+    """
+    Silinen (veya birleştirilen) firmanın eşleştirme anahtarlarını ve mükerrer adaylarını kaldır.
+    """
+    forget_records('company', [instance.pk])
+
+
+@receiver(post_delete, sender=Contact)
+def forget_deleted_contact(sender, instance, **kwargs):
+    forget_records('contact', [instance.pk])
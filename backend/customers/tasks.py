@@ -0,0 +1,21 @@
+import logging
+
+from celery import shared_task
+
+from .dedupe import ENTITIES, find_duplicates
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def find_duplicate_customers():
+    """
+    Son taramadan sonra eklenen veya değişen firma ve kişiler için mükerrer adayları güncelle
+    """
+    results = {entity_type: find_duplicates(entity_type) for entity_type in ENTITIES}
+    summary = ', '.join(
+        f"{entity_type}: {result['scanned']} scanned, {result['candidates']} candidates"
+        for entity_type, result in results.items()
+    )
+    logger.info(f"Duplicate scan finished ({summary})")
+    return f"Duplicate scan finished ({summary})"
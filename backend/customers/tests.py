@@ -1,3 +1,608 @@
-from django.test import TestCase
+import base64
+import io
+import json
+import os
+import tempfile
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from communications.models import EmailMessage, IncomingEmail
+from crm_project.testing import QueryBudgetMixin
+from events.models import Event, EventParticipant
+from opportunities.models import Opportunity, OpportunityStatus
+from .dedupe import company_core_name, find_duplicates
+from .models import Company, Contact, DuplicateBlockingKey, DuplicateCandidate, DuplicateScanState, Note
+from .search import normalize_search_text
+from .urls import router
+
+
+class CustomersQueryBudgetTests(QueryBudgetMixin, APITestCase):
+    """
+    Müşteri endpoint'lerinin sorgu bütçeleri (N+1 regresyonlarını yakalar)
+    """
+    router = router
+    budgets = {
+        'company-list': 1,
+        'company-detail': 3,
+        'company-export': 1,
+        'company-contacts': 3,
+        'company-timeline': 7,
+        'company-search': 3,
+        'company-supabase-companies': 1,
+        'contact-list': 2,
+        'contact-detail': 2,
+        'contact-export': 1,
+        'contact-search': 3,
+        'contact-timeline': 8,
+        'contact-supabase-by-company': 2,
+        'note-list': 1,
+        'note-detail': 1,
+        'note-company-notes': 1,
+        'note-contact-notes': 1,
+        'duplicatecandidate-list': 3,
+        'duplicatecandidate-detail': 2,
+    }
+    route_params = {
+        'company-search': {'q': 'a'},
+        'contact-search': {'q': 'a'},
+        'note-company-notes': lambda: {'company_id': Company.objects.order_by('pk').first().pk},
+        'note-contact-notes': lambda: {'contact_id': Company.objects.order_by('pk').first().contacts.first().pk},
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        # Aday listesi ve detayı için birer mükerrer firma ve kişi
+        company = Company.objects.create(name='Türk Telekom A.Ş.')
+        duplicate = Company.objects.create(name='Turk Telekom AS')
+        Contact.objects.create(company=company, first_name='Ayşe', last_name='Yılmaz', email='ayse@turktelekom.com.tr')
+        Contact.objects.create(company=duplicate, first_name='Ayse', last_name='Yilmaz', email='AYSE@turktelekom.com.tr')
+        for entity_type in ('company', 'contact'):
+            find_duplicates(entity_type, full=True)
+
+
+class CompanyPaginationTests(APITestCase):
+    """
+    Firma listesinin keyset sayfalaması ve imleç doğrulaması
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='sayfalama', password='test-password')
+        self.client.force_authenticate(self.user)
+        for index in range(5):
+            Company.objects.create(name=f'Firma {index}')
+
+    def test_pages_follow_cursor(self):
+        names, url, params = [], reverse('company-list'), {'page_size': 2}
+        while url:
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 200)
+            names += [company['name'] for company in response.data['results']]
+            url, params = response.data['next'], {}
+        self.assertEqual(sorted(names), [f'Firma {index}' for index in range(5)])
+
+    def test_cursor_value_is_validated(self):
+        url = reverse('company-list')
+        for position in (['not-a-date', 1], ['2024-01-01T00:00:00', 'x'], [None]):
+            cursor = base64.b64encode(json.dumps({'p': position}).encode()).decode()
+            response = self.client.get(url, {'cursor': cursor})
+            self.assertEqual(response.status_code, 404)
+
+        response = self.client.get(url, {'ordering': 'name', 'page_size': 2})
+        response = self.client.get(response.data['next'])
+        self.assertEqual(response.status_code, 200)
+
+
+class CustomerSearchTests(APITestCase):
+    """
+    Firma/kişi tam metin aramasının davranışı
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command('create_test_data', stdout=StringIO())
+        cls.user = User.objects.create_user(username='search_user', password='test-password')
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def search(self, query, url_name='company-search', **params):
+        response = self.client.get(reverse(url_name), {'q': query, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_turkish_characters_are_folded(self):
+        self.assertEqual(normalize_search_text('IŞIK Yılmaz Çağrı Ömür'), 'isik yilmaz cagri omur')
+
+        data = self.search('yilmaz')
+        self.assertIn('Yılmaz', [contact['last_name'] for contact in data['contacts']])
+
+        data = self.search('TÜRK')
+        self.assertIn('Türk Telekom A.Ş.', [company['name'] for company in data['companies']])
+
+    def test_prefix_matching_for_type_ahead(self):
+        data = self.search('gara')
+        self.assertEqual([company['name'] for company in data['companies']], ['Garanti BBVA'])
+        # Kişiler firma adıyla da bulunur
+        self.assertTrue(data['contacts'])
+        self.assertTrue(all(contact['company_name'] == 'Garanti BBVA' for contact in data['contacts']))
+
+    def test_all_terms_must_match(self):
+        data = self.search('ayşe satış')
+        self.assertEqual([(c['first_name'], c['last_name']) for c in data['contacts']], [('Ayşe', 'Kaya')])
+        self.assertEqual(data['companies'], [])
+
+    def test_phone_digits_and_email(self):
+        data = self.search('902123143434')
+        self.assertEqual([c['name'] for c in data['companies']], ['Arçelik A.Ş.'])
+
+        data = self.search('mehmet.yilmaz@turktelekom')
+        self.assertEqual(len(data['contacts']), 1)
+
+    def test_limit_is_honoured_and_both_endpoints_match(self):
+        data = self.search('a', limit=2)
+        self.assertEqual(len(data['companies']), 2)
+        self.assertEqual(len(data['contacts']), 2)
+        self.assertEqual(self.search('a', url_name='contact-search', limit=2), data)
+
+    def test_missing_query(self):
+        response = self.client.get(reverse('company-search'))
+        self.assertEqual(response.status_code, 400)
+
+    def test_documents_follow_company_rename(self):
+        company = Company.objects.get(name='Kreatif Ajans')
+        company.name = 'Dijital Stüdyo'
+        company.save()
+
+        data = self.search('stüdyo')
+        self.assertEqual([c['name'] for c in data['companies']], ['Dijital Stüdyo'])
+        self.assertEqual(len(data['contacts']), Contact.objects.filter(company=company).count())
+
+
+    def test_refresh_search_documents_in_batches(self):
+        Contact.objects.update(search_document='')
+        total = Contact.objects.count()
+
+        with CaptureQueriesContext(connection) as queries:
+            updated = Contact.objects.all().refresh_search_documents(batch_size=3)
+
+        self.assertEqual(updated, total)
+        self.assertFalse(Contact.objects.filter(search_document='').exists())
+        # Parti başına bir okuma (+ partilerin bittiğini gösteren boş okuma)
+        reads = [query for query in queries.captured_queries if query['sql'].startswith('SELECT')]
+        self.assertEqual(len(reads), -(-total // 3) + 1)
+        self.assertTrue(all('LIMIT 3' in query['sql'] for query in reads))
+
+
+class CustomerImportTests(APITestCase):
+    """
+    Firma ve kişilerin dosyadan toplu içe aktarımı
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='importer', password='test-password')
+        self.client.force_authenticate(self.user)
+        self.acme = Company.objects.create(name='Acme', tax_number='1234567890', website_url='https://www.acme.com.tr')
+        self.globex = Company.objects.create(name='Globex', email='info@globex.com')
+        self.primary = Contact.objects.create(company=self.acme, first_name='Ali', last_name='Veli',
+                                              email='ali@acme.com.tr', is_primary=True)
+
+    def upload(self, url_name, name, content, **data):
+        upload = SimpleUploadedFile(name, content.encode('utf-8') if isinstance(content, str) else content)
+        return self.client.post(reverse(url_name), {'file': upload, **data}, format='multipart')
+
+    def test_company_csv_import_matches_by_tax_number_and_domain(self):
+        content = (
+            'Firma Adı;Vergi Numarası;Website URL;E-posta;Firma Büyüklüğü\n'
+            'Acme Holding;123 456 7890;;;Küçük (1-50 çalışan)\n'
+            'Globex Teknoloji;;http://globex.com/;;\n'
+            'Initech;;;satis@initech.com;large\n'
+            ';;;;\n'
+            'Hatalı;;;gecersiz-eposta;\n'
+        )
+        response = self.upload('company-import', 'firmalar.csv', content)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['total_rows'], 4)
+        self.assertEqual((response.data['created'], response.data['updated']), (1, 2))
+        self.assertEqual(response.data['error_count'], 1)
+        self.assertEqual(response.data['errors'][0]['row'], 6)
+        self.assertIn('email', response.data['errors'][0]['errors'])
+
+        self.acme.refresh_from_db()
+        self.assertEqual((self.acme.name, self.acme.company_size), ('Acme Holding', 'small'))
+        self.assertEqual(Company.objects.get(name='Globex Teknoloji').pk, self.globex.pk)
+        initech = Company.objects.get(name='Initech')
+        self.assertEqual(initech.domain, 'initech.com')
+        self.assertIn('initech', initech.search_document)
+        # Firma adı değişince kişilerin arama dokümanı da güncellenir
+        self.primary.refresh_from_db()
+        self.assertIn('holding', self.primary.search_document)
+
+    def test_contact_json_import_resolves_companies_and_primary_contacts(self):
+        rows = [
+            {'first_name': 'Ali', 'last_name': 'Veli', 'email': 'ALI@acme.com.tr', 'position': 'Müdür',
+             'company_tax_number': '1234567890'},
+            {'first_name': 'Ayşe', 'last_name': 'Yıldız', 'email': 'ayse@acme.com.tr', 'is_primary': 'Evet',
+             'company_website': 'acme.com.tr'},
+            {'first_name': 'Can', 'last_name': 'Er', 'email': 'can@yeni.com', 'is_primary': True,
+             'company_name': 'Yeni Firma'},
+            {'first_name': 'Deniz', 'last_name': 'Ak', 'is_primary': True, 'company_name': 'Yeni Firma'},
+            {'first_name': 'Eda', 'last_name': 'Su', 'company_tax_number': '999'},
+        ]
+        response = self.upload('contact-import', 'kisiler.json', json.dumps(rows))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['created'], response.data['updated']), (3, 1))
+        self.assertEqual(response.data['companies_created'], 1)
+        self.assertEqual(response.data['errors'], [{'row': 5, 'errors': {'company': ['Firma bulunamadı.']}}])
+
+        self.primary.refresh_from_db()
+        self.assertEqual(self.primary.position, 'Müdür')
+        self.assertFalse(self.primary.is_primary)
+        self.assertEqual(
+            list(Contact.objects.filter(is_primary=True).values_list('first_name', flat=True).order_by('first_name')),
+            ['Ayşe', 'Deniz'],
+        )
+        new_company = Company.objects.get(name='Yeni Firma')
+        self.assertEqual(new_company.contacts.count(), 2)
+
+    def test_malformed_company_website_is_a_row_error(self):
+        rows = [
+            {'first_name': 'Ali', 'last_name': 'Veli', 'company_website': 'http://[abc'},
+            {'first_name': 'Ayşe', 'last_name': 'Yıldız', 'company_website': 'acme.com.tr'},
+        ]
+        response = self.upload('contact-import', 'kisiler.json', json.dumps(rows))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual(response.data['errors'], [{'row': 1, 'errors': {'company': ['Firma bulunamadı.']}}])
+
+    def test_contact_export_round_trip(self):
+        response = self.client.get(reverse('contact-export'), {'export_format': 'xlsx'})
+        content = b''.join(response.streaming_content)
+
+        response = self.upload('contact-import', 'kisiler.xlsx', content, dry_run='true')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['dry_run'])
+        self.assertEqual((response.data['unchanged'], response.data['error_count']), (1, 0))
+        self.assertEqual(response.data['ignored_columns'], ['ID', 'Oluşturulma Tarihi'])
+
+    def test_dry_run_and_no_update(self):
+        response = self.upload('company-import', 'firmalar.json',
+                               '{"name": "Yeni"}\n{"name": "Acme 2", "tax_number": "1234567890"}',
+                               dry_run='1')
+        self.assertEqual((response.data['created'], response.data['updated']), (1, 1))
+        self.assertFalse(Company.objects.filter(name='Yeni').exists())
+
+        response = self.upload('company-import', 'firmalar.json',
+                               '[{"name": "Acme 2", "tax_number": "1234567890"}]', update_existing='false')
+        self.assertEqual(response.data['skipped'], 1)
+        self.acme.refresh_from_db()
+        self.assertEqual(self.acme.name, 'Acme')
+
+    def test_invalid_files_are_rejected(self):
+        self.assertEqual(self.client.post(reverse('company-import'), {}, format='multipart').status_code, 400)
+        self.assertEqual(self.upload('company-import', 'firmalar.pdf', 'x').status_code, 400)
+        self.assertEqual(self.upload('company-import', 'firmalar.xlsx', 'x').status_code, 400)
+        response = self.upload('company-import', 'firmalar.json', '[{"name": "A"}, 3]')
+        self.assertEqual(response.status_code, 400)
+
+    def test_import_command(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False, encoding='utf-8') as file:
+            file.write('name,tax_number\nUmbrella,555\n')
+        self.addCleanup(os.remove, file.name)
+
+        output = io.StringIO()
+        call_command('import_customers', 'companies', file.name, stdout=output)
+
+        self.assertIn('1 yeni', output.getvalue())
+        self.assertTrue(Company.objects.filter(name='Umbrella', tax_number='555').exists())
+
+
+class PrimaryContactTests(APITestCase):
+    """
+    Firma başına tek ana irtibat kişisi kuralı
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='primary_user', password='test-password')
+        self.client.force_authenticate(self.user)
+        self.companies = [Company.objects.create(name=f'Firma {index}') for index in range(3)]
+        self.contacts = {
+            company.pk: [
+                Contact.objects.create(company=company, first_name=name, last_name='Test', is_primary=name == 'A')
+                for name in ('A', 'B')
+            ]
+            for company in self.companies
+        }
+
+    def primaries(self):
+        return set(Contact.objects.filter(is_primary=True).values_list('company_id', 'first_name'))
+
+    def test_constraint_rejects_second_primary(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Contact.objects.filter(first_name='B', company=self.companies[0]).update(is_primary=True)
+
+    def test_save_switches_primary_only_when_it_changes(self):
+        first, second = self.contacts[self.companies[0].pk]
+        second.is_primary = True
+        second.save()
+        self.assertEqual(self.primaries(), {(self.companies[0].pk, 'B'), (self.companies[1].pk, 'A'),
+                                            (self.companies[2].pk, 'A')})
+
+        second.position = 'Müdür'
+        with CaptureQueriesContext(connection) as queries:
+            second.save()
+        # Ana kişi değişmediği için diğer kişileri kaldıran UPDATE çalışmaz
+        self.assertEqual(len([query for query in queries if query['sql'].startswith('UPDATE')]), 1)
+
+    def test_set_primary_for_many_companies(self):
+        contact_ids = [self.contacts[company.pk][1].pk for company in self.companies]
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('contact-set-primary'), {'contact_ids': contact_ids}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['updated_count'], 3)
+        self.assertEqual(self.primaries(), {(company.pk, 'B') for company in self.companies})
+        # Firma sayısından bağımsız: doğrulama + iki UPDATE (+ savepoint)
+        self.assertLessEqual(len([q for q in queries if not q['sql'].startswith(('SAVEPOINT', 'RELEASE'))]), 3)
+
+    def test_set_primary_rejects_two_contacts_of_same_company(self):
+        contact_ids = [contact.pk for contact in self.contacts[self.companies[0].pk]]
+        response = self.client.post(reverse('contact-set-primary'), {'contact_ids': contact_ids}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('contact_ids', response.data)
+
+    def test_api_create_with_primary_replaces_previous(self):
+        company = self.companies[0]
+        response = self.client.post(reverse('contact-list'), {
+            'company': company.pk, 'first_name': 'C', 'last_name': 'Test', 'is_primary': True,
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(list(company.contacts.filter(is_primary=True).values_list('first_name', flat=True)), ['C'])
+
+
+class DuplicateTests(APITestCase):
+    """
+    Mükerrer kayıt tespiti ve birleştirme
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='dedupe_user', password='test-password')
+        self.client.force_authenticate(self.user)
+        self.telekom = Company.objects.create(name='Türk Telekom A.Ş.', phone='0212 555 12 34')
+        self.duplicate = Company.objects.create(
+            name='Turk Telekom AS', phone='+90 212 555 1234', tax_number='1234567890', website_url='https://turktelekom.com.tr'
+        )
+        self.other = Company.objects.create(name='Türk Hava Yolları A.O.')
+
+    def candidate(self, entity_type, first, second):
+        first_id, second_id = sorted([first.pk, second.pk])
+        return DuplicateCandidate.objects.filter(entity_type=entity_type, first_id=first_id, second_id=second_id).first()
+
+    def test_company_names_are_normalized(self):
+        self.assertEqual(company_core_name('Türk Telekom A.Ş.'), 'turk telekom')
+        self.assertEqual(company_core_name('TURK TELEKOM ANONİM ŞİRKETİ'), 'turk telekom')
+
+    def test_companies_are_matched_by_blocks(self):
+        result = find_duplicates('company')
+        self.assertEqual(result['scanned'], 3)
+
+        candidate = self.candidate('company', self.telekom, self.duplicate)
+        self.assertGreaterEqual(candidate.score, 0.8)
+        self.assertEqual(set(candidate.reasons), {'name', 'phone'})
+        # Aynı kelimeyle başlayan ama farklı firma eşik altında kalır
+        self.assertIsNone(self.candidate('company', self.telekom, self.other))
+        self.assertEqual(DuplicateCandidate.objects.count(), 1)
+
+    def test_scan_is_incremental(self):
+        find_duplicates('company')
+        Company.objects.update(updated_at=timezone.now() - timedelta(days=1))
+        state_time = timezone.now() - timedelta(hours=1)
+        DuplicateScanState.objects.filter(entity_type='company').update(last_scanned_at=state_time)
+
+        new = Company.objects.create(name='TÜRK TELEKOM ANONİM ŞİRKETİ', tax_number='1234567890')
+        result = find_duplicates('company')
+        # Yalnızca yeni kayıt taranır, eski kayıtlar blok komşusu olarak puanlanır
+        self.assertEqual(result['scanned'], 1)
+        self.assertEqual(self.candidate('company', self.duplicate, new).score, 1.0)
+        self.assertIsNotNone(self.candidate('company', self.telekom, new))
+
+    def test_contacts_with_same_email_are_matched(self):
+        first = Contact.objects.create(company=self.telekom, first_name='Ayşe', last_name='Yılmaz', email='ayse@example.com')
+        second = Contact.objects.create(company=self.other, first_name='A.', last_name='Kaya', email='AYSE@example.com ')
+        Contact.objects.create(company=self.other, first_name='Mehmet', last_name='Yılmaz')
+
+        find_duplicates('contact')
+        candidate = self.candidate('contact', first, second)
+        self.assertEqual((candidate.score, candidate.reasons), (1.0, ['email']))
+        self.assertEqual(DuplicateCandidate.objects.filter(entity_type='contact').count(), 1)
+
+    def test_dismissed_candidates_survive_rescans_and_deleted_records_are_forgotten(self):
+        find_duplicates('company')
+        candidate = self.candidate('company', self.telekom, self.duplicate)
+
+        response = self.client.get(reverse('duplicatecandidate-list'), {'type': 'company'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['first']['name'], 'Türk Telekom A.Ş.')
+
+        response = self.client.post(reverse('duplicatecandidate-dismiss', args=[candidate.pk]))
+        self.assertEqual(response.data['status'], 'dismissed')
+        find_duplicates('company', full=True)
+        self.assertEqual(self.candidate('company', self.telekom, self.duplicate).status, 'dismissed')
+        self.assertEqual(self.client.get(reverse('duplicatecandidate-list')).data['results'], [])
+
+        self.duplicate.delete()
+        self.assertFalse(DuplicateCandidate.objects.exists())
+        self.assertFalse(DuplicateBlockingKey.objects.filter(entity_type='company', object_id=self.duplicate.pk).exists())
+
+    def test_merge_companies_repoints_relations(self):
+        status = OpportunityStatus.objects.create(name='Yeni', order=1)
+        Contact.objects.create(company=self.telekom, first_name='Eski', last_name='Kişi')
+        primary = Contact.objects.create(company=self.duplicate, first_name='Ana', last_name='Kişi', is_primary=True)
+        Note.objects.create(title='Not', content='...', company=self.duplicate)
+        opportunity = Opportunity.objects.create(
+            title='Fırsat', company=self.duplicate, status=status, value=Decimal('100'), expected_close_date=date.today()
+        )
+        event = Event.objects.create(title='Toplantı', company=self.duplicate, start_datetime=timezone.now())
+        EmailMessage.objects.create(subject='Teklif', content='...', sender='a@example.com', recipients=[],
+                                    company=self.duplicate)
+        IncomingEmail.objects.create(message_id='<1@example.com>', subject='Yanıt', content='...',
+                                     sender_email='b@example.com', recipients=[], company=self.duplicate,
+                                     received_at=timezone.now())
+        find_duplicates('company')
+        candidate = self.candidate('company', self.telekom, self.duplicate)
+
+        keep = 'first' if candidate.first_id == self.telekom.pk else 'second'
+        response = self.client.post(reverse('duplicatecandidate-merge', args=[candidate.pk]), {'keep': keep}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['merged_ids'], [self.duplicate.pk])
+        self.assertEqual(response.data['moved']['customers.Contact'], 1)
+
+        self.assertFalse(Company.objects.filter(pk=self.duplicate.pk).exists())
+        self.assertFalse(DuplicateCandidate.objects.exists())
+        self.telekom.refresh_from_db()
+        # Boş alanlar birleştirilen firmadan doldurulur
+        self.assertEqual((self.telekom.tax_number, self.telekom.domain), ('1234567890', 'turktelekom.com.tr'))
+        self.assertEqual(self.telekom.contacts.count(), 2)
+        self.assertEqual(list(self.telekom.contacts.filter(is_primary=True)), [primary])
+        self.assertEqual(self.telekom.notes.count(), 1)
+        opportunity.refresh_from_db()
+        event.refresh_from_db()
+        self.assertEqual((opportunity.company_id, event.company_id), (self.telekom.pk, self.telekom.pk))
+        self.assertEqual(self.telekom.emails.count(), 1)
+        self.assertEqual(IncomingEmail.objects.get().company_id, self.telekom.pk)
+        primary.refresh_from_db()
+        self.assertIn('turk telekom', primary.search_document)
+
+    def test_merge_contacts_deduplicates_links(self):
+        status = OpportunityStatus.objects.create(name='Yeni', order=1)
+        target = Contact.objects.create(company=self.telekom, first_name='Ayşe', last_name='Yılmaz')
+        sources = [
+            Contact.objects.create(company=self.telekom, first_name='Ayse', last_name='Yilmaz',
+                                   email='ayse@example.com', is_primary=True),
+            Contact.objects.create(company=self.other, first_name='A.', last_name='Yılmaz', position='Müdür'),
+        ]
+        shared, own = [
+            Opportunity.objects.create(title=title, company=self.telekom, status=status, value=Decimal('1'),
+                                       expected_close_date=date.today())
+            for title in ('Ortak', 'Kaynak')
+        ]
+        shared.contacts.add(target, *sources)
+        own.contacts.add(*sources)
+        event = Event.objects.create(title='Toplantı', start_datetime=timezone.now())
+        event.contacts.add(*sources)
+        EventParticipant.objects.create(event=event, contact=sources[0], status='accepted')
+        EventParticipant.objects.create(event=event, contact=sources[1])
+        Note.objects.create(title='Not', content='...', contact=sources[1])
+
+        response = self.client.post(reverse('contact-merge', args=[target.pk]),
+                                    {'source_ids': [source.pk for source in sources]}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(Contact.objects.filter(pk__in=[source.pk for source in sources]).count(), 0)
+        self.assertEqual(list(shared.contacts.all()), [target])
+        self.assertEqual(list(own.contacts.all()), [target])
+        self.assertEqual(list(event.contacts.all()), [target])
+        self.assertEqual(list(EventParticipant.objects.values_list('contact_id', flat=True)), [target.pk])
+        self.assertEqual(target.notes.count(), 1)
+        target.refresh_from_db()
+        self.assertTrue(target.is_primary)
+        self.assertEqual((target.email, target.position), ('ayse@example.com', 'Müdür'))
+
+    def test_merge_errors(self):
+        url = reverse('company-merge', args=[self.telekom.pk])
+        response = self.client.post(url, {'source_ids': [self.telekom.pk]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('error', response.data)
+        response = self.client.post(url, {'source_ids': [999999]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertTrue(Company.objects.filter(pk=self.duplicate.pk).exists())
+
+
+class CustomerTimelineTests(APITestCase):
+    """
+    Firma/kişi aktivite akışının birleştirilmesi ve sayfalanması
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='timeline_user', password='test-password')
+        cls.company = Company.objects.create(name='Akış A.Ş.')
+        cls.contact = Contact.objects.create(company=cls.company, first_name='Zeynep', last_name='Demir')
+        other = Company.objects.create(name='Başka Firma')
+        status = OpportunityStatus.objects.create(name='Yeni', order=1)
+        opportunity = Opportunity.objects.create(
+            title='Lisans', company=cls.company, status=status, value=Decimal('10'), expected_close_date=date.today()
+        )
+        opportunity.contacts.add(cls.contact)
+
+        start = timezone.now() - timedelta(days=30)
+        at = lambda hours: start + timedelta(hours=hours)
+        # Kişiye bağlı not firma akışında da görünür; aynı zamanlı kayıtlar tür ve id ile sıralanır
+        Note.objects.create(title='Firma notu', content='x' * 500, company=cls.company, note_date=at(1))
+        Note.objects.create(title='Kişi notu', content='...', contact=cls.contact, note_date=at(2))
+        Note.objects.create(title='Başka not', content='...', company=other, note_date=at(3))
+        EmailMessage.objects.create(subject='Teklif', content='...', sender='a@example.com', recipients=[],
+                                    company=cls.company, contact=cls.contact, created_at=at(4), sent_at=at(5))
+        IncomingEmail.objects.create(message_id='<t1@example.com>', subject='Yanıt', content='...',
+                                     sender_email='b@example.com', recipients=[], contact=cls.contact,
+                                     received_at=at(5))
+        event = Event.objects.create(title='Demo', start_datetime=at(6))
+        event.contacts.add(cls.contact)
+        Event.objects.create(title='Ziyaret', company=cls.company, start_datetime=at(6))
+        opportunity.activities.create(type='call', title='Arama', description='...', performed_by=cls.user,
+                                      performed_at=at(7))
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def collect(self, url, **params):
+        items, pages = [], 0
+        while url:
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 200)
+            items += response.data['results']
+            url, params, pages = response.data['next'], {}, pages + 1
+        return items, pages
+
+    def test_company_timeline_merges_all_sources(self):
+        items, pages = self.collect(reverse('company-timeline', args=[self.company.pk]), page_size=3)
+        self.assertEqual(pages, 3)
+        self.assertEqual([(item['type'], item['title']) for item in items], [
+            ('opportunity_activity', 'Arama'),
+            ('event', 'Ziyaret'),
+            ('event', 'Demo'),
+            ('incoming_email', 'Yanıt'),
+            ('email', 'Teklif'),
+            ('note', 'Kişi notu'),
+            ('note', 'Firma notu'),
+        ])
+        self.assertEqual(items[0]['performed_by_name'], 'timeline_user')
+        self.assertEqual(len(items[-1]['summary']), 200)
+        self.assertNotIn('content', items[-1])
+
+    def test_contact_timeline_and_type_filter(self):
+        url = reverse('contact-timeline', args=[self.contact.pk])
+        items, _ = self.collect(url)
+        self.assertEqual([item['title'] for item in items], ['Arama', 'Demo', 'Yanıt', 'Teklif', 'Kişi notu'])
+
+        items, _ = self.collect(url, types='note,email')
+        self.assertEqual([item['type'] for item in items], ['email', 'note'])
+
+        response = self.client.get(url, {'types': 'note,call'})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(url, {'cursor': 'bozuk'})
+        self.assertEqual(response.status_code, 404)
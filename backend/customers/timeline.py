@@ -0,0 +1,207 @@
+"""
+Firma ve kişiler için birleşik aktivite akışı (müşteri 360).
+
+Not, gönderilen/alınan e-posta, etkinlik ve fırsat aktiviteleri tek bir
+UNION ALL sorgusunda (tür, id, zaman) üçlüleri olarak sıralanır; her kol
+kendi içinde sıralanıp sayfa boyutuyla sınırlandığından veritabanı tüm
+geçmişi birleştirmez. Sayfadaki kayıtların gösterilecek alanları ardından
+tür başına tek sorguyla yüklenir.
+
+Sayfalama keyset (imleç) tabanlıdır: sıralama (zaman, tür, id) üçlüsüne
+göre azalandır ve imleç son kaydın konumunu taşır.
+"""
+import json
+from base64 import b64decode, b64encode
+
+from django.db import connection
+from django.db.models import CharField, F, Q, Value
+from django.db.models.functions import Coalesce, Substr
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.utils.urls import replace_query_param
+
+from crm_project.pagination import KeysetPagination
+
+# Metin alanlarının akışta gösterilen uzunluğu
+SUMMARY_LENGTH = 200
+
+TIMELINE_TYPES = ('note', 'email', 'incoming_email', 'event', 'opportunity_activity')
+
+
+def _summary(field):
+    return Substr(field, 1, SUMMARY_LENGTH)
+
+
+def _timeline_sources():
+    """
+    Tür adı -> (model, zaman ifadesi, firma filtresi, kişi filtresi, gösterilecek alanlar).
+    Alanlar {yanıttaki ad: model alanı veya ifade} biçimindedir.
+    """
+    from communications.models import EmailMessage, IncomingEmail
+    from events.models import Event
+    from opportunities.models import OpportunityActivity
+
+    from .models import Note
+
+    event_contacts = Event.contacts.through.objects
+
+    return {
+        'note': (
+            Note,
+            Coalesce('note_date', 'created_at'),
+            lambda company: Q(company=company) | Q(contact__company=company),
+            lambda contact: Q(contact=contact),
+            {'title': 'title', 'summary': _summary('content'), 'company_id': 'company_id',
+             'contact_id': 'contact_id'},
+        ),
+        'email': (
+            EmailMessage,
+            Coalesce('sent_at', 'created_at'),
+            lambda company: Q(company=company) | Q(contact__company=company),
+            lambda contact: Q(contact=contact),
+            {'title': 'subject', 'summary': _summary('content'), 'status': 'status', 'sender': 'sender',
+             'recipients': 'recipients', 'contact_id': 'contact_id', 'opportunity_id': 'opportunity_id'},
+        ),
+        'incoming_email': (
+            IncomingEmail,
+            F('received_at'),
+            lambda company: Q(company=company) | Q(contact__company=company),
+            lambda contact: Q(contact=contact),
+            {'title': 'subject', 'status': 'status', 'sender': 'sender_email',
+             'sender_name': 'sender_name', 'has_attachments': 'has_attachments', 'contact_id': 'contact_id'},
+        ),
+        'event': (
+            Event,
+            F('start_datetime'),
+            # Katılımcılar üzerinden eşleşme alt sorguyla yapılır (JOIN satırları çoğaltmaz)
+            lambda company: Q(company=company) | Q(
+                pk__in=event_contacts.filter(contact__company=company).values('event_id')
+            ),
+            lambda contact: Q(pk__in=event_contacts.filter(contact=contact).values('event_id')),
+            {'title': 'title', 'event_type': 'event_type', 'status': 'status',
+             'end_datetime': 'end_datetime', 'location': 'location'},
+        ),
+        'opportunity_activity': (
+            OpportunityActivity,
+            F('performed_at'),
+            lambda company: Q(opportunity__company=company),
+            lambda contact: Q(opportunity__in=contact.opportunities.values('pk')),
+            {'title': 'title', 'summary': _summary('description'), 'activity_type': 'type',
+             'opportunity_id': 'opportunity_id', 'opportunity_title': 'opportunity__title',
+             'performed_by_name': 'performed_by__username'},
+        ),
+    }
+
+
+def _position_filter(item_type, cursor):
+    """
+    (zaman, tür, id) azalan sıralamasında imleçten sonra gelen kayıtlar; tür
+    her kolda sabit olduğundan karşılaştırması Python'da yapılır.
+    """
+    occurred_at, cursor_type, cursor_id = cursor
+    if item_type < cursor_type:
+        return Q(occurred_at__lte=occurred_at)
+    if item_type == cursor_type:
+        return Q(occurred_at__lt=occurred_at) | Q(occurred_at=occurred_at, pk__lt=cursor_id)
+    return Q(occurred_at__lt=occurred_at)
+
+
+def get_timeline(company=None, contact=None, types=TIMELINE_TYPES, cursor=None, limit=50):
+    """
+    Firmanın (kişileri dahil) veya kişinin aktivitelerini yeniden eskiye sıralı döner.
+
+    Args:
+        cursor: Bir önceki sayfanın son kaydının (zaman, tür, id) konumu
+        limit: Döndürülecek en fazla kayıt sayısı
+
+    Returns:
+        tuple: (kayıt listesi, sonraki sayfa var mı)
+    """
+    sources = _timeline_sources()
+    branches = []
+    for item_type in types:
+        model, occurred_at, company_filter, contact_filter, _ = sources[item_type]
+        queryset = model.objects.filter(company_filter(company) if company is not None else contact_filter(contact))
+        queryset = queryset.annotate(
+            item_type=Value(item_type, output_field=CharField()),
+            item_id=F('pk'),
+            occurred_at=occurred_at,
+        )
+        if cursor is not None:
+            queryset = queryset.filter(_position_filter(item_type, cursor))
+        queryset = queryset.values_list('item_type', 'item_id', 'occurred_at')
+        if connection.features.supports_slicing_ordering_in_compound:
+            # PostgreSQL: her kol kendi en yeni kayıtlarıyla sınırlanır
+            queryset = queryset.order_by('-occurred_at', '-item_id')[:limit + 1]
+        else:
+            queryset = queryset.order_by()
+        branches.append(queryset)
+
+    if not branches:
+        return [], False
+    keys = branches[0].union(*branches[1:], all=True).order_by('-occurred_at', '-item_type', '-item_id')
+    keys = list(keys[:limit + 1])
+    has_more = len(keys) > limit
+    keys = keys[:limit]
+
+    ids = {}
+    for item_type, item_id, _ in keys:
+        ids.setdefault(item_type, []).append(item_id)
+    details = {}
+    for item_type, item_ids in ids.items():
+        model, _, _, _, fields = sources[item_type]
+        # Model alanıyla aynı adı taşıyanlar doğrudan, diğerleri takma adla seçilir
+        plain = [name for name, value in fields.items() if value == name]
+        aliases = {name: F(value) if isinstance(value, str) else value
+                   for name, value in fields.items() if value != name}
+        for row in model.objects.filter(pk__in=item_ids).values('pk', *plain, **aliases):
+            details[(item_type, row.pop('pk'))] = row
+
+    items = [
+        {'type': item_type, 'id': item_id, 'occurred_at': occurred_at, **details.get((item_type, item_id), {})}
+        for item_type, item_id, occurred_at in keys
+    ]
+    return items, has_more
+
+
+class TimelinePagination(KeysetPagination):
+    """
+    Birleşik aktivite akışı için yalnızca ileri yönlü keyset sayfalama.
+    İmleç son kaydın (zaman, tür, id) konumunu taşır.
+    """
+    page_size = 30
+
+    def paginate_timeline(self, request, **filters):
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.page, self.has_next = get_timeline(cursor=self.decode_cursor(request), limit=self.page_size, **filters)
+        return self.page
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+
+        try:
+            occurred_at, item_type, item_id = json.loads(b64decode(encoded.encode('ascii')).decode('utf-8'))['p']
+            occurred_at = parse_datetime(occurred_at)
+            if occurred_at is None or item_type not in TIMELINE_TYPES:
+                raise ValueError
+            return occurred_at, item_type, int(item_id)
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        item = self.page[-1]
+        payload = {'p': [item['occurred_at'].isoformat(), item['type'], item['id']]}
+        encoded = b64encode(json.dumps(payload, separators=(',', ':')).encode('utf-8')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def get_previous_link(self):
+        return None
+
+    def get_paginated_response(self, data):
+        self.count = None
+        return super().get_paginated_response(data)
@@ -1,65 +1,130 @@
 from django.shortcuts import render
-from django.db.models import Q
 from rest_framework import viewsets, status, filters
 from rest_framework.decorators import action
+from rest_framework.parsers import FormParser, MultiPartParser
 from rest_framework.response import Response
-import re
 
-from .models import Company, Contact, Note
+from exports.mixins import ExportMixin
+
+from .models import Company, Contact, DuplicateCandidate, Note
 from .serializers import (
     CompanyListSerializer, 
     CompanyDetailSerializer, 
     CompanyCreateUpdateSerializer,
     ContactSerializer,
-    NoteSerializer
+    DuplicateCandidateSerializer,
+    DuplicateMergeSerializer,
+    MergeSerializer,
+    NoteSerializer,
+    SetPrimaryContactsSerializer,
 )
+from .dedupe import load_candidate_records
+from .importer import CompanyImporter, ContactImporter
+from .merge import MergeError, merge_companies, merge_contacts
+from .readers import ImportFileError, detect_import_format, iter_import_rows
+from .search import apply_search, search_customers
+from .timeline import TIMELINE_TYPES, TimelinePagination
 # from crm_project.supabase_helpers import CustomerSupabaseService
 
 
-def is_advanced_query(query):
+SEARCH_DEFAULT_LIMIT = 50
+SEARCH_MAX_LIMIT = 200
+
+
+def customer_search_response(request):
     """
-    Bir sorgunun gelişmiş olup olmadığını belirler.
-    
-    Şu durumlarda sorgu gelişmiş olarak kabul edilir:
-    1. Sorgu birden fazla kelime içeriyorsa
-    2. Sorgu özel karakterler içeriyorsa
-    3. Sorgu çok kısa ise (tek karakter)
-    4. Sorgu bir e-posta veya telefon numarası formatındaysa
-    5. Sorgu vergi numarası formatındaysa
+    Firma ve iletişim kişilerinde ortak arama yapıp yanıtı hazırlar.
+
+    Query parametreleri:
+    - q: Arama terimi (Türkçe karakterden bağımsız, kelime başı eşleşmeli)
+    - limit: (opsiyonel) Her tür için en fazla sonuç sayısı
     """
-    # Sorgu boşsa
-    if not query or query.strip() == '':
-        return False
-        
-    # Sorgu birden fazla kelime içeriyorsa
-    if len(query.split()) > 1:
-        return True
-    
-    # Özel karakterler içeriyorsa
-    special_chars = ['*', '%', '?', '+', '-', '&', '|', '!', '(', ')', '[', ']', '{', '}', '^', '~']
-    if any(char in query for char in special_chars):
-        return True
-    
-    # Çok kısa sorgular
-    if len(query) == 1:
-        return True
-    
-    # Muhtemel telefon numarası
-    if re.search(r'^\+?[\d\s\-()]+$', query) and len(query) > 5:
-        return True
-    
-    # Muhtemel email adresi
-    if '@' in query and '.' in query:
-        return True
-        
-    # Muhtemel vergi numarası
-    if query.isdigit() and 10 <= len(query) <= 11:
-        return True
-    
-    return False
+    query = request.query_params.get('q', '').strip()
+    if not query:
+        return Response({"error": "Arama parametresi sağlanmadı"}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        limit = int(request.query_params.get('limit', SEARCH_DEFAULT_LIMIT))
+    except ValueError:
+        limit = SEARCH_DEFAULT_LIMIT
+    limit = max(1, min(limit, SEARCH_MAX_LIMIT))
+
+    companies, contacts = search_customers(query, limit=limit)
+    return Response({
+        "companies": CompanyListSerializer(companies, many=True).data,
+        "contacts": ContactSerializer(contacts, many=True).data,
+        "status": "success"
+    })
+
+
+def customer_import_response(request, importer_class):
+    """
+    Yüklenen dosyadaki kayıtları içe aktarıp özet raporu döner.
+
+    Form alanları:
+    - file: CSV, XLSX veya JSON (dizi ya da satır başına bir nesne) dosyası
+    - format: (opsiyonel) Dosya biçimi; verilmezse uzantıdan belirlenir
+    - dry_run: '1' veya 'true' ise değişiklikler kaydedilmez, yalnızca rapor döner
+    - update_existing: '0' veya 'false' ise eşleşen kayıtlar güncellenmez
+    """
+    upload = request.FILES.get('file')
+    if not upload:
+        return Response({"error": "Dosya yüklenmedi"}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        file_format = detect_import_format(upload.name, request.data.get('format'))
+    except ImportFileError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    dry_run = str(request.data.get('dry_run', '')).lower() in ['1', 'true']
+    update_existing = str(request.data.get('update_existing', 'true')).lower() not in ['0', 'false']
+
+    importer = importer_class(update_existing=update_existing)
+    try:
+        result = importer.run(iter_import_rows(upload, file_format), dry_run=dry_run)
+    except ImportFileError as e:
+        # Hatalı bölüme kadar olan partiler kaydedilmiş olabilir
+        return Response(
+            {"error": str(e), "result": importer.result.as_dict()},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    return Response({**result.as_dict(), "dry_run": dry_run})
+
+
+def customer_merge_response(merge_function, target, source_ids):
+    """
+    Kaynak kayıtları hedefte birleştirip taşınan ilişki sayılarını döner.
+    """
+    try:
+        moved = merge_function(target, source_ids)
+    except MergeError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response({"id": target.pk, "merged_ids": sorted(set(source_ids) - {target.pk}), "moved": moved})
 
 
-class CompanyViewSet(viewsets.ModelViewSet):
+def customer_timeline_response(request, **filters):
+    """
+    Firma veya kişinin not, e-posta, gelen e-posta, etkinlik ve fırsat
+    aktivitelerini tek akışta, yeniden eskiye sıralı döner.
+
+    Query parametreleri:
+    - types: (opsiyonel) Virgülle ayrılmış kayıt türleri (varsayılan: hepsi)
+    - cursor, page_size: Keyset sayfalama
+    """
+    types = [item_type for item_type in request.query_params.get('types', '').split(',') if item_type]
+    invalid = [item_type for item_type in types if item_type not in TIMELINE_TYPES]
+    if invalid:
+        return Response(
+            {"error": f"Geçersiz kayıt türü: {', '.join(invalid)}. Seçenekler: {', '.join(TIMELINE_TYPES)}"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    paginator = TimelinePagination()
+    items = paginator.paginate_timeline(request, types=types or TIMELINE_TYPES, **filters)
+    return paginator.get_paginated_response(items)
+
+
+class CompanyViewSet(ExportMixin, viewsets.ModelViewSet):
     """
     Firma verilerini yönetmek için API endpoint'i
     """
@@ -67,7 +132,19 @@ class CompanyViewSet(viewsets.ModelViewSet):
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['name', 'tax_number', 'industry', 'email', 'phone']
     ordering_fields = ['name', 'industry', 'created_at']
+    export_resource = 'companies'
+    export_fields = ('id', 'name', 'tax_number', 'industry', 'company_size', 'email', 'phone', 'address',
+                     'website_url', 'linkedin_url', 'created_at')
     
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        # Liste görünümlerinde sayılar tek sorguda hesaplanır (N+1 önlenir)
+        if self.action in ['list', 'supabase_companies']:
+            queryset = queryset.with_list_stats()
+        elif self.action == 'retrieve':
+            queryset = queryset.prefetch_related('contacts', 'notes')
+        return queryset
+
     def get_serializer_class(self):
         if self.action == 'list':
             return CompanyListSerializer
@@ -81,74 +158,53 @@ class CompanyViewSet(viewsets.ModelViewSet):
         Belirli bir firmanın iletişim kişilerini göstermek için özel endpoint
         """
         company = self.get_object()
-        contacts = Contact.objects.filter(company=company)
+        contacts = Contact.objects.filter(company=company).select_related('company').prefetch_related('notes')
+        page = self.paginate_queryset(contacts)
+
+        if page is not None:
+            serializer = ContactSerializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+
         serializer = ContactSerializer(contacts, many=True)
         return Response(serializer.data)
     
+    @action(detail=False, methods=['post'], url_path='import', url_name='import', parser_classes=[MultiPartParser, FormParser])
+    def import_file(self, request):
+        """
+        Firmaları dosyadan toplu içe aktarır; mevcut firmalar vergi numarası
+        veya alan adıyla eşleştirilip güncellenir
+        """
+        return customer_import_response(request, CompanyImporter)
+
+    @action(detail=True, methods=['get'])
+    def timeline(self, request, pk=None):
+        """
+        Firmanın ve kişilerinin tüm aktiviteleri tek, sayfalı akışta
+        """
+        return customer_timeline_response(request, company=self.get_object())
+
+    @action(detail=True, methods=['post'])
+    def merge(self, request, pk=None):
+        """
+        Mükerrer firmaları bu firmada birleştirir: kişi, not, fırsat, etkinlik
+        ve e-postalar taşınır, boş alanlar doldurulur, kaynak firmalar silinir.
+
+        Body: {"source_ids": [2, 3]}
+        """
+        company = self.get_object()
+        serializer = MergeSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        return customer_merge_response(merge_companies, company, serializer.validated_data['source_ids'])
+
     @action(detail=False, methods=['get'])
     def search(self, request):
         """
-        Akıllı arama endpoint'i - hem firmalar hem de iletişim kişileri içinde arama yapar.
-        Sorgu parametrelerine göre Django ORM veya Supabase kullanır.
-        
-        Query parametreleri:
-        - q: Arama terimi
-        - use_supabase: (opsiyonel) '1' veya 'true' ise Supabase kullanır
-        - advanced: (opsiyonel) '1' veya 'true' ise gelişmiş arama yapar (Supabase kullanır)
-        - limit: (opsiyonel) Sonuç sayısı limiti
-        """
-        query = request.query_params.get('q', '')
-        if not query:
-            return Response({"error": "Arama parametresi sağlanmadı"}, status=status.HTTP_400_BAD_REQUEST)
-            
-        # Supabase kullanılıp kullanılmayacağını belirle
-        use_supabase = request.query_params.get('use_supabase', '').lower() in ['1', 'true']
-        advanced_search = request.query_params.get('advanced', '').lower() in ['1', 'true'] or is_advanced_query(query)
-        
-        # Gelişmiş arama veya açıkça Supabase istendiyse Supabase kullan
-        if advanced_search or use_supabase:
-            limit = request.query_params.get('limit', 50)
-            try:
-                limit = int(limit)
-            except ValueError:
-                limit = 50
-                
-            # Supabase ile arama (geçici olarak devre dışı)
-            # results = CustomerSupabaseService.search_all(query, limit=limit)
-            # return Response(results)
-
-            # Geçici olarak Django ORM kullan
-            companies = Company.objects.filter(
-                Q(name__icontains=query) |
-                Q(tax_number__icontains=query) |
-                Q(industry__icontains=query) |
-                Q(email__icontains=query) |
-                Q(phone__icontains=query)
-            )
-
-            company_serializer = CompanyListSerializer(companies, many=True)
-            return Response({
-                "companies": company_serializer.data,
-                "contacts": [],
-                "status": "success"
-            })
-        else:
-            # Django ORM ile basit arama
-            companies = Company.objects.filter(
-                Q(name__icontains=query) | 
-                Q(tax_number__icontains=query) |
-                Q(industry__icontains=query) |
-                Q(email__icontains=query) |
-                Q(phone__icontains=query)
-            )
-            
-            company_serializer = CompanyListSerializer(companies, many=True)
-            return Response({
-                "companies": company_serializer.data,
-                "contacts": [],
-                "status": "success"
-            })
-    
+        Akıllı arama endpoint'i - hem firmalar hem de iletişim kişileri içinde
+        tam metin arama yapar, sonuçlar ilgiye göre sıralanır.
+        """
+        return customer_search_response(request)
+
     @action(detail=False, methods=['get'], url_path='supabase-companies')
     def supabase_companies(self, request):
         """
@@ -176,13 +232,9 @@ class CompanyViewSet(viewsets.ModelViewSet):
         # )
 
         # Geçici olarak Django ORM kullan
-        companies = Company.objects.all()
+        companies = self.get_queryset()
         if search:
-            companies = companies.filter(
-                Q(name__icontains=search) |
-                Q(industry__icontains=search) |
-                Q(email__icontains=search)
-            )
+            companies = apply_search(companies, search)
         if industry:
             companies = companies.filter(industry__icontains=industry)
 
@@ -196,36 +248,71 @@ class CompanyViewSet(viewsets.ModelViewSet):
         })
 
 
-class ContactViewSet(viewsets.ModelViewSet):
+class ContactViewSet(ExportMixin, viewsets.ModelViewSet):
     """
     İletişim kişilerini yönetmek için API endpoint'i
     """
-    queryset = Contact.objects.all()
+    queryset = Contact.objects.select_related('company').prefetch_related('notes')
     serializer_class = ContactSerializer
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['first_name', 'last_name', 'position', 'email', 'phone', 'company__name']
     ordering_fields = ['first_name', 'last_name', 'company__name', 'created_at']
+    ordering = ['-created_at']
+    export_resource = 'contacts'
+    export_fields = ('id', 'first_name', 'last_name', ('company__name', 'Firma'), 'position', 'email', 'phone',
+                     'is_primary', 'lead_source', 'lead_status', 'created_at')
     
+    @action(detail=False, methods=['post'], url_path='import', url_name='import', parser_classes=[MultiPartParser, FormParser])
+    def import_file(self, request):
+        """
+        Kişileri dosyadan toplu içe aktarır; mevcut kişiler e-posta ile
+        eşleştirilip güncellenir, bulunamayan firmalar adıyla oluşturulur
+        """
+        return customer_import_response(request, ContactImporter)
+
+    @action(detail=True, methods=['post'])
+    def merge(self, request, pk=None):
+        """
+        Mükerrer kişileri bu kişide birleştirir: not, fırsat, etkinlik ve
+        e-posta bağlantıları taşınır, kaynak kişiler silinir.
+
+        Body: {"source_ids": [2, 3]}
+        """
+        contact = self.get_object()
+        serializer = MergeSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        return customer_merge_response(merge_contacts, contact, serializer.validated_data['source_ids'])
+
+    @action(detail=True, methods=['get'])
+    def timeline(self, request, pk=None):
+        """
+        Kişinin tüm aktiviteleri tek, sayfalı akışta
+        """
+        return customer_timeline_response(request, contact=self.get_object())
+
+    @action(detail=False, methods=['post'], url_path='set-primary')
+    def set_primary(self, request):
+        """
+        Verilen kişileri firmalarının ana irtibat kişisi yapar; firma sayısından
+        bağımsız olarak sabit sayıda sorgu çalışır.
+
+        Body: {"contact_ids": [1, 2, 3]} (firma başına en fazla bir kişi)
+        """
+        serializer = SetPrimaryContactsSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        updated_count = Contact.objects.set_primary(serializer.validated_data['contact_ids'])
+        return Response({"updated_count": updated_count})
+
     @action(detail=False, methods=['get'])
     def search(self, request):
         """
-        İletişim kişileri içinde arama yapmak için özel endpoint
+        İletişim kişileri içinde arama yapmak için özel endpoint; firma
+        aramasıyla aynı sonucu (firmalar ve kişiler) döner.
         """
-        query = request.query_params.get('q', '')
-        if not query:
-            return Response({"error": "Arama parametresi sağlanmadı"}, status=status.HTTP_400_BAD_REQUEST)
-        
-        contacts = Contact.objects.filter(
-            Q(first_name__icontains=query) |
-            Q(last_name__icontains=query) |
-            Q(position__icontains=query) |
-            Q(email__icontains=query) |
-            Q(phone__icontains=query) |
-            Q(company__name__icontains=query)
-        )
-        
-        serializer = ContactSerializer(contacts, many=True)
-        return Response(serializer.data)
+        return customer_search_response(request)
         
     @action(detail=False, methods=['get'], url_path=r'supabase-by-company/(?P<company_id>\d+)')
     def supabase_by_company(self, request, company_id=None):
@@ -238,16 +325,94 @@ class ContactViewSet(viewsets.ModelViewSet):
         # return Response(results)
 
         # Geçici olarak Django ORM kullan
-        contacts = Contact.objects.filter(company_id=company_id)
+        contacts = self.get_queryset().filter(company_id=company_id)
+        page = self.paginate_queryset(contacts)
+
+        if page is not None:
+            serializer = ContactSerializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+
         serializer = ContactSerializer(contacts, many=True)
         return Response(serializer.data)
 
 
+class DuplicateCandidateViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Mükerrer olma ihtimali olan firma ve kişi çiftleri
+
+    Query parametreleri:
+    - type: 'company' veya 'contact'
+    - status: 'open' (varsayılan), 'dismissed' veya 'all'
+    - min_score: En düşük benzerlik puanı (0-1)
+    """
+    queryset = DuplicateCandidate.objects.all()
+    serializer_class = DuplicateCandidateSerializer
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action != 'list':
+            return queryset
+
+        params = self.request.query_params
+        if params.get('type'):
+            queryset = queryset.filter(entity_type=params['type'])
+        candidate_status = params.get('status', 'open')
+        if candidate_status != 'all':
+            queryset = queryset.filter(status=candidate_status)
+        try:
+            queryset = queryset.filter(score__gte=float(params['min_score']))
+        except (KeyError, ValueError):
+            pass
+        return queryset
+
+    def get_serializer(self, *args, **kwargs):
+        # Kayıt özetleri sayfadaki tüm çiftler için tür başına tek sorguyla yüklenir
+        if args:
+            instances = args[0] if kwargs.get('many') else [args[0]]
+            kwargs.setdefault('context', {**self.get_serializer_context(), 'records': load_candidate_records(instances)})
+        return super().get_serializer(*args, **kwargs)
+
+    @action(detail=True, methods=['post'])
+    def merge(self, request, pk=None):
+        """
+        Çifti birleştirir; `keep` ile belirtilen kayıt korunur, diğeri silinir.
+
+        Body: {"keep": "first"} veya {"keep": "second"}
+        """
+        candidate = self.get_object()
+        serializer = DuplicateMergeSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        target_id, source_id = candidate.first_id, candidate.second_id
+        if serializer.validated_data['keep'] == 'second':
+            target_id, source_id = source_id, target_id
+        model, merge_function = {
+            'company': (Company, merge_companies),
+            'contact': (Contact, merge_contacts),
+        }[candidate.entity_type]
+
+        target = model.objects.filter(pk=target_id).first()
+        if target is None:
+            return Response({"error": "Korunacak kayıt bulunamadı"}, status=status.HTTP_404_NOT_FOUND)
+        return customer_merge_response(merge_function, target, [source_id])
+
+    @action(detail=True, methods=['post'])
+    def dismiss(self, request, pk=None):
+        """
+        Çifti "mükerrer değil" olarak işaretler; sonraki taramalarda tekrar açılmaz.
+        """
+        candidate = self.get_object()
+        candidate.status = 'dismissed'
+        candidate.save(update_fields=['status', 'updated_at'])
+        return Response(self.get_serializer(candidate).data)
+
+
 class NoteViewSet(viewsets.ModelViewSet):
     """
     Notlar için API endpoint'i
     """
-    queryset = Note.objects.all()
+    queryset = Note.objects.select_related('company', 'contact__company')
     serializer_class = NoteSerializer
     filter_backends = [filters.SearchFilter]
     search_fields = ['title', 'content']
@@ -262,6 +427,12 @@ class NoteViewSet(viewsets.ModelViewSet):
             return Response({"error": "Firma ID'si belirtilmelidir"}, status=status.HTTP_400_BAD_REQUEST)
             
         notes = self.queryset.filter(company_id=company_id)
+        page = self.paginate_queryset(notes)
+
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+
         serializer = self.get_serializer(notes, many=True)
         return Response(serializer.data)
         
@@ -275,5 +446,11 @@ class NoteViewSet(viewsets.ModelViewSet):
             return Response({"error": "Kişi ID'si belirtilmelidir"}, status=status.HTTP_400_BAD_REQUEST)
             
         notes = self.queryset.filter(contact_id=contact_id)
+        page = self.paginate_queryset(notes)
+
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+
         serializer = self.get_serializer(notes, many=True)
         return Response(serializer.data)
@@ -47,6 +47,9 @@ class EventListSerializer(serializers.ModelSerializer):
         return f"{obj.assigned_to.first_name} {obj.assigned_to.last_name}" if obj.assigned_to else None
         
     def get_participants_count(self, obj):
+        # EventViewSet sorgusunda annotate edilmişse ek sorgu çalıştırma
+        if hasattr(obj, 'participants_count'):
+            return obj.participants_count
         return obj.contacts.count()
 
 
@@ -1,3 +1,31 @@
-from django.test import TestCase
+from rest_framework.test import APITestCase
 
-# Create your tests here.
+from crm_project.testing import QueryBudgetMixin
+from customers.models import Contact
+from .models import Event
+from .urls import router
+
+
+class EventsQueryBudgetTests(QueryBudgetMixin, APITestCase):
+    """
+    Etkinlik endpoint'lerinin sorgu bütçeleri (N+1 regresyonlarını yakalar)
+    """
+    router = router
+    budgets = {
+        'event-list': 1,
+        'event-detail': 6,
+        'event-export': 1,
+        'event-upcoming': 1,
+        'event-today': 1,
+        'event-this-week': 1,
+        'event-company-events': 1,
+        'event-contact-events': 1,
+        'eventparticipant-list': 1,
+        'eventparticipant-detail': 1,
+        'eventparticipant-event-participants': 1,
+    }
+    route_params = {
+        'event-company-events': lambda: {'company_id': Contact.objects.order_by('pk').first().company_id},
+        'event-contact-events': lambda: {'contact_id': Contact.objects.order_by('pk').first().pk},
+        'eventparticipant-event-participants': lambda: {'event_id': Event.objects.order_by('pk').first().pk},
+    }
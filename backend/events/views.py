@@ -2,8 +2,10 @@ from rest_framework import viewsets, status, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
+from django.db.models import Count
 from django.utils import timezone
 from datetime import timedelta
+from exports.mixins import ExportMixin
 from .models import Event, EventParticipant
 from .serializers import (
     EventListSerializer,
@@ -13,16 +15,27 @@ from .serializers import (
 )
 
 
-class EventViewSet(viewsets.ModelViewSet):
+class EventViewSet(ExportMixin, viewsets.ModelViewSet):
     """
     Etkinlikler için API endpoint'i
     """
-    queryset = Event.objects.all()
+    queryset = Event.objects.select_related('company', 'assigned_to').annotate(
+        participants_count=Count('contacts', distinct=True)
+    )
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['event_type', 'status', 'priority', 'company', 'assigned_to']
     search_fields = ['title', 'description', 'location', 'company__name']
     ordering_fields = ['start_datetime', 'created_at', 'priority']
     ordering = ['-start_datetime']
+    export_resource = 'events'
+    export_fields = ('id', 'title', 'event_type', 'status', 'priority', ('company__name', 'Firma'),
+                     ('assigned_to__username', 'Sorumlu'), 'start_datetime', 'end_datetime', 'location', 'outcome')
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action not in ['list', 'upcoming', 'today', 'this_week', 'company_events', 'contact_events']:
+            queryset = queryset.prefetch_related('contacts__company', 'participants__contact__company')
+        return queryset
 
     def get_serializer_class(self):
         if self.action == 'list':
@@ -42,6 +55,12 @@ class EventViewSet(viewsets.ModelViewSet):
             status__in=['scheduled', 'in_progress']
         ).order_by('start_datetime')
 
+        page = self.paginate_queryset(upcoming_events)
+
+        if page is not None:
+            serializer = EventListSerializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+
         serializer = EventListSerializer(upcoming_events, many=True)
         return Response(serializer.data)
 
@@ -55,6 +74,12 @@ class EventViewSet(viewsets.ModelViewSet):
             start_datetime__date=today
         ).order_by('start_datetime')
 
+        page = self.paginate_queryset(today_events)
+
+        if page is not None:
+            serializer = EventListSerializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+
         serializer = EventListSerializer(today_events, many=True)
         return Response(serializer.data)
 
@@ -71,6 +96,12 @@ class EventViewSet(viewsets.ModelViewSet):
             start_datetime__date__range=[week_start.date(), week_end.date()]
         ).order_by('start_datetime')
 
+        page = self.paginate_queryset(week_events)
+
+        if page is not None:
+            serializer = EventListSerializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+
         serializer = EventListSerializer(week_events, many=True)
         return Response(serializer.data)
 
@@ -127,6 +158,12 @@ class EventViewSet(viewsets.ModelViewSet):
             )
 
         events = self.queryset.filter(company_id=company_id)
+        page = self.paginate_queryset(events)
+
+        if page is not None:
+            serializer = EventListSerializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+
         serializer = EventListSerializer(events, many=True)
         return Response(serializer.data)
 
@@ -143,6 +180,12 @@ class EventViewSet(viewsets.ModelViewSet):
             )
 
         events = self.queryset.filter(contacts__id=contact_id)
+        page = self.paginate_queryset(events)
+
+        if page is not None:
+            serializer = EventListSerializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+
         serializer = EventListSerializer(events, many=True)
         return Response(serializer.data)
 
@@ -151,7 +194,7 @@ class EventParticipantViewSet(viewsets.ModelViewSet):
     """
     Etkinlik katılımcıları için API endpoint'i
     """
-    queryset = EventParticipant.objects.all()
+    queryset = EventParticipant.objects.select_related('contact__company', 'event')
     serializer_class = EventParticipantSerializer
     filter_backends = [DjangoFilterBackend, filters.SearchFilter]
     filterset_fields = ['event', 'contact', 'status']
@@ -170,6 +213,12 @@ class EventParticipantViewSet(viewsets.ModelViewSet):
             )
 
         participants = self.queryset.filter(event_id=event_id)
+        page = self.paginate_queryset(participants)
+
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+
         serializer = self.get_serializer(participants, many=True)
         return Response(serializer.data)
 
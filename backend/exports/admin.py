@@ -0,0 +1,12 @@
+from django.contrib import admin
+from .models import ExportJob
+
+
+@admin.register(ExportJob)
+class ExportJobAdmin(admin.ModelAdmin):
+    """
+    Dışa aktarım işleri için admin panel yapılandırması
+    """
+    list_display = ('resource', 'export_format', 'user', 'status', 'row_count', 'created_at', 'finished_at')
+    list_filter = ('status', 'resource', 'export_format')
+    readonly_fields = ('created_at', 'started_at', 'finished_at')
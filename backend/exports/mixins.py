@@ -0,0 +1,81 @@
+from django.db import transaction
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+from .models import ExportJob
+from .resources import get_export_columns, iter_export_rows
+from .serializers import ExportJobSerializer
+from .writers import EXPORT_FORMATS, iter_export
+
+# Dışa aktarımın kendisine ait, filtre olarak saklanmayan parametreler
+EXPORT_CONTROL_PARAMS = ('export_format', 'background')
+
+
+class ExportMixin:
+    """
+    Viewset'e liste filtreleriyle aynı kayıtları CSV/XLSX olarak indiren
+    `export` endpoint'i ekler.
+
+    Alt sınıflar şunları tanımlar:
+    - export_resource: exports.resources.EXPORT_RESOURCES içindeki kaynak adı
+    - export_fields: Alan yolları veya (alan yolu, başlık) ikilileri
+
+    Query parametreleri:
+    - export_format: csv (varsayılan) veya xlsx
+    - background: '1' veya 'true' ise dosya arka planda hazırlanır ve iş bilgisi döner (202)
+    - Liste endpoint'inin tüm filtre, arama ve sıralama parametreleri
+    """
+    export_resource = None
+    export_fields = ()
+
+    def get_export_queryset(self):
+        # Ön yükleme (prefetch) satır değerleri okunurken kullanılmaz
+        return self.filter_queryset(self.get_queryset()).prefetch_related(None)
+
+    def get_export_rows(self):
+        """
+        Sütun başlıkları ve filtrelenmiş kayıtların değer listelerini üreten iterator.
+        """
+        columns = get_export_columns(self.get_queryset().model, self.export_fields)
+        rows = iter_export_rows(self.get_export_queryset(), columns)
+        return [header for header, _, _ in columns], rows
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        Liste filtrelerine uyan kayıtları CSV veya XLSX olarak dışa aktar
+        """
+        export_format = request.query_params.get('export_format', 'csv')
+        if export_format not in EXPORT_FORMATS:
+            return Response(
+                {"error": f"Desteklenmeyen biçim. Seçenekler: {', '.join(EXPORT_FORMATS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if request.query_params.get('background', '').lower() in ['1', 'true']:
+            from .tasks import run_export_job
+
+            job = ExportJob.objects.create(
+                user=request.user,
+                resource=self.export_resource,
+                export_format=export_format,
+                params={
+                    key: request.query_params.getlist(key)
+                    for key in request.query_params if key not in EXPORT_CONTROL_PARAMS
+                },
+            )
+            transaction.on_commit(lambda: run_export_job.apply_async(args=[job.pk]))
+            return Response(ExportJobSerializer(job, context={'request': request}).data,
+                            status=status.HTTP_202_ACCEPTED)
+
+        header, rows = self.get_export_rows()
+        response = StreamingHttpResponse(
+            iter_export(export_format, header, rows, self.export_resource),
+            content_type=EXPORT_FORMATS[export_format],
+        )
+        file_name = f"{self.export_resource}-{timezone.localtime():%Y%m%d-%H%M%S}.{export_format}"
+        response['Content-Disposition'] = f'attachment; filename="{file_name}"'
+        return response
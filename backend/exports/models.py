@@ -0,0 +1,43 @@
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+
+
+class ExportJob(models.Model):
+    """
+    Arka planda hazırlanan, indirilebilir bir dışa aktarım dosyası.
+    """
+    STATUS_CHOICES = [
+        ('queued', 'Sırada'),
+        ('running', 'Hazırlanıyor'),
+        ('completed', 'Tamamlandı'),
+        ('failed', 'Başarısız'),
+    ]
+    FORMAT_CHOICES = [
+        ('csv', 'CSV'),
+        ('xlsx', 'Excel (XLSX)'),
+    ]
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='export_jobs', verbose_name="Kullanıcı")
+    resource = models.CharField(max_length=30, verbose_name="Kaynak")
+    export_format = models.CharField(max_length=4, choices=FORMAT_CHOICES, default='csv', verbose_name="Biçim")
+    params = models.JSONField(default=dict, blank=True, verbose_name="Filtreler")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued', verbose_name="Durum")
+    file = models.FileField(upload_to='exports/%Y/%m/', blank=True, verbose_name="Dosya")
+    row_count = models.PositiveIntegerField(default=0, verbose_name="Satır Sayısı")
+    error_message = models.TextField(blank=True, default='', verbose_name="Hata Mesajı")
+    created_at = models.DateTimeField(default=timezone.now, verbose_name="Oluşturulma Tarihi")
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name="Başlama Tarihi")
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name="Bitiş Tarihi")
+
+    class Meta:
+        verbose_name = "Dışa Aktarım İşi"
+        verbose_name_plural = "Dışa Aktarım İşleri"
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.resource}.{self.export_format} - {self.get_status_display()}"
+
+    @property
+    def file_name(self):
+        return f"{self.resource}-{timezone.localtime(self.created_at):%Y%m%d-%H%M%S}.{self.export_format}"
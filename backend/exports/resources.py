@@ -0,0 +1,100 @@
+"""
+Dışa aktarılabilir kaynaklar ve sorgu sonuçlarının satırlara dönüştürülmesi.
+
+Kaynaklar ilgili viewset'lerin filtre ve arama mantığıyla sorgulanır; satırlar
+`values_list(...).iterator(chunk_size=...)` ile okunur (PostgreSQL'de sunucu
+taraflı imleç), model nesnesi oluşturulmaz.
+"""
+import json
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db import models
+from django.http import HttpRequest, QueryDict
+from django.utils.module_loading import import_string
+from rest_framework.request import Request
+
+# Kaynak adı: viewset (arka plan işleri filtreleri aynı viewset ile yeniden uygular)
+EXPORT_RESOURCES = {
+    'companies': 'customers.views.CompanyViewSet',
+    'contacts': 'customers.views.ContactViewSet',
+    'opportunities': 'opportunities.views.OpportunityViewSet',
+    'events': 'events.views.EventViewSet',
+    'emails': 'communications.views.EmailMessageViewSet',
+}
+
+# Veritabanından tek seferde okunan satır sayısı
+EXPORT_CHUNK_SIZE = 2000
+
+
+def _get_field(model, path):
+    field = None
+    for part in path.split('__'):
+        field = model._meta.get_field(part)
+        if field.is_relation:
+            model = field.related_model
+    return field
+
+
+def _format_json(value):
+    if isinstance(value, list) and all(isinstance(item, dict) and item.get('email') for item in value):
+        # Alıcı listeleri: [{"email": ..., "name": ...}]
+        return ', '.join(item['email'] for item in value)
+    return json.dumps(value, ensure_ascii=False)
+
+
+def get_export_columns(model, export_fields):
+    """
+    `export_fields` tanımından (alan yolu veya (alan yolu, başlık)) sütunlar.
+
+    Returns:
+        list: [(başlık, alan yolu, dönüştürücü veya None)]
+    """
+    columns = []
+    for item in export_fields:
+        path, header = item if isinstance(item, tuple) else (item, None)
+        try:
+            field = _get_field(model, path)
+        except FieldDoesNotExist:
+            # Sorguya eklenmiş (annotate) değerler
+            columns.append((header or path, path, None))
+            continue
+
+        formatter = None
+        if field.choices:
+            formatter = dict(field.flatchoices).get
+        elif isinstance(field, models.JSONField):
+            formatter = _format_json
+        columns.append((header or str(field.verbose_name), path, formatter))
+    return columns
+
+
+def iter_export_rows(queryset, columns, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Sorgudaki kayıtları sütun sırasıyla değer listeleri olarak üretir.
+    """
+    paths = [path for _, path, _ in columns]
+    formatters = [formatter for _, _, formatter in columns]
+    for values in queryset.values_list(*paths).iterator(chunk_size=chunk_size):
+        yield [
+            formatter(value) if formatter and value is not None else value
+            for formatter, value in zip(formatters, values)
+        ]
+
+
+def get_export_view(resource, user, params):
+    """
+    Kaynağın viewset'ini, verilen kullanıcı ve query parametreleriyle (liste
+    görünümündeki filtreler) yapılmış bir isteğe bağlı olarak hazırlar.
+    """
+    viewset_class = import_string(EXPORT_RESOURCES[resource])
+
+    django_request = HttpRequest()
+    django_request.method = 'GET'
+    django_request.GET = QueryDict(mutable=True)
+    for key, values in params.items():
+        django_request.GET.setlist(key, values if isinstance(values, list) else [values])
+    request = Request(django_request, authenticators=())
+    request.user = user
+
+    view = viewset_class(request=request, args=(), kwargs={}, action='export', format_kwarg=None)
+    return view
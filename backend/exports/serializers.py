@@ -0,0 +1,22 @@
+from rest_framework import serializers
+from rest_framework.reverse import reverse
+
+from .models import ExportJob
+
+
+class ExportJobSerializer(serializers.ModelSerializer):
+    """
+    Dışa aktarım işleri için serializer
+    """
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ExportJob
+        fields = ('id', 'resource', 'export_format', 'params', 'status', 'status_display', 'row_count',
+                  'error_message', 'download_url', 'created_at', 'started_at', 'finished_at')
+
+    def get_download_url(self, obj):
+        if obj.status != 'completed':
+            return None
+        return reverse('exportjob-download', args=[obj.pk], request=self.context.get('request'))
@@ -0,0 +1,78 @@
+import logging
+import tempfile
+from datetime import timedelta
+
+from celery import shared_task
+from django.core.files import File
+from django.utils import timezone
+
+from .models import ExportJob
+from .resources import get_export_view
+from .writers import iter_export
+
+logger = logging.getLogger(__name__)
+
+# Tamamlanan dışa aktarım dosyalarının saklanma süresi
+EXPORT_RETENTION_DAYS = 7
+
+
+@shared_task(bind=True)
+def run_export_job(self, job_id):
+    """
+    Dışa aktarım dosyasını parça parça geçici dosyaya yazıp depoya kaydet
+    """
+    job = ExportJob.objects.select_related('user').filter(pk=job_id, status='queued').first()
+    if job is None:
+        return f"Export job {job_id} not found or already started"
+
+    job.status = 'running'
+    job.started_at = timezone.now()
+    job.save(update_fields=['status', 'started_at'])
+
+    row_count = 0
+
+    def count_rows(rows):
+        nonlocal row_count
+        for row in rows:
+            row_count += 1
+            yield row
+
+    try:
+        view = get_export_view(job.resource, job.user, job.params)
+        header, rows = view.get_export_rows()
+        with tempfile.TemporaryFile() as output:
+            for chunk in iter_export(job.export_format, header, count_rows(rows), job.resource):
+                output.write(chunk)
+            output.seek(0)
+            job.file.save(job.file_name, File(output), save=False)
+    except Exception as e:
+        logger.error(f"Export job {job_id} failed: {e}", exc_info=True)
+        job.status = 'failed'
+        job.error_message = str(e)
+        job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'error_message', 'finished_at'])
+        return f"Export job {job_id} failed: {e}"
+
+    job.status = 'completed'
+    job.row_count = row_count
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'file', 'row_count', 'finished_at'])
+    logger.info(f"Export job {job_id} completed ({row_count} rows)")
+    return f"Export job {job_id} completed ({row_count} rows)"
+
+
+@shared_task
+def cleanup_old_exports():
+    """
+    Saklama süresi dolan dışa aktarım işlerini ve dosyalarını sil
+    """
+    cutoff = timezone.now() - timedelta(days=EXPORT_RETENTION_DAYS)
+    deleted_count = 0
+    for job in ExportJob.objects.filter(created_at__lt=cutoff).iterator():
+        if job.file:
+            job.file.delete(save=False)
+        job.delete()
+        deleted_count += 1
+
+    logger.info(f"Deleted {deleted_count} old export jobs")
+    return f"Deleted {deleted_count} old export jobs"
@@ -0,0 +1,116 @@
+import csv
+import io
+import shutil
+import tempfile
+import zipfile
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from crm_project.testing import QueryBudgetMixin
+from customers.models import Company
+from .models import ExportJob
+from .tasks import run_export_job
+from .urls import router
+
+
+class ExportsQueryBudgetTests(QueryBudgetMixin, APITestCase):
+    """
+    Dışa aktarım işi endpoint'lerinin sorgu bütçeleri
+    """
+    router = router
+    budgets = {
+        'exportjob-list': 1,
+        'exportjob-detail': 1,
+        'exportjob-download': 1,
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        ExportJob.objects.create(user=cls.user, resource='companies', export_format='csv')
+
+
+class ExportTests(APITestCase):
+    """
+    Liste filtreleriyle CSV/XLSX dışa aktarımı ve arka plan işleri
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='exporter', password='test-password')
+        self.client.force_authenticate(self.user)
+        Company.objects.create(name='Akdeniz Lojistik', tax_number='111', industry='Lojistik')
+        Company.objects.create(name='Ege Yazılım', tax_number='222', industry='Yazılım')
+        Company.objects.create(name='=HYPERLINK("http://example.com")', industry='Yazılım')
+
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+
+    def read_csv(self, response):
+        content = b''.join(response.streaming_content).decode('utf-8-sig')
+        return list(csv.reader(io.StringIO(content)))
+
+    def test_csv_export_applies_list_filters(self):
+        response = self.client.get(reverse('company-export'), {'search': 'Yazılım', 'ordering': 'name'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/csv'))
+        self.assertIn('attachment;', response['Content-Disposition'])
+        rows = self.read_csv(response)
+        self.assertEqual(rows[0][:2], ['ID', 'Firma Adı'])
+        names = [row[1] for row in rows[1:]]
+        # Formül olarak çalışabilecek hücreler metin olarak işaretlenir
+        self.assertEqual(names, ["'=HYPERLINK(\"http://example.com\")", 'Ege Yazılım'])
+
+    def test_xlsx_export_is_a_valid_workbook(self):
+        response = self.client.get(reverse('company-export'), {'export_format': 'xlsx'})
+
+        self.assertEqual(response.status_code, 200)
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+        self.assertIsNone(archive.testzip())
+        self.assertIn('xl/workbook.xml', archive.namelist())
+        sheet = archive.read('xl/worksheets/sheet1.xml').decode('utf-8')
+        self.assertIn('Akdeniz Lojistik', sheet)
+        self.assertIn('Firma Adı', sheet)
+
+    def test_unknown_format_is_rejected(self):
+        response = self.client.get(reverse('company-export'), {'export_format': 'pdf'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_background_export_job(self):
+        with override_settings(MEDIA_ROOT=self.media_root):
+            with mock.patch.object(run_export_job, 'apply_async') as apply_async:
+                with self.captureOnCommitCallbacks(execute=True):
+                    response = self.client.get(reverse('company-export'), {'background': '1', 'search': 'Lojistik'})
+
+            self.assertEqual(response.status_code, 202)
+            job = ExportJob.objects.get(pk=response.data['id'])
+            self.assertEqual(job.params, {'search': ['Lojistik']})
+            apply_async.assert_called_once_with(args=[job.pk])
+
+            response = self.client.get(reverse('exportjob-download', args=[job.pk]))
+            self.assertEqual(response.status_code, 409)
+
+            run_export_job(job.pk)
+            job.refresh_from_db()
+            self.assertEqual(job.status, 'completed')
+            self.assertEqual(job.row_count, 1)
+
+            response = self.client.get(reverse('exportjob-detail', args=[job.pk]))
+            self.assertTrue(response.data['download_url'].endswith(f'/jobs/{job.pk}/download/'))
+
+            response = self.client.get(reverse('exportjob-download', args=[job.pk]))
+            self.assertEqual(response.status_code, 200)
+            rows = self.read_csv(response)
+            self.assertEqual([row[1] for row in rows[1:]], ['Akdeniz Lojistik'])
+            response.close()
+
+    def test_jobs_are_visible_only_to_their_owner(self):
+        other = User.objects.create_user(username='other', password='test-password')
+        job = ExportJob.objects.create(user=other, resource='companies', export_format='csv')
+
+        response = self.client.get(reverse('exportjob-detail', args=[job.pk]))
+        self.assertEqual(response.status_code, 404)
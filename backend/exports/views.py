@@ -0,0 +1,28 @@
+from django.http import FileResponse
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+from .models import ExportJob
+from .serializers import ExportJobSerializer
+
+
+class ExportJobViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Kullanıcının arka plan dışa aktarım işleri ve hazırlanan dosyaların indirilmesi
+    """
+    queryset = ExportJob.objects.all()
+    serializer_class = ExportJobSerializer
+
+    def get_queryset(self):
+        return super().get_queryset().filter(user=self.request.user)
+
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        """
+        Tamamlanmış dışa aktarım dosyasını indir
+        """
+        job = self.get_object()
+        if job.status != 'completed' or not job.file:
+            return Response({"error": "Dosya henüz hazır değil"}, status=status.HTTP_409_CONFLICT)
+        return FileResponse(job.file.open('rb'), as_attachment=True, filename=job.file_name)
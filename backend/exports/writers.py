@@ -0,0 +1,192 @@
+"""
+CSV ve XLSX dosyalarını satır satır üreten akış yazıcıları.
+
+Her iki yazıcı da satırları bir iterator'dan okur ve parça parça `bytes`
+üretir; bellekte tutulan veri dosya boyutundan bağımsızdır. XLSX dosyası
+(bir ZIP arşivi) ek kütüphane kullanmadan, arşiv akışa yazılarak üretilir.
+"""
+import csv
+import io
+import re
+import zipfile
+from datetime import date, datetime
+from decimal import Decimal
+from xml.sax.saxutils import escape
+
+from django.utils import timezone
+
+# Bu kadar satırda bir çıktı parçası üretilir
+ROWS_PER_CHUNK = 500
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+# Elektronik tablo programlarında formül olarak çalıştırılabilecek hücre başlangıçları
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+# XML 1.0'da izin verilmeyen kontrol karakterleri
+ILLEGAL_XML_CHARS_RE = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+def format_cell(value):
+    """
+    Hücre değerini dışa aktarım için sadeleştirir: tarihler yerel saatle
+    metne, mantıksal değerler Evet/Hayır'a çevrilir; sayılar korunur.
+    """
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'Evet' if value else 'Hayır'
+    if isinstance(value, (int, float, Decimal)):
+        return value
+    if isinstance(value, datetime):
+        if timezone.is_aware(value):
+            value = timezone.localtime(value)
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    if isinstance(value, date):
+        return value.isoformat()
+
+    text = str(value)
+    # CSV/formül enjeksiyonuna karşı metin olarak işaretle
+    if text.startswith(FORMULA_PREFIXES):
+        text = "'" + text
+    return text
+
+
+def iter_csv(header, rows):
+    """
+    UTF-8 (BOM'lu, Excel'in Türkçe karakterleri doğru açması için) CSV parçaları üretir.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write('\ufeff')
+    writer.writerow(header)
+
+    for index, row in enumerate(rows, 1):
+        writer.writerow([format_cell(value) for value in row])
+        if index % ROWS_PER_CHUNK == 0:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode('utf-8')
+
+
+class _ChunkBuffer:
+    """
+    ZipFile'ın yazdığı baytları biriktiren, konumlanamayan (unseekable) dosya benzeri nesne.
+    """
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def _column_name(index):
+    name = ''
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        name = chr(65 + remainder) + name
+    return name
+
+
+def _xlsx_row(row_number, values):
+    cells = []
+    for column, value in enumerate(values):
+        reference = f"{_column_name(column)}{row_number}"
+        value = format_cell(value)
+        if isinstance(value, (int, float, Decimal)):
+            cells.append(f'<c r="{reference}"><v>{value}</v></c>')
+        elif value != '':
+            text = escape(ILLEGAL_XML_CHARS_RE.sub('', value))
+            cells.append(f'<c r="{reference}" t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>')
+    return f'<row r="{row_number}">{"".join(cells)}</row>'
+
+
+XLSX_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '</Types>'
+)
+XLSX_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+XLSX_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '</Relationships>'
+)
+XLSX_SHEET_HEADER = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+XLSX_SHEET_FOOTER = '</sheetData></worksheet>'
+
+
+def _xlsx_workbook(sheet_name):
+    # Sayfa adı en fazla 31 karakter olabilir ve bazı karakterleri içeremez
+    sheet_name = escape(re.sub(r'[\[\]:*?/\\]', '', sheet_name)[:31] or 'Sayfa1')
+    return (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        f'<sheets><sheet name="{sheet_name}" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    )
+
+
+def iter_xlsx(header, rows, sheet_name='Sayfa1'):
+    """
+    Tek sayfalık XLSX dosyası parçaları üretir. Çalışma sayfası sıkıştırılarak
+    arşive akış halinde yazılır; ZIP merkez dizini en sonda eklenir.
+    """
+    buffer = _ChunkBuffer()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('[Content_Types].xml', XLSX_CONTENT_TYPES)
+        archive.writestr('_rels/.rels', XLSX_ROOT_RELS)
+        archive.writestr('xl/workbook.xml', _xlsx_workbook(sheet_name))
+        archive.writestr('xl/_rels/workbook.xml.rels', XLSX_WORKBOOK_RELS)
+
+        with archive.open('xl/worksheets/sheet1.xml', 'w') as sheet:
+            sheet.write((XLSX_SHEET_HEADER + _xlsx_row(1, header)).encode('utf-8'))
+            yield buffer.take()
+
+            for row_number, row in enumerate(rows, 2):
+                sheet.write(_xlsx_row(row_number, row).encode('utf-8'))
+                if row_number % ROWS_PER_CHUNK == 0:
+                    yield buffer.take()
+
+            sheet.write(XLSX_SHEET_FOOTER.encode('utf-8'))
+    yield buffer.take()
+
+
+def iter_export(export_format, header, rows, sheet_name='Sayfa1'):
+    if export_format == 'xlsx':
+        return iter_xlsx(header, rows, sheet_name)
+    return iter_csv(header, rows)
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Notification, NotificationPreference
+from .models import Notification, NotificationCounter, NotificationPreference
 
 
 @admin.register(Notification)
@@ -117,3 +117,13 @@ class NotificationPreferenceAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         }),
     )
+
+
+@admin.register(NotificationCounter)
+class NotificationCounterAdmin(admin.ModelAdmin):
+    """
+    Okunmamış bildirim sayaçları için admin panel yapılandırması (sayaçlar periyodik görevle eşitlenir)
+    """
+    list_display = ('user', 'unread_count', 'updated_at')
+    search_fields = ('user__username',)
+    readonly_fields = ('user', 'unread_count', 'updated_at')
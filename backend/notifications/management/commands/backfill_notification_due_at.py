@@ -0,0 +1,44 @@
+from itertools import islice
+
+from django.core.management.base import BaseCommand
+
+from notifications.models import Notification
+from notifications.reminders import parse_reminder_datetime
+
+
+class Command(BaseCommand):
+    help = "Hatırlatma bildirimlerinin due_at kolonunu metadata['reminder_datetime'] değerinden doldur"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Tek seferde güncellenecek bildirim sayısı (varsayılan: 1000)',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        notifications = (
+            Notification.objects.filter(notification_type='reminder', due_at__isnull=True)
+            .exclude(metadata__reminder_datetime__isnull=True)
+            .only('id', 'metadata')
+            .iterator(chunk_size=batch_size)
+        )
+
+        updated = invalid = 0
+        while batch := list(islice(notifications, batch_size)):
+            to_update = []
+            for notification in batch:
+                notification.due_at = parse_reminder_datetime(notification.metadata.get('reminder_datetime'))
+                if notification.due_at is None:
+                    invalid += 1
+                else:
+                    to_update.append(notification)
+            Notification.objects.bulk_update(to_update, ['due_at'])
+            updated += len(to_update)
+
+        self.stdout.write(f'{updated} bildirim güncellendi')
+        if invalid:
+            self.stdout.write(self.style.WARNING(f'{invalid} bildirimde geçersiz hatırlatma zamanı var'))
+        self.stdout.write(self.style.SUCCESS('due_at doldurma tamamlandı!'))
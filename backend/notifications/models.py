@@ -1,10 +1,37 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Count, F
 from django.utils import timezone
 from django.contrib.auth.models import User
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.contenttypes.fields import GenericForeignKey
 
 
+class NotificationQuerySet(models.QuerySet):
+    """
+    Bildirim sorguları; silme işlemleri okunmamış sayaçlarını günceller.
+    """
+
+    def visible(self):
+        # Gönderilmemiş hatırlatmalar kullanıcıya gösterilmez
+        return self.exclude(notification_type='reminder', is_sent=False)
+
+    def unread_counts(self):
+        """
+        Alıcı bazında görünür okunmamış bildirim sayıları: {kullanıcı id: sayı}
+        """
+        return dict(
+            self.visible().filter(is_read=False).order_by().values('recipient')
+            .annotate(unread=Count('id')).values_list('recipient', 'unread')
+        )
+
+    def delete(self):
+        with transaction.atomic():
+            unread_counts = self.unread_counts()
+            result = super().delete()
+            NotificationCounter.objects.adjust({user_id: -count for user_id, count in unread_counts.items()})
+        return result
+
+
 class Notification(models.Model):
     """
     Sistem bildirimleri için model
@@ -65,6 +92,8 @@ class Notification(models.Model):
     is_sent = models.BooleanField(default=False, verbose_name="Gönderildi")
     read_at = models.DateTimeField(null=True, blank=True, verbose_name="Okunma Tarihi")
     sent_at = models.DateTimeField(null=True, blank=True, verbose_name="Gönderilme Tarihi")
+    # Hatırlatmanın gönderileceği zaman (metadata['reminder_datetime'] ile aynı)
+    due_at = models.DateTimeField(null=True, blank=True, verbose_name="Gönderim Zamanı")
 
     # Ek bilgiler
     action_url = models.URLField(blank=True, null=True, verbose_name="Aksiyon URL")
@@ -79,6 +108,8 @@ class Notification(models.Model):
     created_at = models.DateTimeField(default=timezone.now, verbose_name="Oluşturulma Tarihi")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="Güncellenme Tarihi")
 
+    objects = NotificationQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Bildirim"
         verbose_name_plural = "Bildirimler"
@@ -87,24 +118,54 @@ class Notification(models.Model):
             models.Index(fields=['recipient', 'is_read']),
             models.Index(fields=['notification_type']),
             models.Index(fields=['created_at']),
+            # Yalnızca gönderilmemiş hatırlatmalar; zamanı gelenler bu küçük indeksten bulunur
+            models.Index(
+                fields=['due_at'],
+                condition=models.Q(notification_type='reminder', is_sent=False),
+                name='notification_due_reminder_idx',
+            ),
         ]
 
     def __str__(self):
         return f"{self.title} - {self.recipient.username}"
 
+    @property
+    def is_visible(self):
+        return not (self.notification_type == 'reminder' and not self.is_sent)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            if self.is_visible and not self.is_read:
+                NotificationCounter.objects.adjust({self.recipient_id: -1})
+        return result
+
     def mark_as_read(self):
         """Bildirimi okundu olarak işaretle"""
         if not self.is_read:
             self.is_read = True
             self.read_at = timezone.now()
-            self.save(update_fields=['is_read', 'read_at'])
-            
+            with transaction.atomic():
+                # Koşullu UPDATE: aynı bildirim paralel işaretlenirse sayaç bir kez azalır
+                updated = Notification.objects.filter(pk=self.pk, is_read=False).update(
+                    is_read=True, read_at=self.read_at
+                )
+                if updated and self.is_visible:
+                    NotificationCounter.objects.adjust({self.recipient_id: -1})
+
     def mark_as_sent(self):
         """Bildirimi gönderildi olarak işaretle"""
         if not self.is_sent:
+            was_visible = self.is_visible
             self.is_sent = True
             self.sent_at = timezone.now()
-            self.save(update_fields=['is_sent', 'sent_at'])
+            with transaction.atomic():
+                updated = Notification.objects.filter(pk=self.pk, is_sent=False).update(
+                    is_sent=True, sent_at=self.sent_at
+                )
+                # Gönderilen hatırlatma artık görünür
+                if updated and not was_visible and not self.is_read:
+                    NotificationCounter.objects.adjust({self.recipient_id: 1})
 
     @classmethod
     def create_meeting_created(cls, event, user):
@@ -136,6 +197,7 @@ class Notification(models.Model):
             content_object=event,
             action_url=f"/events/{event.id}",
             is_sent=False,  # Hatırlatma zamanı geldiğinde e-posta gönderilecek
+            due_at=reminder_datetime,
             metadata={
                 'event_id': event.id,
                 'event_type': event.event_type,
@@ -181,3 +243,92 @@ class NotificationPreference(models.Model):
 
     def __str__(self):
         return f"{self.user.username} - Bildirim Tercihleri"
+
+
+class NotificationCounterQuerySet(models.QuerySet):
+    """
+    Okunmamış bildirim sayaçlarının atomik güncellenmesi ve veritabanıyla eşitlenmesi.
+    """
+
+    def adjust(self, deltas):
+        """
+        Sayaçları {kullanıcı id: değişim} kadar değiştirir; aynı değişim tek UPDATE ile
+        yazılır. Sayacı olmayan kullanıcılar atlanır (ilk okunduğunda hesaplanır).
+        """
+        users_by_delta = {}
+        for user_id, delta in deltas.items():
+            if delta:
+                users_by_delta.setdefault(delta, []).append(user_id)
+        now = timezone.now()
+        for delta, user_ids in users_by_delta.items():
+            self.filter(user_id__in=user_ids).update(unread_count=F('unread_count') + delta, updated_at=now)
+
+    def get_unread_count(self, user_id):
+        """
+        Kullanıcının okunmamış bildirim sayısı; sayaç yoksa hesaplanıp oluşturulur.
+        """
+        unread_count = self.filter(user_id=user_id).values_list('unread_count', flat=True).first()
+        if unread_count is None:
+            unread_count = Notification.objects.filter(recipient_id=user_id).unread_counts().get(user_id, 0)
+            counter, _ = self.get_or_create(user_id=user_id, defaults={'unread_count': unread_count})
+            unread_count = counter.unread_count
+        return max(unread_count, 0)
+
+    def reconcile(self, batch_size=1000):
+        """
+        Sayaçları veritabanındaki gerçek sayılarla karşılaştırıp sapanları düzeltir;
+        okunmamış bildirimi olup sayacı olmayan kullanıcılar için sayaç oluşturur.
+
+        Returns:
+            int: Düzeltilen veya oluşturulan sayaç sayısı
+        """
+        fixed = 0
+        user_ids = list(self.order_by('user_id').values_list('user_id', flat=True))
+        for start in range(0, len(user_ids), batch_size):
+            with transaction.atomic():
+                counters = list(self.select_for_update().filter(user_id__in=user_ids[start:start + batch_size]))
+                # Satırlar kilitliyken sayılır; bu sırada sayaç güncellemeleri bekler
+                actual = Notification.objects.filter(
+                    recipient_id__in=[counter.user_id for counter in counters]
+                ).unread_counts()
+                now = timezone.now()
+                drifted = []
+                for counter in counters:
+                    if counter.unread_count != actual.get(counter.user_id, 0):
+                        counter.unread_count, counter.updated_at = actual.get(counter.user_id, 0), now
+                        drifted.append(counter)
+                self.bulk_update(drifted, ['unread_count', 'updated_at'])
+                fixed += len(drifted)
+
+        existing = set(user_ids)
+        created = self.bulk_create([
+            NotificationCounter(user_id=user_id, unread_count=unread_count)
+            for user_id, unread_count in Notification.objects.unread_counts().items() if user_id not in existing
+        ], ignore_conflicts=True)
+        return fixed + len(created)
+
+
+class NotificationCounter(models.Model):
+    """
+    Kullanıcının okunmamış (görünür) bildirim sayısı; bildirim oluşturma,
+    okuma, gönderme ve silme işlemlerinde atomik olarak güncellenir, periyodik
+    olarak veritabanıyla eşitlenir.
+    """
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='notification_counter',
+        verbose_name="Kullanıcı"
+    )
+    unread_count = models.IntegerField(default=0, verbose_name="Okunmamış Bildirim")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Güncellenme Tarihi")
+
+    objects = NotificationCounterQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = "Bildirim Sayacı"
+        verbose_name_plural = "Bildirim Sayaçları"
+
+    def __str__(self):
+        return f"{self.user.username}: {self.unread_count}"
@@ -0,0 +1,112 @@
+"""
+Bildirimlerin bağlı istemcilere anlık iletilmesi (Redis pub/sub).
+
+Görünür hale gelen her bildirim (oluşturulan bildirimler ve zamanı gelip
+sahiplenilen hatırlatmalar) işlem commit edildikten sonra alıcının
+`notifications:user:<id>` kanalına yayınlanır. SSE uç noktası
+(`notifications.stream`) bu kanala abone olur; istemci yeniden bağlandığında
+son gördüğü bildirim id'sinden sonrası veritabanından tamamlanır.
+
+Yayın en iyi çaba ile yapılır: Redis'e ulaşılamazsa bildirim kaybolmaz,
+istemci bir sonraki bağlantısında veritabanından alır.
+"""
+import json
+import logging
+from functools import lru_cache
+
+import redis
+from django.conf import settings
+from django.core import signing
+from django.db import transaction
+from django.db.models import Q
+
+from .models import Notification
+from .serializers import NotificationListSerializer
+
+logger = logging.getLogger(__name__)
+
+NOTIFICATION_CHANNEL = 'notifications:user:{user_id}'
+# Akış bileti yalnızca bağlantı kurulurken doğrulanır; kısa ömürlüdür ve
+# URL'de taşındığı için erişim günlüklerine düşse de kalıcı kimlik bilgisi sızmaz
+STREAM_TICKET_SALT = 'notifications.stream-ticket'
+STREAM_TICKET_MAX_AGE = 60
+# Yeniden bağlanmada veritabanından tamamlanan en fazla bildirim; daha fazlası
+# kaçırıldıysa istemci listeyi REST API'den yeniden yükler
+STREAM_BACKFILL_LIMIT = 100
+
+
+def get_user_channel(user_id):
+    return NOTIFICATION_CHANNEL.format(user_id=user_id)
+
+
+def issue_stream_ticket(user):
+    """
+    Yalnızca bildirim akışına bağlanmak için kullanılabilen, imzalı ve kısa ömürlü bilet
+    """
+    return signing.dumps({'u': user.pk}, salt=STREAM_TICKET_SALT)
+
+
+def read_stream_ticket(ticket):
+    """
+    Returns:
+        int | None: Bilet geçerliyse kullanıcı id'si
+    """
+    try:
+        return signing.loads(ticket, salt=STREAM_TICKET_SALT, max_age=STREAM_TICKET_MAX_AGE)['u']
+    except (signing.BadSignature, KeyError, TypeError):
+        return None
+
+
+@lru_cache(maxsize=None)
+def get_redis(url):
+    return redis.Redis.from_url(url)
+
+
+def notification_payload(notification):
+    return dict(NotificationListSerializer(notification).data)
+
+
+def publish_notifications(notifications):
+    """
+    Görünür bildirimleri commit sonrasında alıcılarının kanalına yayınlar.
+    Anlık kanal yapılandırılmamışsa (NOTIFICATION_PUSH_REDIS_URL) hiçbir şey yapmaz.
+    """
+    url = settings.NOTIFICATION_PUSH_REDIS_URL
+    if not url:
+        return
+    messages = [
+        (get_user_channel(notification.recipient_id), json.dumps(notification_payload(notification)))
+        for notification in notifications if notification.pk and notification.is_visible
+    ]
+    if messages:
+        transaction.on_commit(lambda: _publish(url, messages))
+
+
+def _publish(url, messages):
+    try:
+        pipeline = get_redis(url).pipeline(transaction=False)
+        for channel, message in messages:
+            pipeline.publish(channel, message)
+        pipeline.execute()
+    except redis.RedisError as e:
+        logger.warning(f"Notification push failed for {len(messages)} notifications: {e}")
+
+
+def missed_notifications(user_id, last_id, limit=STREAM_BACKFILL_LIMIT):
+    """
+    İstemcinin son gördüğü bildirimden sonra görünür hale gelenler: daha yeni
+    bildirimler ve o bildirimden sonra gönderilen (daha önce oluşturulmuş) hatırlatmalar.
+
+    Returns:
+        tuple: (bildirim verileri, limit aşıldı mı)
+    """
+    visible = Notification.objects.filter(recipient_id=user_id).visible()
+    missed = Q(pk__gt=last_id)
+    last_seen_at = visible.filter(pk=last_id).values_list('created_at', flat=True).first()
+    if last_seen_at is not None:
+        missed |= Q(notification_type='reminder', sent_at__gt=last_seen_at, pk__lt=last_id)
+
+    notifications = list(visible.filter(missed).order_by('pk')[:limit + 1])
+    if len(notifications) > limit:
+        return [], True
+    return [notification_payload(notification) for notification in notifications], False
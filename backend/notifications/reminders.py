@@ -0,0 +1,186 @@
+"""
+Toplantı hatırlatmalarının zamanlanması ve sahiplenilmesi.
+
+Hatırlatma, zamanı yaklaştığında (REMINDER_SCHEDULE_HORIZON içinde) tam
+gönderim zamanına ETA verilmiş bir Celery görevi olarak kuyruğa alınır;
+etkinlik oluşturulurken signal'dan, daha ileri tarihli olanlar düşük
+frekanslı tarama görevinden. Görev, kuyruğa alındığı andaki `due_at`
+değerini taşır: etkinlik güncellenip hatırlatma başka zamana alındıysa veya
+silindiyse eski görev hiçbir şey yapmaz (iptal için revoke gerekmez).
+
+Gönderilmemiş hatırlatmalar `due_at` kolonundaki kısmi indeksten bulunur;
+metadata JSON'u taranmaz. Sahiplenme SELECT ... FOR UPDATE SKIP LOCKED ile
+yapılır ve satırlar aynı işlemde gönderildi olarak işaretlenir; böylece
+paralel çalışan beat/worker süreçleri aynı hatırlatmayı iki kez göndermez.
+"""
+from collections import Counter
+from datetime import timedelta
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Notification, NotificationCounter
+
+# Tek seferde sahiplenilen en fazla hatırlatma sayısı
+REMINDER_BATCH_SIZE = 500
+# Bu süre içinde gönderilecek hatırlatmalar ETA ile kuyruğa alınır; tarama
+# aralığından uzun olmalıdır. Worker belleğinde uzun süre bekleyen görev tutulmaz.
+REMINDER_SCHEDULE_HORIZON = timedelta(minutes=30)
+REMINDER_SCHEDULED_KEY = 'notifications:reminder-scheduled:{pk}:{due_at}'
+
+
+def due_reminders(now=None):
+    return Notification.objects.filter(
+        notification_type='reminder', is_sent=False, due_at__lte=now or timezone.now()
+    )
+
+
+def claim_due_reminders(limit=REMINDER_BATCH_SIZE, now=None):
+    """
+    Zamanı gelmiş hatırlatmaları sahiplenir ve gönderildi olarak işaretler.
+
+    Returns:
+        list: Sahiplenilen bildirimler
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        notifications = list(
+            due_reminders(now).select_for_update(skip_locked=True).order_by('due_at')[:limit]
+        )
+        Notification.objects.filter(pk__in=[notification.pk for notification in notifications]).update(
+            is_sent=True, sent_at=now, updated_at=now
+        )
+        # Gönderilen hatırlatmalar artık görünür ve okunmamış sayılır
+        NotificationCounter.objects.adjust(Counter(
+            notification.recipient_id for notification in notifications if not notification.is_read
+        ))
+    for notification in notifications:
+        notification.is_sent, notification.sent_at = True, now
+    return notifications
+
+
+def claim_reminder(notification_id, due_at):
+    """
+    Tek bir hatırlatmayı, hâlâ gönderilmemişse ve zamanı kuyruğa alındığı
+    andaki gibiyse sahiplenir.
+
+    Returns:
+        Notification | None
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        notification = (
+            due_reminders(now).select_for_update(skip_locked=True)
+            .filter(pk=notification_id, due_at=due_at).first()
+        )
+        if notification is None:
+            return None
+        Notification.objects.filter(pk=notification.pk).update(is_sent=True, sent_at=now, updated_at=now)
+        if not notification.is_read:
+            NotificationCounter.objects.adjust({notification.recipient_id: 1})
+    notification.is_sent, notification.sent_at = True, now
+    return notification
+
+
+def schedule_reminder(notification, now=None):
+    """
+    Hatırlatma yakın zamandaysa işlem onaylandıktan sonra gönderim zamanına
+    ETA verilmiş görev olarak kuyruğa alır. Aynı (hatırlatma, zaman) çifti
+    bir kez kuyruğa alınır.
+
+    Returns:
+        bool: Kuyruğa alındı mı
+    """
+    from .tasks import send_scheduled_reminder
+
+    now = now or timezone.now()
+    due_at = notification.due_at
+    if notification.is_sent or due_at is None or due_at > now + REMINDER_SCHEDULE_HORIZON:
+        return False
+
+    key = REMINDER_SCHEDULED_KEY.format(pk=notification.pk, due_at=due_at.isoformat())
+    if not cache.add(key, True, REMINDER_SCHEDULE_HORIZON.total_seconds() * 2):
+        return False
+    transaction.on_commit(lambda: send_scheduled_reminder.apply_async(
+        args=[notification.pk, due_at.isoformat()], eta=max(due_at, now)
+    ))
+    return True
+
+
+def schedule_upcoming_reminders(now=None):
+    """
+    Önümüzdeki REMINDER_SCHEDULE_HORIZON içinde gönderilecek hatırlatmaları kuyruğa alır.
+
+    Returns:
+        int: Yeni kuyruğa alınan hatırlatma sayısı
+    """
+    now = now or timezone.now()
+    upcoming = due_reminders(now + REMINDER_SCHEDULE_HORIZON).filter(due_at__gt=now).only('pk', 'due_at', 'is_sent')
+    return sum(schedule_reminder(notification, now) for notification in upcoming)
+
+
+def event_reminders(event):
+    return Notification.objects.filter(
+        notification_type='reminder',
+        content_type=ContentType.objects.get_for_model(event),
+        object_id=event.pk,
+    )
+
+
+def sync_meeting_reminder(event):
+    """
+    Etkinliğin hatırlatmasını etkinlikle eşitler: zamanı değiştiyse gönderilmemiş
+    hatırlatma yeniden zamanlanır, hatırlatma kaldırıldıysa iptal edilir, daha
+    önce gönderilmiş hatırlatmadan sonra yeni bir zaman verildiyse yenisi oluşturulur.
+    """
+    reminders = event_reminders(event)
+    if event.event_type != 'meeting' or not event.assigned_to_id or not event.reminder_datetime:
+        reminders.filter(is_sent=False).delete()
+        return None
+
+    metadata = {
+        'event_id': event.id,
+        'event_type': event.event_type,
+        'start_datetime': event.start_datetime.isoformat(),
+        'reminder_datetime': event.reminder_datetime.isoformat(),
+    }
+    pending = reminders.filter(is_sent=False).order_by('pk').first()
+    if pending is None:
+        if event.reminder_datetime <= timezone.now() or reminders.filter(due_at=event.reminder_datetime).exists():
+            return None
+        notification = Notification.create_meeting_reminder(event, event.assigned_to, event.reminder_datetime)
+    else:
+        changes = {
+            'recipient_id': event.assigned_to_id,
+            'title': f"Toplantı Hatırlatması: {event.title}",
+            'message': f"'{event.title}' toplantısı yaklaşıyor.",
+            'due_at': event.reminder_datetime,
+            'metadata': metadata,
+        }
+        if all(getattr(pending, field) == value for field, value in changes.items()):
+            return pending
+        for field, value in changes.items():
+            setattr(pending, field, value)
+        pending.save(update_fields=[*changes, 'updated_at'])
+        notification = pending
+
+    schedule_reminder(notification)
+    return notification
+
+
+def parse_reminder_datetime(value):
+    """
+    metadata['reminder_datetime'] değerini datetime'a çevirir; geçersizse None döner.
+    """
+    if not isinstance(value, str):
+        return None
+    try:
+        parsed = parse_datetime(value)
+    except ValueError:
+        return None
+    if parsed is not None and timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
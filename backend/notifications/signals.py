@@ -2,7 +2,9 @@ from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from django.contrib.auth.models import User
 from events.models import Event
-from .models import Notification, NotificationPreference
+from .models import Notification, NotificationCounter, NotificationPreference
+from .push import publish_notifications
+from .reminders import event_reminders, schedule_reminder, sync_meeting_reminder
 from .tasks import send_meeting_created_email
 
 
@@ -27,20 +29,25 @@ def create_event_notifications(sender, instance, created, **kwargs):
                 )
             
             # Toplantı hatırlatması için bildirimi hatırlatma zamanına göre oluştur
-            # Bu bildirim otomatik olarak gönderilmeyecek, sadece zamanı gelince gönderilecek
+            # Bu bildirim otomatik olarak gönderilmeyecek, sadece zamanı gelince gönderilecek;
+            # zamanı yakınsa gönderim anına ETA verilmiş görev olarak kuyruğa alınır
             if instance.assigned_to and instance.reminder_datetime:
-                Notification.create_meeting_reminder(
+                reminder = Notification.create_meeting_reminder(
                     instance,
                     instance.assigned_to,
                     instance.reminder_datetime
                 )
+                schedule_reminder(reminder)
     else:
+        # Gönderilmemiş hatırlatma yeni zamana göre yeniden zamanlanır veya iptal edilir
+        sync_meeting_reminder(instance)
+
         # Etkinlik güncellendi - artık "event_updated" tipi kullanılacak ve başlık "Toplantı Hatırlatması" olacak
         if instance.assigned_to:
-            # Varsa önceki hatırlatma bildirimlerini sil
+            # Varsa önceki güncelleme bildirimlerini sil
             Notification.objects.filter(
                 recipient=instance.assigned_to,
-                notification_type__in=['reminder', 'event_updated'],  # Hem eski reminder hem de event_updated bildirimlerini sil
+                notification_type='event_updated',
                 object_id=instance.id,
                 content_type__model='event'
             ).delete()
@@ -68,8 +75,10 @@ def create_event_notifications(sender, instance, created, **kwargs):
 @receiver(post_delete, sender=Event)
 def create_event_deletion_notification(sender, instance, **kwargs):
     """
-    Etkinlik silindiğinde bildirim oluştur
+    Etkinlik silindiğinde bildirim oluştur ve gönderilmemiş hatırlatmayı iptal et
     """
+    event_reminders(instance).filter(is_sent=False).delete()
+
     if instance.assigned_to:
         Notification.objects.create(
             recipient=instance.assigned_to,
@@ -85,12 +94,25 @@ def create_event_deletion_notification(sender, instance, **kwargs):
         )
 
 
+@receiver(post_save, sender=Notification)
+def push_created_notification(sender, instance, created, **kwargs):
+    """
+    Yeni bildirimi okunmamış sayacına ekle ve bağlı istemcilere ilet
+    (gönderilmemiş hatırlatmalar sahiplenildiklerinde sayılır ve iletilir)
+    """
+    if created:
+        if instance.is_visible and not instance.is_read:
+            NotificationCounter.objects.adjust({instance.recipient_id: 1})
+        publish_notifications([instance])
+
+
 @receiver(post_save, sender=User)
 def create_notification_preferences(sender, instance, created, **kwargs):
     """
-    Yeni kullanıcı oluşturulduğunda varsayılan bildirim tercihlerini oluştur
+    Yeni kullanıcı oluşturulduğunda okunmamış sayacını ve varsayılan bildirim tercihlerini oluştur
     """
     if created:
+        NotificationCounter.objects.get_or_create(user=instance)
         NotificationPreference.objects.get_or_create(
             user=instance,
             defaults={
@@ -0,0 +1,199 @@
+"""
+Anlık bildirimler için ASGI Server-Sent Events uç noktası.
+
+İstemci önce `stream_ticket` action'ından kısa ömürlü bir bilet alır ve
+`EventSource` ile `STREAM_PATH?ticket=...` adresine bağlanır (tarayıcı başlık
+gönderemediği için kalıcı API token'ı URL'de taşınmaz). Bağlantı boyunca
+kullanıcının Redis kanalına gelen bildirimler `notification` olayı olarak
+iletilir; olay id'si bildirim id'sidir. Tarayıcı yeniden bağlanırken
+`Last-Event-ID` başlığını gönderir ve aradaki bildirimler veritabanından
+tamamlanır; kaçırılan bildirim sayısı çok fazlaysa `resync` olayı gönderilir.
+
+Uç nokta Django middleware zincirinin dışında çalıştığından CORS başlıkları
+`CORS_*` ayarlarına göre burada eklenir.
+"""
+import asyncio
+import json
+import re
+from contextlib import suppress
+from urllib.parse import parse_qs, urlsplit
+
+from asgiref.sync import sync_to_async
+from corsheaders.conf import conf as cors_conf
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import close_old_connections
+from redis import RedisError
+from redis import asyncio as aioredis
+
+from .push import get_user_channel, missed_notifications, read_stream_ticket
+
+STREAM_PATH = '/api/v1/notifications/stream/'
+# Proxy'lerin boşta kalan bağlantıyı kapatmaması için yorum satırı gönderim aralığı (sn)
+HEARTBEAT_INTERVAL = 15
+# Bağlantı koptuğunda tarayıcının yeniden denemeden önce beklediği süre (ms)
+RECONNECT_DELAY_MS = 5000
+
+
+def _authenticate(ticket):
+    user_id = read_stream_ticket(ticket)
+    if user_id is None:
+        return None
+    close_old_connections()
+    try:
+        return user_id if User.objects.filter(pk=user_id, is_active=True).exists() else None
+    finally:
+        close_old_connections()
+
+
+def _load_missed(user_id, last_id):
+    close_old_connections()
+    try:
+        return missed_notifications(user_id, last_id)
+    finally:
+        close_old_connections()
+
+
+def _get_query_param(scope, name, default=None):
+    return parse_qs(scope.get('query_string', b'').decode('latin-1')).get(name, [default])[0]
+
+
+def cors_headers(scope):
+    """
+    İsteğin Origin'i CORS ayarlarında izinliyse eklenecek yanıt başlıkları
+    (corsheaders.middleware.CorsMiddleware ile aynı kurallar)
+    """
+    origin = dict(scope['headers']).get(b'origin', b'').decode('latin-1')
+    if not origin:
+        return []
+    allowed = (
+        cors_conf.CORS_ALLOW_ALL_ORIGINS
+        or origin in cors_conf.CORS_ALLOWED_ORIGINS
+        or any(re.match(pattern, origin) for pattern in cors_conf.CORS_ALLOWED_ORIGIN_REGEXES)
+    )
+    if not allowed or urlsplit(origin).scheme not in ('http', 'https'):
+        return []
+
+    if cors_conf.CORS_ALLOW_ALL_ORIGINS and not cors_conf.CORS_ALLOW_CREDENTIALS:
+        headers = [(b'access-control-allow-origin', b'*')]
+    else:
+        headers = [(b'access-control-allow-origin', origin.encode('latin-1')), (b'vary', b'origin')]
+    if cors_conf.CORS_ALLOW_CREDENTIALS:
+        headers.append((b'access-control-allow-credentials', b'true'))
+    return headers
+
+
+def _get_last_id(scope):
+    last_id = dict(scope['headers']).get(b'last-event-id', b'').decode('latin-1')
+    if not last_id:
+        last_id = _get_query_param(scope, 'last_id', '')
+    return int(last_id) if last_id.isdigit() else None
+
+
+def format_event(payload=None, event=None, event_id=None, comment=None):
+    lines = []
+    if comment is not None:
+        lines.append(f': {comment}')
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    if event is not None:
+        lines.append(f'event: {event}')
+    if payload is not None:
+        lines.append(f'data: {json.dumps(payload)}')
+    return ('\n'.join(lines) + '\n\n').encode('utf-8')
+
+
+async def _send_error(scope, send, status, message):
+    await send({
+        'type': 'http.response.start', 'status': status,
+        'headers': [(b'content-type', b'application/json'), *cors_headers(scope)],
+    })
+    await send({'type': 'http.response.body', 'body': json.dumps({'error': message}).encode('utf-8')})
+
+
+async def _wait_for_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+class NotificationStreamMiddleware:
+    """
+    `STREAM_PATH` isteklerini SSE akışına, diğerlerini Django uygulamasına yönlendirir.
+    """
+
+    def __init__(self, application):
+        self.application = application
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http' and scope['path'] == STREAM_PATH:
+            return await notification_stream(scope, receive, send)
+        return await self.application(scope, receive, send)
+
+
+async def notification_stream(scope, receive, send):
+    ticket = _get_query_param(scope, 'ticket')
+    user_id = await sync_to_async(_authenticate)(ticket) if ticket else None
+    if user_id is None:
+        return await _send_error(scope, send, 401, "Akış bileti verilmedi, geçersiz veya süresi dolmuş")
+    if not settings.NOTIFICATION_PUSH_REDIS_URL:
+        return await _send_error(scope, send, 503, "Anlık bildirim kanalı yapılandırılmamış")
+
+    client = aioredis.Redis.from_url(settings.NOTIFICATION_PUSH_REDIS_URL)
+    pubsub = client.pubsub()
+    try:
+        # Veritabanından tamamlamadan önce abone olunur; aradaki bildirimler kaçmaz
+        await pubsub.subscribe(get_user_channel(user_id))
+    except RedisError:
+        await _close(client, pubsub)
+        return await _send_error(scope, send, 503, "Anlık bildirim kanalına şu anda ulaşılamıyor")
+
+    disconnected = asyncio.ensure_future(_wait_for_disconnect(receive))
+    try:
+        await send({
+            'type': 'http.response.start', 'status': 200,
+            'headers': [
+                (b'content-type', b'text/event-stream'),
+                (b'cache-control', b'no-cache'),
+                (b'x-accel-buffering', b'no'),
+                *cors_headers(scope),
+            ],
+        })
+        await send({'type': 'http.response.body', 'body': f'retry: {RECONNECT_DELAY_MS}\n\n'.encode(), 'more_body': True})
+
+        delivered = set()
+        last_id = _get_last_id(scope)
+        if last_id is not None:
+            payloads, overflow = await sync_to_async(_load_missed)(user_id, last_id)
+            if overflow:
+                await send({'type': 'http.response.body', 'body': format_event({}, event='resync'), 'more_body': True})
+            for payload in payloads:
+                delivered.add(payload['id'])
+                await send({
+                    'type': 'http.response.body', 'more_body': True,
+                    'body': format_event(payload, event='notification', event_id=payload['id']),
+                })
+
+        while not disconnected.done():
+            message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=HEARTBEAT_INTERVAL)
+            if message is None:
+                body = format_event(comment='keepalive')
+            else:
+                payload = json.loads(message['data'])
+                if payload['id'] in delivered:
+                    continue
+                body = format_event(payload, event='notification', event_id=payload['id'])
+            await send({'type': 'http.response.body', 'body': body, 'more_body': True})
+    except (OSError, RedisError):
+        # İstemci ayrıldı veya Redis bağlantısı koptu; akış kapanır, istemci
+        # yeniden bağlanıp kaldığı yerden devam eder
+        pass
+    finally:
+        disconnected.cancel()
+        await _close(client, pubsub)
+
+
+async def _close(client, pubsub):
+    with suppress(RedisError, OSError):
+        await pubsub.unsubscribe()
+    await pubsub.aclose()
+    await client.aclose()
@@ -1,16 +1,20 @@
 import logging
 from datetime import timedelta
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from django.core.mail import send_mail, EmailMultiAlternatives
 from django.conf import settings
-from django.template.loader import render_to_string
+from django.contrib.contenttypes.models import ContentType
+from django.template.loader import get_template, render_to_string
 from celery import shared_task
 from celery.exceptions import Retry
 
-from .models import Notification
+from .models import Notification, NotificationCounter
+from .push import publish_notifications
+from .reminders import claim_due_reminders, claim_reminder, schedule_upcoming_reminders
 from events.models import Event
 from authentication.models import UserProfile
-from communications.smtp_service import smtp_service
+from communications.smtp_service import get_smtp_account, get_smtp_config, smtp_service
 
 logger = logging.getLogger(__name__)
 
@@ -31,69 +35,93 @@ def get_sender_email(user):
         return user.email
 
 
+def get_urgency_color(remaining_minutes):
+    """
+    Kalan süreye göre aciliyet rengi
+    """
+    if remaining_minutes <= 15:
+        return '#ef4444'  # Acil durum - kırmızı
+    if remaining_minutes <= 30:
+        return '#f59e0b'  # Yaklaşan - turuncu
+    return '#3b82f6'  # Normal durum - mavi
+
+
+def get_meeting_email_events():
+    """
+    Toplantı e-postası için gereken ilişkiler tek seferde yüklenir
+    (şablon firma adını, katılımcıları ve sorumlunun adını kullanır).
+    """
+    return Event.objects.select_related('company', 'assigned_to__profile').prefetch_related('contacts')
+
+
+def build_meeting_email(event, user_profile, template, **extra_context):
+    """
+    Toplantı e-postasının HTML içeriği ve katılımcı adresleri.
+    Katılımcılar önceden yüklendiyse yeni sorgu çalışmaz.
+    """
+    contacts = list(event.contacts.all())
+    html_content = template.render({'event': event, 'user_profile': user_profile, 'contacts': contacts, **extra_context})
+    return html_content, [contact.email for contact in contacts if contact.email]
+
+
+def get_meeting_smtp_config(user_profile):
+    """
+    Profilde SMTP ayarları eksiksizse gönderim konfigürasyonu, yoksa None
+    """
+    if user_profile.smtp_server and user_profile.smtp_username and user_profile.smtp_password:
+        return {**get_smtp_config(user_profile), 'smtp_port': user_profile.smtp_port or 587}
+    return None
+
+
+def send_meeting_email(user_profile, smtp_config, subject, html_content, participant_emails):
+    """
+    Toplantı e-postasını sorumlu kullanıcıya, katılımcılar CC'de olacak şekilde gönderir.
+
+    Returns:
+        tuple: (success: bool, message: str)
+    """
+    # Communications uygulamasının SMTP servisini kullanarak e-posta gönder
+    success, message, _ = smtp_service.send_email(
+        from_email=user_profile.smtp_username,
+        from_name=f"{user_profile.user.first_name} {user_profile.user.last_name}",
+        to_emails=[user_profile.user.email],
+        subject=subject,
+        content=html_content,
+        cc_emails=participant_emails or None,
+        smtp_config=smtp_config
+    )
+    return success, message
+
+
 @shared_task(bind=True, max_retries=3, default_retry_delay=60)
 def send_meeting_created_email(self, event_id, user_id):
     """
     Toplantı oluşturulduğunda e-posta gönder
     """
     try:
-        event = Event.objects.get(id=event_id)
-        user_profile = UserProfile.objects.get(user_id=user_id)
-        
-        # E-posta içeriği hazırla
-        subject = f"Yeni Toplantı: {event.title}"
-        
-        # HTML içerik - gelişmiş şablon kullan - direkt Django şablonunu render et
-        # Şablon için context hazırla
-        context = {
-            'event': event,
-            'user_profile': user_profile,
-            'contacts': event.contacts.all() if event.contacts.exists() else []
-        }
-        
-        # HTML şablonunu render et
-        html_content = render_to_string('emails/meeting_created.html', context)
-        
-        # Katılımcıların e-postalarını ekle
-        participant_emails = []
-        for contact in event.contacts.all():
-            if contact.email:
-                participant_emails.append(contact.email)
-        
+        event = get_meeting_email_events().get(id=event_id)
+        user_profile = UserProfile.objects.select_related('user').get(user_id=user_id)
+
+        html_content, participant_emails = build_meeting_email(
+            event, user_profile, get_template('emails/meeting_created.html')
+        )
+
         # SMTP ayarlarını kontrol et
-        if user_profile.smtp_server and user_profile.smtp_username and user_profile.smtp_password:
-            smtp_config = {
-                'smtp_server': user_profile.smtp_server,
-                'smtp_port': user_profile.smtp_port or 587,
-                'smtp_username': user_profile.smtp_username,
-                'smtp_password': user_profile.smtp_password,
-                'use_tls': user_profile.use_tls,
-            }
-            
-            # Communications uygulamasının SMTP servisini kullanarak e-posta gönder
-            from_email = user_profile.smtp_username
-            from_name = f"{user_profile.user.first_name} {user_profile.user.last_name}"
-            success, message, response = smtp_service.send_email(
-                from_email=from_email,
-                from_name=from_name,
-                to_emails=[user_profile.user.email],
-                subject=subject,
-                content=html_content,
-                cc_emails=participant_emails if participant_emails else None,
-                smtp_config=smtp_config
-            )
-            
-            if not success:
-                logger.error(f"Error sending email via SMTP service: {message}")
-                raise Exception(f"SMTP error: {message}")
-            
-        else:
+        smtp_config = get_meeting_smtp_config(user_profile)
+        if smtp_config is None:
             logger.error("SMTP configuration not found for user")
             raise Exception("SMTP configuration not found for user")
-        
+
+        success, message = send_meeting_email(
+            user_profile, smtp_config, f"Yeni Toplantı: {event.title}", html_content, participant_emails
+        )
+        if not success:
+            logger.error(f"Error sending email via SMTP service: {message}")
+            raise Exception(f"SMTP error: {message}")
+
         logger.info(f"Meeting created email sent for event {event_id} to user {user_id}")
         return f"Email sent successfully for event {event_id}"
-        
+
     except Event.DoesNotExist:
         logger.error(f"Event {event_id} not found")
         return f"Event {event_id} not found"
@@ -110,81 +138,38 @@ def send_meeting_created_email(self, event_id, user_id):
 @shared_task(bind=True, max_retries=3, default_retry_delay=60)
 def send_meeting_reminder_email(self, event_id, user_id, reminder_minutes=60):
     """
-    Toplantı hatırlatması e-postası gönder
+    Toplantı hatırlatması e-postası gönder (toplu gönderimde başarısız olanların tekrar denemesi)
     """
     try:
-        event = Event.objects.get(id=event_id)
-        user_profile = UserProfile.objects.get(user_id=user_id)
-        
+        event = get_meeting_email_events().get(id=event_id)
+        user_profile = UserProfile.objects.select_related('user').get(user_id=user_id)
+
         # Toplantı zamanı kontrolü
         time_until_meeting = event.start_datetime - timezone.now()
         if time_until_meeting.total_seconds() < 0:
             logger.warning(f"Meeting {event_id} has already started")
             return f"Meeting {event_id} has already started"
-        
-        # E-posta içeriği hazırla
-        subject = f"Toplantı Hatırlatması: {event.title} ({reminder_minutes} dakika kaldı)"
-        
-        # HTML içerik - gelişmiş şablon kullan - direkt Django şablonunu render et
-        # Kalan süreye göre aciliyet rengi
-        urgency_color = '#3b82f6'  # Normal durum - mavi
-        if reminder_minutes <= 15:
-            urgency_color = '#ef4444'  # Acil durum - kırmızı
-        elif reminder_minutes <= 30:
-            urgency_color = '#f59e0b'  # Yaklaşan - turuncu
-        
-        # Şablon için context hazırla
-        context = {
-            'event': event,
-            'user_profile': user_profile,
-            'remaining_minutes': reminder_minutes,
-            'urgency_color': urgency_color,
-            'contacts': event.contacts.all() if event.contacts.exists() else []
-        }
-        
-        # HTML şablonunu render et
-        html_content = render_to_string('emails/meeting_reminder.html', context)
-        
-        # Katılımcıların e-postalarını ekle
-        participant_emails = []
-        for contact in event.contacts.all():
-            if contact.email:
-                participant_emails.append(contact.email)
-        
+
+        html_content, participant_emails = build_meeting_email(
+            event, user_profile, get_template('emails/meeting_reminder.html'),
+            remaining_minutes=reminder_minutes, urgency_color=get_urgency_color(reminder_minutes),
+        )
+
         # SMTP ayarlarını kontrol et
-        if user_profile.smtp_server and user_profile.smtp_username and user_profile.smtp_password:
-            smtp_config = {
-                'smtp_server': user_profile.smtp_server,
-                'smtp_port': user_profile.smtp_port or 587,
-                'smtp_username': user_profile.smtp_username,
-                'smtp_password': user_profile.smtp_password,
-                'use_tls': user_profile.use_tls,
-            }
-            
-            # Communications uygulamasının SMTP servisini kullanarak e-posta gönder
-            from_email = user_profile.smtp_username
-            from_name = f"{user_profile.user.first_name} {user_profile.user.last_name}"
-            success, message, response = smtp_service.send_email(
-                from_email=from_email,
-                from_name=from_name,
-                to_emails=[user_profile.user.email],
-                subject=subject,
-                content=html_content,
-                cc_emails=participant_emails if participant_emails else None,
-                smtp_config=smtp_config
-            )
-            
-            if not success:
-                logger.error(f"Error sending email via SMTP service: {message}")
-                raise Exception(f"SMTP error: {message}")
-        
-        else:
+        smtp_config = get_meeting_smtp_config(user_profile)
+        if smtp_config is None:
             logger.error("SMTP configuration not found for user")
             raise Exception("SMTP configuration not found for user")
-        
+
+        subject = f"Toplantı Hatırlatması: {event.title} ({reminder_minutes} dakika kaldı)"
+        success, message = send_meeting_email(user_profile, smtp_config, subject, html_content, participant_emails)
+        if not success:
+            logger.error(f"Error sending email via SMTP service: {message}")
+            raise Exception(f"SMTP error: {message}")
+
         logger.info(f"Meeting reminder email sent for event {event_id} to user {user_id}")
         return f"Reminder email sent successfully for event {event_id}"
-        
+
     except Event.DoesNotExist:
         logger.error(f"Event {event_id} not found")
         return f"Event {event_id} not found"
@@ -198,73 +183,112 @@ def send_meeting_reminder_email(self, event_id, user_id, reminder_minutes=60):
         return f"Failed to send reminder email after {self.max_retries} retries: {exc}"
 
 
+def dispatch_meeting_reminders(notifications, now=None):
+    """
+    Sahiplenilmiş hatırlatmaların e-postalarını toplu gönderir.
+
+    Etkinlikler, katılımcılar, firmalar ve sorumlu kullanıcıların profilleri
+    hatırlatma sayısından bağımsız birkaç sorguyla yüklenir; şablon bir kez
+    derlenir, gönderimler SMTP hesabına göre gruplanır (havuzdaki aynı bağlantı
+    art arda kullanılır) ve etkinlikler tek UPDATE ile işaretlenir. Gönderilemeyen
+    e-postalar tekrar denemeli tekil göreve devredilir.
+
+    Returns:
+        int: İşlenen (sistem içi bildirimi etkinleşen) hatırlatma sayısı
+    """
+    now = now or timezone.now()
+    event_type = ContentType.objects.get_for_model(Event)
+    event_ids = {
+        notification.object_id for notification in notifications
+        if notification.content_type_id == event_type.pk and notification.object_id
+    }
+    events = get_meeting_email_events().filter(pk__in=event_ids, assigned_to__isnull=False).in_bulk()
+    template = get_template('emails/meeting_reminder.html')
+
+    deliveries = []
+    for notification in notifications:
+        event = events.get(notification.object_id) if notification.content_type_id == event_type.pk else None
+        if event is None:
+            continue
+        remaining_minutes = max(1, int((event.start_datetime - now).total_seconds() / 60))
+        deliveries.append((notification, event, remaining_minutes))
+
+    # Sistem içi bildirim sahiplenilirken gönderildi olarak işaretlendi; etkinliklerin
+    # hatırlatma durumu tek UPDATE ile güncellenir (save() signal'ı tetiklemez)
+    Event.objects.filter(pk__in={event.pk for _, event, _ in deliveries}).update(is_reminder_sent=True)
+    # Sahiplenilen hatırlatmalar artık görünür; bağlı istemcilere iletilir
+    publish_notifications(notifications)
+
+    sendable, retries = [], []
+    for notification, event, remaining_minutes in deliveries:
+        if event.start_datetime <= now:
+            logger.warning(f"Meeting {event.pk} has already started")
+            continue
+        user_profile = getattr(event.assigned_to, 'profile', None)
+        smtp_config = get_meeting_smtp_config(user_profile) if user_profile else None
+        if smtp_config is None:
+            logger.error(f"SMTP configuration not found for user {event.assigned_to_id}")
+            continue
+        sendable.append((get_smtp_account(smtp_config), smtp_config, user_profile, event, remaining_minutes))
+
+    for _, smtp_config, user_profile, event, remaining_minutes in sorted(sendable, key=lambda item: item[0]):
+        try:
+            html_content, participant_emails = build_meeting_email(
+                event, user_profile, template,
+                remaining_minutes=remaining_minutes, urgency_color=get_urgency_color(remaining_minutes),
+            )
+            subject = f"Toplantı Hatırlatması: {event.title} ({remaining_minutes} dakika kaldı)"
+            success, message = send_meeting_email(user_profile, smtp_config, subject, html_content, participant_emails)
+        except Exception as e:
+            success, message = False, str(e)
+
+        if success:
+            logger.info(f"Meeting reminder email sent for event {event.pk} to user {event.assigned_to_id}")
+        else:
+            logger.error(f"Error sending reminder for event {event.pk}, retrying in background: {message}")
+            retries.append((event.pk, event.assigned_to_id, remaining_minutes))
+
+    for event_id, user_id, remaining_minutes in retries:
+        send_meeting_reminder_email.apply_async(args=[event_id, user_id, remaining_minutes], countdown=60)
+    return len(deliveries)
+
+
+@shared_task
+def send_scheduled_reminder(notification_id, due_at):
+    """
+    ETA ile zamanlanmış tek bir hatırlatmayı gönder; hatırlatma bu arada
+    başka zamana alındıysa, silindiyse veya gönderildiyse hiçbir şey yapmaz
+    """
+    notification = claim_reminder(notification_id, parse_datetime(due_at))
+    if notification is None:
+        return f"Reminder {notification_id} is no longer due at {due_at}"
+
+    sent_count = dispatch_meeting_reminders([notification])
+    logger.info(f"Scheduled reminder {notification_id} dispatched")
+    return f"Sent {sent_count} meeting reminder emails"
+
+
 @shared_task
 def send_pending_meeting_reminders():
     """
-    Bekleyen toplantı hatırlatmalarını gönder - sadece hatırlatma zamanı gelmiş ve henüz gönderilmemiş olanları
+    Hatırlatma taraması (güvenlik ağı): ETA görevi kaybolmuş veya gecikmiş
+    hatırlatmaları gönderir, yaklaşan hatırlatmaları ETA ile kuyruğa alır
     """
     now = timezone.now()
     logger.info(f"Checking for meeting reminders at {now.isoformat()}")
-    
-    # Gönderilmemiş ve zamanı gelmiş bildirimleri bul
-    # Bildirim zamanı şu andan önce olan ve gönderilmemiş bildirimleri bul
-    pending_notifications = Notification.objects.filter(
-        notification_type='reminder',
-        is_sent=False
-    ).exclude(metadata__reminder_datetime__isnull=True)
-    
-    # Bu şekilde filtreliyoruz çünkü JSONField içinde datetime karşılaştırması yaparken sorun çıkabilir
-    reminders_to_send = []
-    for notification in pending_notifications:
-        if 'reminder_datetime' in notification.metadata:
-            reminder_time_str = notification.metadata['reminder_datetime']
-            try:
-                reminder_time = timezone.datetime.fromisoformat(reminder_time_str)
-                if reminder_time <= now:
-                    reminders_to_send.append(notification)
-            except (ValueError, TypeError) as e:
-                logger.error(f"Invalid reminder_datetime format in notification {notification.id}: {e}")
-    
-    logger.info(f"Found {len(reminders_to_send)} meeting reminders to send")
-    pending_notifications = reminders_to_send
-    
+
     sent_count = 0
-    for notification in pending_notifications:
-        try:
-            if notification.content_object and notification.content_object.assigned_to:
-                # Kalan dakikayı hesapla
-                remaining_minutes = 60  # Varsayılan değer
-                if 'start_datetime' in notification.metadata:
-                    start_time = timezone.datetime.fromisoformat(notification.metadata['start_datetime'])
-                    remaining_seconds = (start_time - now).total_seconds()
-                    remaining_minutes = max(1, int(remaining_seconds / 60))
-                
-                # 1. E-posta gönder
-                send_meeting_reminder_email.delay(
-                    notification.content_object.id,
-                    notification.content_object.assigned_to.id,
-                    remaining_minutes
-                )
-                
-                # 2. Sistem içi bildirim olarak aktifleştir
-                # Bildirim zaten veritabanında var, sadece is_sent=True yapılacak
-                notification.is_sent = True
-                notification.sent_at = timezone.now()
-                notification.save(update_fields=['is_sent', 'sent_at'])
-                
-                # Aynı zamanda etkinlik modelindeki hatırlatma durumunu da güncelle
-                if notification.content_object:
-                    event = notification.content_object
-                    event.is_reminder_sent = True
-                    event.save(update_fields=['is_reminder_sent'])
-                
-                sent_count += 1
-                
-        except Exception as e:
-            logger.error(f"Error processing notification {notification.id}: {e}")
-    
-    logger.info(f"Processed {sent_count} meeting reminder notifications")
-    return f"Sent {sent_count} meeting reminder emails and activated {sent_count} in-system notifications"
+    # Zamanı gelmiş hatırlatmalar partiler halinde sahiplenilir (paralel görevler aynı kaydı almaz)
+    while notifications := claim_due_reminders(now=now):
+        logger.info(f"Claimed {len(notifications)} overdue meeting reminders")
+        sent_count += dispatch_meeting_reminders(notifications, now)
+
+    scheduled_count = schedule_upcoming_reminders(now)
+    logger.info(f"Processed {sent_count} meeting reminder notifications, scheduled {scheduled_count}")
+    return (
+        f"Sent {sent_count} meeting reminder emails and activated {sent_count} in-system notifications, "
+        f"scheduled {scheduled_count} upcoming reminders"
+    )
 
 
 @shared_task
@@ -318,6 +342,16 @@ def cleanup_old_notifications():
     return f"Cleaned up {deleted_count} old notifications"
 
 
+@shared_task
+def reconcile_notification_counters():
+    """
+    Okunmamış bildirim sayaçlarını veritabanıyla eşitle (kaçırılan güncellemeleri düzeltir)
+    """
+    fixed_count = NotificationCounter.objects.reconcile()
+    logger.info(f"Reconciled {fixed_count} notification counters")
+    return f"Reconciled {fixed_count} notification counters"
+
+
 @shared_task(bind=True, max_retries=3)
 def send_bulk_notification_emails(self, notification_ids):
     """
@@ -1,3 +1,414 @@
-from django.test import TestCase
+import asyncio
+import json
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+import redis
+from asgiref.sync import async_to_sync
+from asgiref.testing import ApplicationCommunicator
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from authentication.models import UserProfile
+from crm_project.testing import QueryBudgetMixin
+from customers.models import Company, Contact
+from events.models import Event
+from .models import Notification, NotificationCounter, NotificationPreference
+from .push import missed_notifications
+from .reminders import claim_due_reminders
+from .stream import NotificationStreamMiddleware, format_event
+from .tasks import (
+    dispatch_meeting_reminders, reconcile_notification_counters, send_pending_meeting_reminders,
+    send_scheduled_reminder,
+)
+from .urls import router
+
+
+class NotificationsQueryBudgetTests(QueryBudgetMixin, APITestCase):
+    """
+    Bildirim endpoint'lerinin sorgu bütçeleri (N+1 regresyonlarını yakalar)
+    """
+    router = router
+    budgets = {
+        'notification-list': 1,
+        'notification-detail': 1,
+        'notification-unread': 1,
+        'notification-unread-count': 1,
+        'notification-by-type': 1,
+        'notificationpreference-list': 1,
+        'notificationpreference-detail': 1,
+        'notificationpreference-my-preferences': 2,
+    }
+    route_params = {
+        'notification-by-type': {'type': 'info'},
+    }
+    route_models = {
+        'notification': Notification,
+        'notificationpreference': NotificationPreference,
+    }
+
+    def get_route_object(self, basename):
+        # Kullanıcı sadece kendi kayıtlarını görebildiği için detay route'ları kendi kaydıyla çağrılır
+        if basename == 'notification':
+            return Notification.objects.filter(recipient=self.user).first()
+        return NotificationPreference.objects.get(user=self.user)
+
+
+@mock.patch('notifications.signals.send_meeting_created_email.delay')
+class MeetingReminderDispatchTests(APITestCase):
+    """
+    Zamanı gelen hatırlatmaların due_at kolonu üzerinden sahiplenilmesi
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='reminder_user', password='test-password',
+                                             email='reminder@example.com')
+        UserProfile.objects.filter(user=self.user).update(
+            smtp_server='smtp.example.com', smtp_username='reminder@example.com', smtp_password='secret'
+        )
+        self.now = timezone.now()
+
+    def create_meeting(self, minutes_until_reminder):
+        start = self.now + timedelta(minutes=minutes_until_reminder + 60)
+        return Event.objects.create(
+            title=f'Toplantı {minutes_until_reminder}', event_type='meeting', assigned_to=self.user,
+            start_datetime=start, reminder_datetime=start - timedelta(minutes=60),
+        )
+
+    def test_reminders_are_claimed_once(self, _):
+        due = self.create_meeting(-5)
+        self.create_meeting(30)
+        reminder = Notification.objects.get(notification_type='reminder', object_id=due.pk)
+        self.assertEqual(reminder.due_at, due.reminder_datetime)
+
+        claimed = claim_due_reminders()
+        self.assertEqual([notification.pk for notification in claimed], [reminder.pk])
+        self.assertEqual(claim_due_reminders(), [])
+        reminder.refresh_from_db()
+        self.assertTrue(reminder.is_sent)
+
+    def test_pending_reminder_task_dispatches_due_reminders(self, _):
+        due = self.create_meeting(-1)
+        self.create_meeting(10)
+
+        with mock.patch('notifications.tasks.smtp_service.send_email', return_value=(True, 'ok', None)) as send:
+            result = send_pending_meeting_reminders()
+        self.assertIn('Sent 1', result)
+        self.assertEqual(send.call_args.kwargs['to_emails'], ['reminder@example.com'])
+        self.assertIn(due.title, send.call_args.kwargs['subject'])
+        due.refresh_from_db()
+        self.assertTrue(due.is_reminder_sent)
+        self.assertEqual(Notification.objects.filter(notification_type='reminder', is_sent=False).count(), 1)
+
+    def test_batch_dispatch_query_count_is_constant(self, _):
+        company = Company.objects.create(name='Toplu Gönderim A.Ş.')
+        for minutes in range(-10, 0):
+            event = self.create_meeting(minutes)
+            event.contacts.add(Contact.objects.create(company=company, first_name='Ayşe', last_name=f'Yılmaz {minutes}',
+                                                      email=f'ayse{-minutes}@example.com'))
+        notifications = claim_due_reminders(now=self.now)
+        self.assertEqual(len(notifications), 10)
+
+        # Etkinlikler (firma + profil), katılımcılar ve toplu UPDATE
+        with mock.patch('notifications.tasks.smtp_service.send_email', return_value=(True, 'ok', None)) as send, \
+                self.assertNumQueries(3):
+            self.assertEqual(dispatch_meeting_reminders(notifications, self.now), 10)
+        self.assertEqual(send.call_count, 10)
+        self.assertEqual(len(send.call_args.kwargs['cc_emails']), 1)
+        self.assertEqual(Event.objects.filter(is_reminder_sent=True).count(), 10)
+
+    def test_failed_send_is_retried_in_background(self, _):
+        self.create_meeting(-1)
+
+        with mock.patch('notifications.tasks.smtp_service.send_email', return_value=(False, 'down', None)), \
+                mock.patch('notifications.tasks.send_meeting_reminder_email.apply_async') as retry:
+            send_pending_meeting_reminders()
+        retry.assert_called_once()
+
+    def test_backfill_command_reads_metadata(self, _):
+        event = self.create_meeting(-5)
+        Notification.objects.update(due_at=None)
+        Notification.objects.create(recipient=self.user, notification_type='reminder', title='Bozuk', message='...',
+                                    metadata={'reminder_datetime': 'yarın'})
+
+        out = StringIO()
+        call_command('backfill_notification_due_at', stdout=out)
+        self.assertIn('1 bildirim güncellendi', out.getvalue())
+        self.assertEqual(
+            Notification.objects.get(notification_type='reminder', object_id=event.pk).due_at, event.reminder_datetime
+        )
+
+
+@mock.patch('notifications.signals.send_meeting_created_email.delay')
+@mock.patch('notifications.tasks.send_scheduled_reminder.apply_async')
+class MeetingReminderSchedulingTests(APITestCase):
+    """
+    Hatırlatmaların ETA ile zamanlanması, yeniden zamanlanması ve iptali
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='scheduler_user', password='test-password')
+
+    def create_meeting(self, reminder_in):
+        reminder_datetime = timezone.now() + reminder_in
+        with self.captureOnCommitCallbacks(execute=True):
+            event = Event.objects.create(
+                title='Planlama', event_type='meeting', assigned_to=self.user,
+                start_datetime=reminder_datetime + timedelta(hours=1), reminder_datetime=reminder_datetime,
+            )
+        return event, Notification.objects.get(notification_type='reminder', object_id=event.pk)
+
+    def test_near_reminder_is_queued_with_eta(self, apply_async, _):
+        event, reminder = self.create_meeting(timedelta(minutes=10))
+        apply_async.assert_called_once_with(
+            args=[reminder.pk, event.reminder_datetime.isoformat()], eta=event.reminder_datetime
+        )
+
+    def test_reschedule_and_cancel(self, apply_async, _):
+        event, reminder = self.create_meeting(timedelta(days=2))
+        # Uzak hatırlatmalar tarama görevine bırakılır
+        apply_async.assert_not_called()
+
+        old_due_at = reminder.due_at
+        event.reminder_datetime = timezone.now() + timedelta(minutes=5)
+        with self.captureOnCommitCallbacks(execute=True):
+            event.save()
+        reminder.refresh_from_db()
+        self.assertEqual(reminder.due_at, event.reminder_datetime)
+        self.assertEqual(apply_async.call_args.kwargs['eta'], event.reminder_datetime)
+        self.assertEqual(Notification.objects.filter(notification_type='reminder').count(), 1)
+
+        # Eski zamanla kuyruğa alınmış görev hiçbir şey yapmaz
+        self.assertIn('no longer due', send_scheduled_reminder(reminder.pk, old_due_at.isoformat()))
+
+        event.delete()
+        self.assertFalse(Notification.objects.filter(notification_type='reminder').exists())
+
+    def test_scheduled_task_sends_once(self, apply_async, _):
+        event, reminder = self.create_meeting(timedelta(minutes=10))
+        Notification.objects.filter(pk=reminder.pk).update(due_at=timezone.now() - timedelta(seconds=1))
+        reminder.refresh_from_db()
+
+        UserProfile.objects.filter(user=self.user).update(
+            smtp_server='smtp.example.com', smtp_username='scheduler@example.com', smtp_password='secret'
+        )
+        with mock.patch('notifications.tasks.smtp_service.send_email', return_value=(True, 'ok', None)) as send:
+            self.assertIn('Sent 1', send_scheduled_reminder(reminder.pk, reminder.due_at.isoformat()))
+            self.assertIn('no longer due', send_scheduled_reminder(reminder.pk, reminder.due_at.isoformat()))
+        send.assert_called_once()
+        event.refresh_from_db()
+        self.assertTrue(event.is_reminder_sent)
+        # Gönderildi işareti signal'ı tetiklemez, yeni hatırlatma oluşmaz
+        self.assertEqual(Notification.objects.filter(notification_type='reminder').count(), 1)
+
+    def test_sweep_queues_upcoming_reminders_once(self, apply_async, _):
+        self.create_meeting(timedelta(days=2))
+        _, reminder = self.create_meeting(timedelta(minutes=20))
+        apply_async.reset_mock()
+        cache.clear()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            send_pending_meeting_reminders()
+            send_pending_meeting_reminders()
+        apply_async.assert_called_once()
+        self.assertEqual(apply_async.call_args.kwargs['args'][0], reminder.pk)
+
+
+@override_settings(NOTIFICATION_PUSH_REDIS_URL='redis://push.test:6379/1')
+class NotificationPushTests(APITestCase):
+    """
+    Bildirimlerin Redis kanalına yayınlanması ve SSE akışında kaldığı yerden devam
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='push_user', password='test-password')
+        self.token = Token.objects.get(user=self.user)
+        self.redis = mock.patch('notifications.push.get_redis').start().return_value
+        self.addCleanup(mock.patch.stopall)
+
+    def published(self):
+        return [(call.args[0], json.loads(call.args[1])) for call in self.redis.pipeline.return_value.publish.call_args_list]
+
+    def test_visible_notifications_are_published_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            notification = Notification.objects.create(recipient=self.user, title='Merhaba', message='...')
+            Notification.objects.create(recipient=self.user, notification_type='reminder', title='Sonra', message='...')
+        self.assertEqual(self.published(), [(f'notifications:user:{self.user.pk}', mock.ANY)])
+        self.assertEqual(self.published()[0][1]['id'], notification.pk)
+
+        other = User.objects.create_user(username='push_other', password='test-password')
+        self.redis.reset_mock()
+        self.client.force_authenticate(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/v1/notifications/notifications/bulk_create/', {
+                'recipient_ids': [self.user.pk, other.pk], 'title': 'Duyuru', 'message': '...',
+                'notification_type': 'system',
+            }, format='json')
+        self.assertEqual(response.data['created_count'], 2)
+        self.assertEqual([channel for channel, _ in self.published()],
+                         [f'notifications:user:{self.user.pk}', f'notifications:user:{other.pk}'])
+
+    def test_resume_includes_reminders_sent_after_last_seen(self):
+        reminder = Notification.objects.create(recipient=self.user, notification_type='reminder', title='Toplantı',
+                                               message='...')
+        seen = Notification.objects.create(recipient=self.user, title='Görüldü', message='...')
+        newer = Notification.objects.create(recipient=self.user, title='Yeni', message='...')
+
+        payloads, overflow = missed_notifications(self.user.pk, seen.pk)
+        self.assertFalse(overflow)
+        self.assertEqual([payload['id'] for payload in payloads], [newer.pk])
+
+        Notification.objects.filter(pk=reminder.pk).update(is_sent=True, sent_at=timezone.now() + timedelta(seconds=1))
+        payloads, _ = missed_notifications(self.user.pk, seen.pk)
+        self.assertEqual([payload['id'] for payload in payloads], [reminder.pk, newer.pk])
+        self.assertEqual(missed_notifications(self.user.pk, 0, limit=2), ([], True))
+
+    def open_stream(self, query_string, headers=(), inputs=1):
+        async def run_stream():
+            communicator = ApplicationCommunicator(NotificationStreamMiddleware(None), {
+                'type': 'http', 'path': '/api/v1/notifications/stream/', 'query_string': query_string.encode(),
+                'headers': [(b'origin', b'http://localhost:3000'), *headers],
+            })
+            await communicator.send_input({'type': 'http.request'})
+            outputs = [await communicator.receive_output() for _ in range(inputs)]
+            await communicator.send_input({'type': 'http.disconnect'})
+            await communicator.wait()
+            return outputs
+
+        return async_to_sync(run_stream)()
+
+    def stream_ticket(self):
+        self.client.force_authenticate(self.user)
+        return self.client.post('/api/v1/notifications/notifications/stream_ticket/').data['ticket']
+
+    def test_stream_replays_missed_then_forwards_live_notifications(self):
+        seen = Notification.objects.create(recipient=self.user, title='Görüldü', message='...')
+        missed = Notification.objects.create(recipient=self.user, title='Kaçırıldı', message='...')
+        live = {'id': missed.pk + 1, 'title': 'Canlı'}
+
+        messages = [
+            {'type': 'message', 'data': json.dumps({'id': missed.pk, 'title': 'Kaçırıldı'})},
+            {'type': 'message', 'data': json.dumps(live)},
+        ]
+
+        async def get_message(**kwargs):
+            if messages:
+                return messages.pop(0)
+            await asyncio.sleep(0.01)
+
+        pubsub = mock.AsyncMock()
+        pubsub.get_message.side_effect = get_message
+        client = mock.AsyncMock()
+        client.pubsub = mock.Mock(return_value=pubsub)
+
+        with mock.patch('notifications.stream.aioredis.Redis.from_url', return_value=client):
+            start, *outputs = self.open_stream(
+                f'ticket={self.stream_ticket()}', headers=[(b'last-event-id', str(seen.pk).encode())], inputs=4
+            )
+        bodies = [output['body'] for output in outputs]
+
+        self.assertEqual(start['status'], 200)
+        # Akış Django middleware'lerinden geçmediği için CORS başlıkları burada eklenir
+        headers = dict(start['headers'])
+        self.assertEqual(headers[b'access-control-allow-origin'], b'http://localhost:3000')
+        self.assertEqual(headers[b'access-control-allow-credentials'], b'true')
+        pubsub.subscribe.assert_awaited_once_with(f'notifications:user:{self.user.pk}')
+        # Veritabanından tamamlanan bildirim canlı kanaldan ikinci kez iletilmez
+        self.assertIn(f'id: {missed.pk}\nevent: notification\n'.encode(), bodies[1])
+        self.assertEqual(bodies[2], format_event(live, event='notification', event_id=live['id']))
+
+    def test_stream_requires_valid_ticket(self):
+        # API token'ı URL'de kabul edilmez
+        self.assertEqual(self.open_stream(f'token={self.token.key}')[0]['status'], 401)
+        self.assertEqual(self.open_stream('ticket=bozuk')[0]['status'], 401)
+
+        ticket = self.stream_ticket()
+        # Süresi dolmuş bilet
+        with mock.patch('notifications.push.STREAM_TICKET_MAX_AGE', -1):
+            start = self.open_stream(f'ticket={ticket}')[0]
+        self.assertEqual(start['status'], 401)
+        self.assertIn((b'access-control-allow-origin', b'http://localhost:3000'), start['headers'])
+
+    def test_stream_reports_unavailable_redis(self):
+        pubsub = mock.AsyncMock()
+        pubsub.subscribe.side_effect = redis.ConnectionError('Connection refused')
+        client = mock.AsyncMock()
+        client.pubsub = mock.Mock(return_value=pubsub)
+
+        with mock.patch('notifications.stream.aioredis.Redis.from_url', return_value=client):
+            start = self.open_stream(f'ticket={self.stream_ticket()}')[0]
+        self.assertEqual(start['status'], 503)
+        client.aclose.assert_awaited_once()
+
+
+class NotificationCounterTests(APITestCase):
+    """
+    Okunmamış bildirim sayaçlarının artımlı güncellenmesi ve eşitlenmesi
+    """
+    url = '/api/v1/notifications/notifications/'
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='counter_user', password='test-password')
+        self.client.force_authenticate(self.user)
+
+    def create_notification(self, **kwargs):
+        return Notification.objects.create(recipient=self.user, title='Bildirim', message='...', **kwargs)
+
+    def unread_count(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(f'{self.url}unread_count/')
+        self.assertEqual(response.data['unread_count'], Notification.objects.filter(
+            recipient=self.user
+        ).unread_counts().get(self.user.pk, 0))
+        return response.data['unread_count']
+
+    def test_counter_follows_notification_lifecycle(self):
+        first = self.create_notification()
+        second = self.create_notification()
+        reminder = self.create_notification(notification_type='reminder', due_at=timezone.now())
+        self.assertEqual(self.unread_count(), 2)
+
+        self.client.post(f'{self.url}{first.pk}/mark_as_read/')
+        self.client.post(f'{self.url}{first.pk}/mark_as_read/')
+        self.assertEqual(self.unread_count(), 1)
+
+        claim_due_reminders()
+        self.assertEqual(self.unread_count(), 2)
+        Notification.objects.get(pk=reminder.pk).mark_as_read()
+        self.assertEqual(self.unread_count(), 1)
+
+        self.client.post(f'{self.url}bulk_create/', {
+            'recipient_ids': [self.user.pk, self.user.pk], 'title': 'Duyuru', 'message': '...',
+            'notification_type': 'system',
+        }, format='json')
+        self.assertEqual(self.unread_count(), 3)
+
+        self.client.delete(f'{self.url}{second.pk}/')
+        self.assertEqual(self.unread_count(), 2)
+        self.client.patch(f'{self.url}{Notification.objects.filter(is_read=False).first().pk}/', {'is_read': True})
+        self.assertEqual(self.unread_count(), 1)
+
+        self.client.post(f'{self.url}mark_all_as_read/')
+        self.assertEqual(self.unread_count(), 0)
+        self.create_notification()
+        Notification.objects.filter(recipient=self.user).delete()
+        self.assertEqual(self.unread_count(), 0)
+
+    def test_reconcile_repairs_drift_and_missing_counters(self):
+        self.create_notification()
+        NotificationCounter.objects.filter(user=self.user).update(unread_count=7)
+        other = User.objects.create_user(username='counter_other', password='test-password')
+        NotificationCounter.objects.filter(user=other).delete()
+        Notification.objects.bulk_create([Notification(recipient=other, title='Eski', message='...')])
+
+        self.assertIn('Reconciled 2', reconcile_notification_counters())
+        self.assertEqual(NotificationCounter.objects.get(user=self.user).unread_count, 1)
+        self.assertEqual(NotificationCounter.objects.get(user=other).unread_count, 1)
+        self.assertEqual(NotificationCounter.objects.reconcile(), 0)
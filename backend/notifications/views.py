@@ -2,8 +2,11 @@ from rest_framework import viewsets, status, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from collections import Counter
+from django.db import transaction
 from django.utils import timezone
-from .models import Notification, NotificationPreference
+from .models import Notification, NotificationCounter, NotificationPreference
+from .push import STREAM_TICKET_MAX_AGE, issue_stream_ticket, publish_notifications
 from .serializers import (
     NotificationSerializer,
     NotificationListSerializer,
@@ -25,9 +28,9 @@ class NotificationViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         # Kullanıcı sadece kendi bildirimlerini görebilir
-        queryset = Notification.objects.filter(recipient=self.request.user)
+        queryset = Notification.objects.filter(recipient=self.request.user).select_related('recipient')
         # Reminder tipinde ve is_sent=False olan bildirimleri HER ZAMAN dışla
-        queryset = queryset.exclude(notification_type='reminder', is_sent=False)
+        queryset = queryset.visible()
         # Ekstra tip filtresi varsa uygula
         notification_type = self.request.query_params.get('type')
         if notification_type:
@@ -45,23 +48,48 @@ class NotificationViewSet(viewsets.ModelViewSet):
         # Bildirimi oluşturan kullanıcıyı alıcı olarak ayarla
         serializer.save(recipient=self.request.user)
 
+    def perform_update(self, serializer):
+        was_unread = not serializer.instance.is_read
+        with transaction.atomic():
+            notification = serializer.save()
+            # Okundu durumu güncellemeyle de değişebilir
+            if was_unread != (not notification.is_read):
+                NotificationCounter.objects.adjust({notification.recipient_id: -1 if was_unread else 1})
+
     @action(detail=False, methods=['get'])
     def unread(self, request):
         """
         Okunmamış bildirimleri listeler
         """
         unread_notifications = self.get_queryset().filter(is_read=False)
+        page = self.paginate_queryset(unread_notifications)
+
+        if page is not None:
+            serializer = NotificationListSerializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+
         serializer = NotificationListSerializer(unread_notifications, many=True)
         return Response(serializer.data)
 
     @action(detail=False, methods=['get'])
     def unread_count(self, request):
         """
-        Okunmamış bildirim sayısını döner
+        Okunmamış bildirim sayısını döner (tip filtresi yoksa sayaçtan okunur)
         """
-        count = self.get_queryset().filter(is_read=False).count()
+        if request.query_params.get('type'):
+            count = self.get_queryset().filter(is_read=False).count()
+        else:
+            count = NotificationCounter.objects.get_unread_count(request.user.pk)
         return Response({'unread_count': count})
 
+    @action(detail=False, methods=['post'])
+    def stream_ticket(self, request):
+        """
+        Anlık bildirim akışına (SSE) bağlanmak için kısa ömürlü bilet döner;
+        EventSource başlık gönderemediğinden API token'ı yerine URL'de bu bilet taşınır
+        """
+        return Response({'ticket': issue_stream_ticket(request.user), 'expires_in': STREAM_TICKET_MAX_AGE})
+
     @action(detail=True, methods=['post'])
     def mark_as_read(self, request, pk=None):
         """
@@ -81,10 +109,12 @@ class NotificationViewSet(viewsets.ModelViewSet):
         unread_notifications = self.get_queryset().filter(is_read=False)
         now = timezone.now()
 
-        unread_notifications.update(
-            is_read=True,
-            read_at=now
-        )
+        with transaction.atomic():
+            updated = unread_notifications.update(
+                is_read=True,
+                read_at=now
+            )
+            NotificationCounter.objects.adjust({request.user.pk: -updated})
 
         return Response({'message': 'Tüm bildirimler okundu olarak işaretlendi'})
 
@@ -101,6 +131,12 @@ class NotificationViewSet(viewsets.ModelViewSet):
             )
 
         notifications = self.get_queryset().filter(notification_type=notification_type)
+        page = self.paginate_queryset(notifications)
+
+        if page is not None:
+            serializer = NotificationListSerializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+
         serializer = NotificationListSerializer(notifications, many=True)
         return Response(serializer.data)
 
@@ -123,8 +159,14 @@ class NotificationViewSet(viewsets.ModelViewSet):
                 )
                 notifications.append(notification)
 
-            # Toplu oluşturma
-            created_notifications = Notification.objects.bulk_create(notifications)
+            # Toplu oluşturma; bulk_create post_save signal'ı tetiklemediğinden
+            # sayaçlar ve anlık iletim burada güncellenir
+            with transaction.atomic():
+                created_notifications = Notification.objects.bulk_create(notifications)
+                NotificationCounter.objects.adjust(Counter(
+                    notification.recipient_id for notification in created_notifications if notification.is_visible
+                ))
+                publish_notifications(created_notifications)
 
             return Response({
                 'message': f'{len(created_notifications)} bildirim oluşturuldu',
@@ -143,7 +185,7 @@ class NotificationPreferenceViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         # Kullanıcı sadece kendi tercihlerini görebilir
-        return NotificationPreference.objects.filter(user=self.request.user)
+        return NotificationPreference.objects.filter(user=self.request.user).select_related('user')
 
     def perform_create(self, serializer):
         # Tercihi oluşturan kullanıcıyı ayarla
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import OpportunityStatus, Opportunity, OpportunityActivity
+from .models import OpportunityStatus, Opportunity, OpportunityActivity, OpportunityStatusTransition, PipelineSnapshot
 
 
 @admin.register(OpportunityStatus)
@@ -74,3 +74,39 @@ class OpportunityActivityAdmin(admin.ModelAdmin):
             'fields': ('performed_by', 'performed_at', 'created_at')
         }),
     )
+
+
+@admin.register(PipelineSnapshot)
+class PipelineSnapshotAdmin(admin.ModelAdmin):
+    """
+    Satış hattı özet tablosu (görevler tarafından doldurulur)
+    """
+    list_display = ('snapshot_date', 'status', 'owner', 'count', 'value', 'entered_count', 'entered_value')
+    list_filter = ('snapshot_date', 'status', 'owner')
+    date_hierarchy = 'snapshot_date'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(OpportunityStatusTransition)
+class OpportunityStatusTransitionAdmin(admin.ModelAdmin):
+    """
+    Fırsat durum geçişleri (yalnızca eklenebilir kayıt)
+    """
+    list_display = ('opportunity', 'from_status', 'to_status', 'changed_by', 'changed_at', 'duration')
+    list_filter = ('to_status', 'from_status', 'changed_at')
+    search_fields = ('opportunity__title',)
+    date_hierarchy = 'changed_at'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
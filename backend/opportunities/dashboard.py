@@ -0,0 +1,126 @@
+"""
+Satış fırsatı dashboard istatistikleri.
+
+Tüm sayaçlar ve dağılımlar durum x öncelik gruplamalı tek bir sorgudan
+(koşullu Count/Sum ile) hesaplanır, durum bilgileri önbellekten eklenir; yaklaşan kapanışlar ikinci sorgudur.
+Sonuç kullanıcı ve filtre bazında önbelleğe alınır. Fırsat veya durum
+değiştiğinde önbellek sürümü artırılarak tüm kayıtlar geçersiz kılınır.
+"""
+import hashlib
+import json
+from collections import OrderedDict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from .status_cache import status_cache
+
+DASHBOARD_CACHE_TIMEOUT = 5 * 60
+DASHBOARD_CACHE_VERSION_KEY = 'opportunities:dashboard:version'
+# Yaklaşan kapanışlar için bakılan gün sayısı
+DASHBOARD_UPCOMING_DAYS = 30
+
+
+def get_dashboard_cache_version():
+    version = cache.get(DASHBOARD_CACHE_VERSION_KEY)
+    if version is None:
+        cache.add(DASHBOARD_CACHE_VERSION_KEY, 1, timeout=None)
+        version = cache.get(DASHBOARD_CACHE_VERSION_KEY, 1)
+    return version
+
+
+def invalidate_dashboard_cache():
+    """
+    Önbellek sürümünü artırır; eski sürümle yazılmış kayıtlar bir daha okunmaz
+    ve zaman aşımıyla silinir.
+    """
+    try:
+        cache.incr(DASHBOARD_CACHE_VERSION_KEY)
+    except ValueError:
+        # Anahtar yok (ilk kullanım veya önbellek temizlendi)
+        cache.set(DASHBOARD_CACHE_VERSION_KEY, 2, timeout=None)
+
+
+def get_dashboard_cache_key(user_id, filters):
+    payload = json.dumps(filters, sort_keys=True, default=str)
+    digest = hashlib.md5(payload.encode('utf-8')).hexdigest()
+    return f"opportunities:dashboard:{get_dashboard_cache_version()}:{user_id}:{digest}"
+
+
+def build_dashboard(queryset, upcoming_queryset, serializer_class):
+    """
+    Dashboard verisini üretir.
+
+    Args:
+        queryset: Filtrelenmiş fırsatlar
+        upcoming_queryset: Aynı filtrelerle, kart serileştirmesi için hazırlanmış fırsatlar
+        serializer_class: Yaklaşan kapanışların serializer'ı
+    """
+    now = timezone.now()
+    last30 = Q(created_at__gte=now - timedelta(days=30))
+
+    rows = queryset.values('status_id', 'priority').annotate(
+        count=Count('id'),
+        total_value=Sum('value'),
+        last30days_count=Count('id', filter=last30),
+        last30days_value=Sum('value', filter=last30),
+    ).order_by()
+    # Durum bilgileri (ad, renk, sıra, kazanıldı/kaybedildi) önbellekten okunur
+    status_order = {item.pk: index for index, item in enumerate(status_cache.all())}
+    rows = sorted(rows, key=lambda row: (status_order.get(row['status_id'], len(status_order)), row['priority']))
+
+    totals = {
+        f"{group}_{metric}": 0
+        for group in ('total', 'open', 'won', 'lost', 'last30days')
+        for metric in ('count', 'value')
+    }
+    status_distribution = OrderedDict()
+    priority_distribution = {}
+
+    for row in rows:
+        count, value = row['count'], row['total_value'] or Decimal('0')
+        opportunity_status = status_cache.get(row['status_id'])
+        if opportunity_status.is_won:
+            group = 'won'
+        elif opportunity_status.is_lost:
+            group = 'lost'
+        else:
+            group = 'open'
+        for key in ('total', group):
+            totals[f"{key}_count"] += count
+            totals[f"{key}_value"] += value
+        totals['last30days_count'] += row['last30days_count']
+        totals['last30days_value'] += row['last30days_value'] or 0
+
+        status_item = status_distribution.setdefault(row['status_id'], {
+            'status__name': opportunity_status.name,
+            'status__color': opportunity_status.color,
+            'count': 0,
+            'total_value': 0,
+        })
+        status_item['count'] += count
+        status_item['total_value'] += value
+
+        priority_item = priority_distribution.setdefault(row['priority'], {
+            'priority': row['priority'], 'count': 0, 'total_value': 0,
+        })
+        priority_item['count'] += count
+        priority_item['total_value'] += value
+
+    today = now.date()
+    upcoming_closures = upcoming_queryset.filter(
+        expected_close_date__gte=today,
+        expected_close_date__lte=today + timedelta(days=DASHBOARD_UPCOMING_DAYS),
+        closed_at__isnull=True,  # Henüz kapanmamış olanlar
+    ).order_by('expected_close_date')
+
+    return {
+        **totals,
+        'status_distribution': list(status_distribution.values()),
+        'priority_distribution': [priority_distribution[key] for key in sorted(priority_distribution)],
+        # ReturnList serializer'a referans tutar; önbelleğe düz liste yazılır
+        'upcoming_closures': list(serializer_class(upcoming_closures, many=True).data),
+    }
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.utils import timezone
 from customers.models import Company, Contact
 from django.contrib.auth.models import User
@@ -15,6 +15,8 @@ class OpportunityStatus(models.Model):
     is_default = models.BooleanField(default=False, verbose_name="Varsayılan")
     is_won = models.BooleanField(default=False, verbose_name="Kazanıldı")  # Eğer bu durum bir kazanç durumu ise
     is_lost = models.BooleanField(default=False, verbose_name="Kaybedildi")  # Eğer bu durum bir kayıp durumu ise
+    # Süreç içi durum önbelleklerinin değişikliği fark etmesi için kullanılır (bkz. status_cache)
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Güncellenme Tarihi")
     
     class Meta:
         verbose_name = "Fırsat Durumu"
@@ -27,7 +29,7 @@ class OpportunityStatus(models.Model):
     def save(self, *args, **kwargs):
         if self.is_default:
             # Diğer tüm durumları varsayılan olmaktan çıkar
-            OpportunityStatus.objects.filter(is_default=True).update(is_default=False)
+            OpportunityStatus.objects.filter(is_default=True).update(is_default=False, updated_at=timezone.now())
         
         # Kazanıldı ve kaybedildi aynı anda olamaz
         if self.is_won and self.is_lost:
@@ -87,6 +89,7 @@ class Opportunity(models.Model):
     created_at = models.DateTimeField(default=timezone.now, verbose_name="Oluşturulma Tarihi")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="Güncellenme Tarihi")
     closed_at = models.DateTimeField(null=True, blank=True, verbose_name="Kapanış Tarihi")
+    status_changed_at = models.DateTimeField(null=True, blank=True, editable=False, verbose_name="Durum Değişim Tarihi")
     
     class Meta:
         verbose_name = "Satış Fırsatı"
@@ -95,20 +98,124 @@ class Opportunity(models.Model):
     
     def __str__(self):
         return f"{self.title} ({self.company.name})"
-    
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Veritabanından okunan durum; kaydederken durum geçişini ek sorgu olmadan tespit etmek için
+        instance._loaded_status_id = instance.__dict__.get('status_id')
+        return instance
+
+    def get_status(self):
+        """
+        Fırsatın durumu; ilişki yüklenmemişse sorgu yerine durum önbelleğinden okunur.
+        """
+        if Opportunity.status.is_cached(self):
+            return self.status
+        from .status_cache import status_cache
+        return status_cache.get(self.status_id)
+
     def save(self, *args, **kwargs):
+        status = self.get_status()
+
         # Durum kazanıldı veya kaybedildi ise ve kapanış tarihi yok ise
-        if (self.status.is_won or self.status.is_lost) and not self.closed_at:
+        if (status.is_won or status.is_lost) and not self.closed_at:
             self.closed_at = timezone.now()
             
         # Durum ne kazanıldı ne de kaybedildi ise kapanış tarihini temizle
-        if not self.status.is_won and not self.status.is_lost:
+        if not status.is_won and not status.is_lost:
             self.closed_at = None
-            
 
-            
+        # Durum geçişi post_save sinyalinde kayıt ile aynı işlem içinde loglanır
+        self._status_transition = None
+        loaded_status_id = getattr(self, '_loaded_status_id', None)
+        if self._state.adding or self.status_id != loaded_status_id:
+            now = timezone.now()
+            self._status_transition = {
+                'from_status_id': None if self._state.adding else loaded_status_id,
+                'entered_from_status_at': self.status_changed_at or self.created_at,
+                'changed_at': now,
+            }
+            self.status_changed_at = now
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'status_changed_at'}
+
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+
+class OpportunityStatusTransition(models.Model):
+    """
+    Fırsat durum geçişlerinin yalnızca eklenebilen (append-only) kaydı.
+
+    `duration` fırsatın önceki durumda geçirdiği süredir; durum süreleri ve
+    huni analizleri doğrudan bu tablo üzerinde SQL ile toplanır.
+    """
+    opportunity = models.ForeignKey(
+        Opportunity,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name="status_transitions",
+        verbose_name="Satış Fırsatı"
+    )
+    from_status = models.ForeignKey(
+        OpportunityStatus,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="transitions_out",
+        verbose_name="Önceki Durum"
+    )
+    to_status = models.ForeignKey(
+        OpportunityStatus,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name="transitions_in",
+        verbose_name="Yeni Durum"
+    )
+    owner = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="opportunity_transitions",
+        verbose_name="Sorumlu Kişi"
+    )
+    changed_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="opportunity_status_changes",
+        verbose_name="Değiştiren"
+    )
+    value = models.DecimalField(max_digits=12, decimal_places=2, verbose_name="Değer (TL)")
+    entered_from_status_at = models.DateTimeField(null=True, blank=True, verbose_name="Önceki Duruma Giriş Tarihi")
+    changed_at = models.DateTimeField(default=timezone.now, verbose_name="Değişim Tarihi")
+    duration = models.DurationField(null=True, blank=True, verbose_name="Önceki Durumda Geçen Süre")
+
+    class Meta:
+        verbose_name = "Fırsat Durum Geçişi"
+        verbose_name_plural = "Fırsat Durum Geçişleri"
+        ordering = ['-changed_at']
+        indexes = [
+            models.Index(fields=['opportunity', 'changed_at'], name='opp_transition_opp_idx'),
+            models.Index(fields=['from_status', 'changed_at'], name='opp_transition_from_idx'),
+            models.Index(fields=['to_status', 'changed_at'], name='opp_transition_to_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.opportunity_id}: {self.from_status_id} -> {self.to_status_id}"
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Durum geçiş kayıtları değiştirilemez")
         super().save(*args, **kwargs)
 
+    def delete(self, *args, **kwargs):
+        raise ValueError("Durum geçiş kayıtları silinemez")
+
 
 class OpportunityActivity(models.Model):
     """
@@ -148,3 +255,55 @@ class OpportunityActivity(models.Model):
     
     def __str__(self):
         return f"{self.get_type_display()}: {self.title} ({self.opportunity.title})"
+
+
+class PipelineSnapshot(models.Model):
+    """
+    Satış hattının gün, durum ve sorumlu bazında özet kaydı.
+
+    `count`/`value` günün sonundaki (son hesaplamadaki) stoktur; `entered_*`
+    alanları o gün bu duruma giren fırsatların akışıdır. Raporlar fırsat
+    tablosu yerine bu küçük tablodan okunur.
+    """
+    snapshot_date = models.DateField(verbose_name="Tarih")
+    status = models.ForeignKey(
+        OpportunityStatus,
+        on_delete=models.CASCADE,
+        related_name="pipeline_snapshots",
+        verbose_name="Durum"
+    )
+    owner = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="pipeline_snapshots",
+        verbose_name="Sorumlu Kişi"
+    )
+    count = models.PositiveIntegerField(default=0, verbose_name="Fırsat Sayısı")
+    value = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Toplam Değer (TL)")
+    entered_count = models.PositiveIntegerField(default=0, verbose_name="Duruma Giren Fırsat Sayısı")
+    entered_value = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Duruma Giren Değer (TL)")
+    # Duruma girişte fırsatların yaşlarının (oluşturulmadan bu yana gün) toplamı
+    entered_age_days = models.FloatField(default=0, verbose_name="Girişte Toplam Yaş (gün)")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Güncellenme Tarihi")
+
+    class Meta:
+        verbose_name = "Satış Hattı Özeti"
+        verbose_name_plural = "Satış Hattı Özetleri"
+        ordering = ['-snapshot_date']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['snapshot_date', 'status', 'owner'],
+                condition=models.Q(owner__isnull=False),
+                name='pipeline_snapshot_owner_uniq',
+            ),
+            models.UniqueConstraint(
+                fields=['snapshot_date', 'status'],
+                condition=models.Q(owner__isnull=True),
+                name='pipeline_snapshot_unassigned_uniq',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.snapshot_date} - {self.status.name}: {self.count}"
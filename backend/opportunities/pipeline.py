@@ -0,0 +1,301 @@
+"""
+Satış hattı (pipeline) özet tablosu ve bu tablodan üretilen raporlar.
+
+`PipelineSnapshot` gün x durum x sorumlu bazında iki tür veri tutar:
+
+- Stok (count, value): O gün hattaki fırsatlar. Gece görevi günü kapatır;
+  gün içinde fırsat değiştikçe aynı hesaplama gecikmeli olarak tekrarlanır.
+- Akış (entered_*): O gün duruma giren fırsatlar. Fırsat kaydedilirken aynı
+  işlem içinde artırılır; geçmiş sonradan yeniden üretilemez.
+
+Dönüşüm oranı, hız ve ağırlıklı tahmin yalnızca bu tablodan okunur; sorgu
+maliyeti fırsat sayısından bağımsızdır (gün x durum x sorumlu satırı).
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Max, Q, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Opportunity, OpportunityStatus, PipelineSnapshot
+
+# Gün içi değişikliklerden sonra stok hesaplamasının ertelendiği süre (saniye);
+# bu sürede gelen diğer değişiklikler aynı hesaplamaya dahil olur
+PIPELINE_SNAPSHOT_DELAY = 60
+PIPELINE_SNAPSHOT_PENDING_KEY = 'opportunities:pipeline-snapshot:pending'
+# Dönüşüm oranları ve olasılıklar için varsayılan geriye bakış süresi (gün)
+PIPELINE_LOOKBACK_DAYS = 90
+
+
+def record_stage_entry(opportunity, when=None):
+    """
+    Fırsatın mevcut durumuna girişini günün akış sayaçlarına ekler.
+    Çağıran işlemin içinde çalışır; satır yoksa oluşturulur.
+    """
+    record_stage_entries([opportunity], when)
+
+
+def record_stage_entries(opportunities, when=None):
+    """
+    Fırsatların mevcut durumlarına girişlerini akış sayaçlarına ekler; toplu
+    değişikliklerde fırsat başına değil (durum, sorumlu) grubu başına yazılır.
+    """
+    when = when or timezone.now()
+    day = timezone.localdate(when)
+
+    groups = {}
+    for opportunity in opportunities:
+        key = (opportunity.status_id, opportunity.assigned_to_id)
+        count, value, age_days = groups.get(key, (0, Decimal('0'), 0.0))
+        groups[key] = (
+            count + 1,
+            value + (opportunity.value or Decimal('0')),
+            age_days + max((when - opportunity.created_at).total_seconds(), 0) / 86400,
+        )
+
+    for (status_id, owner_id), (count, value, age_days) in groups.items():
+        _add_stage_entries(day, status_id, owner_id, count, value, age_days)
+
+
+def _add_stage_entries(day, status_id, owner_id, count, value, age_days):
+    rows = PipelineSnapshot.objects.filter(snapshot_date=day, status_id=status_id, owner_id=owner_id)
+    increments = {
+        'entered_count': F('entered_count') + count,
+        'entered_value': F('entered_value') + value,
+        'entered_age_days': F('entered_age_days') + age_days,
+        'updated_at': timezone.now(),
+    }
+    if rows.update(**increments):
+        return
+
+    try:
+        with transaction.atomic():
+            PipelineSnapshot.objects.create(
+                snapshot_date=day,
+                status_id=status_id,
+                owner_id=owner_id,
+                entered_count=count,
+                entered_value=value,
+                entered_age_days=age_days,
+            )
+    except IntegrityError:
+        # Satır eşzamanlı olarak oluşturuldu
+        rows.update(**increments)
+
+
+def take_pipeline_snapshot(day=None):
+    """
+    Hattın güncel stokunu (durum x sorumlu bazında sayı ve değer) verilen
+    günün satırlarına yazar. Artık fırsatı kalmayan satırların stoku
+    sıfırlanır, akış sayaçlarına dokunulmaz.
+
+    Returns:
+        int: Yazılan satır sayısı
+    """
+    day = day or timezone.localdate()
+    for attempt in range(2):
+        try:
+            with transaction.atomic():
+                return _write_pipeline_snapshot(day)
+        except IntegrityError:
+            # Aynı anda record_stage_entry yeni satır oluşturdu; bir kez daha dene
+            if attempt:
+                raise
+
+
+def _write_pipeline_snapshot(day):
+    existing = {
+        (row.status_id, row.owner_id): row
+        for row in PipelineSnapshot.objects.select_for_update().filter(snapshot_date=day)
+    }
+    groups = Opportunity.objects.values('status_id', 'assigned_to_id').annotate(
+        count=Count('id'), total_value=Sum('value')
+    ).order_by()
+
+    now = timezone.now()
+    to_create, to_update = [], []
+    for group in groups:
+        row = existing.pop((group['status_id'], group['assigned_to_id']), None)
+        if row is None:
+            row = PipelineSnapshot(snapshot_date=day, status_id=group['status_id'], owner_id=group['assigned_to_id'])
+            to_create.append(row)
+        else:
+            to_update.append(row)
+        row.count = group['count']
+        row.value = group['total_value'] or 0
+        row.updated_at = now
+
+    for row in existing.values():
+        row.count, row.value, row.updated_at = 0, 0, now
+        to_update.append(row)
+
+    PipelineSnapshot.objects.bulk_create(to_create)
+    PipelineSnapshot.objects.bulk_update(to_update, ['count', 'value', 'updated_at'])
+    return len(to_create) + len(to_update)
+
+
+def schedule_pipeline_snapshot():
+    """
+    Günün stok satırlarının yeniden hesaplanmasını planlar. Aynı anda
+    planlanmış bir hesaplama varsa yenisi eklenmez.
+    """
+    from .tasks import refresh_pipeline_snapshot
+
+    if cache.add(PIPELINE_SNAPSHOT_PENDING_KEY, True, PIPELINE_SNAPSHOT_DELAY):
+        transaction.on_commit(
+            lambda: refresh_pipeline_snapshot.apply_async(countdown=PIPELINE_SNAPSHOT_DELAY)
+        )
+
+
+def get_snapshots(owner_id=None):
+    snapshots = PipelineSnapshot.objects.all()
+    if owner_id:
+        snapshots = snapshots.filter(owner_id=owner_id)
+    return snapshots
+
+
+def get_pipeline_trend(date_from, date_to, owner_id=None):
+    """
+    Günlük, durum bazında hat stoku (trend grafikleri için)
+    """
+    return list(
+        get_snapshots(owner_id).filter(snapshot_date__range=(date_from, date_to))
+        .values('snapshot_date', 'status_id', 'status__name', 'status__color')
+        .annotate(count=Sum('count'), value=Sum('value'))
+        .order_by('snapshot_date', 'status__order', 'status_id')
+    )
+
+
+def _ratio(numerator, denominator):
+    return round(numerator / denominator, 4) if denominator else None
+
+
+def get_stage_conversion(date_from, date_to, owner_id=None):
+    """
+    Verilen aralıkta durumlara giriş sayıları ve sıralı açık durumlar
+    arasındaki dönüşüm oranları; kazanma oranı kazanılan / (kazanılan + kaybedilen).
+    """
+    entry_filter = Q(pipeline_snapshots__snapshot_date__range=(date_from, date_to))
+    if owner_id:
+        entry_filter &= Q(pipeline_snapshots__owner_id=owner_id)
+
+    statuses = list(
+        OpportunityStatus.objects.annotate(
+            entered_count=Coalesce(Sum('pipeline_snapshots__entered_count', filter=entry_filter), 0),
+            entered_value=Coalesce(Sum('pipeline_snapshots__entered_value', filter=entry_filter), Decimal('0')),
+            entered_age_days=Coalesce(Sum('pipeline_snapshots__entered_age_days', filter=entry_filter), 0.0),
+        ).order_by('order', 'id')
+    )
+
+    open_stages = [item for item in statuses if not item.is_won and not item.is_lost]
+    won = [item for item in statuses if item.is_won]
+    won_count = sum(item.entered_count for item in won)
+    lost_count = sum(item.entered_count for item in statuses if item.is_lost)
+    won_age_days = sum(item.entered_age_days for item in won)
+
+    stages = []
+    for index, item in enumerate(open_stages):
+        next_count = open_stages[index + 1].entered_count if index + 1 < len(open_stages) else won_count
+        stages.append({
+            'status_id': item.id,
+            'status_name': item.name,
+            'entered_count': item.entered_count,
+            'entered_value': item.entered_value,
+            'conversion_rate': _ratio(next_count, item.entered_count),
+            # Bu duruma giren fırsatların kazanılma olasılığı (ağırlıklı tahminde kullanılır)
+            'win_probability': min(_ratio(won_count, item.entered_count) or 0, 1.0),
+        })
+
+    return {
+        'date_from': date_from,
+        'date_to': date_to,
+        'stages': stages,
+        'won_count': won_count,
+        'won_value': sum((item.entered_value for item in won), Decimal('0')),
+        'lost_count': lost_count,
+        'win_rate': _ratio(won_count, won_count + lost_count),
+        'average_cycle_days': round(won_age_days / won_count, 1) if won_count else None,
+    }
+
+
+def get_latest_open_stock(owner_id=None):
+    """
+    En son özet günündeki açık durum stokları: (tarih, {durum_id: {'count', 'value'}})
+    """
+    snapshots = get_snapshots(owner_id)
+    latest_date = snapshots.aggregate(latest=Max('snapshot_date'))['latest']
+    if latest_date is None:
+        return None, {}
+
+    rows = snapshots.filter(
+        snapshot_date=latest_date, status__is_won=False, status__is_lost=False
+    ).values('status_id').annotate(count=Sum('count'), value=Sum('value')).order_by()
+    return latest_date, {row['status_id']: row for row in rows}
+
+
+def get_pipeline_velocity(date_from, date_to, owner_id=None):
+    """
+    Satış hızı = açık fırsat sayısı x ortalama değer x kazanma oranı / ortalama satış süresi (TL/gün)
+    """
+    conversion = get_stage_conversion(date_from, date_to, owner_id)
+    snapshot_date, stock = get_latest_open_stock(owner_id)
+
+    open_count = sum(row['count'] for row in stock.values())
+    open_value = sum((row['value'] for row in stock.values()), Decimal('0'))
+    average_value = open_value / open_count if open_count else Decimal('0')
+    win_rate = conversion['win_rate']
+    cycle_days = conversion['average_cycle_days']
+
+    velocity = None
+    if win_rate is not None and cycle_days:
+        velocity = round(float(average_value) * open_count * win_rate / cycle_days, 2)
+
+    return {
+        'snapshot_date': snapshot_date,
+        'open_count': open_count,
+        'average_value': round(average_value, 2),
+        'win_rate': win_rate,
+        'average_cycle_days': cycle_days,
+        'velocity_per_day': velocity,
+    }
+
+
+def get_weighted_forecast(date_from, date_to, owner_id=None):
+    """
+    Açık durumlardaki değerin, o durumdan geçmişte kazanılma oranıyla ağırlıklandırılmış toplamı
+    """
+    conversion = get_stage_conversion(date_from, date_to, owner_id)
+    snapshot_date, stock = get_latest_open_stock(owner_id)
+
+    stages = []
+    weighted_total = pipeline_total = Decimal('0')
+    for stage in conversion['stages']:
+        row = stock.get(stage['status_id'], {'count': 0, 'value': Decimal('0')})
+        # Bu durumdan geçmiş veri yoksa genel kazanma oranı kullanılır
+        probability = stage['win_probability'] if stage['entered_count'] else (conversion['win_rate'] or 0)
+        weighted_value = (row['value'] * Decimal(str(probability))).quantize(Decimal('0.01'))
+        stages.append({
+            'status_id': stage['status_id'],
+            'status_name': stage['status_name'],
+            'count': row['count'],
+            'value': row['value'],
+            'probability': probability,
+            'weighted_value': weighted_value,
+        })
+        weighted_total += weighted_value
+        pipeline_total += row['value']
+
+    return {
+        'snapshot_date': snapshot_date,
+        'stages': stages,
+        'pipeline_total': pipeline_total,
+        'weighted_total': weighted_total,
+    }
+
+
+def get_default_report_range():
+    today = timezone.localdate()
+    return today - timedelta(days=PIPELINE_LOOKBACK_DAYS), today
@@ -1,7 +1,8 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
-from .models import OpportunityStatus, Opportunity, OpportunityActivity
+from .models import OpportunityStatus, Opportunity, OpportunityActivity, OpportunityStatusTransition
 from customers.serializers import ContactNestedSerializer
+from .status_cache import status_cache
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -44,8 +45,8 @@ class OpportunityListSerializer(serializers.ModelSerializer):
     Satış fırsatları listesi için kısa serializer
     """
     company_name = serializers.CharField(source='company.name', read_only=True)
-    status_name = serializers.CharField(source='status.name', read_only=True)
-    status_color = serializers.CharField(source='status.color', read_only=True)
+    status_name = serializers.SerializerMethodField(read_only=True)
+    status_color = serializers.SerializerMethodField(read_only=True)
     assigned_to_name = serializers.SerializerMethodField(read_only=True)
     is_closed = serializers.SerializerMethodField(read_only=True)
     contact_count = serializers.SerializerMethodField(read_only=True)
@@ -56,6 +57,13 @@ class OpportunityListSerializer(serializers.ModelSerializer):
                   'status_color', 'value', 'priority', 'expected_close_date',
                   'assigned_to', 'assigned_to_name', 'closed_at', 'is_closed', 'contact_count')
     
+    def get_status_name(self, obj):
+        # Durumlar süreç içi önbellekten okunur, sorguya join eklenmez
+        return status_cache.get(obj.status_id).name
+
+    def get_status_color(self, obj):
+        return status_cache.get(obj.status_id).color
+
     def get_assigned_to_name(self, obj):
         if obj.assigned_to:
             return f"{obj.assigned_to.first_name} {obj.assigned_to.last_name}".strip() or obj.assigned_to.username
@@ -65,6 +73,9 @@ class OpportunityListSerializer(serializers.ModelSerializer):
         return obj.closed_at is not None
     
     def get_contact_count(self, obj):
+        # OpportunityViewSet sorgusunda annotate edilmişse ek sorgu çalıştırma
+        if hasattr(obj, 'contact_count'):
+            return obj.contact_count
         return obj.contacts.count()
 
 
@@ -73,7 +84,7 @@ class OpportunityDetailSerializer(serializers.ModelSerializer):
     Satış fırsatı detayları için kapsamlı serializer
     """
     company_name = serializers.CharField(source='company.name', read_only=True)
-    status_details = OpportunityStatusSerializer(source='status', read_only=True)
+    status_details = serializers.SerializerMethodField(read_only=True)
     assigned_to_details = UserSerializer(source='assigned_to', read_only=True)
     contacts = ContactNestedSerializer(many=True, read_only=True)
     activities = OpportunityActivitySerializer(many=True, read_only=True)
@@ -82,6 +93,40 @@ class OpportunityDetailSerializer(serializers.ModelSerializer):
         model = Opportunity
         fields = '__all__'
 
+    def get_status_details(self, obj):
+        return OpportunityStatusSerializer(status_cache.get(obj.status_id)).data
+
+
+class OpportunityStatusTransitionSerializer(serializers.ModelSerializer):
+    """
+    Fırsat durum geçişleri için serializer
+    """
+    from_status_name = serializers.CharField(source='from_status.name', read_only=True, default=None)
+    to_status_name = serializers.CharField(source='to_status.name', read_only=True, default=None)
+    changed_by_details = UserSerializer(source='changed_by', read_only=True)
+
+    class Meta:
+        model = OpportunityStatusTransition
+        fields = ('id', 'opportunity', 'from_status', 'from_status_name', 'to_status', 'to_status_name',
+                  'owner', 'changed_by', 'changed_by_details', 'value', 'entered_from_status_at',
+                  'changed_at', 'duration')
+
+
+class BulkStatusChangeSerializer(serializers.Serializer):
+    """
+    Toplu durum değişikliği için serializer
+    """
+    opportunity_ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=1000
+    )
+    status_id = serializers.IntegerField()
+
+    def validate_status_id(self, value):
+        try:
+            return status_cache.get(value)
+        except OpportunityStatus.DoesNotExist:
+            raise serializers.ValidationError("Geçersiz status ID")
+
 
 class OpportunityCreateUpdateSerializer(serializers.ModelSerializer):
     """
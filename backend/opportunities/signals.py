@@ -0,0 +1,56 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .dashboard import invalidate_dashboard_cache
+from .pipeline import record_stage_entry, schedule_pipeline_snapshot
+from .status_cache import status_cache
+from .transitions import build_transition
+from .models import Opportunity, OpportunityStatus
+
+
+@receiver(post_save, sender=Opportunity)
+@receiver(post_delete, sender=Opportunity)
+@receiver(post_save, sender=OpportunityStatus)
+@receiver(post_delete, sender=OpportunityStatus)
+def invalidate_opportunity_dashboard(sender, **kwargs):
+    """
+    Fırsat veya durum değiştiğinde dashboard önbelleğini geçersiz kıl.
+    İşlem onaylandıktan sonra yapılır; aksi halde eşzamanlı bir istek eski
+    veriyi yeni sürümle önbelleğe yazabilir.
+    """
+    transaction.on_commit(invalidate_dashboard_cache)
+
+
+@receiver(post_save, sender=Opportunity)
+def track_opportunity_pipeline(sender, instance, created, **kwargs):
+    """
+    Yeni fırsatın veya durum geçişini aynı işlem içinde geçiş kaydına ve
+    özet tabloya yaz, günün stok hesaplamasını planla.
+    """
+    if kwargs.get('raw'):
+        return
+    transition = getattr(instance, '_status_transition', None)
+    if transition:
+        build_transition(instance, **transition).save()
+        record_stage_entry(instance, transition['changed_at'])
+        instance._status_transition = None
+        instance._loaded_status_id = instance.status_id
+    schedule_pipeline_snapshot()
+
+
+@receiver(post_delete, sender=Opportunity)
+def refresh_pipeline_after_delete(sender, instance, **kwargs):
+    schedule_pipeline_snapshot()
+
+
+@receiver(post_save, sender=OpportunityStatus)
+@receiver(post_delete, sender=OpportunityStatus)
+def invalidate_status_cache(sender, **kwargs):
+    """
+    Durum tablosu değiştiğinde süreç içi durum önbelleğini yenile: hemen ve
+    işlem onaylandığında (arada eski değerlerle yeniden yüklenmiş olabilir).
+    Diğer süreçler değişikliği tablodaki sürüm işaretinden görür.
+    """
+    status_cache.invalidate()
+    transaction.on_commit(status_cache.invalidate)
@@ -0,0 +1,86 @@
+import threading
+import time
+
+from django.db.models import Count, Max
+
+# Diğer süreçlerdeki değişikliklerin (tablodaki sürüm işareti) kontrol aralığı (saniye)
+STATUS_CACHE_CHECK_INTERVAL = 10
+
+
+class OpportunityStatusCache:
+    """
+    Küçük ve nadiren değişen OpportunityStatus tablosunun süreç içi kopyası.
+
+    Kayıt kaydetme mantığı, serializer'lar ve kanban/dashboard durum bilgisini
+    buradan okur. Durum değiştiğinde aynı süreçteki kopya hemen, diğer
+    süreçlerdekiler en geç `check_interval` saniye içinde yenilenir: sürüm
+    işareti tablonun kayıt sayısı ve en son `updated_at` değeridir. İşaret
+    veritabanından okunduğu için süreçler arasında paylaşılan bir önbellek
+    (Redis) gerekmez; süreç içi LocMemCache ile de doğru çalışır.
+    """
+
+    def __init__(self, check_interval=STATUS_CACHE_CHECK_INTERVAL):
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._statuses = None
+        self._version = None
+        self._checked_at = 0
+
+    def _shared_version(self):
+        from .models import OpportunityStatus
+
+        # Güncelleme updated_at'i, ekleme ve silme kayıt sayısını veya en son değeri değiştirir
+        marker = OpportunityStatus.objects.aggregate(count=Count('pk'), updated_at=Max('updated_at'))
+        return marker['count'], marker['updated_at']
+
+    def _load(self):
+        from .models import OpportunityStatus
+
+        with self._lock:
+            statuses = {item.pk: item for item in OpportunityStatus.objects.order_by('order', 'pk')}
+            # _shared_version ile aynı işaret, yüklenen kayıtlardan hesaplanır
+            version = len(statuses), max((item.updated_at for item in statuses.values()), default=None)
+            self._statuses, self._version, self._checked_at = statuses, version, time.monotonic()
+            return statuses
+
+    def _get_statuses(self):
+        statuses = self._statuses
+        if statuses is None:
+            return self._load()
+        if time.monotonic() - self._checked_at > self.check_interval:
+            if self._shared_version() != self._version:
+                return self._load()
+            self._checked_at = time.monotonic()
+        return statuses
+
+    def get(self, status_id):
+        """
+        Durum nesnesi; kopyada yoksa (başka süreçte yeni oluşturulmuş olabilir) tablo bir kez yeniden okunur.
+
+        Raises:
+            OpportunityStatus.DoesNotExist
+        """
+        from .models import OpportunityStatus
+
+        status = self._get_statuses().get(status_id)
+        if status is None:
+            status = self._load().get(status_id)
+        if status is None:
+            raise OpportunityStatus.DoesNotExist(f"OpportunityStatus {status_id} bulunamadı")
+        return status
+
+    def all(self):
+        """
+        Tüm durumlar, `order` sırasıyla
+        """
+        return list(self._get_statuses().values())
+
+    def invalidate(self):
+        """
+        Bu süreçteki kopyayı siler; diğer süreçler değişikliği tablodaki sürüm işaretinden görür.
+        """
+        self._statuses = None
+
+
+# Global instance
+status_cache = OpportunityStatusCache()
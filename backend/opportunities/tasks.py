@@ -0,0 +1,30 @@
+import logging
+
+from celery import shared_task
+from django.core.cache import cache
+
+from .pipeline import PIPELINE_SNAPSHOT_PENDING_KEY, take_pipeline_snapshot
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def refresh_pipeline_snapshot():
+    """
+    Gün içindeki fırsat değişikliklerinden sonra günün stok satırlarını yeniden hesapla
+    """
+    # Hesaplama başladıktan sonra gelen değişiklikler yeni bir hesaplama planlayabilsin
+    cache.delete(PIPELINE_SNAPSHOT_PENDING_KEY)
+    rows = take_pipeline_snapshot()
+    logger.info(f"Refreshed pipeline snapshot ({rows} rows)")
+    return f"Refreshed pipeline snapshot ({rows} rows)"
+
+
+@shared_task
+def take_nightly_pipeline_snapshot():
+    """
+    Günün sonunda hattın stokunu günün özet satırlarına yaz
+    """
+    rows = take_pipeline_snapshot()
+    logger.info(f"Took nightly pipeline snapshot ({rows} rows)")
+    return f"Took nightly pipeline snapshot ({rows} rows)"
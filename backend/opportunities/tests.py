@@ -1,3 +1,482 @@
-from django.test import TestCase
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from crm_project.testing import QueryBudgetMixin
+from customers.models import Company
+from .models import Opportunity, OpportunityStatus, OpportunityStatusTransition, PipelineSnapshot
+from .pipeline import take_pipeline_snapshot
+from .status_cache import OpportunityStatusCache, status_cache
+from .tasks import refresh_pipeline_snapshot
+from .urls import router
+
+
+class OpportunitiesQueryBudgetTests(QueryBudgetMixin, APITestCase):
+    """
+    Satış fırsatı endpoint'lerinin sorgu bütçeleri (N+1 regresyonlarını yakalar)
+    """
+    router = router
+    budgets = {
+        'opportunitystatus-list': 1,
+        'opportunitystatus-detail': 1,
+        'opportunity-list': 1,
+        'opportunity-detail': 4,
+        'opportunity-export': 1,
+        'opportunity-dashboard': 2,
+        'opportunity-company-opportunities': 4,
+        'opportunity-kanban': 1,
+        'opportunity-pipeline-trend': 1,
+        'opportunity-pipeline-conversion': 1,
+        'opportunity-pipeline-velocity': 3,
+        'opportunity-pipeline-forecast': 3,
+        'opportunity-stage-durations': 1,
+        'opportunity-funnel': 1,
+        'opportunity-status-history': 1,
+        'opportunityactivity-list': 1,
+        'opportunityactivity-detail': 1,
+        'opportunityactivity-opportunity-activities': 1,
+    }
+    route_params = {
+        'opportunity-company-opportunities': lambda: {'company_id': Opportunity.objects.order_by('pk').first().company_id},
+        'opportunityactivity-opportunity-activities': lambda: {'opportunity_id': Opportunity.objects.order_by('pk').first().pk},
+    }
+
+
+class KanbanTests(APITestCase):
+    """
+    Kanban panosu: tek sorgu, kolon limitleri, devam bağlantıları ve ETag
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='kanban', password='test-password')
+        company = Company.objects.create(name='Arçelik A.Ş.')
+        cls.new = OpportunityStatus.objects.create(name='Yeni', order=1)
+        cls.offer = OpportunityStatus.objects.create(name='Teklif', order=2)
+        cls.empty = OpportunityStatus.objects.create(name='Kazanıldı', order=3, is_won=True)
+
+        now = timezone.now()
+        cls.new_opportunities = [
+            Opportunity.objects.create(
+                title=f"Fırsat {index}", company=company, status=cls.new, value=Decimal(100 * (index + 1)),
+                expected_close_date=date.today(), created_at=now - timedelta(hours=index),
+            )
+            for index in range(5)
+        ]
+        Opportunity.objects.create(title='Teklif', company=company, status=cls.offer, value=Decimal('50'),
+                                   expected_close_date=date.today())
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def test_board_is_built_in_one_pass(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('opportunity-kanban'), {'page_size': 2})
+
+        columns = {column['status_id']: column for column in response.data}
+        self.assertEqual([column['status_name'] for column in response.data], ['Yeni', 'Teklif', 'Kazanıldı'])
+
+        new_column = columns[self.new.id]
+        self.assertEqual(new_column['count'], 5)
+        self.assertEqual(new_column['total_value'], Decimal('1500'))
+        self.assertEqual([card['title'] for card in new_column['opportunities']], ['Fırsat 0', 'Fırsat 1'])
+        self.assertTrue(new_column['has_more'])
+
+        self.assertFalse(columns[self.offer.id]['has_more'])
+        self.assertEqual(columns[self.empty.id]['count'], 0)
+        self.assertEqual(columns[self.empty.id]['opportunities'], [])
+
+    def test_columns_are_not_truncated_by_default(self):
+        with mock.patch('crm_project.pagination.KeysetPagination.page_size', 2):
+            response = self.client.get(reverse('opportunity-kanban'))
+
+        new_column = response.data[0]
+        self.assertEqual(len(new_column['opportunities']), 5)
+        self.assertFalse(new_column['has_more'])
+        self.assertIsNone(new_column['next'])
+
+    def test_load_more_continues_column(self):
+        response = self.client.get(reverse('opportunity-kanban'), {'page_size': 2})
+        next_link = response.data[0]['next']
+
+        titles = [card['title'] for card in response.data[0]['opportunities']]
+        while next_link:
+            page = self.client.get(next_link)
+            self.assertEqual(page.status_code, 200)
+            titles += [card['title'] for card in page.data['results']]
+            next_link = page.data['next']
+
+        self.assertEqual(titles, [f"Fırsat {index}" for index in range(5)])
+
+    def test_unchanged_board_returns_not_modified(self):
+        response = self.client.get(reverse('opportunity-kanban'))
+        etag = response['ETag']
+
+        response = self.client.get(reverse('opportunity-kanban'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        opportunity = self.new_opportunities[0]
+        opportunity.status = self.offer
+        opportunity.save()
+
+        response = self.client.get(reverse('opportunity-kanban'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+class DashboardTests(APITestCase):
+    """
+    Dashboard: koşullu toplamlar, filtreler ve önbellek geçersiz kılma
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='dashboard', password='test-password')
+        cls.other_user = User.objects.create_user(username='diger', password='test-password')
+        cls.company = Company.objects.create(name='Vestel')
+        other_company = Company.objects.create(name='Beko')
+        cls.open_status = OpportunityStatus.objects.create(name='Yeni', order=1)
+        cls.won_status = OpportunityStatus.objects.create(name='Kazanıldı', order=2, is_won=True)
+        cls.lost_status = OpportunityStatus.objects.create(name='Kaybedildi', order=3, is_lost=True)
+
+        today = date.today()
+        cls.open_opportunity = Opportunity.objects.create(
+            title='Açık', company=cls.company, status=cls.open_status, value=Decimal('100'),
+            priority='high', expected_close_date=today + timedelta(days=5), assigned_to=cls.user,
+        )
+        Opportunity.objects.create(
+            title='Kazanılan', company=cls.company, status=cls.won_status, value=Decimal('200'),
+            priority='low', expected_close_date=today, assigned_to=cls.other_user,
+        )
+        Opportunity.objects.create(
+            title='Eski kayıp', company=other_company, status=cls.lost_status, value=Decimal('300'),
+            priority='high', expected_close_date=today, assigned_to=cls.user,
+            created_at=timezone.now() - timedelta(days=60),
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.user)
+
+    def test_totals_and_distributions(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('opportunity-dashboard'))
+
+        data = response.data
+        self.assertEqual((data['total_count'], data['total_value']), (3, Decimal('600')))
+        self.assertEqual((data['open_count'], data['open_value']), (1, Decimal('100')))
+        self.assertEqual((data['won_count'], data['won_value']), (1, Decimal('200')))
+        self.assertEqual((data['lost_count'], data['lost_value']), (1, Decimal('300')))
+        self.assertEqual((data['last30days_count'], data['last30days_value']), (2, Decimal('300')))
+        self.assertEqual(
+            [(item['status__name'], item['count']) for item in data['status_distribution']],
+            [('Yeni', 1), ('Kazanıldı', 1), ('Kaybedildi', 1)],
+        )
+        self.assertEqual(
+            [(item['priority'], item['count'], item['total_value']) for item in data['priority_distribution']],
+            [('high', 2, Decimal('400')), ('low', 1, Decimal('200'))],
+        )
+        self.assertEqual([item['title'] for item in data['upcoming_closures']], ['Açık'])
+
+    def test_filters(self):
+        response = self.client.get(reverse('opportunity-dashboard'), {'assigned_to_id': self.user.id})
+        self.assertEqual(response.data['total_count'], 2)
+
+        response = self.client.get(reverse('opportunity-dashboard'), {
+            'company_id': self.company.id,
+            'date_from': (date.today() - timedelta(days=1)).isoformat(),
+        })
+        self.assertEqual(response.data['total_count'], 2)
+        self.assertEqual(response.data['lost_count'], 0)
+
+        response = self.client.get(reverse('opportunity-dashboard'), {'date_to': 'dün'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_cached_until_opportunity_changes(self):
+        self.client.get(reverse('opportunity-dashboard'))
+        with self.assertNumQueries(0):
+            self.client.get(reverse('opportunity-dashboard'))
+
+        with mock.patch.object(refresh_pipeline_snapshot, 'apply_async'):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.open_opportunity.status = self.won_status
+                self.open_opportunity.save()
+
+        response = self.client.get(reverse('opportunity-dashboard'))
+        self.assertEqual(response.data['won_count'], 2)
+        self.assertEqual(response.data['open_count'], 0)
+
+
+class PipelineSnapshotTests(APITestCase):
+    """
+    Satış hattı özet tablosu: akış sayaçları, stok hesaplaması ve raporlar
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='pipeline', password='test-password')
+        cls.company = Company.objects.create(name='Ford Otosan')
+        cls.lead = OpportunityStatus.objects.create(name='Aday', order=1)
+        cls.offer = OpportunityStatus.objects.create(name='Teklif', order=2)
+        cls.won = OpportunityStatus.objects.create(name='Kazanıldı', order=3, is_won=True)
+        cls.lost = OpportunityStatus.objects.create(name='Kaybedildi', order=4, is_lost=True)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.user)
+
+    def create_opportunity(self, status, value='100'):
+        return Opportunity.objects.create(
+            title='Filo', company=self.company, status=status, value=Decimal(value),
+            expected_close_date=date.today(), assigned_to=self.user,
+        )
+
+    def get_row(self, status):
+        return PipelineSnapshot.objects.get(snapshot_date=timezone.localdate(), status=status, owner=self.user)
+
+    def test_status_transitions_are_counted_once(self):
+        opportunity = self.create_opportunity(self.lead)
+        opportunity.title = 'Filo yenileme'
+        opportunity.save()
+
+        opportunity = Opportunity.objects.get(pk=opportunity.pk)
+        opportunity.status = self.offer
+        opportunity.save()
+        opportunity.save()
+
+        self.assertEqual(self.get_row(self.lead).entered_count, 1)
+        offer_row = self.get_row(self.offer)
+        self.assertEqual((offer_row.entered_count, offer_row.entered_value), (1, Decimal('100')))
+
+    def test_snapshot_writes_stock_and_clears_empty_rows(self):
+        opportunity = self.create_opportunity(self.lead, '250')
+        take_pipeline_snapshot()
+        self.assertEqual((self.get_row(self.lead).count, self.get_row(self.lead).value), (1, Decimal('250')))
+
+        opportunity.status = self.offer
+        opportunity.save()
+        take_pipeline_snapshot()
+
+        self.assertEqual(self.get_row(self.lead).count, 0)
+        self.assertEqual(self.get_row(self.lead).entered_count, 1)
+        self.assertEqual(self.get_row(self.offer).count, 1)
+
+    def test_changes_schedule_a_single_refresh(self):
+        with mock.patch.object(refresh_pipeline_snapshot, 'apply_async') as apply_async:
+            with self.captureOnCommitCallbacks(execute=True):
+                opportunity = self.create_opportunity(self.lead)
+                opportunity.status = self.offer
+                opportunity.save()
+        apply_async.assert_called_once()
+
+    def test_reports_are_served_from_rollups(self):
+        today = timezone.localdate()
+        rows = [
+            (self.lead, 4, '400', 10, 0),
+            (self.offer, 2, '1000', 5, 0),
+            (self.won, 0, '0', 2, 60),
+            (self.lost, 0, '0', 3, 0),
+        ]
+        PipelineSnapshot.objects.bulk_create([
+            PipelineSnapshot(snapshot_date=today, status=status, owner=self.user, count=count,
+                             value=Decimal(value), entered_count=entered, entered_age_days=age)
+            for status, count, value, entered, age in rows
+        ])
+
+        response = self.client.get(reverse('opportunity-pipeline-conversion'))
+        self.assertEqual([stage['conversion_rate'] for stage in response.data['stages']], [0.5, 0.4])
+        self.assertEqual(response.data['win_rate'], 0.4)
+        self.assertEqual(response.data['average_cycle_days'], 30.0)
+
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('opportunity-pipeline-forecast'))
+        self.assertEqual([stage['weighted_value'] for stage in response.data['stages']],
+                         [Decimal('80.00'), Decimal('400.00')])
+        self.assertEqual(response.data['weighted_total'], Decimal('480.00'))
+
+        response = self.client.get(reverse('opportunity-pipeline-velocity'), {'assigned_to_id': self.user.id})
+        self.assertEqual(response.data['open_count'], 6)
+        self.assertEqual(response.data['velocity_per_day'], 18.67)
+
+        response = self.client.get(reverse('opportunity-pipeline-trend'))
+        self.assertEqual([(row['status__name'], row['count']) for row in response.data],
+                         [('Aday', 4), ('Teklif', 2), ('Kazanıldı', 0), ('Kaybedildi', 0)])
+
+
+class StatusTransitionTests(APITestCase):
+    """
+    Durum geçiş kaydı ve bu kayıttan hesaplanan süre/huni raporları
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='gecis', password='test-password')
+        cls.company = Company.objects.create(name='Tofaş')
+        cls.lead = OpportunityStatus.objects.create(name='Aday', order=1)
+        cls.offer = OpportunityStatus.objects.create(name='Teklif', order=2)
+        cls.won = OpportunityStatus.objects.create(name='Kazanıldı', order=3, is_won=True)
+        cls.lost = OpportunityStatus.objects.create(name='Kaybedildi', order=4, is_lost=True)
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def create_opportunity(self, days_ago=0):
+        return Opportunity.objects.create(
+            title='Bayi ağı', company=self.company, status=self.lead, value=Decimal('100'),
+            expected_close_date=date.today(), assigned_to=self.user,
+            created_at=timezone.now() - timedelta(days=days_ago),
+        )
+
+    def move(self, opportunity, new_status, days_later):
+        """
+        Fırsatı, önceki durumuna girdikten `days_later` gün sonra yeni duruma taşır
+        """
+        with mock.patch('django.utils.timezone.now', return_value=opportunity.status_changed_at + timedelta(days=days_later)):
+            opportunity.status = new_status
+            opportunity.save()
+
+    def test_change_status_logs_transition(self):
+        opportunity = self.create_opportunity()
+        response = self.client.post(
+            reverse('opportunity-change-status', args=[opportunity.pk]), {'status_id': self.offer.pk}
+        )
+        self.assertEqual(response.status_code, 200)
+
+        transitions = list(OpportunityStatusTransition.objects.filter(opportunity=opportunity).order_by('changed_at'))
+        self.assertEqual([(item.from_status_id, item.to_status_id) for item in transitions],
+                         [(None, self.lead.pk), (self.lead.pk, self.offer.pk)])
+        self.assertEqual(transitions[1].changed_by, self.user)
+        self.assertIsNotNone(transitions[1].duration)
+
+        response = self.client.get(reverse('opportunity-status-history', args=[opportunity.pk]))
+        self.assertEqual([item['to_status_name'] for item in response.data['results']], ['Teklif', 'Aday'])
+
+    def test_saving_without_status_change_is_not_logged(self):
+        opportunity = self.create_opportunity()
+        opportunity.value = Decimal('200')
+        opportunity.save()
+        self.assertEqual(OpportunityStatusTransition.objects.filter(opportunity=opportunity).count(), 1)
+
+        with self.assertRaises(ValueError):
+            OpportunityStatusTransition.objects.filter(opportunity=opportunity).first().save()
+
+    def test_stage_durations_and_funnel(self):
+        fast, slow, dropped = (self.create_opportunity(days_ago=60) for _ in range(3))
+        self.move(fast, self.offer, 0.5)
+        self.move(fast, self.won, 3)
+        self.move(slow, self.offer, 10)
+        self.move(slow, self.lost, 40)
+        self.move(dropped, self.lost, 2)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('opportunity-stage-durations'))
+        durations = {row['status_name']: row for row in response.data}
+        self.assertEqual(durations['Aday']['count'], 3)
+        self.assertEqual(durations['Aday']['distribution']['under_1_day'], 1)
+        self.assertEqual(durations['Aday']['distribution']['1_to_7_days'], 1)
+        self.assertEqual(durations['Aday']['distribution']['7_to_30_days'], 1)
+        self.assertEqual(durations['Teklif']['min_days'], 3.0)
+        self.assertEqual(durations['Teklif']['max_days'], 40.0)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('opportunity-funnel'))
+        funnel = {row['status_name']: row for row in response.data}
+        self.assertEqual((funnel['Aday']['reached'], funnel['Aday']['lost']), (3, 1))
+        self.assertEqual(funnel['Aday']['drop_off_rate'], round(1 - 2 / 3, 4))
+        self.assertEqual((funnel['Teklif']['reached'], funnel['Teklif']['lost']), (2, 1))
+        self.assertEqual(funnel['Teklif']['drop_off_rate'], 0.5)
+        self.assertEqual(funnel['Kazanıldı']['reached'], 1)
+
+
+class StatusCacheTests(APITestCase):
+    """
+    Durum önbelleği ve toplu durum değişikliği
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='toplu', password='test-password')
+        cls.company = Company.objects.create(name='Aselsan')
+        cls.lead = OpportunityStatus.objects.create(name='Aday', order=1)
+        cls.won = OpportunityStatus.objects.create(name='Kazanıldı', order=2, is_won=True)
+
+    def setUp(self):
+        cache.clear()
+        status_cache.invalidate()
+        self.client.force_authenticate(self.user)
+
+    def create_opportunity(self, **kwargs):
+        return Opportunity.objects.create(
+            title='Radar', company=self.company, status=self.lead, value=Decimal('100'),
+            expected_close_date=date.today(), assigned_to=self.user, **kwargs
+        )
+
+    def test_save_reads_status_from_cache(self):
+        opportunity = Opportunity.objects.get(pk=self.create_opportunity().pk)
+        status_cache.all()
+
+        opportunity.status_id = self.won.pk
+        with mock.patch.object(refresh_pipeline_snapshot, 'apply_async'):
+            with self.assertNumQueries(0):
+                self.assertTrue(opportunity.get_status().is_won)
+            opportunity.save()
+        self.assertIsNotNone(opportunity.closed_at)
+
+    def test_status_changes_invalidate_cache(self):
+        self.assertEqual(status_cache.get(self.lead.pk).name, 'Aday')
+        self.lead.name = 'Potansiyel'
+        self.lead.save()
+        self.assertEqual(status_cache.get(self.lead.pk).name, 'Potansiyel')
+
+    def test_other_processes_see_status_changes_without_shared_cache(self):
+        # Başka bir süreçteki kopya: signal yalnızca bu süreçtekini geçersiz kılar
+        other_process = OpportunityStatusCache(check_interval=0)
+        self.assertFalse(other_process.get(self.lead.pk).is_won)
+
+        with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}):
+            self.lead.is_won = True
+            self.lead.save()
+            self.assertTrue(other_process.get(self.lead.pk).is_won)
+
+            self.won.delete()
+            self.assertEqual([item.pk for item in other_process.all()], [self.lead.pk])
+
+    def test_bulk_change_status(self):
+        opportunities = [self.create_opportunity() for _ in range(3)]
+        already_closed_at = timezone.now() - timedelta(days=3)
+        Opportunity.objects.filter(pk=opportunities[0].pk).update(status=self.won, closed_at=already_closed_at)
+        before = timezone.now()
+
+        response = self.client.post(reverse('opportunity-bulk-change-status'), {
+            'opportunity_ids': [item.pk for item in opportunities], 'status_id': self.won.pk,
+        }, format='json')
+        self.assertEqual(response.data['updated_count'], 2)
+
+        for opportunity in Opportunity.objects.filter(pk__in=[item.pk for item in opportunities[1:]]):
+            self.assertEqual(opportunity.status_id, self.won.pk)
+            self.assertGreaterEqual(opportunity.closed_at, before)
+            self.assertGreaterEqual(opportunity.updated_at, before)
+        self.assertEqual(Opportunity.objects.get(pk=opportunities[0].pk).closed_at, already_closed_at)
+
+        transitions = OpportunityStatusTransition.objects.filter(to_status=self.won)
+        self.assertEqual(transitions.count(), 2)
+        self.assertTrue(all(item.changed_by_id == self.user.pk for item in transitions))
+        self.assertEqual(PipelineSnapshot.objects.get(status=self.won, owner=self.user).entered_count, 2)
+
+        response = self.client.post(reverse('opportunity-bulk-change-status'), {
+            'opportunity_ids': [opportunities[1].pk], 'status_id': self.lead.pk,
+        }, format='json')
+        self.assertIsNone(Opportunity.objects.get(pk=opportunities[1].pk).closed_at)
+
+    def test_bulk_change_status_rejects_unknown_status(self):
+        response = self.client.post(reverse('opportunity-bulk-change-status'), {
+            'opportunity_ids': [1], 'status_id': 999999,
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,211 @@
+"""
+Fırsat durum geçişi kaydı ve bu kayıt üzerinden durum süresi / huni analizleri.
+
+Geçişler `OpportunityStatusTransition` tablosuna yalnızca eklenir. Tekil
+kayıtlar Opportunity.save() ile aynı işlemde post_save sinyalinden, toplu
+durum değişiklikleri (`bulk_change_status`) tek INSERT olarak yazılır.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Avg, Count, IntegerField, Max, Min, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .dashboard import invalidate_dashboard_cache
+from .models import Opportunity, OpportunityStatus, OpportunityStatusTransition
+from .pipeline import record_stage_entries, schedule_pipeline_snapshot
+
+# Geçişi yapan kullanıcı; view'lar kaydetmeden önce `status_changed_by` ile belirler
+_status_changed_by = ContextVar('status_changed_by', default=None)
+
+# Durum süresi dağılımı için aralıklar: (etiket, alt sınır, üst sınır)
+DURATION_BUCKETS = (
+    ('under_1_day', None, timedelta(days=1)),
+    ('1_to_7_days', timedelta(days=1), timedelta(days=7)),
+    ('7_to_30_days', timedelta(days=7), timedelta(days=30)),
+    ('30_to_90_days', timedelta(days=30), timedelta(days=90)),
+    ('over_90_days', timedelta(days=90), None),
+)
+
+
+@contextmanager
+def status_changed_by(user):
+    """
+    Blok içinde kaydedilen fırsatların durum geçişlerini `user` adına loglar.
+    """
+    token = _status_changed_by.set(user if user and user.is_authenticated else None)
+    try:
+        yield
+    finally:
+        _status_changed_by.reset(token)
+
+
+def build_transition(opportunity, from_status_id, entered_from_status_at, changed_at, changed_by=None):
+    """
+    Kaydedilmemiş bir geçiş kaydı; önceki durumda geçen süre burada hesaplanır.
+    """
+    duration = None
+    if from_status_id is not None and entered_from_status_at is not None:
+        duration = max(changed_at - entered_from_status_at, timedelta(0))
+    return OpportunityStatusTransition(
+        opportunity_id=opportunity.pk,
+        from_status_id=from_status_id,
+        to_status_id=opportunity.status_id,
+        owner_id=opportunity.assigned_to_id,
+        changed_by=changed_by or _status_changed_by.get(),
+        value=opportunity.value,
+        entered_from_status_at=entered_from_status_at,
+        changed_at=changed_at,
+        duration=duration,
+    )
+
+
+def log_status_transitions(transitions):
+    """
+    Geçiş kayıtlarını tek sorguda ekler (toplu durum değişiklikleri için).
+    """
+    return OpportunityStatusTransition.objects.bulk_create(transitions)
+
+
+def bulk_change_status(opportunity_ids, new_status, changed_by=None):
+    """
+    Fırsatları tek UPDATE ile yeni duruma taşır. Opportunity.save() çağrılmadığı
+    için kapanış tarihi, durum değişim tarihi ve updated_at (auto_now) burada
+    ayarlanır; geçiş kayıtları, akış sayaçları ve önbellek geçersiz kılma da
+    sinyaller yerine toplu olarak yapılır.
+
+    Returns:
+        int: Durumu değişen fırsat sayısı
+    """
+    now = timezone.now()
+    if new_status.is_won or new_status.is_lost:
+        # Zaten kapanmış olanların kapanış tarihi korunur
+        closed_at = Coalesce('closed_at', Value(now))
+    else:
+        closed_at = None
+
+    with transaction.atomic():
+        # Geçiş kaydı için önceki durumlar okunur; satırlar işlem sonuna kadar kilitlenir
+        opportunities = list(
+            Opportunity.objects.select_for_update().filter(pk__in=opportunity_ids)
+            .exclude(status_id=new_status.pk)
+            .only('id', 'status_id', 'status_changed_at', 'created_at', 'value', 'assigned_to_id')
+        )
+        if not opportunities:
+            return 0
+
+        Opportunity.objects.filter(pk__in=[item.pk for item in opportunities]).update(
+            status_id=new_status.pk, closed_at=closed_at, status_changed_at=now, updated_at=now,
+        )
+
+        transitions = []
+        for opportunity in opportunities:
+            from_status_id = opportunity.status_id
+            entered_from_status_at = opportunity.status_changed_at or opportunity.created_at
+            opportunity.status_id = new_status.pk
+            transitions.append(
+                build_transition(opportunity, from_status_id, entered_from_status_at, now, changed_by)
+            )
+        log_status_transitions(transitions)
+        record_stage_entries(opportunities, now)
+
+        transaction.on_commit(invalidate_dashboard_cache)
+        schedule_pipeline_snapshot()
+
+    return len(opportunities)
+
+
+def get_transitions(date_from=None, date_to=None, owner_id=None):
+    transitions = OpportunityStatusTransition.objects.all()
+    if date_from:
+        transitions = transitions.filter(changed_at__date__gte=date_from)
+    if date_to:
+        transitions = transitions.filter(changed_at__date__lte=date_to)
+    if owner_id:
+        transitions = transitions.filter(owner_id=owner_id)
+    return transitions
+
+
+def _days(duration):
+    return round(duration.total_seconds() / 86400, 2) if duration is not None else None
+
+
+def get_stage_durations(date_from=None, date_to=None, owner_id=None):
+    """
+    Durumdan çıkışlara göre, fırsatların o durumda geçirdiği süre dağılımı.
+    Tüm istatistikler tek bir gruplu sorguda hesaplanır.
+    """
+    bucket_counts = {}
+    for label, lower, upper in DURATION_BUCKETS:
+        bucket_filter = Q()
+        if lower is not None:
+            bucket_filter &= Q(duration__gte=lower)
+        if upper is not None:
+            bucket_filter &= Q(duration__lt=upper)
+        bucket_counts[label] = Count('id', filter=bucket_filter)
+
+    rows = get_transitions(date_from, date_to, owner_id).filter(
+        from_status__isnull=False, duration__isnull=False
+    ).values('from_status_id', 'from_status__name', 'from_status__order').annotate(
+        count=Count('id'),
+        average=Avg('duration'),
+        minimum=Min('duration'),
+        maximum=Max('duration'),
+        **bucket_counts,
+    ).order_by('from_status__order', 'from_status_id')
+
+    return [
+        {
+            'status_id': row['from_status_id'],
+            'status_name': row['from_status__name'],
+            'count': row['count'],
+            'average_days': _days(row['average']),
+            'min_days': _days(row['minimum']),
+            'max_days': _days(row['maximum']),
+            'distribution': {label: row[label] for label, _, _ in DURATION_BUCKETS},
+        }
+        for row in rows
+    ]
+
+
+def get_funnel(date_from=None, date_to=None, owner_id=None):
+    """
+    Durum sırasına göre huni: her duruma ulaşan farklı fırsat sayısı, bu
+    durumdan kaybedilenler ve bir sonraki açık duruma geçemeyenlerin oranı.
+    """
+    transitions = get_transitions(date_from, date_to, owner_id)
+    reached = transitions.filter(to_status=OuterRef('pk')).order_by().values('to_status').annotate(
+        total=Count('opportunity', distinct=True)
+    ).values('total')
+    lost = transitions.filter(from_status=OuterRef('pk'), to_status__is_lost=True).order_by().values(
+        'from_status'
+    ).annotate(total=Count('id')).values('total')
+
+    statuses = OpportunityStatus.objects.annotate(
+        reached=Coalesce(Subquery(reached, output_field=IntegerField()), Value(0)),
+        lost=Coalesce(Subquery(lost, output_field=IntegerField()), Value(0)),
+    ).order_by('order', 'id')
+
+    stages = [
+        {
+            'status_id': item.id,
+            'status_name': item.name,
+            'is_won': item.is_won,
+            'is_lost': item.is_lost,
+            'reached': item.reached,
+            'lost': item.lost,
+        }
+        for item in statuses
+    ]
+
+    open_stages = [stage for stage in stages if not stage['is_won'] and not stage['is_lost']]
+    won_reached = sum(stage['reached'] for stage in stages if stage['is_won'])
+    for index, stage in enumerate(open_stages):
+        next_reached = open_stages[index + 1]['reached'] if index + 1 < len(open_stages) else won_reached
+        stage['drop_off_rate'] = (
+            round(max(1 - next_reached / stage['reached'], 0), 4) if stage['reached'] else None
+        )
+    return stages
@@ -2,18 +2,39 @@ from django.shortcuts import render
 from rest_framework import viewsets, status, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from django.db.models import Sum, Count, Q
-from django.utils import timezone
+from django.db.models import Sum, Count, Q, F, OuterRef, Subquery, Window
+from django.db.models.functions import Coalesce, RowNumber
+from django.core.cache import cache
+from django.utils.dateparse import parse_date
+from rest_framework.utils.urls import replace_query_param
 
-from .models import OpportunityStatus, Opportunity, OpportunityActivity
+from crm_project.etag import etag_response
+from exports.mixins import ExportMixin
+
+from .dashboard import DASHBOARD_CACHE_TIMEOUT, build_dashboard, get_dashboard_cache_key
+from .models import OpportunityStatus, Opportunity, OpportunityActivity, OpportunityStatusTransition
+from .pipeline import (
+    get_default_report_range,
+    get_pipeline_trend,
+    get_pipeline_velocity,
+    get_stage_conversion,
+    get_weighted_forecast,
+)
 from .serializers import (
     OpportunityStatusSerializer,
     OpportunityListSerializer, 
     OpportunityDetailSerializer, 
     OpportunityCreateUpdateSerializer,
     OpportunityActivitySerializer,
-    OpportunityActivityCreateSerializer
+    OpportunityActivityCreateSerializer,
+    OpportunityStatusTransitionSerializer,
+    BulkStatusChangeSerializer,
 )
+from .status_cache import status_cache
+from .transitions import bulk_change_status, get_funnel, get_stage_durations, status_changed_by
+
+
+KANBAN_ORDERING = '-created_at'
 
 
 class OpportunityStatusViewSet(viewsets.ModelViewSet):
@@ -22,17 +43,30 @@ class OpportunityStatusViewSet(viewsets.ModelViewSet):
     """
     queryset = OpportunityStatus.objects.all().order_by('order')
     serializer_class = OpportunityStatusSerializer
+    # Durumlar küçük bir referans tablosudur, kanban kolonları için tamamı tek seferde döner
+    pagination_class = None
 
 
-class OpportunityViewSet(viewsets.ModelViewSet):
+class OpportunityViewSet(ExportMixin, viewsets.ModelViewSet):
     """
     Satış fırsatları için API endpoint'i
     """
-    queryset = Opportunity.objects.all()
+    queryset = Opportunity.objects.select_related('company', 'assigned_to').annotate(
+        contact_count=Count('contacts', distinct=True)
+    )
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['title', 'description', 'company__name']
     ordering_fields = ['created_at', 'updated_at', 'expected_close_date', 'value', 'priority']
     ordering = ['-created_at']
+    export_resource = 'opportunities'
+    export_fields = ('id', 'title', ('company__name', 'Firma'), ('status__name', 'Durum'), 'value', 'priority',
+                     'expected_close_date', ('assigned_to__username', 'Sorumlu'), 'created_at', 'closed_at')
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action != 'list':
+            queryset = queryset.prefetch_related('contacts', 'activities__performed_by')
+        return queryset
     
     def get_serializer_class(self):
         if self.action == 'list':
@@ -46,74 +80,156 @@ class OpportunityViewSet(viewsets.ModelViewSet):
         Fırsat oluşturulduğunda, mevcut kullanıcıyı sorumlu olarak ata
         (eğer kullanıcı tarafından belirtilmediyse)
         """
-        if not serializer.validated_data.get('assigned_to'):
-            serializer.save(assigned_to=self.request.user)
-        else:
+        with status_changed_by(self.request.user):
+            if not serializer.validated_data.get('assigned_to'):
+                serializer.save(assigned_to=self.request.user)
+            else:
+                serializer.save()
+
+    def perform_update(self, serializer):
+        with status_changed_by(self.request.user):
             serializer.save()
     
+    def _get_report_params(self):
+        """
+        Rapor filtreleri: assigned_to_id, company_id, date_from, date_to (YYYY-MM-DD).
+
+        Returns:
+            tuple: (verilen filtreler, hata yanıtı veya None)
+        """
+        params = self.request.query_params
+        report_params = {}
+        for name in ('assigned_to_id', 'company_id'):
+            value = params.get(name)
+            if value:
+                if not value.isdigit():
+                    return None, Response({"error": f"Geçersiz {name}"}, status=status.HTTP_400_BAD_REQUEST)
+                report_params[name] = int(value)
+        for name in ('date_from', 'date_to'):
+            value = params.get(name)
+            if value:
+                try:
+                    parsed = parse_date(value)
+                except ValueError:
+                    parsed = None
+                if parsed is None:
+                    return None, Response({"error": f"Geçersiz {name} (YYYY-MM-DD bekleniyor)"},
+                                          status=status.HTTP_400_BAD_REQUEST)
+                report_params[name] = parsed
+        return report_params, None
+
     @action(detail=False, methods=['get'])
     def dashboard(self, request):
         """
         Dashboard istatistikleri için veri sağlar
+
+        Filtreler: assigned_to_id, company_id, date_from, date_to (oluşturulma tarihi, YYYY-MM-DD)
         """
-        # Son 30 gündeki fırsatlar
-        days30 = timezone.now() - timezone.timedelta(days=30)
-        opportunities30 = Opportunity.objects.filter(created_at__gte=days30)
-        
-        # Statülere göre tüm fırsatlar
-        status_counts = Opportunity.objects.values('status__name', 'status__color').annotate(
-            count=Count('id'),
-            total_value=Sum('value')
-        ).order_by('status__order')
-        
-        # Kazanılan ve kaybedilen fırsatlar
-        won_opportunities = Opportunity.objects.filter(status__is_won=True)
-        lost_opportunities = Opportunity.objects.filter(status__is_lost=True)
-        
-        # Açık fırsatlar (ne kazanılmış ne de kaybedilmiş)
-        open_opportunities = Opportunity.objects.filter(
-            ~Q(status__is_won=True) & ~Q(status__is_lost=True)
-        )
-        
-        # Önceliklere göre fırsatlar
-        priority_counts = Opportunity.objects.values('priority').annotate(
-            count=Count('id'),
-            total_value=Sum('value')
-        ).order_by('priority')
-        
-        # Beklenilen yakın tarihli kapanışlar (önümüzdeki 30 gün)
-        next30days = timezone.now() + timezone.timedelta(days=30)
-        upcoming_closures = Opportunity.objects.filter(
-            expected_close_date__gte=timezone.now().date(),
-            expected_close_date__lte=next30days.date(),
-            closed_at__isnull=True  # Henüz kapanmamış olanlar
-        ).order_by('expected_close_date')
-        
-        upcoming_data = OpportunityListSerializer(upcoming_closures, many=True).data
-        
-        response_data = {
-            'total_count': Opportunity.objects.count(),
-            'total_value': Opportunity.objects.aggregate(total=Sum('value'))['total'] or 0,
-            
-            'open_count': open_opportunities.count(),
-            'open_value': open_opportunities.aggregate(total=Sum('value'))['total'] or 0,
-            
-            'won_count': won_opportunities.count(),
-            'won_value': won_opportunities.aggregate(total=Sum('value'))['total'] or 0,
-            
-            'lost_count': lost_opportunities.count(),
-            'lost_value': lost_opportunities.aggregate(total=Sum('value'))['total'] or 0,
-            
-            'last30days_count': opportunities30.count(),
-            'last30days_value': opportunities30.aggregate(total=Sum('value'))['total'] or 0,
-            
-            'status_distribution': status_counts,
-            'priority_distribution': priority_counts,
-            'upcoming_closures': upcoming_data,
+        report_params, error = self._get_report_params()
+        if error:
+            return error
+        lookups = {
+            'assigned_to_id': 'assigned_to_id',
+            'company_id': 'company_id',
+            'date_from': 'created_at__date__gte',
+            'date_to': 'created_at__date__lte',
         }
-        
+        filters = {lookups[name]: value for name, value in report_params.items()}
+
+        cache_key = get_dashboard_cache_key(request.user.id, filters)
+        response_data = cache.get(cache_key)
+        if response_data is None:
+            response_data = build_dashboard(
+                Opportunity.objects.filter(**filters),
+                self.queryset.filter(**filters),
+                OpportunityListSerializer,
+            )
+            cache.set(cache_key, response_data, DASHBOARD_CACHE_TIMEOUT)
+
         return Response(response_data)
 
+    def _pipeline_report(self, report):
+        """
+        Özet tablodan rapor üretir. Filtreler: assigned_to_id, date_from, date_to
+        (varsayılan son PIPELINE_LOOKBACK_DAYS gün).
+        """
+        report_params, error = self._get_report_params()
+        if error:
+            return error
+        default_from, default_to = get_default_report_range()
+        return Response(report(
+            report_params.get('date_from', default_from),
+            report_params.get('date_to', default_to),
+            report_params.get('assigned_to_id'),
+        ))
+
+    @action(detail=False, methods=['get'], url_path='pipeline-trend')
+    def pipeline_trend(self, request):
+        """
+        Günlük, durum bazında hat stoku
+        """
+        return self._pipeline_report(get_pipeline_trend)
+
+    @action(detail=False, methods=['get'], url_path='pipeline-conversion')
+    def pipeline_conversion(self, request):
+        """
+        Durumlar arası dönüşüm oranları ve kazanma oranı
+        """
+        return self._pipeline_report(get_stage_conversion)
+
+    @action(detail=False, methods=['get'], url_path='pipeline-velocity')
+    def pipeline_velocity(self, request):
+        """
+        Satış hızı (TL/gün) ve bileşenleri
+        """
+        return self._pipeline_report(get_pipeline_velocity)
+
+    @action(detail=False, methods=['get'], url_path='pipeline-forecast')
+    def pipeline_forecast(self, request):
+        """
+        Durum bazında kazanılma olasılığıyla ağırlıklandırılmış hat değeri
+        """
+        return self._pipeline_report(get_weighted_forecast)
+
+    def _transition_report(self, report):
+        """
+        Durum geçiş kaydından rapor üretir. Filtreler: assigned_to_id, date_from, date_to
+        """
+        report_params, error = self._get_report_params()
+        if error:
+            return error
+        return Response(report(
+            report_params.get('date_from'),
+            report_params.get('date_to'),
+            report_params.get('assigned_to_id'),
+        ))
+
+    @action(detail=False, methods=['get'], url_path='stage-durations')
+    def stage_durations(self, request):
+        """
+        Fırsatların durumlarda geçirdiği süre dağılımı
+        """
+        return self._transition_report(get_stage_durations)
+
+    @action(detail=False, methods=['get'])
+    def funnel(self, request):
+        """
+        Durumlara ulaşan fırsat sayıları ve kayıp oranları
+        """
+        return self._transition_report(get_funnel)
+
+    @action(detail=True, methods=['get'], url_path='status-history')
+    def status_history(self, request, pk=None):
+        """
+        Fırsatın durum geçişleri (en yeniden eskiye)
+        """
+        transitions = OpportunityStatusTransition.objects.filter(opportunity_id=pk).select_related(
+            'from_status', 'to_status', 'changed_by'
+        ).order_by('-changed_at')
+        page = self.paginate_queryset(transitions)
+        serializer = OpportunityStatusTransitionSerializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
     @action(detail=True, methods=['post'])
     def change_status(self, request, pk=None):
         """
@@ -131,8 +247,8 @@ class OpportunityViewSet(viewsets.ModelViewSet):
 
             # Status'un var olduğunu kontrol et
             try:
-                new_status = OpportunityStatus.objects.get(id=status_id)
-            except OpportunityStatus.DoesNotExist:
+                new_status = status_cache.get(int(status_id))
+            except (OpportunityStatus.DoesNotExist, TypeError, ValueError):
                 return Response(
                     {"error": "Geçersiz status ID"},
                     status=status.HTTP_400_BAD_REQUEST
@@ -140,7 +256,8 @@ class OpportunityViewSet(viewsets.ModelViewSet):
 
             # Opportunity'nin status'unu güncelle
             opportunity.status = new_status
-            opportunity.save()
+            with status_changed_by(request.user):
+                opportunity.save()
 
             # Güncellenmiş opportunity'yi döndür
             serializer = OpportunityDetailSerializer(opportunity)
@@ -152,6 +269,23 @@ class OpportunityViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+    @action(detail=False, methods=['post'], url_path='bulk-change-status')
+    def bulk_change_status(self, request):
+        """
+        Birden fazla fırsatın durumunu tek seferde değiştir (kanban çoklu seçim)
+
+        Body: {"opportunity_ids": [...], "status_id": ...}
+        """
+        serializer = BulkStatusChangeSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        new_status = serializer.validated_data['status_id']
+        updated_count = bulk_change_status(
+            serializer.validated_data['opportunity_ids'], new_status, request.user
+        )
+        return Response({"updated_count": updated_count, "status_id": new_status.pk})
+
     @action(detail=False, methods=['get'])
     def company_opportunities(self, request):
         """
@@ -161,7 +295,7 @@ class OpportunityViewSet(viewsets.ModelViewSet):
         if not company_id:
             return Response({"error": "Firma ID'si belirtilmelidir"}, status=status.HTTP_400_BAD_REQUEST)
             
-        opportunities = self.queryset.filter(company_id=company_id)
+        opportunities = self.get_queryset().filter(company_id=company_id)
         page = self.paginate_queryset(opportunities)
         
         if page is not None:
@@ -171,56 +305,116 @@ class OpportunityViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(opportunities, many=True)
         return Response(serializer.data)
     
+    def _filter_kanban_queryset(self, queryset):
+        params = self.request.query_params
+
+        company_id = params.get('company_id')
+        if company_id:
+            queryset = queryset.filter(company_id=company_id)
+
+        assigned_to_id = params.get('assigned_to_id')
+        if assigned_to_id:
+            queryset = queryset.filter(assigned_to_id=assigned_to_id)
+
+        priority = params.get('priority')
+        if priority:
+            queryset = queryset.filter(priority=priority)
+
+        # Açık/kapalı filtresi
+        is_closed = params.get('is_closed')
+        if is_closed == 'true':
+            queryset = queryset.filter(closed_at__isnull=False)
+        elif is_closed == 'false':
+            queryset = queryset.filter(closed_at__isnull=True)
+
+        return queryset
+
     @action(detail=False, methods=['get'])
     def kanban(self, request):
         """
         Kanban görünümü için durumlarına göre gruplandırılmış fırsatlar
+
+        Tüm kolonların kartları, kolon başına kart sayısı ve toplam değerle
+        birlikte pencere fonksiyonlarıyla tek sorguda alınır. İstemci `page_size`
+        gönderirse kolon başına ilk `page_size` kart döner ve kolonun devamı
+        `next` bağlantısıyla (status_id + cursor) yüklenir; göndermezse kolonlar
+        kırpılmaz.
+        Yanıt ETag taşır; değişmemiş pano için 304 döner.
         """
-        statuses = OpportunityStatus.objects.all().order_by('order')
+        contact_counts = Opportunity.contacts.through.objects.filter(
+            opportunity_id=OuterRef('pk')
+        ).values('opportunity_id').annotate(count=Count('*')).values('count')
+        opportunities = self._filter_kanban_queryset(
+            Opportunity.objects.select_related('company', 'assigned_to').annotate(
+                contact_count=Coalesce(Subquery(contact_counts), 0)
+            )
+        )
+
+        status_id = request.query_params.get('status_id')
+        if status_id and not status_id.isdigit():
+            return Response({"error": "Geçersiz status_id"}, status=status.HTTP_400_BAD_REQUEST)
+
+        if status_id and self.paginator.cursor_query_param in request.query_params:
+            # "Daha fazla yükle": tek kolonun sonraki sayfası
+            page = self.paginate_queryset(
+                opportunities.filter(status_id=status_id).order_by(KANBAN_ORDERING)
+            )
+            serializer = OpportunityListSerializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+
+        # "Daha fazla yükle" desteklemeyen istemciler için varsayılan olarak sınır yoktur
+        limit = self.paginator.get_page_size(request) if 'page_size' in request.query_params else None
+
+        column = {'partition_by': [F('status_id')]}
+        cards = opportunities.annotate(
+            column_rank=Window(RowNumber(), order_by=[F('created_at').desc(), F('id').desc()], **column),
+            column_count=Window(Count('id'), **column),
+            column_value=Window(Sum('value'), **column),
+        ).order_by('status_id', 'column_rank')
+        if limit is not None:
+            cards = cards.filter(column_rank__lte=limit)
+        statuses = status_cache.all()
+        if status_id:
+            cards = cards.filter(status_id=status_id)
+            statuses = [item for item in statuses if item.pk == int(status_id)]
+
+        cards_by_status = {}
+        for card in cards:
+            cards_by_status.setdefault(card.status_id, []).append(card)
+
+        base_url = request.build_absolute_uri()
         kanban_data = []
-        
-        for status in statuses:
-            opportunities = Opportunity.objects.filter(status=status)
-            
-            # Filtreler uygula
-            company_id = request.query_params.get('company_id')
-            if company_id:
-                opportunities = opportunities.filter(company_id=company_id)
-                
-            assigned_to_id = request.query_params.get('assigned_to_id')
-            if assigned_to_id:
-                opportunities = opportunities.filter(assigned_to_id=assigned_to_id)
-                
-            priority = request.query_params.get('priority')
-            if priority:
-                opportunities = opportunities.filter(priority=priority)
-                
-            # Açık/kapalı filtresi
-            is_closed = request.query_params.get('is_closed')
-            if is_closed == 'true':
-                opportunities = opportunities.filter(closed_at__isnull=False)
-            elif is_closed == 'false':
-                opportunities = opportunities.filter(closed_at__isnull=True)
-            
-            serializer = OpportunityListSerializer(opportunities, many=True)
-            
+        for opportunity_status in statuses:
+            column_cards = cards_by_status.get(opportunity_status.id, [])
+            count = column_cards[0].column_count if column_cards else 0
+
+            next_link = None
+            if count > len(column_cards):
+                next_link = self.paginator.build_next_link(
+                    replace_query_param(base_url, 'status_id', opportunity_status.id),
+                    column_cards[-1],
+                    KANBAN_ORDERING,
+                )
+
             kanban_data.append({
-                'status_id': status.id,
-                'status_name': status.name,
-                'status_color': status.color,
-                'count': opportunities.count(),
-                'total_value': opportunities.aggregate(total=Sum('value'))['total'] or 0,
-                'opportunities': serializer.data
+                'status_id': opportunity_status.id,
+                'status_name': opportunity_status.name,
+                'status_color': opportunity_status.color,
+                'count': count,
+                'total_value': column_cards[0].column_value if column_cards else 0,
+                'opportunities': OpportunityListSerializer(column_cards, many=True).data,
+                'has_more': next_link is not None,
+                'next': next_link,
             })
-        
-        return Response(kanban_data)
+
+        return etag_response(request, kanban_data)
 
 
 class OpportunityActivityViewSet(viewsets.ModelViewSet):
     """
     Satış fırsatı aktiviteleri için API endpoint'i
     """
-    queryset = OpportunityActivity.objects.all()
+    queryset = OpportunityActivity.objects.select_related('performed_by')
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['title', 'description']
     ordering_fields = ['performed_at', 'type']
@@ -251,5 +445,11 @@ class OpportunityActivityViewSet(viewsets.ModelViewSet):
             return Response({"error": "Fırsat ID'si belirtilmelidir"}, status=status.HTTP_400_BAD_REQUEST)
             
         activities = self.queryset.filter(opportunity_id=opportunity_id)
+        page = self.paginate_queryset(activities)
+
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+
         serializer = self.get_serializer(activities, many=True)
         return Response(serializer.data)
@@ -1,20 +1,21 @@
 'use client';
 
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef } from 'react';
 import AppWrapper from '@/components/layout/AppWrapper';
 import PageHeader from '@/components/layout/PageHeader';
 import Card from '@/components/layout/Card';
 import Link from 'next/link';
 import TestEmailViewer from '@/components/communications/TestEmailViewer';
 import { useSearchParams } from 'next/navigation';
-import { getEmailTemplates, getIncomingEmails, fetchEmailsFromIMAP, getIMAPStatus, getSentEmails } from '@/services/communicationService';
+import { getEmailTemplates, getIncomingEmails, fetchEmailsFromIMAP, getMailboxSyncJob, getIMAPStatus, getSentEmails } from '@/services/communicationService';
 import { getCompanies } from '@/services/companyService';
 import { getContacts } from '@/services/contactService';
 import { getOpportunities } from '@/services/opportunityService';
-import { EmailTemplate, IncomingEmail, EmailMessage } from '@/types/communications';
+import { EmailTemplate, IncomingEmail, EmailMessage, MailboxSyncJob } from '@/types/communications';
 import { CompanyList, Contact } from '@/types/customer';
 import { OpportunityList } from '@/types/opportunities';
 import EmailDetailModal from '@/components/communications/EmailDetailModal';
+import LoadMoreButton from '@/components/common/LoadMoreButton';
 import { 
   PlusIcon, 
   EnvelopeIcon, 
@@ -27,6 +28,13 @@ import {
   BeakerIcon
 } from '@heroicons/react/24/outline';
 
+// Senkronizasyon işi bu durumlardan birine geçene kadar takip edilir
+const SYNC_FINISHED_STATUSES = ['success', 'failed', 'skipped'];
+const SYNC_POLL_INTERVAL = 2000; // 2 saniye
+const SYNC_POLL_TIMEOUT = 5 * 60 * 1000; // 5 dakika
+
+const wait = (ms: number) => new Promise(resolve => setTimeout(resolve, ms));
+
 export default function Communications() {
   const [activeTab, setActiveTab] = useState('inbox');
   const [templates, setTemplates] = useState<EmailTemplate[]>([]);
@@ -40,6 +48,14 @@ export default function Communications() {
   const [isFetching, setIsFetching] = useState(false);
   const [imapStatus, setImapStatus] = useState<any>(null);
   const [lastFetchTime, setLastFetchTime] = useState<Date | null>(null);
+  const [syncJob, setSyncJob] = useState<MailboxSyncJob | null>(null);
+  // Süren senkronizasyon takibi; sekme değişince veya sayfadan çıkınca durdurulur
+  const syncPollRef = useRef(0);
+  const isSyncingRef = useRef(false);
+  // Sayfalı listelerin sonraki sayfa bağlantıları
+  const [incomingNextUrl, setIncomingNextUrl] = useState<string | null>(null);
+  const [sentNextUrl, setSentNextUrl] = useState<string | null>(null);
+  const [isLoadingMore, setIsLoadingMore] = useState(false);
 
   // Filtreleme state'leri
   const [filters, setFilters] = useState({
@@ -63,26 +79,28 @@ export default function Communications() {
           console.log('Şablonlar yükleniyor...');
           const data = await getEmailTemplates();
           console.log('Yüklenen şablonlar:', data);
-          setTemplates(Array.isArray(data) ? data : []);
+          setTemplates(data);
         } else if (activeTab === 'inbox') {
           console.log('Gelen e-postalar yükleniyor...');
-          const [emailsData, statusData] = await Promise.all([
+          const [emailsPage, statusData] = await Promise.all([
             getIncomingEmails(),
             getIMAPStatus()
           ]);
-          console.log('Yüklenen gelen e-postalar:', emailsData);
-          setIncomingEmails(Array.isArray(emailsData) ? emailsData : []);
+          console.log('Yüklenen gelen e-postalar:', emailsPage.results);
+          setIncomingEmails(emailsPage.results);
+          setIncomingNextUrl(emailsPage.next);
           setImapStatus(statusData);
         } else if (activeTab === 'sent') {
           console.log('Gönderilen e-postalar yükleniyor...');
-          const [emailsData, companiesData, contactsData, opportunitiesData] = await Promise.all([
+          const [emailsPage, companiesData, contactsData, opportunitiesData] = await Promise.all([
             getSentEmails(),
             getCompanies(),
             getContacts(),
             getOpportunities()
           ]);
-          console.log('Yüklenen gönderilen e-postalar:', emailsData);
-          setSentEmails(Array.isArray(emailsData) ? emailsData : []);
+          console.log('Yüklenen gönderilen e-postalar:', emailsPage.results);
+          setSentEmails(emailsPage.results);
+          setSentNextUrl(emailsPage.next);
           setCompanies(Array.isArray(companiesData) ? companiesData : []);
           setContacts(Array.isArray(contactsData) ? contactsData : []);
           setOpportunities(Array.isArray(opportunitiesData) ? opportunitiesData : []);
@@ -131,7 +149,10 @@ export default function Communications() {
         fetchEmailsAutomatically();
       }, 60000); // 60 saniye = 1 dakika
 
-      return () => clearInterval(interval);
+      return () => {
+        clearInterval(interval);
+        syncPollRef.current += 1;
+      };
     }
   }, [activeTab, imapStatus]);
 
@@ -149,8 +170,9 @@ export default function Communications() {
         if (newFilters.contact) filterParams.contact = parseInt(newFilters.contact);
         if (newFilters.opportunity) filterParams.opportunity = parseInt(newFilters.opportunity);
 
-        const emailsData = await getSentEmails(filterParams);
-        setSentEmails(Array.isArray(emailsData) ? emailsData : []);
+        const emailsPage = await getSentEmails(filterParams);
+        setSentEmails(emailsPage.results);
+        setSentNextUrl(emailsPage.next);
       } catch (err) {
         console.error('Filtreleme hatası:', err);
       } finally {
@@ -166,8 +188,9 @@ export default function Communications() {
     if (activeTab === 'sent') {
       try {
         setIsLoading(true);
-        const emailsData = await getSentEmails();
-        setSentEmails(Array.isArray(emailsData) ? emailsData : []);
+        const emailsPage = await getSentEmails();
+        setSentEmails(emailsPage.results);
+        setSentNextUrl(emailsPage.next);
       } catch (err) {
         console.error('Filtreleme temizleme hatası:', err);
       } finally {
@@ -176,28 +199,75 @@ export default function Communications() {
     }
   };
 
-  // E-postaları IMAP'tan al (otomatik tarama için)
+  // E-postaları IMAP'tan al (otomatik tarama için). Senkronizasyon arka planda
+  // çalıştığından iş bitene kadar durumu sorgulanır, sonra gelen kutusu yenilenir.
   const fetchEmailsAutomatically = async () => {
+    // Önceki tarama hâlâ sürüyorsa yenisini başlatma
+    if (isSyncingRef.current) return;
+    const pollId = syncPollRef.current;
     try {
+      isSyncingRef.current = true;
       setIsFetching(true);
       console.log('Otomatik IMAP taraması başlatılıyor...');
-      const result = await fetchEmailsFromIMAP();
-      console.log('IMAP sonucu:', result);
-
-      // Başarılıysa gelen e-postaları yeniden yükle
-      if (result.success) {
-        const emailsData = await getIncomingEmails();
-        setIncomingEmails(Array.isArray(emailsData) ? emailsData : []);
-        setLastFetchTime(new Date());
-        console.log(`${result.saved_count || 0} yeni e-posta alındı`);
+      let job: MailboxSyncJob = await fetchEmailsFromIMAP();
+      setSyncJob(job);
+
+      const deadline = Date.now() + SYNC_POLL_TIMEOUT;
+      while (!SYNC_FINISHED_STATUSES.includes(job.status)) {
+        await wait(SYNC_POLL_INTERVAL);
+        if (syncPollRef.current !== pollId || Date.now() > deadline) return;
+        job = await getMailboxSyncJob(job.id);
+        setSyncJob(job);
+      }
+      console.log('IMAP sonucu:', job);
+
+      if (job.status === 'failed') {
+        console.error('E-posta senkronizasyonu başarısız:', job.message);
+        return;
       }
+
+      // Tamamlandıysa gelen e-postaların ilk sayfasını yeniden yükle
+      if (syncPollRef.current !== pollId) return;
+      const emailsPage = await getIncomingEmails();
+      setIncomingEmails(emailsPage.results);
+      setIncomingNextUrl(emailsPage.next);
+      setLastFetchTime(new Date());
+      console.log(`${job.saved_count} yeni e-posta alındı`);
     } catch (err) {
       console.error('Otomatik e-posta alma hatası:', err);
     } finally {
+      isSyncingRef.current = false;
       setIsFetching(false);
     }
   };
 
+  // Listelerin sonraki sayfasını yükle
+  const loadMoreIncomingEmails = async (url: string) => {
+    try {
+      setIsLoadingMore(true);
+      const emailsPage = await getIncomingEmails(url);
+      setIncomingEmails(prev => [...prev, ...emailsPage.results]);
+      setIncomingNextUrl(emailsPage.next);
+    } catch (err) {
+      console.error('Gelen e-postalar yüklenirken hata:', err);
+    } finally {
+      setIsLoadingMore(false);
+    }
+  };
+
+  const loadMoreSentEmails = async (url: string) => {
+    try {
+      setIsLoadingMore(true);
+      const emailsPage = await getSentEmails(undefined, url);
+      setSentEmails(prev => [...prev, ...emailsPage.results]);
+      setSentNextUrl(emailsPage.next);
+    } catch (err) {
+      console.error('Gönderilen e-postalar yüklenirken hata:', err);
+    } finally {
+      setIsLoadingMore(false);
+    }
+  };
+
   // Modal fonksiyonları
   const openEmailModal = (email: EmailMessage | IncomingEmail, type: 'sent' | 'incoming') => {
     setSelectedEmail(email);
@@ -386,11 +456,22 @@ export default function Communications() {
                   <div className="inline-flex items-center text-sm text-gray-600">
                     <ClockIcon className="-ml-1 mr-2 h-4 w-4 animate-spin" />
                     E-postalar alınıyor...
+                    {syncJob && syncJob.status === 'running' && (
+                      <span className="ml-1">
+                        %{syncJob.progress} ({syncJob.saved_count} yeni)
+                      </span>
+                    )}
+                  </div>
+                )}
+                {syncJob?.status === 'failed' && !isFetching && (
+                  <div className="text-sm text-red-600 bg-red-50 px-3 py-1 rounded-md">
+                    E-postalar alınamadı{syncJob.message ? `: ${syncJob.message}` : ''}
                   </div>
                 )}
                 {lastFetchTime && !isFetching && (
                   <div className="text-sm text-gray-500">
                     Son güncelleme: {lastFetchTime.toLocaleTimeString('tr-TR')}
+                    {syncJob?.status === 'success' && ` (${syncJob.saved_count} yeni e-posta)`}
                   </div>
                 )}
               </div>
@@ -467,6 +548,12 @@ export default function Communications() {
                     ))}
                   </tbody>
                 </table>
+                <LoadMoreButton
+                  next={incomingNextUrl}
+                  isLoading={isLoadingMore}
+                  onLoadMore={loadMoreIncomingEmails}
+                  className="mb-6"
+                />
               </div>
             ) : (
               <div className="text-center py-8">
@@ -626,6 +713,15 @@ export default function Communications() {
               </table>
             </div>
 
+            {!isLoading && (
+              <LoadMoreButton
+                next={sentNextUrl}
+                isLoading={isLoadingMore}
+                onLoadMore={loadMoreSentEmails}
+                className="mb-6"
+              />
+            )}
+
             {sentEmails.length === 0 && !isLoading && (
               <div className="text-center py-8">
                 <EnvelopeIcon className="mx-auto h-12 w-12 text-gray-400" />
@@ -7,7 +7,7 @@ import PageHeader from '@/components/layout/PageHeader';
 import Card from '@/components/layout/Card';
 import ContactCard from '@/components/customers/ContactCard';
 import { getCompanyById, deleteCompany, getCompanyContacts } from '@/services/companyService';
-import { getOpportunities } from '@/services/opportunityService';
+import { getCompanyOpportunities } from '@/services/opportunityService';
 import { getCompanyEvents } from '@/services/eventService';
 import { CompanyDetail, Contact, Note } from '@/types/customer';
 import { OpportunityList } from '@/types/opportunities';
@@ -64,8 +64,7 @@ export default function CompanyDetails({ params }: CompanyDetailsProps) {
         setContacts(contactsData || []);
 
         // Şirketin fırsatlarını getir
-        const opportunitiesData = await getOpportunities();
-        const companyOpportunities = opportunitiesData.filter(opp => opp.company === parsedId);
+        const companyOpportunities = await getCompanyOpportunities(parsedId);
         setOpportunities(companyOpportunities);
 
         // Şirketin etkinliklerini getir
@@ -4,7 +4,8 @@ import { useState, useEffect } from 'react';
 import AppWrapper from '@/components/layout/AppWrapper';
 import PageHeader from '@/components/layout/PageHeader';
 import CompanyCard from '@/components/customers/CompanyCard';
-import { getCompanies, searchCompanies } from '@/services/companyService';
+import LoadMoreButton from '@/components/common/LoadMoreButton';
+import { getCompaniesPage, searchCompanies } from '@/services/companyService';
 import { CompanyList } from '@/types/customer';
 import Link from 'next/link';
 import { MagnifyingGlassIcon, PlusIcon } from '@heroicons/react/24/outline';
@@ -14,13 +15,17 @@ export default function Companies() {
   const [searchTerm, setSearchTerm] = useState('');
   const [isLoading, setIsLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
+  // Sonraki sayfanın bağlantısı (aramada sonuçlar tek seferde döner)
+  const [nextUrl, setNextUrl] = useState<string | null>(null);
+  const [isLoadingMore, setIsLoadingMore] = useState(false);
 
   useEffect(() => {
     const fetchCompanies = async () => {
       try {
         setIsLoading(true);
-        const data = await getCompanies();
-        setCompanies(data);
+        const page = await getCompaniesPage();
+        setCompanies(page.results);
+        setNextUrl(page.next);
       } catch (err) {
         console.error('Firmalar yüklenirken hata:', err);
         setError('Firmalar yüklenirken bir sorun oluştu.');
@@ -35,13 +40,15 @@ export default function Companies() {
   const handleSearch = async (e: React.FormEvent) => {
     e.preventDefault();
     if (!searchTerm.trim()) {
-      const data = await getCompanies();
-      setCompanies(data);
+      const page = await getCompaniesPage();
+      setCompanies(page.results);
+      setNextUrl(page.next);
       return;
     }
 
     try {
       setIsLoading(true);
+      setNextUrl(null);
       const results = await searchCompanies(searchTerm);
       setCompanies(results);
     } catch (err) {
@@ -52,6 +59,20 @@ export default function Companies() {
     }
   };
 
+  const handleLoadMore = async (url: string) => {
+    try {
+      setIsLoadingMore(true);
+      const page = await getCompaniesPage(url);
+      setCompanies(prev => [...prev, ...page.results]);
+      setNextUrl(page.next);
+    } catch (err) {
+      console.error('Firmalar yüklenirken hata:', err);
+      setError('Firmalar yüklenirken bir sorun oluştu.');
+    } finally {
+      setIsLoadingMore(false);
+    }
+  };
+
   return (
     <AppWrapper>
       <PageHeader 
@@ -145,6 +166,10 @@ export default function Companies() {
             ))}
           </div>
         )}
+
+        {!isLoading && (
+          <LoadMoreButton next={nextUrl} isLoading={isLoadingMore} onLoadMore={handleLoadMore} />
+        )}
       </div>
     </AppWrapper>
   );
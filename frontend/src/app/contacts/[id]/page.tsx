@@ -6,7 +6,7 @@ import AppWrapper from '@/components/layout/AppWrapper';
 import PageHeader from '@/components/layout/PageHeader';
 import Card from '@/components/layout/Card';
 import { getContactById, deleteContact } from '@/services/contactService';
-import { getOpportunities } from '@/services/opportunityService';
+import { getCompanyOpportunities } from '@/services/opportunityService';
 import { getContactEvents } from '@/services/eventService';
 import { Contact, Note } from '@/types/customer';
 import { OpportunityList } from '@/types/opportunities';
@@ -58,11 +58,8 @@ export default function ContactDetails({ params }: ContactDetailsProps) {
         setContact(data);
 
         // Kişinin fırsatlarını getir
-        const opportunitiesData = await getOpportunities();
-        // Contact'ın company'si üzerinden fırsatları filtrele
-        const contactOpportunities = opportunitiesData.filter(opp =>
-          opp.company === data.company
-        );
+        // Contact'ın company'si üzerinden fırsatları getir
+        const contactOpportunities = await getCompanyOpportunities(data.company);
         setOpportunities(contactOpportunities);
 
         // Kişinin etkinliklerini getir
@@ -4,8 +4,8 @@ import { useState, useEffect } from 'react';
 import AppWrapper from '@/components/layout/AppWrapper';
 import PageHeader from '@/components/layout/PageHeader';
 import Card from '@/components/layout/Card';
-import { getCompanies } from '@/services/companyService';
-import { getContacts } from '@/services/contactService';
+import { getCompaniesPage } from '@/services/companyService';
+import { getContactsPage } from '@/services/contactService';
 import { CompanyList, Contact } from '@/types/customer';
 import Link from 'next/link';
 import { 
@@ -22,6 +22,8 @@ import {
 export default function Dashboard() {
   const [companies, setCompanies] = useState<CompanyList[]>([]);
   const [contacts, setContacts] = useState<Contact[]>([]);
+  const [companyCount, setCompanyCount] = useState(0);
+  const [contactCount, setContactCount] = useState(0);
   const [isLoading, setIsLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
 
@@ -29,13 +31,17 @@ export default function Dashboard() {
     const fetchDashboardData = async () => {
       try {
         setIsLoading(true);
-        const [companiesData, contactsData] = await Promise.all([
-          getCompanies(),
-          getContacts()
+        // Sadece ilk 5 kayıt ve toplam sayı istenir
+        const params = { page_size: 5, include_count: 1 };
+        const [companiesPage, contactsPage] = await Promise.all([
+          getCompaniesPage(undefined, params),
+          getContactsPage(undefined, params)
         ]);
         
-        setCompanies(companiesData.slice(0, 5)); // Son 5 şirket
-        setContacts(contactsData.slice(0, 5)); // Son 5 kişi
+        setCompanies(companiesPage.results); // Son 5 şirket
+        setContacts(contactsPage.results); // Son 5 kişi
+        setCompanyCount(companiesPage.count ?? companiesPage.results.length);
+        setContactCount(contactsPage.count ?? contactsPage.results.length);
       } catch (err) {
         console.error('Dashboard verileri yüklenirken hata:', err);
         setError('Veriler yüklenirken bir sorun oluştu.');
@@ -50,14 +56,14 @@ export default function Dashboard() {
   const stats = [
     { 
       title: 'Toplam Firma', 
-      value: companies.length,
+      value: companyCount,
       icon: BuildingOfficeIcon, 
       color: 'bg-blue-100 text-blue-800',
       href: '/companies'
     },
     { 
       title: 'Toplam Kişi', 
-      value: contacts.length,
+      value: contactCount,
       icon: UsersIcon, 
       color: 'bg-green-100 text-green-800',
       href: '/contacts'
@@ -6,20 +6,25 @@ import AppWrapper from '@/components/layout/AppWrapper';
 import PageHeader from '@/components/layout/PageHeader';
 import Card from '@/components/layout/Card';
 import { PlusIcon, CalendarIcon, ClockIcon, MapPinIcon } from '@heroicons/react/24/outline';
-import { getEvents, getEventTypeLabel, getEventStatusLabel, getEventPriorityLabel } from '@/services/eventService';
+import LoadMoreButton from '@/components/common/LoadMoreButton';
+import { getEventsPage, getEventTypeLabel, getEventStatusLabel, getEventPriorityLabel, EventListFilter } from '@/services/eventService';
 import { EventList } from '@/types/events';
 
 export default function EventsPage() {
   const [events, setEvents] = useState<EventList[]>([]);
   const [isLoading, setIsLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
-  const [filter, setFilter] = useState<'all' | 'upcoming' | 'today' | 'completed'>('all');
+  const [filter, setFilter] = useState<EventListFilter>('all');
+  // Filtreleme sunucuda yapılır; sonraki sayfa istenince yüklenir
+  const [nextUrl, setNextUrl] = useState<string | null>(null);
+  const [isLoadingMore, setIsLoadingMore] = useState(false);
 
-  const loadEvents = async () => {
+  const loadEvents = async (currentFilter: EventListFilter) => {
     try {
       setIsLoading(true);
-      const eventsData = await getEvents();
-      setEvents(eventsData);
+      const page = await getEventsPage(currentFilter);
+      setEvents(page.results);
+      setNextUrl(page.next);
     } catch (err) {
       console.error('Etkinlikler yüklenirken hata:', err);
       setError('Etkinlikler yüklenirken bir sorun oluştu.');
@@ -29,25 +34,22 @@ export default function EventsPage() {
   };
 
   useEffect(() => {
-    loadEvents();
-  }, []);
-
-  const filteredEvents = events.filter(event => {
-    const now = new Date();
-    const eventDate = new Date(event.start_datetime);
-    const today = new Date(now.getFullYear(), now.getMonth(), now.getDate());
-    
-    switch (filter) {
-      case 'upcoming':
-        return eventDate > now && event.status !== 'completed';
-      case 'today':
-        return eventDate >= today && eventDate < new Date(today.getTime() + 24 * 60 * 60 * 1000);
-      case 'completed':
-        return event.status === 'completed';
-      default:
-        return true;
+    loadEvents(filter);
+  }, [filter]);
+
+  const handleLoadMore = async (url: string) => {
+    try {
+      setIsLoadingMore(true);
+      const page = await getEventsPage(filter, url);
+      setEvents(prev => [...prev, ...page.results]);
+      setNextUrl(page.next);
+    } catch (err) {
+      console.error('Etkinlikler yüklenirken hata:', err);
+      setError('Etkinlikler yüklenirken bir sorun oluştu.');
+    } finally {
+      setIsLoadingMore(false);
     }
-  });
+  };
 
   const formatDateTime = (dateString: string) => {
     const date = new Date(dateString);
@@ -146,7 +148,7 @@ export default function EventsPage() {
             ].map((tab) => (
               <button
                 key={tab.key}
-                onClick={() => setFilter(tab.key as any)}
+                onClick={() => setFilter(tab.key as EventListFilter)}
                 className={`py-2 px-1 border-b-2 font-medium text-sm ${
                   filter === tab.key
                     ? 'border-indigo-500 text-indigo-600'
@@ -161,7 +163,7 @@ export default function EventsPage() {
       </div>
 
       {/* Events Grid */}
-      {filteredEvents.length === 0 ? (
+      {events.length === 0 ? (
         <Card>
           <div className="text-center py-12">
             <CalendarIcon className="mx-auto h-12 w-12 text-gray-400" />
@@ -182,7 +184,7 @@ export default function EventsPage() {
         </Card>
       ) : (
         <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-6">
-          {filteredEvents.map((event) => (
+          {events.map((event) => (
             <Card key={event.id} className="hover:shadow-lg transition-shadow cursor-pointer">
               <Link href={`/events/${event.id}`}>
                 <div className="p-6">
@@ -236,6 +238,8 @@ export default function EventsPage() {
           ))}
         </div>
       )}
+
+      <LoadMoreButton next={nextUrl} isLoading={isLoadingMore} onLoadMore={handleLoadMore} />
     </AppWrapper>
   );
 }
@@ -10,12 +10,14 @@ import {
   TrashIcon,
   FunnelIcon 
 } from '@heroicons/react/24/outline';
+import LoadMoreButton from '@/components/common/LoadMoreButton';
 import { 
-  getNotifications, 
+  getNotificationsPage, 
+  getUnreadNotificationCount,
   markNotificationAsRead, 
   markAllNotificationsAsRead,
   deleteNotification,
-  getNotificationsByType,
+  NotificationListFilter,
   formatNotificationDate,
   getNotificationTypeIcon,
   getNotificationTypeColor,
@@ -28,22 +30,22 @@ export default function NotificationsPage() {
   const [notifications, setNotifications] = useState<NotificationList[]>([]);
   const [isLoading, setIsLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
-  const [filter, setFilter] = useState<'all' | 'unread' | 'reminder' | 'event' | 'email' | 'system'>('all');
+  const [filter, setFilter] = useState<NotificationListFilter>('all');
+  // Liste sayfa sayfa yüklendiğinden okunmamış sayısı sunucudaki sayaçtan alınır
+  const [unreadCount, setUnreadCount] = useState(0);
+  const [nextUrl, setNextUrl] = useState<string | null>(null);
+  const [isLoadingMore, setIsLoadingMore] = useState(false);
 
   const loadNotifications = async () => {
     try {
       setIsLoading(true);
-      let notificationsData: NotificationList[];
-      
-      if (filter === 'all') {
-        notificationsData = await getNotifications();
-      } else if (filter === 'unread') {
-        notificationsData = (await getNotifications()).filter(n => !n.is_read);
-      } else {
-        notificationsData = await getNotificationsByType(filter);
-      }
-      
-      setNotifications(notificationsData);
+      const [page, counter] = await Promise.all([
+        getNotificationsPage(filter),
+        getUnreadNotificationCount()
+      ]);
+      setNotifications(page.results);
+      setNextUrl(page.next);
+      setUnreadCount(counter.unread_count);
     } catch (err) {
       console.error('Bildirimler yüklenirken hata:', err);
       setError('Bildirimler yüklenirken bir sorun oluştu.');
@@ -52,12 +54,27 @@ export default function NotificationsPage() {
     }
   };
 
+  const handleLoadMore = async (url: string) => {
+    try {
+      setIsLoadingMore(true);
+      const page = await getNotificationsPage(filter, url);
+      setNotifications(prev => [...prev, ...page.results]);
+      setNextUrl(page.next);
+    } catch (err) {
+      console.error('Bildirimler yüklenirken hata:', err);
+      setError('Bildirimler yüklenirken bir sorun oluştu.');
+    } finally {
+      setIsLoadingMore(false);
+    }
+  };
+
   const handleMarkAsRead = async (id: number) => {
     try {
       await markNotificationAsRead(id);
       setNotifications(prev => 
         prev.map(n => n.id === id ? { ...n, is_read: true, read_at: new Date().toISOString() } : n)
       );
+      setUnreadCount(prev => Math.max(prev - 1, 0));
     } catch (err) {
       console.error('Bildirim okundu olarak işaretlenirken hata:', err);
     }
@@ -69,6 +86,7 @@ export default function NotificationsPage() {
       setNotifications(prev => 
         prev.map(n => ({ ...n, is_read: true, read_at: new Date().toISOString() }))
       );
+      setUnreadCount(0);
     } catch (err) {
       console.error('Tüm bildirimler okundu olarak işaretlenirken hata:', err);
     }
@@ -78,8 +96,12 @@ export default function NotificationsPage() {
     if (!confirm('Bu bildirimi silmek istediğinizden emin misiniz?')) return;
     
     try {
+      const deleted = notifications.find(n => n.id === id);
       await deleteNotification(id);
       setNotifications(prev => prev.filter(n => n.id !== id));
+      if (deleted && !deleted.is_read) {
+        setUnreadCount(prev => Math.max(prev - 1, 0));
+      }
     } catch (err) {
       console.error('Bildirim silinirken hata:', err);
     }
@@ -89,8 +111,6 @@ export default function NotificationsPage() {
     loadNotifications();
   }, [filter]);
 
-  const unreadCount = notifications.filter(n => !n.is_read).length;
-
   if (isLoading) {
     return (
       <AppWrapper>
@@ -115,7 +135,7 @@ export default function NotificationsPage() {
     <AppWrapper>
       <PageHeader 
         title="Bildirimler" 
-        subtitle={`${notifications.length} bildirim${unreadCount > 0 ? ` (${unreadCount} okunmamış)` : ''}`}
+        subtitle={unreadCount > 0 ? `${unreadCount} okunmamış bildirim` : 'Tüm bildirimler okundu'}
         action={
           unreadCount > 0 ? (
             <button
@@ -149,7 +169,7 @@ export default function NotificationsPage() {
             ].map((tab) => (
               <button
                 key={tab.key}
-                onClick={() => setFilter(tab.key as any)}
+                onClick={() => setFilter(tab.key as NotificationListFilter)}
                 className={`py-2 px-1 border-b-2 font-medium text-sm ${
                   filter === tab.key
                     ? 'border-indigo-500 text-indigo-600'
@@ -250,6 +270,8 @@ export default function NotificationsPage() {
           ))}
         </div>
       )}
+
+      <LoadMoreButton next={nextUrl} isLoading={isLoadingMore} onLoadMore={handleLoadMore} />
     </AppWrapper>
   );
 }
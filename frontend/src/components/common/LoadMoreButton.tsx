@@ -0,0 +1,29 @@
+'use client';
+
+interface LoadMoreButtonProps {
+  // Sonraki sayfanın bağlantısı; yoksa buton gösterilmez
+  next: string | null;
+  isLoading: boolean;
+  onLoadMore: (next: string) => void;
+  className?: string;
+}
+
+// Sayfalı listelerin sonuna eklenen "Daha fazla yükle" butonu
+export default function LoadMoreButton({ next, isLoading, onLoadMore, className = '' }: LoadMoreButtonProps) {
+  if (!next) {
+    return null;
+  }
+
+  return (
+    <div className={`mt-6 flex justify-center ${className}`}>
+      <button
+        type="button"
+        onClick={() => onLoadMore(next)}
+        disabled={isLoading}
+        className="inline-flex items-center px-4 py-2 border border-gray-300 text-sm font-medium rounded-md shadow-sm text-gray-700 bg-white hover:bg-gray-50 focus:outline-none focus:ring-2 focus:ring-offset-2 focus:ring-indigo-500 disabled:opacity-50"
+      >
+        {isLoading ? 'Yükleniyor...' : 'Daha fazla yükle'}
+      </button>
+    </div>
+  );
+}
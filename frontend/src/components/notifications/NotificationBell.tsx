@@ -11,7 +11,8 @@ import {
   markAllNotificationsAsRead,
   formatNotificationDate,
   getNotificationTypeIcon,
-  getNotificationTypeColor
+  getNotificationTypeColor,
+  subscribeToNotifications
 } from '@/services/notificationService';
 import { NotificationList } from '@/types/notifications';
 
@@ -36,8 +37,8 @@ export default function NotificationBell() {
   const loadUnreadNotifications = async () => {
     try {
       setIsLoading(true);
-      const unreadNotifications = await getUnreadNotifications();
-      setNotifications(unreadNotifications.slice(0, 10)); // Son 10 bildirim
+      const unreadNotifications = await getUnreadNotifications(10); // Son 10 bildirim
+      setNotifications(unreadNotifications);
     } catch (error) {
       console.error('Bildirimler yüklenirken hata:', error);
     } finally {
@@ -87,13 +88,33 @@ export default function NotificationBell() {
     return () => document.removeEventListener('mousedown', handleClickOutside);
   }, []);
 
-  // Sayfa yüklendiğinde bildirim sayısını yükle
+  // Sayfa yüklendiğinde bildirim sayısını yükle, yeni bildirimleri anlık akıştan al
   useEffect(() => {
     loadUnreadCount();
-    
-    // Her 30 saniyede bir bildirim sayısını güncelle
-    const interval = setInterval(loadUnreadCount, 30000);
-    return () => clearInterval(interval);
+
+    let interval: ReturnType<typeof setInterval> | undefined;
+    const unsubscribe = subscribeToNotifications(
+      (notification) => {
+        setUnreadCount(prev => prev + 1);
+        setNotifications(prev => [notification, ...prev.filter(n => n.id !== notification.id)].slice(0, 10));
+      },
+      () => {
+        loadUnreadCount();
+        loadUnreadNotifications();
+      },
+      () => {
+        // Anlık akış yoksa her 30 saniyede bir bildirim sayısını güncelle
+        if (!interval) {
+          interval = setInterval(loadUnreadCount, 30000);
+        }
+      }
+    );
+    return () => {
+      unsubscribe();
+      if (interval) {
+        clearInterval(interval);
+      }
+    };
   }, []);
 
   return (
@@ -39,4 +39,44 @@ apiClient.interceptors.response.use(
   }
 );
 
+// Keyset sayfalı liste yanıtı ({ next, previous, results })
+export interface PaginatedResponse<T> {
+  next: string | null;
+  previous: string | null;
+  count?: number;
+  results: T[];
+}
+
+// Liste endpoint'inin tek bir sayfasını getirir. `url` bir önceki sayfanın `next`
+// bağlantısı da olabilir (sorgu parametrelerini zaten içerir). Sayfalanmayan
+// endpoint'lerin düz dizi yanıtları tek sayfa olarak döner.
+export const getPage = async <T>(url: string, params?: Record<string, unknown>): Promise<PaginatedResponse<T>> => {
+  const response: { data: T[] | PaginatedResponse<T> } = await apiClient.get(url, { params });
+  if (Array.isArray(response.data)) {
+    return { next: null, previous: null, results: response.data };
+  }
+  return response.data;
+};
+
+// Liste endpoint'inin tüm sayfalarını `next` bağlantılarını izleyerek getirir;
+// sayfalanmayan endpoint'lerin düz dizi yanıtları olduğu gibi döner.
+// Yalnızca küçük seçim listeleri (dropdown'lar) için kullanılır; liste sayfaları
+// getPage ile sayfa sayfa yükler.
+export const getAllPages = async <T>(url: string, params?: Record<string, unknown>): Promise<T[]> => {
+  const items: T[] = [];
+  let nextUrl: string | null = url;
+  let nextParams = params;
+  while (nextUrl) {
+    const response: { data: T[] | PaginatedResponse<T> } = await apiClient.get(nextUrl, { params: nextParams });
+    if (Array.isArray(response.data)) {
+      return response.data;
+    }
+    items.push(...response.data.results);
+    nextUrl = response.data.next;
+    // `next` bağlantısı sorgu parametrelerini zaten içerir
+    nextParams = undefined;
+  }
+  return items;
+};
+
 export default apiClient;
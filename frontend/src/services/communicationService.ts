@@ -1,4 +1,4 @@
-import apiClient from './apiClient';
+import apiClient, { getAllPages, getPage, PaginatedResponse } from './apiClient';
 import { getAuthToken } from './authService';
 import axios from 'axios';
 import {
@@ -7,17 +7,18 @@ import {
   EmailConfig,
   SendEmailRequest,
   IncomingEmail,
-  ImapSettings
+  ImapSettings,
+  MailboxSyncJob,
+  MailboxSyncStartResponse
 } from '../types/communications';
 
 // E-posta şablonları için API çağrıları
 const TEMPLATES_URL = '/api/v1/communications/email-templates/';
 
-// E-posta şablonlarını getir
+// E-posta şablonlarını getir (şablon seçimi için tamamı)
 export const getEmailTemplates = async (): Promise<EmailTemplate[]> => {
   try {
-    const response = await apiClient.get(TEMPLATES_URL);
-    return response.data;
+    return await getAllPages<EmailTemplate>(TEMPLATES_URL);
   } catch (error) {
     console.error("Template fetch error:", error);
     return [];
@@ -56,11 +57,12 @@ export const deleteEmailTemplate = async (id: number): Promise<void> => {
 // E-posta mesajları için API çağrıları
 const EMAILS_URL = '/api/v1/communications/messages/';
 
-// E-postaları getir
-export const getEmails = async (status?: string): Promise<EmailMessage[]> => {
-  const url = status ? `${EMAILS_URL}?status=${status}` : EMAILS_URL;
-  const response = await apiClient.get(url);
-  return response.data;
+// E-postaların bir sayfasını getir; sonraki sayfalar için önceki yanıtın `next` bağlantısı `url` olarak verilir
+export const getEmails = async (status?: string, url?: string): Promise<PaginatedResponse<EmailMessage>> => {
+  if (url) {
+    return getPage<EmailMessage>(url);
+  }
+  return getPage<EmailMessage>(EMAILS_URL, status ? { status } : undefined);
 };
 
 // Belirli bir e-postayı getir
@@ -75,23 +77,26 @@ export const sendEmail = async (emailData: SendEmailRequest): Promise<EmailMessa
   return response.data;
 };
 
-// Gönderilen e-postaları getir
+// Gönderilen e-postaların bir sayfasını getir; sonraki sayfalar için önceki
+// yanıtın `next` bağlantısı `url` olarak verilir (filtreleri zaten içerir)
 export const getSentEmails = async (filters?: {
   company?: number;
   contact?: number;
   content?: string;
   opportunity?: number;
-}): Promise<EmailMessage[]> => {
-  let url = `${EMAILS_URL}?status=sent`;
+}, url?: string): Promise<PaginatedResponse<EmailMessage>> => {
+  if (url) {
+    return getPage<EmailMessage>(url);
+  }
 
+  const params: Record<string, unknown> = { status: 'sent' };
   if (filters) {
-    if (filters.company) url += `&company=${filters.company}`;
-    if (filters.contact) url += `&contact=${filters.contact}`;
-    if (filters.opportunity) url += `&opportunity=${filters.opportunity}`;
+    if (filters.company) params.company = filters.company;
+    if (filters.contact) params.contact = filters.contact;
+    if (filters.opportunity) params.opportunity = filters.opportunity;
   }
 
-  const response = await apiClient.get(url);
-  return response.data;
+  return getPage<EmailMessage>(EMAILS_URL, params);
 };
 
 // Taslak e-posta kaydet
@@ -117,8 +122,7 @@ const CONFIGS_URL = '/communications/email-configs/';
 
 // E-posta ayarlarını getir
 export const getEmailConfigs = async (): Promise<EmailConfig[]> => {
-  const response = await apiClient.get(CONFIGS_URL);
-  return response.data;
+  return getAllPages<EmailConfig>(CONFIGS_URL);
 };
 
 // Belirli bir e-posta ayarını getir
@@ -158,8 +162,7 @@ export const setDefaultEmailConfig = async (id: number): Promise<EmailConfig> =>
 
 // Test e-postalarını görüntüleme (sadece geliştirme ortamında çalışır)
 export const getTestEmails = async (): Promise<any[]> => {
-  const response = await apiClient.get(`${EMAILS_URL}test-emails/`);
-  return response.data;
+  return getAllPages<any>(`${EMAILS_URL}test-emails/`);
 };
 
 export const getTestEmailDetail = async (id: string): Promise<any> => {
@@ -170,15 +173,9 @@ export const getTestEmailDetail = async (id: string): Promise<any> => {
 // Gelen e-postalar için API çağrıları
 const INCOMING_EMAILS_URL = '/api/v1/communications/incoming-emails/';
 
-// Gelen e-postaları getir
-export const getIncomingEmails = async (): Promise<IncomingEmail[]> => {
-  try {
-    const response = await apiClient.get(INCOMING_EMAILS_URL);
-    return response.data.results || response.data;
-  } catch (error) {
-    console.error("Incoming emails fetch error:", error);
-    return [];
-  }
+// Gelen e-postaların bir sayfasını getir; sonraki sayfalar için önceki yanıtın `next` bağlantısı `url` olarak verilir
+export const getIncomingEmails = async (url: string = INCOMING_EMAILS_URL): Promise<PaginatedResponse<IncomingEmail>> => {
+  return getPage<IncomingEmail>(url);
 };
 
 // Belirli bir gelen e-postayı getir
@@ -187,12 +184,19 @@ export const getIncomingEmailById = async (id: number): Promise<IncomingEmail> =
   return response.data;
 };
 
-// E-postaları IMAP ile al
-export const fetchEmailsFromIMAP = async (): Promise<{ success: boolean; message: string; fetched_count: number; saved_count: number }> => {
+// E-postaları IMAP ile al. Senkronizasyon arka planda çalışır; dönen iş
+// getMailboxSyncJob ile tamamlanana kadar takip edilir.
+export const fetchEmailsFromIMAP = async (): Promise<MailboxSyncStartResponse> => {
   const response = await apiClient.post(`${INCOMING_EMAILS_URL}fetch/`);
   return response.data;
 };
 
+// Senkronizasyon işinin durumunu ve ilerlemesini getir
+export const getMailboxSyncJob = async (id: number): Promise<MailboxSyncJob> => {
+  const response = await apiClient.get(`${INCOMING_EMAILS_URL}sync-jobs/${id}/`);
+  return response.data;
+};
+
 // E-postayı okunmuş olarak işaretle
 export const markEmailAsRead = async (id: number): Promise<any> => {
   const response = await apiClient.patch(`${INCOMING_EMAILS_URL}${id}/mark-read/`);
@@ -1,12 +1,19 @@
-import apiClient from './apiClient';
+import apiClient, { getAllPages, getPage, PaginatedResponse } from './apiClient';
 import { Company, CompanyCreate, CompanyList, CompanyDetail } from '../types/customer';
 
 const COMPANIES_URL = '/api/v1/customers/companies/';
 
-// Tüm şirketleri getir
+// Tüm şirketleri getir (seçim listeleri için)
 export const getCompanies = async (): Promise<CompanyList[]> => {
-  const response = await apiClient.get(COMPANIES_URL);
-  return response.data;
+  return getAllPages<CompanyList>(COMPANIES_URL);
+};
+
+// Şirket listesinin bir sayfasını getir; `url` bir önceki sayfanın `next` bağlantısı olabilir
+export const getCompaniesPage = async (
+  url: string = COMPANIES_URL,
+  params?: Record<string, unknown>
+): Promise<PaginatedResponse<CompanyList>> => {
+  return getPage<CompanyList>(url, params);
 };
 
 // Belirli bir şirketin detaylarını getir
@@ -40,6 +47,5 @@ export const searchCompanies = async (query: string): Promise<CompanyList[]> =>
 
 // Şirketin iletişim kişilerini getir
 export const getCompanyContacts = async (companyId: number) => {
-  const response = await apiClient.get(`${COMPANIES_URL}${companyId}/contacts/`);
-  return response.data;
+  return getAllPages(`${COMPANIES_URL}${companyId}/contacts/`);
 };
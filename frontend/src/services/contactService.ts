@@ -1,12 +1,19 @@
-import apiClient from './apiClient';
+import apiClient, { getAllPages, getPage, PaginatedResponse } from './apiClient';
 import { Contact, ContactCreate } from '../types/customer';
 
 const CONTACTS_URL = '/api/v1/customers/contacts/';
 
-// Tüm kişileri getir
+// Tüm kişileri getir (seçim listeleri için)
 export const getContacts = async (): Promise<Contact[]> => {
-  const response = await apiClient.get(CONTACTS_URL);
-  return response.data;
+  return getAllPages<Contact>(CONTACTS_URL);
+};
+
+// Kişi listesinin bir sayfasını getir; `url` bir önceki sayfanın `next` bağlantısı olabilir
+export const getContactsPage = async (
+  url: string = CONTACTS_URL,
+  params?: Record<string, unknown>
+): Promise<PaginatedResponse<Contact>> => {
+  return getPage<Contact>(url, params);
 };
 
 // Belirli bir kişinin detaylarını getir
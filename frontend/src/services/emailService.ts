@@ -22,7 +22,7 @@ export interface EmailMessage {
   recipients: any[];
   cc?: any[];
   bcc?: any[];
-  status: 'draft' | 'sending' | 'sent' | 'failed';
+  status: 'draft' | 'queued' | 'sending' | 'sent' | 'failed' | 'dead';
   error_message?: string;
   company?: any;
   contact?: any;
@@ -67,18 +67,13 @@ class EmailService {
 
   async sendEmail(emailData: EmailData): Promise<any> {
     try {
-      // Önce ekleri yükle
-      const attachmentData: any[] = [];
+      // Önce ekleri yükle, gönderimde sadece id'leri ile referans ver
+      const attachmentIds: number[] = [];
       
       if (emailData.attachments && emailData.attachments.length > 0) {
         for (const file of emailData.attachments) {
           const uploadedAttachment = await this.uploadAttachment(file);
-          attachmentData.push({
-            file_name: uploadedAttachment.file_name,
-            file_content: uploadedAttachment.file_content,
-            file_size: uploadedAttachment.file_size,
-            content_type: uploadedAttachment.content_type
-          });
+          attachmentIds.push(uploadedAttachment.id);
         }
       }
 
@@ -89,7 +84,7 @@ class EmailService {
         recipients: emailData.recipients.map(email => ({ email: email.trim() })),
         cc: emailData.cc?.map(email => ({ email: email.trim() })) || [],
         bcc: emailData.bcc?.map(email => ({ email: email.trim() })) || [],
-        attachments: attachmentData,
+        attachment_ids: attachmentIds,
         company_id: emailData.company_id,
         contact_id: emailData.contact_id
         
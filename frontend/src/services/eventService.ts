@@ -1,4 +1,4 @@
-import apiClient from './apiClient';
+import apiClient, { getAllPages, getPage, PaginatedResponse } from './apiClient';
 import { Event, EventList, EventCreate, EventUpdate, EventParticipant, EventParticipantCreate, EventParticipantUpdate } from '../types/events';
 
 const EVENTS_URL = '/api/v1/events/events/';
@@ -6,10 +6,27 @@ const PARTICIPANTS_URL = '/api/v1/events/participants/';
 
 // Event API calls
 
-// Tüm etkinlikleri getir
-export const getEvents = async (): Promise<EventList[]> => {
-  const response = await apiClient.get(EVENTS_URL);
-  return response.data;
+export type EventListFilter = 'all' | 'upcoming' | 'today' | 'completed';
+
+// Etkinlik listesinin bir sayfasını getir. Filtre sunucuda uygulanır; sonraki
+// sayfalar için önceki yanıtın `next` bağlantısı `url` olarak verilir.
+export const getEventsPage = async (
+  filter: EventListFilter = 'all',
+  url?: string
+): Promise<PaginatedResponse<EventList>> => {
+  if (url) {
+    return getPage<EventList>(url);
+  }
+  switch (filter) {
+    case 'upcoming':
+      return getPage<EventList>(`${EVENTS_URL}upcoming/`);
+    case 'today':
+      return getPage<EventList>(`${EVENTS_URL}today/`);
+    case 'completed':
+      return getPage<EventList>(EVENTS_URL, { status: 'completed' });
+    default:
+      return getPage<EventList>(EVENTS_URL);
+  }
 };
 
 // Belirli bir etkinliğin detaylarını getir
@@ -37,32 +54,27 @@ export const deleteEvent = async (id: number): Promise<void> => {
 
 // Yaklaşan etkinlikleri getir
 export const getUpcomingEvents = async (): Promise<EventList[]> => {
-  const response = await apiClient.get(`${EVENTS_URL}upcoming/`);
-  return response.data;
+  return getAllPages<EventList>(`${EVENTS_URL}upcoming/`);
 };
 
 // Bugünkü etkinlikleri getir
 export const getTodayEvents = async (): Promise<EventList[]> => {
-  const response = await apiClient.get(`${EVENTS_URL}today/`);
-  return response.data;
+  return getAllPages<EventList>(`${EVENTS_URL}today/`);
 };
 
 // Bu haftaki etkinlikleri getir
 export const getThisWeekEvents = async (): Promise<EventList[]> => {
-  const response = await apiClient.get(`${EVENTS_URL}this_week/`);
-  return response.data;
+  return getAllPages<EventList>(`${EVENTS_URL}this_week/`);
 };
 
 // Firma ile ilişkili etkinlikleri getir
 export const getCompanyEvents = async (companyId: number): Promise<EventList[]> => {
-  const response = await apiClient.get(`${EVENTS_URL}company_events/?company_id=${companyId}`);
-  return response.data;
+  return getAllPages<EventList>(`${EVENTS_URL}company_events/?company_id=${companyId}`);
 };
 
 // Kişi ile ilişkili etkinlikleri getir
 export const getContactEvents = async (contactId: number): Promise<EventList[]> => {
-  const response = await apiClient.get(`${EVENTS_URL}contact_events/?contact_id=${contactId}`);
-  return response.data;
+  return getAllPages<EventList>(`${EVENTS_URL}contact_events/?contact_id=${contactId}`);
 };
 
 // Etkinliği tamamla
@@ -81,14 +93,12 @@ export const cancelEvent = async (id: number, reason?: string): Promise<Event> =
 
 // Tüm katılımcıları getir
 export const getEventParticipants = async (): Promise<EventParticipant[]> => {
-  const response = await apiClient.get(PARTICIPANTS_URL);
-  return response.data;
+  return getAllPages<EventParticipant>(PARTICIPANTS_URL);
 };
 
 // Belirli bir etkinliğin katılımcılarını getir
 export const getEventParticipantsByEvent = async (eventId: number): Promise<EventParticipant[]> => {
-  const response = await apiClient.get(`${PARTICIPANTS_URL}event_participants/?event_id=${eventId}`);
-  return response.data;
+  return getAllPages<EventParticipant>(`${PARTICIPANTS_URL}event_participants/?event_id=${eventId}`);
 };
 
 // Belirli bir katılımcının detaylarını getir
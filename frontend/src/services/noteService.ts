@@ -1,12 +1,11 @@
-import apiClient from './apiClient';
+import apiClient, { getAllPages } from './apiClient';
 import { Note } from '../types/customer';
 
 const NOTES_URL = '/api/v1/customers/notes/';
 
 // Tüm notları getir
 export const getNotes = async (): Promise<Note[]> => {
-  const response = await apiClient.get(NOTES_URL);
-  return response.data;
+  return getAllPages<Note>(NOTES_URL);
 };
 
 // Belirli bir notun detaylarını getir
@@ -34,6 +33,5 @@ export const deleteNote = async (id: number): Promise<void> => {
 
 // Firma veya kişi ile ilişkili notları getir
 export const getRelatedNotes = async (entityType: 'company' | 'contact', entityId: number): Promise<Note[]> => {
-  const response = await apiClient.get(`${NOTES_URL}?${entityType}=${entityId}`);
-  return response.data;
+  return getAllPages<Note>(`${NOTES_URL}?${entityType}=${entityId}`);
 };
@@ -1,4 +1,4 @@
-import apiClient from './apiClient';
+import apiClient, { getPage, PaginatedResponse } from './apiClient';
 import {
   Notification,
   NotificationList,
@@ -10,13 +10,28 @@ import {
 
 const NOTIFICATIONS_URL = '/api/v1/notifications/notifications/';
 const PREFERENCES_URL = '/api/v1/notifications/preferences/';
+const STREAM_URL = '/api/v1/notifications/stream/';
 
 // Notification API calls
 
-// Tüm bildirimleri getir (kullanıcının kendi bildirimleri)
-export const getNotifications = async (): Promise<NotificationList[]> => {
-  const response = await apiClient.get(NOTIFICATIONS_URL);
-  return response.data;
+export type NotificationListFilter = 'all' | 'unread' | 'reminder' | 'event' | 'email' | 'system';
+
+// Kullanıcının bildirimlerinin bir sayfasını getir. Filtre sunucuda uygulanır;
+// sonraki sayfalar için önceki yanıtın `next` bağlantısı `url` olarak verilir.
+export const getNotificationsPage = async (
+  filter: NotificationListFilter = 'all',
+  url?: string
+): Promise<PaginatedResponse<NotificationList>> => {
+  if (url) {
+    return getPage<NotificationList>(url);
+  }
+  if (filter === 'all') {
+    return getPage<NotificationList>(NOTIFICATIONS_URL);
+  }
+  if (filter === 'unread') {
+    return getPage<NotificationList>(`${NOTIFICATIONS_URL}unread/`);
+  }
+  return getPage<NotificationList>(`${NOTIFICATIONS_URL}by_type/`, { type: filter });
 };
 
 // Belirli bir bildirimin detaylarını getir
@@ -42,10 +57,10 @@ export const deleteNotification = async (id: number): Promise<void> => {
   await apiClient.delete(`${NOTIFICATIONS_URL}${id}/`);
 };
 
-// Okunmamış bildirimleri getir
-export const getUnreadNotifications = async (): Promise<NotificationList[]> => {
-  const response = await apiClient.get(`${NOTIFICATIONS_URL}unread/`);
-  return response.data;
+// En son okunmamış bildirimleri getir
+export const getUnreadNotifications = async (limit = 10): Promise<NotificationList[]> => {
+  const page = await getPage<NotificationList>(`${NOTIFICATIONS_URL}unread/`, { page_size: limit });
+  return page.results;
 };
 
 // Okunmamış bildirim sayısını getir
@@ -66,12 +81,6 @@ export const markAllNotificationsAsRead = async (): Promise<{ message: string }>
   return response.data;
 };
 
-// Bildirim tipine göre filtreleme
-export const getNotificationsByType = async (type: string): Promise<NotificationList[]> => {
-  const response = await apiClient.get(`${NOTIFICATIONS_URL}by_type/?type=${type}`);
-  return response.data;
-};
-
 // Toplu bildirim oluşturma
 export const createBulkNotifications = async (bulkNotification: BulkNotificationCreate): Promise<{ message: string; created_count: number }> => {
   const response = await apiClient.post(`${NOTIFICATIONS_URL}bulk_create/`, bulkNotification);
@@ -84,6 +93,80 @@ export const getRecentNotifications = async (limit = 10): Promise<{ notification
   return response.data;
 };
 
+// Anlık bildirim akışına bağlanmak için kısa ömürlü bilet al
+export const getNotificationStreamTicket = async (): Promise<{ ticket: string; expires_in: number }> => {
+  const response = await apiClient.post(`${NOTIFICATIONS_URL}stream_ticket/`);
+  return response.data;
+};
+
+// Üst üste bu kadar bağlantı denemesi başarısız olursa yoklamaya dönülür
+const MAX_STREAM_FAILURES = 3;
+
+// Anlık bildirim akışına (SSE) abone ol; akış kullanılamıyorsa onUnavailable çağrılır.
+// Bilet yalnızca bağlantı kurulurken geçerli olduğundan, bağlantı kapanınca yeni biletle
+// ve son görülen bildirim id'siyle yeniden bağlanılır.
+export const subscribeToNotifications = (
+  onNotification: (notification: NotificationList) => void,
+  onResync: () => void,
+  onUnavailable: () => void
+): (() => void) => {
+  if (typeof EventSource === 'undefined') {
+    onUnavailable();
+    return () => {};
+  }
+
+  let source: EventSource | null = null;
+  let closed = false;
+  let failures = 0;
+  let lastId: string | null = null;
+
+  const connect = async () => {
+    let ticket: string;
+    try {
+      ({ ticket } = await getNotificationStreamTicket());
+    } catch {
+      onUnavailable();
+      return;
+    }
+    if (closed) {
+      return;
+    }
+
+    const params = new URLSearchParams({ ticket });
+    if (lastId) {
+      params.set('last_id', lastId);
+    }
+    source = new EventSource(`${apiClient.defaults.baseURL}${STREAM_URL}?${params}`);
+    source.onopen = () => {
+      failures = 0;
+    };
+    source.addEventListener('notification', (event) => {
+      const message = event as MessageEvent;
+      lastId = message.lastEventId || lastId;
+      onNotification(JSON.parse(message.data));
+    });
+    source.addEventListener('resync', onResync);
+    source.onerror = () => {
+      // Sunucu akışı reddettiyse (ör. bilet süresi dolduysa) tarayıcı yeniden denemez
+      if (source?.readyState === EventSource.CLOSED && !closed) {
+        source.close();
+        failures += 1;
+        if (failures >= MAX_STREAM_FAILURES) {
+          onUnavailable();
+        } else {
+          connect();
+        }
+      }
+    };
+  };
+
+  connect();
+  return () => {
+    closed = true;
+    source?.close();
+  };
+};
+
 // Bekleyen hatırlatmaları getir
 export const getPendingReminders = async (): Promise<{ pending_reminders: NotificationList[] }> => {
   const response = await apiClient.get(`${NOTIFICATIONS_URL}pending_reminders/`);
@@ -1,4 +1,4 @@
-import apiClient from './apiClient';
+import apiClient, { getAllPages, getPage } from './apiClient';
 import { 
   OpportunityStatus, 
   OpportunityList, 
@@ -21,8 +21,7 @@ export const getOpportunityStatuses = async (): Promise<OpportunityStatus[]> =>
 
 // Tüm fırsatları getir
 export const getOpportunities = async (): Promise<OpportunityList[]> => {
-  const response = await apiClient.get(OPPORTUNITIES_URL);
-  return response.data;
+  return getAllPages<OpportunityList>(OPPORTUNITIES_URL);
 };
 
 // Kanban formatında fırsatları getir
@@ -31,10 +30,10 @@ export const getOpportunitiesKanban = async (): Promise<KanbanColumn[]> => {
   return response.data;
 };
 
-// Fırsatları ara
+// Fırsatları ara (en iyi eşleşen ilk sayfa)
 export const searchOpportunities = async (query: string): Promise<OpportunityList[]> => {
-  const response = await apiClient.get(`${OPPORTUNITIES_URL}search/?q=${query}`);
-  return response.data;
+  const page = await getPage<OpportunityList>(OPPORTUNITIES_URL, { search: query });
+  return page.results;
 };
 
 // Belirli bir fırsatın detaylarını getir
@@ -74,12 +73,10 @@ export const addOpportunityActivity = async (activity: OpportunityActivityCreate
 
 // Firma ilişkili fırsatları getir
 export const getCompanyOpportunities = async (companyId: number): Promise<OpportunityList[]> => {
-  const response = await apiClient.get(`${OPPORTUNITIES_URL}?company=${companyId}`);
-  return response.data;
+  return getAllPages<OpportunityList>(`${OPPORTUNITIES_URL}company_opportunities/`, { company_id: companyId });
 };
 
 // Kişi ilişkili fırsatları getir
 export const getContactOpportunities = async (contactId: number): Promise<OpportunityList[]> => {
-  const response = await apiClient.get(`${OPPORTUNITIES_URL}?contact=${contactId}`);
-  return response.data;
+  return getAllPages<OpportunityList>(`${OPPORTUNITIES_URL}?contact=${contactId}`);
 };
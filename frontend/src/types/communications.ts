@@ -92,3 +92,25 @@ export interface IncomingEmail {
   attachments?: any[];
   recipients_count: number;
 }
+
+export interface MailboxSyncJob {
+  id: number;
+  status: 'queued' | 'running' | 'success' | 'failed' | 'skipped';
+  status_display: string;
+  progress: number;
+  headers_only: boolean;
+  fetched_count: number;
+  saved_count: number;
+  batches_done: number;
+  batch_count: number;
+  message: string;
+  created_at: string;
+  started_at: string | null;
+  finished_at: string | null;
+}
+
+// E-posta alma isteğinin yanıtı (kuyruğa alınan iş ve ek alanlar)
+export interface MailboxSyncStartResponse extends MailboxSyncJob {
+  success: boolean;
+  job_id: number;
+}